@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+带宽调度模块
+
+多台设备同时从FileHTTPServer下载时，按令牌桶限制发送速率：
+- 全局带宽上限（所有连接共享）
+- 单客户端带宽上限（按设备IP）
+- 优先级分类（配置文件优先于大文件/媒体），按权重加权公平分配
+- 统计每次传输实际达到的速率
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Optional
+import logging
+
+
+# 优先级分类及其权重：竞争全局带宽时按权重比例分配
+PRIORITY_WEIGHTS = {
+    'config': 8,
+    'normal': 4,
+    'bulk': 1,
+}
+
+CONFIG_EXTENSIONS = {
+    '.conf', '.cfg', '.ini', '.json', '.xml', '.yaml', '.yml', '.txt', '.sh', '.properties'
+}
+BULK_EXTENSIONS = {
+    '.img', '.iso', '.ota', '.squashfs', '.zip', '.tar', '.gz', '.tgz', '.xz', '.bz2',
+    '.mp3', '.mp4', '.avi', '.mkv', '.mov', '.jpg', '.jpeg', '.png'
+}
+BULK_SIZE = 16 * 1024 * 1024  # 超过此大小的文件归为bulk
+CHUNK_SIZE = 64 * 1024  # 限速时每次申请的字节数
+
+
+class TokenBucket:
+    """令牌桶（非线程安全，由BandwidthScheduler的锁保护）"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        初始化令牌桶
+
+        Args:
+            rate (float): 速率（字节/秒）
+            burst (float, optional): 桶容量，默认0.25秒的流量且不小于一个发送块
+        """
+        self.rate = rate
+        self.burst = burst or max(rate * 0.25, CHUNK_SIZE)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, nbytes: int, now: float) -> float:
+        """获取nbytes字节还需等待的秒数"""
+        self._refill(now)
+        needed = min(nbytes, self.burst)
+        return 0.0 if self.tokens >= needed else (needed - self.tokens) / self.rate
+
+    def consume(self, nbytes: int, now: float):
+        """扣除令牌（允许透支，透支部分由后续等待补偿）"""
+        self._refill(now)
+        self.tokens -= nbytes
+
+
+class Transfer:
+    """
+    一次传输的调度状态与统计
+
+    Attributes:
+        client (str): 客户端地址
+        name (str): 文件名
+        priority (str): 优先级分类
+        bytes_sent (int): 已发送字节数
+    """
+
+    def __init__(self, client: str, name: str, priority: str, vtime: float):
+        self.client = client
+        self.name = name
+        self.priority = priority
+        self.weight = PRIORITY_WEIGHTS.get(priority, PRIORITY_WEIGHTS['normal'])
+        self.vtime = vtime  # 加权虚拟时间：已发送字节 / 权重
+        self.bytes_sent = 0
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        """传输耗时（秒）"""
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def achieved_rate(self) -> float:
+        """实际达到的速率（字节/秒）"""
+        elapsed = self.elapsed
+        return self.bytes_sent / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        """转换为统计字典"""
+        return {
+            'client': self.client,
+            'name': self.name,
+            'priority': self.priority,
+            'bytes': self.bytes_sent,
+            'seconds': round(self.elapsed, 3),
+            'rate': round(self.achieved_rate, 1),
+        }
+
+
+class BandwidthScheduler:
+    """
+    加权公平的带宽调度器
+
+    未设置任何上限时不做限速，只统计速率。设置上限后发送循环按块申请令牌：
+    先满足单客户端令牌桶，再在等待全局令牌的传输中选择加权虚拟时间最小者，
+    使高优先级传输按权重获得更多带宽，同时低优先级传输不会被饿死。
+    """
+
+    def __init__(self, global_rate: Optional[float] = None, per_client_rate: Optional[float] = None,
+                 logger: Optional[logging.Logger] = None, history_size: int = 100):
+        """
+        初始化带宽调度器
+
+        Args:
+            global_rate (float, optional): 全局带宽上限（字节/秒），None表示不限
+            per_client_rate (float, optional): 单客户端带宽上限（字节/秒），None表示不限
+            logger (logging.Logger, optional): 日志记录器
+            history_size (int): 保留的已完成传输记录数
+        """
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self._cond = threading.Condition()
+        self._global_bucket: Optional[TokenBucket] = None
+        self._per_client_rate: Optional[float] = None
+        self._client_buckets: Dict[str, TokenBucket] = {}
+        self._active: List[Transfer] = []
+        self._waiting: List[Transfer] = []
+        self._history: Deque[Transfer] = deque(maxlen=history_size)
+        self.set_limits(global_rate, per_client_rate)
+
+    def set_limits(self, global_rate: Optional[float] = None, per_client_rate: Optional[float] = None):
+        """
+        设置带宽上限，对进行中的传输立即生效
+
+        Args:
+            global_rate (float, optional): 全局带宽上限（字节/秒）
+            per_client_rate (float, optional): 单客户端带宽上限（字节/秒）
+        """
+        with self._cond:
+            self._global_bucket = TokenBucket(global_rate) if global_rate else None
+            self._per_client_rate = per_client_rate or None
+            self._client_buckets.clear()
+            self._cond.notify_all()
+
+    @property
+    def limited(self) -> bool:
+        """是否设置了任何带宽上限"""
+        return self._global_bucket is not None or self._per_client_rate is not None
+
+    @staticmethod
+    def classify(filename: str, size: int = 0, is_binary: Optional[bool] = None) -> str:
+        """
+        根据文件名、大小和类型确定优先级分类
+
+        Args:
+            filename (str): 文件名
+            size (int): 文件大小
+            is_binary (bool, optional): 是否为二进制文件
+
+        Returns:
+            str: 'config'、'normal' 或 'bulk'
+        """
+        ext = os.path.splitext(filename)[1].lower()
+        if ext in BULK_EXTENSIONS or size >= BULK_SIZE:
+            return 'bulk'
+        if ext in CONFIG_EXTENSIONS or is_binary is False:
+            return 'config'
+        return 'normal'
+
+    @contextmanager
+    def open_transfer(self, client: str, name: str, priority: str = 'normal'):
+        """
+        登记一次传输，结束时记录实际速率
+
+        Args:
+            client (str): 客户端地址
+            name (str): 文件名
+            priority (str): 优先级分类
+
+        Yields:
+            Transfer: 传输状态，发送循环用它申请令牌
+        """
+        with self._cond:
+            # 新传输从当前最小虚拟时间开始，不能借空闲时段累积的额度插队
+            vtime = min((t.vtime for t in self._active), default=0.0)
+            transfer = Transfer(client, name, priority, vtime)
+            self._active.append(transfer)
+        try:
+            yield transfer
+        finally:
+            with self._cond:
+                transfer.finished = time.monotonic()
+                self._active.remove(transfer)
+                if not any(t.client == client for t in self._active):
+                    self._client_buckets.pop(client, None)
+                self._history.append(transfer)
+                self._cond.notify_all()
+            self.logger.debug(f"传输结束: {name} -> {client} [{priority}] "
+                              f"{transfer.bytes_sent} bytes, {transfer.achieved_rate / 1024:.1f} KB/s")
+
+    def acquire(self, transfer: Transfer, nbytes: int):
+        """
+        为传输申请发送nbytes字节的额度，必要时阻塞等待
+
+        Args:
+            transfer (Transfer): open_transfer返回的传输
+            nbytes (int): 即将发送的字节数
+        """
+        if not self.limited:
+            transfer.bytes_sent += nbytes
+            return
+        with self._cond:
+            self._waiting.append(transfer)
+            try:
+                while True:
+                    wait = self._grant_delay(transfer, nbytes, time.monotonic())
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+            finally:
+                self._waiting.remove(transfer)
+            now = time.monotonic()
+            if self._global_bucket:
+                self._global_bucket.consume(nbytes, now)
+            client_bucket = self._client_bucket(transfer.client)
+            if client_bucket:
+                client_bucket.consume(nbytes, now)
+            transfer.vtime += nbytes / transfer.weight
+            self._cond.notify_all()
+        transfer.bytes_sent += nbytes
+
+    def record(self, transfer: Transfer, nbytes: int):
+        """记录未经限速发送的字节数"""
+        transfer.bytes_sent += nbytes
+
+    def _client_bucket(self, client: str) -> Optional[TokenBucket]:
+        """获取客户端令牌桶（需持有锁）"""
+        if not self._per_client_rate:
+            return None
+        bucket = self._client_buckets.get(client)
+        if bucket is None:
+            bucket = self._client_buckets[client] = TokenBucket(self._per_client_rate)
+        return bucket
+
+    def _grant_delay(self, transfer: Transfer, nbytes: int, now: float) -> float:
+        """计算该传输还需等待多久才能发送（需持有锁）"""
+        client_bucket = self._client_bucket(transfer.client)
+        if client_bucket:
+            client_wait = client_bucket.delay(nbytes, now)
+            if client_wait > 0:
+                return client_wait
+        if not self._global_bucket:
+            return 0.0
+
+        # 只在客户端额度已就绪的传输之间竞争全局带宽
+        eligible = [t for t in self._waiting
+                    if not self._client_bucket(t.client) or self._client_bucket(t.client).delay(nbytes, now) == 0]
+        if min(eligible, key=lambda t: t.vtime) is not transfer:
+            # 让虚拟时间更小的传输先发，其完成后会唤醒等待者
+            return 0.05
+        return self._global_bucket.delay(nbytes, now)
+
+    def active_transfers(self) -> List[Dict]:
+        """获取进行中传输的统计"""
+        with self._cond:
+            return [t.to_dict() for t in self._active]
+
+    def recent_transfers(self) -> List[Dict]:
+        """获取最近完成传输的统计（含实际速率）"""
+        with self._cond:
+            return [t.to_dict() for t in self._history]
+
+
+class ThrottledWriter:
+    """按调度器额度写入的输出流包装（用于长度未知的流式响应）"""
+
+    def __init__(self, raw, scheduler: BandwidthScheduler, transfer: Transfer):
+        self.raw = raw
+        self.scheduler = scheduler
+        self.transfer = transfer
+
+    def write(self, data) -> int:
+        view = memoryview(data)
+        for start in range(0, len(view), CHUNK_SIZE):
+            chunk = view[start:start + CHUNK_SIZE]
+            self.scheduler.acquire(self.transfer, len(chunk))
+            self.raw.write(chunk)
+        return len(view)
+
+    def flush(self):
+        flush = getattr(self.raw, 'flush', None)
+        if flush:
+            flush()
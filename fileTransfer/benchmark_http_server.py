@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP文件服务器性能基准测试
+
+在本机回环地址上启动FileHTTPServer，由独立子进程作为客户端反复下载，
+统计不同发送路径的吞吐量以及服务端每GB消耗的CPU时间，
+以及小文件请求的延迟（暂存元数据缓存 vs 逐请求探测文件）。
+
+用法:
+    python -m fileTransfer.benchmark_http_server --size-mb 256 --rounds 3 --requests 2000
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fileTransfer.http_server import FileHTTPServer
+
+
+def _free_port() -> int:
+    """获取一个可用的本地端口"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _download_worker(port: int, request_queue, result_queue):
+    """客户端子进程：按请求队列中的文件名逐个下载，回传每次收到的字节数"""
+    buffer = bytearray(1024 * 1024)
+    while True:
+        path = request_queue.get()
+        if path is None:
+            break
+        total = 0
+        with socket.create_connection(("127.0.0.1", port)) as sock:
+            sock.sendall(f"GET /{path} HTTP/1.0\r\nHost: bench\r\n\r\n".encode())
+            while True:
+                n = sock.recv_into(buffer)
+                if not n:
+                    break
+                total += n
+        result_queue.put(total)
+
+
+def _latency_worker(port: int, path: str, count: int, result_queue):
+    """客户端子进程：顺序请求同一文件count次，回传每次请求的耗时（秒）"""
+    request = f"GET /{path} HTTP/1.0\r\nHost: bench\r\n\r\n".encode()
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        with socket.create_connection(("127.0.0.1", port)) as sock:
+            sock.sendall(request)
+            while sock.recv(65536):
+                pass
+        latencies.append(time.perf_counter() - start)
+    result_queue.put(latencies)
+
+
+def _make_payload(directory: str, size_mb: int) -> str:
+    """生成指定大小的随机内容测试文件"""
+    path = os.path.join(directory, f"payload_{size_mb}mb.bin")
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+    return path
+
+
+def run_send_benchmark(size_mb: int, rounds: int) -> List[Dict]:
+    """
+    对比不同文件发送路径的吞吐量和CPU消耗
+
+    Args:
+        size_mb (int): 测试文件大小（MB）
+        rounds (int): 每种路径的下载次数
+
+    Returns:
+        List[Dict]: 每种路径的统计结果
+    """
+    variants = [
+        ("copyfileobj默认缓冲区", False, shutil.COPY_BUFSIZE),
+        ("1MB缓冲区", False, 1024 * 1024),
+        ("os.sendfile", True, 1024 * 1024),
+    ]
+    if not hasattr(os, "sendfile"):
+        variants = variants[:2]
+
+    work_dir = tempfile.mkdtemp(prefix="http_bench_")
+    source = _make_payload(work_dir, size_mb)
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    try:
+        for label, use_sendfile, buffer_size in variants:
+            port = _free_port()
+            server = FileHTTPServer(port=port)
+            server.logger.setLevel("WARNING")
+            server.use_sendfile = use_sendfile
+            server.copy_buffer_size = buffer_size
+            server.start()
+
+            request_queue, result_queue = ctx.Queue(), ctx.Queue()
+            client = ctx.Process(target=_download_worker, args=(port, request_queue, result_queue))
+            client.start()
+            total_bytes, wall, cpu = 0, 0.0, 0.0
+            for _ in range(rounds):
+                # 每轮重新暂存文件，暂存耗时不计入统计
+                name = os.path.basename(server.add_file(source))
+                cpu_start = time.process_time()
+                wall_start = time.perf_counter()
+                request_queue.put(name)
+                total_bytes += result_queue.get()
+                wall += time.perf_counter() - wall_start
+                cpu += time.process_time() - cpu_start
+            request_queue.put(None)
+            client.join()
+            server.stop()
+
+            gigabytes = total_bytes / (1024 ** 3)
+            results.append({
+                "variant": label,
+                "bytes": total_bytes,
+                "throughput_mb_s": total_bytes / (1024 ** 2) / wall if wall else 0.0,
+                "cpu_s_per_gb": cpu / gigabytes if gigabytes else 0.0,
+            })
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def run_latency_benchmark(requests: int, size_kb: int = 4) -> List[Dict]:
+    """
+    对比暂存文件（使用缓存元数据）与未暂存文件（每次请求检测类型、读取文件头）的请求延迟
+
+    Args:
+        requests (int): 每种情况的请求次数
+        size_kb (int): 测试文件大小（KB）
+
+    Returns:
+        List[Dict]: 每种情况的延迟统计（毫秒）
+    """
+    work_dir = tempfile.mkdtemp(prefix="http_bench_")
+    source = os.path.join(work_dir, "small.txt")
+    with open(source, "wb") as f:
+        f.write(b"benchmark line\n" * (size_kb * 1024 // 15))
+
+    port = _free_port()
+    server = FileHTTPServer(port=port)
+    server.logger.setLevel("WARNING")
+    server.start()
+    # 直接放入临时目录的文件不受暂存存储管理，每次请求都会重新检测
+    unmanaged = "unmanaged.txt"
+    shutil.copy2(source, os.path.join(server.temp_dir, unmanaged))
+    cases = [
+        ("暂存文件(元数据缓存)", os.path.basename(server.add_file(source))),
+        ("未暂存文件(逐请求检测)", unmanaged),
+    ]
+
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    try:
+        for label, name in cases:
+            result_queue = ctx.Queue()
+            client = ctx.Process(target=_latency_worker, args=(port, name, requests, result_queue))
+            client.start()
+            latencies = sorted(result_queue.get())
+            client.join()
+            results.append({
+                "case": label,
+                "requests": len(latencies),
+                "mean_ms": statistics.fmean(latencies) * 1000,
+                "p50_ms": latencies[len(latencies) // 2] * 1000,
+                "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+            })
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def _print_table(title: str, rows: List[Dict], columns: List[str]):
+    """打印结果表格"""
+    print(f"\n== {title} ==")
+    print(" | ".join(f"{c:>18}" for c in columns))
+    for row in rows:
+        cells = []
+        for c in columns:
+            value = row[c]
+            cells.append(f"{value:>18.2f}" if isinstance(value, float) else f"{str(value):>18}")
+        print(" | ".join(cells))
+
+
+def main():
+    """基准测试入口"""
+    parser = argparse.ArgumentParser(description="FileHTTPServer 性能基准测试")
+    parser.add_argument("--size-mb", type=int, default=256, help="测试文件大小(MB)")
+    parser.add_argument("--rounds", type=int, default=3, help="每种发送路径的下载次数")
+    parser.add_argument("--requests", type=int, default=2000, help="延迟测试的请求次数")
+    args = parser.parse_args()
+
+    rows = run_send_benchmark(args.size_mb, args.rounds)
+    _print_table("文件发送路径", rows, ["variant", "throughput_mb_s", "cpu_s_per_gb"])
+
+    rows = run_latency_benchmark(args.requests)
+    _print_table("小文件请求延迟", rows, ["case", "requests", "mean_ms", "p50_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
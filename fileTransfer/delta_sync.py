@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目录增量同步模块
+
+把本地目录同步到设备目录时只发送有变化的文件：
+- 一条设备命令取得远程清单（相对路径、大小、修改时间，可选md5）；
+  每台设备第一次同步时探测一次可用的清单命令（find -exec 或 find | while read）
+- 本地清单按（路径、大小、修改时间）缓存md5，未修改的文件不重复计算
+- 按大小和修改时间（或md5）比对出新增和修改的文件，打成一个tar流发送，
+  tar保留修改时间，下次同步时未改动的文件不会再被判为变化
+- 可选删除设备上本地已不存在的文件
+- 上传、删除和重新获取清单在一次往返中完成，并据新清单校验结果
+"""
+
+import asyncio
+import json
+import logging
+import os
+import posixpath
+import re
+import shlex
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fileTransfer.logger_utils import get_logger
+from fileTransfer.transfer_queue import file_digest, transfer_timeout
+
+
+# 清单命令（大小/修改时间/路径）与 md5sum 在 find 下的输出行；wc -c 的输出可能带前导空格
+_STAT_LINE = re.compile(r"^\s*(\d+)/(\d+)/\./(.+)$")
+_PROBE_LINE = re.compile(r"^\s*\d+/\d+//dev/null\s*$", re.MULTILINE)
+_MD5_LINE = re.compile(r"^([0-9a-fA-F]{32})\s+\./(.+)$")
+RM_BATCH = 100  # 每条rm命令最多删除的文件数，避免命令行过长
+# 本地md5缓存的默认位置：放在用户目录下，不随程序的启动目录变化
+DEFAULT_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".file_transfer", "sync_manifest.json")
+
+
+class ManifestEntry:
+    """
+    清单中的一个文件
+
+    Attributes:
+        size (int): 大小（字节）
+        mtime (float): 修改时间（Unix时间戳）
+        md5 (str): 十六进制MD5，未计算时为None
+    """
+
+    def __init__(self, size: int, mtime: float, md5: Optional[str] = None):
+        self.size = size
+        self.mtime = mtime
+        self.md5 = md5
+
+    def __repr__(self) -> str:
+        return f"ManifestEntry(size={self.size}, mtime={self.mtime}, md5={self.md5})"
+
+
+class SyncPlan:
+    """
+    一次同步的差异
+
+    Attributes:
+        upload (List[str]): 需要发送的文件（相对路径，/分隔）
+        delete (List[str]): 设备上多余的文件
+        unchanged (int): 未变化的文件数
+        upload_bytes (int): 需要发送的字节数
+    """
+
+    def __init__(self, upload: List[str], delete: List[str], unchanged: int, upload_bytes: int):
+        self.upload = upload
+        self.delete = delete
+        self.unchanged = unchanged
+        self.upload_bytes = upload_bytes
+
+    def to_dict(self) -> Dict:
+        """转换为统计字典"""
+        return {
+            'upload': len(self.upload),
+            'delete': len(self.delete),
+            'unchanged': self.unchanged,
+            'upload_bytes': self.upload_bytes,
+        }
+
+
+class LocalManifest:
+    """
+    本地清单及其md5缓存
+
+    缓存以文件绝对路径为键，记录上次计算时的大小、修改时间（纳秒）和md5，
+    大小和修改时间都没变时直接复用md5。指定cache_file时缓存持久化为JSON。
+    """
+
+    def __init__(self, cache_file: Optional[str] = None, logger: Optional[logging.Logger] = None):
+        """
+        初始化
+
+        Args:
+            cache_file (str, optional): 缓存文件路径，默认只缓存在内存中
+            logger (logging.Logger, optional): 日志记录器
+        """
+        self.cache_file = cache_file
+        self.logger = logger or get_logger(self.__class__)
+        self._cache: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def scan(self, local_dir: str, checksums: bool = False) -> Dict[str, ManifestEntry]:
+        """
+        遍历本地目录生成清单
+
+        Args:
+            local_dir (str): 本地目录
+            checksums (bool): 是否计算md5（有缓存时复用）
+
+        Returns:
+            Dict[str, ManifestEntry]: 相对路径（/分隔）到清单项的映射
+        """
+        manifest: Dict[str, ManifestEntry] = {}
+        for root, _, names in os.walk(local_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                if os.path.islink(path) or not os.path.isfile(path):
+                    continue
+                stat_result = os.stat(path)
+                relative = os.path.relpath(path, local_dir).replace(os.sep, '/')
+                entry = ManifestEntry(stat_result.st_size, stat_result.st_mtime)
+                if checksums:
+                    entry.md5 = self._md5(path, stat_result.st_size, stat_result.st_mtime_ns)
+                manifest[relative] = entry
+        return manifest
+
+    def save(self) -> None:
+        """把缓存写入cache_file（没有变化或未指定文件时不写）"""
+        with self._lock:
+            if not self.cache_file or not self._dirty:
+                return
+            data = {'version': 1, 'files': {path: list(value) for path, value in self._cache.items()}}
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_file)), exist_ok=True)
+            tmp_path = f"{self.cache_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            self.logger.warning(f"⚠️ 保存本地清单缓存失败: {e}")
+
+    def _md5(self, path: str, size: int, mtime_ns: int) -> str:
+        key = os.path.abspath(path)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached and cached[0] == size and cached[1] == mtime_ns:
+            return cached[2]
+        digest = file_digest(path, 'md5')
+        with self._lock:
+            self._cache[key] = (size, mtime_ns, digest)
+            self._dirty = True
+        return digest
+
+    def _load(self) -> None:
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._cache = {path: tuple(value) for path, value in data.get('files', {}).items()}
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"⚠️ 本地清单缓存无法读取，重新计算: {e}")
+
+
+class ManifestStrategy:
+    """
+    一种生成远程清单的命令组合
+
+    Attributes:
+        name (str): 策略名称
+    """
+
+    name = ""
+
+    def listing(self, find_args: str = ". -type f") -> str:
+        """对find找到的每个文件输出一行 大小/修改时间/路径"""
+        raise NotImplementedError
+
+    def checksums(self) -> str:
+        """对当前目录下的每个文件输出一行md5sum"""
+        raise NotImplementedError
+
+    def probe(self) -> str:
+        """探测命令：只列出/dev/null，不遍历任何目录"""
+        return self.listing("/dev/null")
+
+
+class FindExecManifest(ManifestStrategy):
+    """find -exec ... {} +：每批文件只启动一次stat"""
+
+    name = "find-exec"
+
+    def listing(self, find_args: str = ". -type f") -> str:
+        return f"find {find_args} -exec stat -c '%s/%Y/%n' {{}} +"
+
+    def checksums(self) -> str:
+        return "find . -type f -exec md5sum {} +"
+
+
+class FindLoopManifest(ManifestStrategy):
+    """find | while read：旧版busybox的find不支持 -exec {} + 或没有stat时的兜底（每个文件启动一次wc和date）"""
+
+    name = "find-loop"
+
+    def listing(self, find_args: str = ". -type f") -> str:
+        return (f'find {find_args} | while IFS= read -r f; do '
+                f'echo "$(wc -c < "$f")/$(date -r "$f" +%s)/$f"; done')
+
+    def checksums(self) -> str:
+        return 'find . -type f | while IFS= read -r f; do md5sum "$f"; done'
+
+
+# 按优先级排列的候选策略
+MANIFEST_STRATEGIES: Tuple[ManifestStrategy, ...] = (FindExecManifest(), FindLoopManifest())
+
+
+def manifest_commands(remote_dir: str, checksums: bool = False,
+                      strategy: Optional[ManifestStrategy] = None) -> List[str]:
+    """
+    生成获取远程清单的命令（与其他命令放在同一批中发送）
+
+    第一条判断目录是否存在，第二条列出全部文件的大小、修改时间和相对路径，
+    checksums为True时再输出每个文件的md5。
+
+    Args:
+        remote_dir (str): 远程目录
+        checksums (bool): 是否计算md5
+        strategy (ManifestStrategy, optional): 清单命令，默认find -exec
+
+    Returns:
+        List[str]: 两条命令
+    """
+    strategy = strategy or MANIFEST_STRATEGIES[0]
+    quoted = shlex.quote(remote_dir)
+    listing = f"cd {quoted} && {strategy.listing()}"
+    if checksums:
+        listing += f" && {strategy.checksums()}"
+    return [f"test -d {quoted}", listing]
+
+
+def parse_manifest(results: Sequence[Tuple[str, int]]) -> Dict[str, ManifestEntry]:
+    """
+    解析manifest_commands的执行结果
+
+    Args:
+        results (Sequence[Tuple[str, int]]): 两条命令的 (输出, 退出码)
+
+    Returns:
+        Dict[str, ManifestEntry]: 相对路径到清单项的映射，目录不存在时为空
+
+    Raises:
+        RuntimeError: 目录存在但列表命令失败时抛出
+    """
+    (_, exists), (output, code) = results
+    if exists != 0:
+        return {}
+    if code != 0:
+        raise RuntimeError(f"获取远程清单失败（退出码 {code}）: {output.strip()[-200:]}")
+    manifest: Dict[str, ManifestEntry] = {}
+    digests: Dict[str, str] = {}
+    for line in output.splitlines():
+        line = line.rstrip('\r')
+        match = _STAT_LINE.match(line)
+        if match:
+            manifest[match.group(3)] = ManifestEntry(int(match.group(1)), float(match.group(2)))
+            continue
+        match = _MD5_LINE.match(line)
+        if match:
+            digests[match.group(2)] = match.group(1).lower()
+    for relative, digest in digests.items():
+        if relative in manifest:
+            manifest[relative].md5 = digest
+    return manifest
+
+
+def diff_manifests(local: Dict[str, ManifestEntry], remote: Dict[str, ManifestEntry],
+                   mtime_window: float = 2.0) -> SyncPlan:
+    """
+    比对本地和远程清单
+
+    两边都有md5时按md5判断；否则大小不同或修改时间相差超过mtime_window即视为变化
+    （FAT等文件系统的修改时间精度为2秒）。
+
+    Args:
+        local (Dict[str, ManifestEntry]): 本地清单
+        remote (Dict[str, ManifestEntry]): 远程清单
+        mtime_window (float): 修改时间允许的误差（秒），默认2秒
+
+    Returns:
+        SyncPlan: 同步差异
+    """
+    upload, unchanged, upload_bytes = [], 0, 0
+    for relative in sorted(local):
+        entry, existing = local[relative], remote.get(relative)
+        if existing is None or existing.size != entry.size:
+            changed = True
+        elif entry.md5 and existing.md5:
+            changed = entry.md5 != existing.md5
+        else:
+            changed = abs(int(entry.mtime) - existing.mtime) > mtime_window
+        if changed:
+            upload.append(relative)
+            upload_bytes += entry.size
+        else:
+            unchanged += 1
+    delete = sorted(set(remote) - set(local))
+    return SyncPlan(upload, delete, unchanged, upload_bytes)
+
+
+class DeltaSync:
+    """
+    本地目录到设备目录的增量同步
+
+    Example:
+        >>> syncer = DeltaSync(LocalManifest(DEFAULT_CACHE_FILE))
+        >>> plan = await syncer.sync(shell, http_server, "D:/assets", "/customer/assets", delete_extras=True)
+        >>> plan.to_dict()
+    """
+
+    def __init__(self, manifest: Optional[LocalManifest] = None, checksums: bool = False,
+                 mtime_window: float = 2.0, logger: Optional[logging.Logger] = None):
+        """
+        初始化
+
+        Args:
+            manifest (LocalManifest, optional): 本地清单缓存，默认只缓存在内存中
+            checksums (bool): 是否按md5比对（设备端需对全部文件计算md5，较慢但不依赖修改时间）
+            mtime_window (float): 修改时间允许的误差（秒），默认2秒
+            logger (logging.Logger, optional): 日志记录器
+        """
+        self.logger = logger or get_logger(self.__class__)
+        self.manifest = manifest or LocalManifest(logger=self.logger)
+        self.checksums = checksums
+        self.mtime_window = mtime_window
+        self._strategies: Dict[Tuple[str, int], ManifestStrategy] = {}
+        self._lock = threading.Lock()
+
+    async def strategy_for(self, shell) -> ManifestStrategy:
+        """
+        获取设备的清单命令，第一次调用时探测
+
+        所有候选命令在一次往返中对/dev/null执行，选择第一个成功且输出了记录的策略。
+
+        Args:
+            shell (CustomTelnetClient): 已登录的客户端（调用方负责串行化）
+
+        Returns:
+            ManifestStrategy: 清单命令
+        """
+        key = (shell.host, shell.port)
+        with self._lock:
+            cached = self._strategies.get(key)
+        if cached is not None:
+            return cached
+
+        results = await shell.execute_many([strategy.probe() for strategy in MANIFEST_STRATEGIES])
+        chosen = MANIFEST_STRATEGIES[-1]
+        for strategy, (output, code) in zip(MANIFEST_STRATEGIES, results):
+            if code == 0 and _PROBE_LINE.search(output):
+                chosen = strategy
+                break
+        self.logger.info(f"✅ 设备 {shell.host} 使用清单命令: {chosen.name}")
+        with self._lock:
+            self._strategies[key] = chosen
+        return chosen
+
+    async def plan(self, shell, local_dir: str, remote_dir: str) -> SyncPlan:
+        """
+        只计算差异，不修改设备
+
+        Args:
+            shell (CustomTelnetClient): 已登录的客户端（调用方负责串行化）
+            local_dir (str): 本地目录
+            remote_dir (str): 远程目录
+
+        Returns:
+            SyncPlan: 同步差异
+        """
+        strategy = await self.strategy_for(shell)
+        remote = parse_manifest(await shell.execute_many(manifest_commands(remote_dir, self.checksums, strategy)))
+        local = await asyncio.get_running_loop().run_in_executor(None, self.manifest.scan, local_dir, self.checksums)
+        return diff_manifests(local, remote, self.mtime_window)
+
+    async def sync(self, shell, http_server, local_dir: str, remote_dir: str,
+                   delete_extras: bool = False, timeout: Optional[float] = None) -> SyncPlan:
+        """
+        同步本地目录到设备目录
+
+        先一次往返取得远程清单并比对，再在一次往返中完成tar流上传、删除多余文件和
+        重新获取清单，按新清单确认每个发送的文件都已到位。
+
+        Args:
+            shell (CustomTelnetClient): 已登录的客户端（调用方负责串行化）
+            http_server (FileHTTPServer): 发布tar流的HTTP服务器
+            local_dir (str): 本地目录
+            remote_dir (str): 远程目录
+            delete_extras (bool): 是否删除设备上本地不存在的文件，默认False
+            timeout (float, optional): 上传批次的超时时间（秒），默认按待发送字节数计算
+
+        Returns:
+            SyncPlan: 本次执行的同步差异
+
+        Raises:
+            RuntimeError: 上传、删除失败或同步后清单仍不一致时抛出
+        """
+        plan = await self.plan(shell, local_dir, remote_dir)
+        # md5都在比对时算好，无论之后是否需要发送、是否成功都先落盘，下次同步直接复用
+        await asyncio.get_running_loop().run_in_executor(None, self.manifest.save)
+        deletions = plan.delete if delete_extras else []
+        self.logger.info(f"增量同步 {local_dir} -> {remote_dir}: 发送 {len(plan.upload)} 个文件"
+                         f"（{plan.upload_bytes} 字节），删除 {len(deletions)} 个，未变化 {plan.unchanged} 个")
+        if not plan.upload and not deletions:
+            return plan
+
+        quoted = shlex.quote(remote_dir)
+        commands = []
+        archive_name = None
+        if plan.upload:
+            name = f"{posixpath.basename(remote_dir.rstrip('/')) or 'root'}-delta"
+            archive_name = http_server.add_directory(local_dir, name, members=plan.upload)
+            if not archive_name:
+                raise RuntimeError(f"无法发布增量tar流: {local_dir}")
+            url = http_server.get_download_url(archive_name)
+            commands.append(f"mkdir -p {quoted} && cd {quoted} && wget -q -O - {shlex.quote(url)} | tar -xf -")
+        for start in range(0, len(deletions), RM_BATCH):
+            paths = " ".join(shlex.quote(posixpath.join(remote_dir, relative))
+                             for relative in deletions[start:start + RM_BATCH])
+            commands.append(f"rm -f {paths}")
+        commands.extend(manifest_commands(remote_dir, strategy=await self.strategy_for(shell)))
+
+        try:
+            results = await shell.execute_many(commands, timeout=timeout or transfer_timeout(plan.upload_bytes))
+        finally:
+            if archive_name:
+                http_server.remove_directory(archive_name)
+
+        failed = [(command, output) for command, (output, code) in zip(commands[:-2], results[:-2]) if code != 0]
+        if failed:
+            command, output = failed[0]
+            raise RuntimeError(f"增量同步命令失败: {command} - {output.strip()[-200:]}")
+
+        # 据新清单确认：发送的文件大小和修改时间与本地一致，删除的文件已不存在
+        remote = parse_manifest(results[-2:])
+        local = await asyncio.get_running_loop().run_in_executor(None, self.manifest.scan, local_dir)
+        pending = diff_manifests({relative: local[relative] for relative in plan.upload if relative in local},
+                                 remote, self.mtime_window).upload
+        leftovers = [relative for relative in deletions if relative in remote]
+        if pending or leftovers:
+            raise RuntimeError(f"同步后仍不一致: 未到位 {pending[:5]}，未删除 {leftovers[:5]}")
+        self.logger.info(f"✅ 增量同步完成: {remote_dir}")
+        return plan
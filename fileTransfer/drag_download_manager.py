@@ -51,7 +51,7 @@ class DragDownloadManager:
         """
         self.logger = get_logger(self.__class__)
         self.telnet_client = telnet_client
-        self.http_server = http_server  # 保留但不再必需
+        self.http_server = http_server  # 用于接收设备推送的文件（可选）
         self.event_loop = event_loop
         self.telnet_lock = telnet_lock
         
@@ -79,7 +79,7 @@ class DragDownloadManager:
             telnet_lock: Telnet锁
         """
         self.telnet_client = telnet_client
-        self.http_server = http_server  # 保留但不再必需
+        self.http_server = http_server  # 用于接收设备推送的文件（可选）
         if event_loop:
             self.event_loop = event_loop
         if telnet_lock:
@@ -231,6 +231,24 @@ class DragDownloadManager:
             if not remote_ip:
                 raise Exception("无法获取远程设备IP地址")
             
+            # 确定最终文件路径
+            target_file_path = os.path.join(task.local_target_path, task.filename)
+            
+            # 如果文件已存在，生成新名称
+            if os.path.exists(target_file_path):
+                base_name, ext = os.path.splitext(task.filename)
+                counter = 1
+                while os.path.exists(target_file_path):
+                    new_filename = f"{base_name}_{counter}{ext}"
+                    target_file_path = os.path.join(task.local_target_path, new_filename)
+                    counter += 1
+                
+                self.logger.info(f"目标文件已存在，重命名为: {os.path.basename(target_file_path)}")
+            
+            # 优先让设备把文件推送到本机HTTP服务器，省去设备httpd的检查和重启
+            if self._push_from_device(task, target_file_path):
+                return True
+            
             # 确保远程设备httpd服务已启动
             self.logger.info("检查并启动远程设备httpd服务...")
             try:
@@ -262,20 +280,6 @@ class DragDownloadManager:
             
             self.logger.info(f"远程HTTP下载URL: {download_url}")
             
-            # 确定最终文件路径
-            target_file_path = os.path.join(task.local_target_path, task.filename)
-            
-            # 如果文件已存在，生成新名称
-            if os.path.exists(target_file_path):
-                base_name, ext = os.path.splitext(task.filename)
-                counter = 1
-                while os.path.exists(target_file_path):
-                    new_filename = f"{base_name}_{counter}{ext}"
-                    target_file_path = os.path.join(task.local_target_path, new_filename)
-                    counter += 1
-                
-                self.logger.info(f"目标文件已存在，重命名为: {os.path.basename(target_file_path)}")
-            
             # 从远程设备HTTP服务器下载文件
             self.logger.debug(f"开始HTTP下载: {download_url} -> {target_file_path}")
             
@@ -325,6 +329,66 @@ class DragDownloadManager:
             self.logger.error(task.error_message)
             return False
     
+    def _push_from_device(self, task: DragDownloadTask, target_file_path: str) -> bool:
+        """让设备通过本机HTTP服务器的上传接口推送文件
+        
+        依次尝试 wget --post-file 和 nc，设备端无需运行httpd。
+        
+        Args:
+            task: 下载任务
+            target_file_path: 本地保存路径
+            
+        Returns:
+            是否推送成功，失败时调用方回退到设备httpd下载
+        """
+        if not (self.http_server and self.event_loop and self.telnet_lock
+                and hasattr(self.http_server, 'expect_upload')):
+            return False
+        
+        import urllib.parse
+        pending = self.http_server.expect_upload(target_file_path)
+        upload_url = self.http_server.get_upload_url(pending.name)
+        parsed = urllib.parse.urlparse(upload_url)
+        remote = task.remote_file_path
+        commands = [
+            f'wget -q -O /dev/null --post-file="{remote}" "{upload_url}"',
+            # 旧版busybox wget不支持--post-file时，用nc手工发送PUT请求；
+            # 路径经过百分号编码（含%），只能作为参数传给printf，不能放进格式串
+            f"{{ printf 'PUT %s HTTP/1.0\\r\\nContent-Length: %s\\r\\n\\r\\n' '{parsed.path}' "
+            f'"$(wc -c < "{remote}")"; cat "{remote}"; }} | nc {parsed.hostname} {parsed.port}',
+        ]
+        try:
+            for command in commands:
+                self.logger.info(f"请求设备推送文件: {command}")
+                try:
+                    self._run_telnet_command(command, timeout=120)
+                except Exception as e:
+                    self.logger.warning(f"设备推送命令执行异常: {e}")
+                    continue
+                # 命令返回时请求体已发送完毕，服务端写盘稍有延迟
+                if pending.wait(timeout=3):
+                    task.file_size = task.downloaded_size = pending.size
+                    task.progress = 100.0
+                    if self.progress_callback:
+                        self.progress_callback(task, 100.0)
+                    self.logger.info(f"设备推送成功: {task.filename} ({pending.size} bytes) -> {target_file_path}")
+                    return True
+            self.logger.info("设备推送未成功，回退到设备httpd下载")
+            return False
+        finally:
+            self.http_server.upload_receiver.cancel(pending.name)
+    
+    def _run_telnet_command(self, command: str, timeout: float) -> str:
+        """在事件循环中持有telnet锁执行命令（供后台线程调用）"""
+        import asyncio
+        
+        async def run():
+            async with self.telnet_lock:
+                return await self.telnet_client.execute_command(command, timeout=timeout)
+        
+        future = asyncio.run_coroutine_threadsafe(run(), self.event_loop)
+        return future.result(timeout=timeout + 10)
+    
     async def _ensure_httpd_service_async(self):
         """异步方式确保远端根目录httpd服务已启动"""
         try:
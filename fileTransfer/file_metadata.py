@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件元数据模块
+
+在文件暂存时一次性计算下载所需的元数据（大小、修改时间、MIME类型、
+二进制/可执行标记、内容哈希），请求处理时直接使用，避免每次GET都重复读盘。
+"""
+
+import mimetypes
+import os
+from typing import Optional
+
+
+# 常见二进制文件扩展名
+BINARY_EXTENSIONS = {
+    '.exe', '.bin', '.so', '.dll', '.dylib', '.a', '.o', '.obj',
+    '.zip', '.rar', '.7z', '.tar', '.gz', '.bz2', '.xz',
+    '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.ico', '.tiff',
+    '.mp3', '.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv',
+    '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
+    '.deb', '.rpm', '.apk', '.ipa', '.dmg', '.iso'
+}
+
+# 只有这些扩展名的文件才需要可执行权限
+EXECUTABLE_EXTENSIONS = {
+    '.exe', '.bin', '.so', '.dll', '.dylib', '.a', '.o', '.obj',
+    '.deb', '.rpm', '.apk', '.ipa'
+}
+
+HEAD_SIZE = 1024  # 内容检测读取的字节数
+_NON_ASCII_BYTES = bytes(range(128, 256))
+_CONTROL_BYTES = bytes(b for b in range(32) if b not in (9, 10, 13))
+
+
+def guess_content_type(filename: str) -> str:
+    """根据文件扩展名获取Content-Type"""
+    content_type, _ = mimetypes.guess_type(filename)
+    return content_type or 'application/octet-stream'
+
+
+def detect_binary(filename: str, head: bytes) -> bool:
+    """
+    根据扩展名和文件头部内容判断是否为二进制文件
+
+    Args:
+        filename (str): 文件名
+        head (bytes): 文件开头的内容（最多HEAD_SIZE字节）
+
+    Returns:
+        bool: 是否为二进制文件
+    """
+    if os.path.splitext(filename)[1].lower() in BINARY_EXTENSIONS:
+        return True
+    if not head:
+        return False
+
+    # 空字节是二进制文件的典型特征
+    if b'\x00' in head:
+        return True
+
+    # 用bytes.translate删除目标字节后按长度差计数，避免Python逐字节循环
+    non_ascii_count = len(head) - len(head.translate(None, _NON_ASCII_BYTES))
+    if non_ascii_count / len(head) > 0.3:
+        return True
+
+    # 控制字符（除了常见的换行、制表符等）超过5%
+    control_count = len(head) - len(head.translate(None, _CONTROL_BYTES))
+    return control_count / len(head) > 0.05
+
+
+def detect_executable(filename: str, head: bytes) -> bool:
+    """
+    判断文件是否为需要可执行权限的二进制文件
+
+    Args:
+        filename (str): 文件名
+        head (bytes): 文件开头的内容
+
+    Returns:
+        bool: 是否需要可执行权限
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in EXECUTABLE_EXTENSIONS:
+        return True
+    # 没有扩展名的文件通过ELF魔数判断
+    return not ext and head[:4] == b'\x7fELF'
+
+
+def read_head(file_path: str) -> bytes:
+    """读取文件开头用于类型检测的内容"""
+    with open(file_path, 'rb') as f:
+        return f.read(HEAD_SIZE)
+
+
+class FileMetadata:
+    """
+    发布文件的元数据
+
+    Attributes:
+        size (int): 文件大小
+        mtime_ns (int): 修改时间（纳秒）
+        content_type (str): MIME类型
+        is_binary (bool): 是否为二进制文件
+        is_executable (bool): 是否需要可执行权限
+        sha256 (str): 内容SHA-256，未计算时为None
+    """
+
+    __slots__ = ('size', 'mtime_ns', 'content_type', 'is_binary', 'is_executable', 'sha256')
+
+    def __init__(self, size: int, mtime_ns: int, content_type: str, is_binary: bool,
+                 is_executable: bool, sha256: Optional[str] = None):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.content_type = content_type
+        self.is_binary = is_binary
+        self.is_executable = is_executable
+        self.sha256 = sha256
+
+    @property
+    def mtime(self) -> float:
+        """修改时间（秒）"""
+        return self.mtime_ns / 1e9
+
+    @property
+    def etag(self) -> str:
+        """强ETag：有内容哈希时使用哈希，否则使用修改时间和大小"""
+        if self.sha256:
+            return f'"{self.sha256[:32]}"'
+        return f'"{self.mtime_ns:x}-{self.size:x}"'
+
+    @classmethod
+    def from_file(cls, file_path: str, filename: Optional[str] = None,
+                  sha256: Optional[str] = None) -> 'FileMetadata':
+        """
+        读取文件信息生成元数据
+
+        Args:
+            file_path (str): 文件路径
+            filename (str, optional): 用于判断类型的文件名，默认取路径中的文件名
+            sha256 (str, optional): 已知的内容哈希
+
+        Returns:
+            FileMetadata: 文件元数据
+        """
+        filename = filename or os.path.basename(file_path)
+        stat_result = os.stat(file_path)
+        head = read_head(file_path)
+        return cls(
+            size=stat_result.st_size,
+            mtime_ns=stat_result.st_mtime_ns,
+            content_type=guess_content_type(filename),
+            is_binary=detect_binary(filename, head),
+            is_executable=detect_executable(filename, head),
+            sha256=sha256,
+        )
@@ -123,8 +123,10 @@ class RemoteFileEditor:
                 self.logger.error("无法将文件添加到 HTTP 服务器临时目录")
                 return False
 
+            # 下载URL使用暂存名（同名文件仍在被下载时可能带 _1 后缀），设备上仍保存为filename
+            staged_name = os.path.basename(server_tmp_path)
             host_ip = self.http_server._get_local_ip()
-            download_url = self.http_server.get_download_url(filename, host_ip)
+            download_url = self.http_server.get_download_url(staged_name, host_ip)
             wget_cmd = f'cd "{base_dir}" && wget -q -O "{filename}" "{download_url}"'
             self.logger.debug(f"执行写入命令: {wget_cmd}")
             async with self.telnet_lock:
@@ -137,7 +139,7 @@ class RemoteFileEditor:
                 await self.telnet_client.execute_command(chmod_cmd)
 
             # 清理
-            self.http_server.remove_file(filename)
+            self.http_server.remove_file(staged_name)
             os.unlink(local_tmp_path)
             return True
         except Exception as e:
@@ -624,6 +624,7 @@ class RemoteFileEditorGUI:
         self.theme = theme
         self.logger = logger
         self.event_loop = event_loop
+        self.on_remote_change = None  # 保存修改了设备上的文件后回调(path)，如使目录缓存失效
         
         # 远程文件编辑器实例
         self.remote_file_editor = RemoteFileEditor(
@@ -689,7 +690,7 @@ class RemoteFileEditorGUI:
                     # 异步保存文件
                     future = self._run_async(self.remote_file_editor.write_file_async(remote_path, new_text))
                     if future:
-                        future.add_done_callback(lambda f: self._on_save_result(f, advanced_editor))
+                        future.add_done_callback(lambda f: self._on_save_result(f, advanced_editor, remote_path))
                     else:
                         if advanced_editor.is_window_valid():
                             advanced_editor.status_var.set("保存失败")
@@ -714,10 +715,12 @@ class RemoteFileEditorGUI:
             self.logger.error(f"显示编辑器窗口失败: {e}")
             messagebox.showerror("错误", f"显示编辑器窗口失败: {e}")
     
-    def _on_save_result(self, future, advanced_editor):
+    def _on_save_result(self, future, advanced_editor, remote_path: str = None):
         """处理保存结果"""
         try:
             success = future.result()
+            if success and remote_path and self.on_remote_change:
+                self.on_remote_change(remote_path)
             if success:
                 if advanced_editor.is_window_valid():
                     advanced_editor.status_var.set("保存成功")
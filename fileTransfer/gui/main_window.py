@@ -22,9 +22,18 @@ import re
 # 添加父目录到系统路径
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from telnetTool.telnetConnect import CustomTelnetClient
+from telnetTool.session_pool import get_session_pool
+from telnetTool.shell_dispatcher import ShellDispatcher
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from fileTransfer.http_server import FileHTTPServer
 from fileTransfer.logger_utils import get_logger
+from fileTransfer.precompress import PrecompressPolicy
+from fileTransfer.delta_sync import DEFAULT_CACHE_FILE, DeltaSync, LocalManifest
+from fileTransfer.remote_listing import RemoteLister
+from fileTransfer.transfer_queue import (
+    STATE_DONE, STATE_FAILED, STATE_RETRYING, STATE_RUNNING, TransferJob, TransferQueue, directory_size, run_download,
+    transfer_timeout
+)
 
 # 导入组件模块
 from fileTransfer.gui.styles import ModernTheme
@@ -59,11 +68,29 @@ class ModernFileTransferGUI:
         
         # 初始化组件
         self.telnet_client: Optional[CustomTelnetClient] = None
+        self.shell_dispatcher: Optional[ShellDispatcher] = None
         self.http_server: Optional[FileHTTPServer] = None
         self.current_remote_path = "/"
         self.connection_config = {}
         self.is_connected = False
         
+        # 预压缩传输（可选，开始传输时读取面板上的开关）：仅在节省的传输时间大于设备解压耗时时使用
+        self.precompress_transfers = False
+        self.precompress_policy = PrecompressPolicy()
+        
+        # 远程目录列表（列表命令按设备探测一次，重连后继续使用）
+        self.remote_lister = RemoteLister()
+        self._prefetch_tasks = set()  # 后台预取任务（保留引用，断开连接时取消）
+        
+        # 传输队列：同时传输的文件数（即工作shell数）和失败重试次数
+        self.transfer_concurrency = 3
+        self.transfer_retries = 2
+        
+        # 目录增量同步：本地文件md5缓存持久化，开始传输时读取面板上的同步选项
+        self.delta_sync = DeltaSync(LocalManifest(DEFAULT_CACHE_FILE))
+        self.sync_directories = False
+        self.sync_delete_extras = False
+        
         # 添加刷新状态控制
         self.is_refreshing = False
         self.refresh_pending = False
@@ -294,13 +321,6 @@ class ModernFileTransferGUI:
             self.logger.info(f"开始连接到 {config['host']}")
             self.connection_config = config
             
-            from telnetTool.telnetConnect import CustomTelnetClient
-            self.telnet_client = CustomTelnetClient(
-                host=config['host'],
-                port=config['port'],
-                timeout=30.0
-            )
-            
             # 使用回调方式避免阻塞UI线程
             future = self._run_async(self._do_connect())
             if future:
@@ -322,17 +342,26 @@ class ModernFileTransferGUI:
             self.root.after(0, lambda: self._on_connect_failed(str(e)))
     
     async def _do_connect(self):
-        """执行连接"""
+        """
+        执行连接（会话来自进程级会话池，同一设备的其他工具可复用已登录的连接）
+        
+        telnet_client为交互shell（浏览、编辑、chmod），传输等长任务由调度器分配到工作shell，
+        两者互不阻塞。
+        """
         try:
-            success = await self.telnet_client.connect(
+            self.shell_dispatcher = ShellDispatcher(
+                self.connection_config['host'],
+                self.connection_config['port'],
                 username=self.connection_config['username'],
                 password=self.connection_config['password'],
-                shell_prompt='#'
+                worker_shells=self.transfer_concurrency,
+                timeout=30.0,
+                interactive_lock=self.telnet_lock,
+                logger=self.logger
             )
-            if success:
-                await self.telnet_client.execute_command('pwd')
-                return True
-            return False
+            self.telnet_client = await self.shell_dispatcher.start()
+            await self.telnet_client.execute_command('pwd')
+            return True
         except Exception as e:
             self.logger.error(f"连接失败: {str(e)}")
             return False
@@ -349,10 +378,6 @@ class ModernFileTransferGUI:
             # 启动HTTP服务器
             if not self.http_server:
                 self._start_http_server_delayed()
-            else:
-                # 如果HTTP服务器已启动，更新其telnet客户端引用以支持二进制文件自动chmod
-                self.logger.info("更新HTTP服务器的telnet客户端引用，启用二进制文件自动chmod功能")
-                self.http_server.telnet_client = self.telnet_client
             
             # 更新拖拽下载管理器的客户端
             self.drag_download_manager.set_clients(self.telnet_client, self.http_server, self.loop, self.telnet_lock)
@@ -371,6 +396,7 @@ class ModernFileTransferGUI:
                 self.root, self.theme, self.logger,
                 self.telnet_client, self.http_server, self.loop, self.telnet_lock
             )
+            self.file_editor.on_remote_change = self._invalidate_remote_path
             
             # 自动刷新目录
             self.root.after(200, self._auto_refresh_directory)
@@ -472,12 +498,20 @@ class ModernFileTransferGUI:
                 self.http_server.stop()
                 self.http_server = None
             
-            # 断开telnet
+            # 取消后台目录预取，避免其在会话关闭后继续使用旧连接
+            if self.loop and self.loop.is_running():
+                self.loop.call_soon_threadsafe(self._cancel_prefetch_tasks)
+            
+            # 断开telnet（关闭会话池中该设备的全部会话）
             if self.telnet_client:
-                future = self._run_async(self.telnet_client.disconnect())
+                future = self._run_async(
+                    get_session_pool(self.loop).close_host(self.telnet_client.host, self.telnet_client.port))
                 if future:
                     future.result(timeout=5)
+                # 断开期间设备可能被其他人修改，丢弃该设备的目录缓存（探测到的列表命令保留）
+                self.remote_lister.cache.clear(self.telnet_client.host, self.telnet_client.port)
                 self.telnet_client = None
+                self.shell_dispatcher = None
             
             # 重置状态
             self.connection_panel.update_connection_status(False, "已断开连接")
@@ -503,8 +537,7 @@ class ModernFileTransferGUI:
         """在后台线程中启动HTTP服务器"""
         try:
             if not self.http_server:
-                # 传递telnet客户端以支持二进制文件自动chmod功能
-                self.http_server = FileHTTPServer(port=88, telnet_client=self.telnet_client)
+                self.http_server = FileHTTPServer(port=88)
                 self.http_server.start()
                 
                 # 在主线程中更新UI
@@ -550,10 +583,16 @@ class ModernFileTransferGUI:
         self.logger.info("用户手动触发目录刷新")
         self.last_refresh_time = current_time
         self._update_status("正在刷新目录...")
-        self._refresh_directory()
+        # 手动刷新绕过目录缓存
+        self._refresh_directory(force=True)
     
-    def _refresh_directory(self):
-        """刷新目录"""
+    def _refresh_directory(self, force: bool = False):
+        """
+        刷新目录
+        
+        Args:
+            force (bool): 是否绕过目录缓存重新列出，默认False
+        """
         if not self.is_connected:
             return
         
@@ -570,9 +609,9 @@ class ModernFileTransferGUI:
             else:
                 return
             
-        threading.Thread(target=self._refresh_directory_async, daemon=True).start()
+        threading.Thread(target=self._refresh_directory_async, args=(force,), daemon=True).start()
     
-    def _refresh_directory_async(self):
+    def _refresh_directory_async(self, force: bool = False):
         """异步刷新目录"""
         try:
             # 设置刷新状态和开始时间
@@ -597,7 +636,7 @@ class ModernFileTransferGUI:
                 self.root.after(0, lambda: self.directory_panel.set_refresh_status(False))
                 return
             
-            future = self._run_async(self._get_directory_listing(self.current_remote_path))
+            future = self._run_async(self._get_directory_listing(self.current_remote_path, use_cache=not force))
             if future:
                 future.add_done_callback(self._on_directory_result)
             else:
@@ -651,8 +690,14 @@ class ModernFileTransferGUI:
             self.refresh_pending = False
             self._refresh_directory()
     
-    async def _get_directory_listing(self, path):
-        """获取目录列表 - 增强版本，改进命令执行和错误处理"""
+    async def _get_directory_listing(self, path, use_cache: bool = True):
+        """
+        获取目录列表：列表命令按设备探测一次并缓存，之后每个目录一次往返
+        
+        Args:
+            path (str): 远程目录
+            use_cache (bool): 是否使用目录缓存，默认True
+        """
         try:
             normalized_path = self._normalize_unix_path(path)
             self.logger.info(f"获取目录列表: '{path}' -> '{normalized_path}'")
@@ -663,125 +708,34 @@ class ModernFileTransferGUI:
             
             # 使用锁保护telnet连接
             async with self.telnet_lock:
-                # 先检查当前工作目录
-                pwd_result = await self.telnet_client.execute_command('pwd', timeout=10)
-                self.logger.debug(f"当前工作目录: {repr(pwd_result)}")
-                
-                # 简化逻辑：直接尝试创建目录（如果已存在会被忽略）
-                self.logger.debug(f"确保目录存在: {normalized_path}")
-                mkdir_cmd = f'mkdir -p "{normalized_path}" 2>/dev/null; echo "MKDIR_DONE"'
-                mkdir_result = await self.telnet_client.execute_command(mkdir_cmd, timeout=15)
-                self.logger.debug(f"mkdir命令结果: {repr(mkdir_result)}")
-                
-                # 尝试多种ls命令变体，找到能工作的版本
-                ls_commands = [
-                    f'cd "{normalized_path}" && ls -la . 2>/dev/null || echo "LS_FAILED"',
-                    f'ls -la "{normalized_path}" 2>/dev/null || echo "LS_FAILED"',
-                    f'ls -l "{normalized_path}" 2>/dev/null || echo "LS_FAILED"', 
-                    f'ls -a "{normalized_path}" 2>/dev/null || echo "LS_FAILED"',
-                    f'find "{normalized_path}" -maxdepth 1 -ls 2>/dev/null || echo "LS_FAILED"'
-                ]
-                
-                result = ""
-                for i, ls_cmd in enumerate(ls_commands):
-                    self.logger.debug(f"尝试ls命令变体 {i+1}: {ls_cmd}")
-                    try:
-                        # 等待一小段时间，确保命令执行完成
-                        await asyncio.sleep(0.1)
-                        result = await self.telnet_client.execute_command(ls_cmd, timeout=25)
-                        self.logger.info(f"ls命令变体{i+1}输出长度: {len(result)} 字符")
-                        self.logger.info(f"ls命令变体{i+1}输出内容: {repr(result[:300])}")  # 显示前300字符
-                        
-                        # 检查是否是有效输出（不只是命令提示符或错误信息）
-                        cleaned_result = result.strip()
-                        lines = cleaned_result.split('\n')
-                        # 过滤掉命令提示符行
-                        content_lines = []
-                        for line in lines:
-                            stripped_line = line.strip()
-                            if (stripped_line and 
-                                not stripped_line.startswith('/ #') and 
-                                not stripped_line.endswith('/ #') and
-                                '/ #' != stripped_line):
-                                content_lines.append(line)
-                        
-                        # 检查是否包含有效的文件/目录信息
-                        has_content = False
-                        if content_lines:
-                            # 检查是否包含常见的目录名或文件信息
-                            content_text = ' '.join(content_lines).lower()
-                            common_dirs = ['bin', 'etc', 'var', 'usr', 'tmp', 'home', 'root', 'dev', 'proc', 'sys']
-                            file_indicators = ['drwx', '-rw', 'total', ':', 'jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
-                            
-                            if any(dir_name in content_text for dir_name in common_dirs) or \
-                               any(indicator in content_text for indicator in file_indicators):
-                                has_content = True
-                        
-                        if (cleaned_result and 
-                            len(cleaned_result) > 10 and 
-                            'LS_FAILED' not in cleaned_result and
-                            has_content and
-                            len(content_lines) > 0):
-                            self.logger.info(f"ls命令变体{i+1}成功，内容行数: {len(content_lines)}")
-                            # 对于简化格式的ls输出，需要特殊处理
-                            # 索引: 0=cd+ls -la, 1=ls -la, 2=ls -l, 3=ls -a, 4=find
-                            if i >= 2:  # ls -l, ls -a 或 find 命令可能是简化格式
-                                # 检查是否确实是简化格式（没有详细权限信息）
-                                is_simple_format = True
-                                for line in content_lines[:3]:  # 检查前几行
-                                    if line.strip().startswith(('drwx', '-rw', 'total')):
-                                        is_simple_format = False
-                                        break
-                                
-                                if is_simple_format:
-                                    self.logger.info("检测到简化格式的ls输出，进行特殊解析")
-                                    result = self._convert_simple_ls_to_detailed(result, normalized_path)
-                            break
-                        else:
-                            self.logger.warning(f"ls命令变体{i+1}输出无效: 内容行数={len(content_lines)}, 有内容={has_content}")
-                            self.logger.debug(f"输出内容: {repr(cleaned_result[:200])}")
-                            result = ""
-                    except asyncio.TimeoutError:
-                        self.logger.warning(f"ls命令变体{i+1}超时")
-                        result = ""
-                    except Exception as e:
-                        self.logger.warning(f"ls命令变体{i+1}异常: {e}")
-                        result = ""
-                
-                # 如果所有ls命令都失败，进行最终检查
-                if not result or len(result.strip()) < 10:
-                    self.logger.warning(f"所有ls命令变体都失败，进行目录存在性检查")
-                    
-                    # 检查目录是否真的存在
-                    check_cmd = f'test -d "{normalized_path}" && echo "DIR_EXISTS" || echo "DIR_NOT_EXISTS"'
-                    try:
-                        check_result = await self.telnet_client.execute_command(check_cmd, timeout=10)
-                        self.logger.info(f"目录存在性检查结果: {repr(check_result)}")
-                        
-                        if "DIR_NOT_EXISTS" in check_result:
-                            self.logger.error(f"目录不存在且无法创建: {normalized_path}")
-                            # 检查父目录状态
-                            parent_path = self._get_unix_parent_path(normalized_path)
-                            parent_info_cmd = f'ls -la "{parent_path}" 2>&1 || echo "PARENT_CHECK_FAILED"'
-                            parent_info = await self.telnet_client.execute_command(parent_info_cmd, timeout=10)
-                            self.logger.error(f"父目录信息: {repr(parent_info)}")
-                            return []
-                        elif "DIR_EXISTS" in check_result:
-                            # 目录存在但ls失败，可能是权限问题或目录为空
-                            self.logger.warning(f"目录存在但ls命令失败，尝试简单文件计数")
-                            count_cmd = f'find "{normalized_path}" -maxdepth 1 -type f 2>/dev/null | wc -l'
-                            count_result = await self.telnet_client.execute_command(count_cmd, timeout=10)
-                            self.logger.info(f"目录文件计数: {repr(count_result)}")
-                            return []  # 返回空列表表示目录存在但为空或无法访问
-                        else:
-                            self.logger.error(f"目录检查命令返回异常: {repr(check_result)}")
-                            return []
-                    except Exception as e:
-                        self.logger.error(f"目录存在性检查异常: {e}")
-                        return []
-            
-            # 解析目录内容
-            items = self._parse_directory_output(result, path)
+                try:
+                    # 目录不存在时自动创建（与之前的mkdir -p行为一致）
+                    entries = await self.remote_lister.list_directory(
+                        self.telnet_client, normalized_path, create=True, use_cache=use_cache
+                    )
+                except FileNotFoundError:
+                    self.logger.error(f"目录不存在且无法创建: {normalized_path}")
+                    return []
+            
+            # 后台预取相邻目录，不阻塞本次刷新
+            task = asyncio.ensure_future(self._prefetch_nearby_directories(normalized_path, entries))
+            self._prefetch_tasks.add(task)
+            task.add_done_callback(self._on_prefetch_done)
+            
+            items = [
+                {
+                    'name': entry.name,
+                    'is_directory': entry.is_directory,
+                    'is_executable': entry.is_executable,
+                    'is_link': entry.is_link,
+                    'file_type': self._determine_file_type(entry.permissions, entry.name),
+                    'permissions': entry.permissions,
+                    'size': entry.size,
+                    'mtime': entry.mtime,
+                    'full_path': self._join_unix_path(normalized_path, entry.name)
+                }
+                for entry in entries
+            ]
             self.logger.info(f"最终解析得到 {len(items)} 个项目")
             return items
             
@@ -791,82 +745,48 @@ class ModernFileTransferGUI:
             self.logger.error(f"详细错误信息: {traceback.format_exc()}")
             return []
     
-    def _convert_simple_ls_to_detailed(self, simple_output: str, base_path: str) -> str:
-        """将简化格式的ls输出转换为详细格式"""
+    async def _prefetch_nearby_directories(self, path: str, entries):
+        """
+        预取上级、子目录和同级目录的列表（一次往返），浏览目录树时直接命中缓存
+        
+        Args:
+            path (str): 当前目录
+            entries (List[RemoteEntry]): 当前目录的条目
+        """
         try:
-            self.logger.info("开始转换简化格式的ls输出")
-            
-            # 清理ANSI转义序列
-            cleaned_output = self._clean_ansi_codes(simple_output)
-            lines = cleaned_output.strip().split('\n')
-            
-            # 过滤掉命令提示符行，提取内容行
-            content_lines = []
-            for line in lines:
-                stripped_line = line.strip()
-                if (stripped_line and 
-                    not stripped_line.startswith('/ #') and 
-                    not stripped_line.endswith('/ #') and
-                    '/ #' != stripped_line):
-                    content_lines.append(line)
-            
-            if not content_lines:
-                self.logger.warning("简化格式输出中没有有效内容")
-                return ""
-            
-            # 解析文件名（简化格式是多列显示）
-            file_names = []
-            for line in content_lines:
-                # 简化格式的ls输出是空格分隔的多列
-                # 需要小心处理，因为文件名可能包含空格
-                parts = line.split()
-                for part in parts:
-                    # 过滤掉特殊项
-                    if part not in ['.', '..'] and part.strip():
-                        file_names.append(part.strip())
-            
-            self.logger.info(f"从简化输出中提取到 {len(file_names)} 个文件名: {file_names[:10]}")  # 只显示前10个
-            
-            # 生成模拟的详细格式输出
-            detailed_lines = []
-            for filename in file_names:
-                # 根据文件名推测类型和权限
-                if filename in ['bin', 'etc', 'var', 'usr', 'tmp', 'home', 'dev', 'proc', 'sys', 'lib', 'sbin', 'opt', 'boot']:
-                    # 系统目录
-                    permissions = "drwxr-xr-x"
-                    file_type = "directory"
-                elif filename.startswith('.'):
-                    # 隐藏文件/目录
-                    permissions = "drwxr-xr-x" if len(filename) > 1 else "drwxr-xr-x" 
-                    file_type = "directory"
-                elif filename in ['config', 'customer', 'software', 'upgrade', 'appconfigs', 'vendor']:
-                    # 应用目录
-                    permissions = "drwxrwxr-x"
-                    file_type = "directory"
-                else:
-                    # 默认为目录（大多数情况下根目录下都是目录）
-                    permissions = "drwxr-xr-x"
-                    file_type = "directory"
-                
-                # 生成模拟的详细格式行
-                # 格式: permissions links owner group size date time name
-                detailed_line = f"{permissions}    2 root     root         160 Jan  1  1970 {filename}"
-                detailed_lines.append(detailed_line)
-            
-            # 添加total行（模拟）
-            if detailed_lines:
-                total_line = f"total {len(detailed_lines)}"
-                detailed_lines.insert(0, total_line)
-            
-            result = '\n'.join(detailed_lines)
-            self.logger.info(f"生成了 {len(detailed_lines)} 行详细格式输出")
-            self.logger.debug(f"转换结果: {repr(result[:200])}")
-            
-            return result
-            
+            client = self.telnet_client
+            if not client or not self.is_connected:
+                return
+            parent = self._get_unix_parent_path(path)
+            candidates = [parent] if path != '/' else []
+            candidates += [self._join_unix_path(path, e.name) for e in entries if e.is_directory]
+            siblings = self.remote_lister.cache.get(client.host, client.port, parent)
+            if siblings and path != '/':
+                candidates += [self._join_unix_path(parent, e.name) for e in siblings
+                               if e.is_directory and self._join_unix_path(parent, e.name) != path]
+            async with self.telnet_lock:
+                stored = await self.remote_lister.prefetch(client, candidates)
+            if stored:
+                self.logger.debug(f"已预取 {stored} 个相邻目录: {path}")
         except Exception as e:
-            self.logger.error(f"转换简化格式失败: {e}")
-            return simple_output  # 返回原始输出
+            self.logger.debug(f"预取相邻目录失败: {e}")
+    
+    def _on_prefetch_done(self, task: asyncio.Task):
+        """预取任务结束：释放引用并记录异常"""
+        self._prefetch_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            self.logger.warning(f"⚠️ 预取相邻目录任务异常: {task.exception()}")
+    
+    def _cancel_prefetch_tasks(self):
+        """取消未完成的预取任务（在事件循环线程中调用）"""
+        for task in list(self._prefetch_tasks):
+            task.cancel()
+    
+    def _invalidate_remote_path(self, path: str):
+        """设备上的path被本程序修改后使目录缓存失效（上传、删除、chmod、mkdir）"""
+        client = self.telnet_client
+        if client:
+            self.remote_lister.invalidate(client.host, client.port, self._normalize_unix_path(path))
     
     def _get_unix_parent_path(self, path: str) -> str:
         """获取Unix风格的父路径"""
@@ -887,65 +807,6 @@ class ModernFileTransferGUI:
         else:
             return path[:last_slash]
     
-    def _parse_directory_output(self, output: str, base_path: str) -> List[Dict[str, Any]]:
-        """解析目录输出"""
-        items = []
-        try:
-            # 清理ANSI转义序列
-            cleaned_result = self._clean_ansi_codes(output)
-            lines = cleaned_result.strip().split('\n')
-            self.logger.info(f"清理后的输出行数: {len(lines)}")
-            self.logger.info(f"清理后的输出内容: {repr(cleaned_result)}")
-            
-            for i, line in enumerate(lines):
-                line = line.strip()
-                self.logger.debug(f"处理第{i}行: {repr(line)}")
-                
-                if not line or (i == 0 and line.startswith('total')):
-                    self.logger.debug(f"跳过第{i}行: 空行或total行")
-                    continue
-                
-                parts = line.split()
-                self.logger.debug(f"第{i}行分割后: {len(parts)} 个部分: {parts}")
-                
-                if len(parts) >= 9:
-                    permissions = parts[0]
-                    name = ' '.join(parts[8:])
-                    
-                    if name in ['.', '..']:
-                        self.logger.debug(f"跳过目录项: {name}")
-                        continue
-                    
-                    name = self._clean_ansi_codes(name)
-                    
-                    if name:
-                        is_directory = permissions.startswith('d')
-                        is_executable = 'x' in permissions[1:4] and not is_directory
-                        is_link = permissions.startswith('l')
-                        
-                        file_type = self._determine_file_type(permissions, name)
-                        
-                        item = {
-                            'name': name,
-                            'is_directory': is_directory,
-                            'is_executable': is_executable,
-                            'is_link': is_link,
-                            'file_type': file_type,
-                            'permissions': permissions,
-                            'full_path': self._join_unix_path(base_path, name)
-                        }
-                        items.append(item)
-                        self.logger.debug(f"添加项目: {name} (权限: {permissions})")
-                else:
-                    self.logger.debug(f"第{i}行部分不足9个，跳过: {parts}")
-            
-            self.logger.debug(f"最终解析得到 {len(items)} 个项目")
-            return items
-            
-        except Exception as e:
-            self.logger.error(f"解析目录输出失败: {str(e)}")
-            return []
-    
     def _on_path_change(self, new_path: str):
         """处理路径变化"""
         self.current_remote_path = new_path
@@ -1013,11 +874,12 @@ class ModernFileTransferGUI:
             async with self.telnet_lock:
                 delete_cmd = f'rm "{file_path}"'
                 self.logger.info(f"执行删除命令: {delete_cmd}")
-                result = await self.telnet_client.execute_command(delete_cmd, timeout=10)
+                result = await self.telnet_client.execute_command(delete_cmd)
+                self._invalidate_remote_path(file_path)
                 
                 # 检查删除是否成功
                 check_cmd = f'ls "{file_path}" 2>/dev/null || echo "FILE_NOT_FOUND"'
-                check_result = await self.telnet_client.execute_command(check_cmd, timeout=5)
+                check_result = await self.telnet_client.execute_command(check_cmd)
                 
                 return "FILE_NOT_FOUND" in check_result or "No such file" in check_result
         except Exception as e:
@@ -1130,6 +992,8 @@ class ModernFileTransferGUI:
             messagebox.showerror("错误", "HTTP服务器未启动，无法进行文件传输")
             return
         
+        self.sync_directories, self.sync_delete_extras = self.transfer_panel.get_sync_options()
+        self.precompress_transfers = self.transfer_panel.get_precompress_option()
         self.logger.info(f"🚀 开始传输 {len(transfer_tasks)} 个文件到目录: {self.current_remote_path}")
         self._update_status(f"开始传输 {len(transfer_tasks)} 个文件...")
         self.transfer_panel.update_transfer_button_state(False, '🔄 传输中...')
@@ -1138,7 +1002,7 @@ class ModernFileTransferGUI:
     def _transfer_files_async(self, transfer_tasks: List[tuple]):
         """异步传输文件"""
         try:
-            future = self._run_async(self._execute_transfers_sequentially(transfer_tasks))
+            future = self._run_async(self._execute_transfers(transfer_tasks))
             if future:
                 future.add_done_callback(lambda f: self._on_transfer_result(f, len(transfer_tasks)))
             else:
@@ -1156,34 +1020,81 @@ class ModernFileTransferGUI:
             self.logger.error(f"传输结果处理失败: {e}")
             self.root.after(0, lambda: self._on_transfer_error(str(e)))
     
-    async def _execute_transfers_sequentially(self, transfer_tasks: List[tuple]):
-        """串行执行传输任务"""
-        success_count = 0
+    async def _execute_transfers(self, transfer_tasks: List[tuple]):
+        """
+        经传输队列并发执行传输任务（在工作shell上执行，不占用交互shell）
         
-        for i, (local_file, remote_path, filename) in enumerate(transfer_tasks, 1):
-            self.logger.info(f"开始传输文件 {i}/{len(transfer_tasks)}: {filename}")
-            
-            try:
-                async with self.telnet_lock:
-                    if await self._transfer_single_file_async(local_file, remote_path, filename):
-                        success_count += 1
-                        self.logger.info(f"✅ 文件传输成功: {filename} ({i}/{len(transfer_tasks)})")
-                        # 在UI中显示进度
-                        self.root.after(0, lambda f=filename, n=i, t=len(transfer_tasks): 
-                                       self._update_status(f"已完成: {f} ({n}/{t})"))
-                    else:
-                        self.logger.error(f"❌ 文件传输失败: {filename} ({i}/{len(transfer_tasks)})")
-                        # 在UI中显示失败信息
-                        self.root.after(0, lambda f=filename, n=i, t=len(transfer_tasks): 
-                                       self._update_status(f"传输失败: {f} ({n}/{t})"))
-            except Exception as e:
-                self.logger.error(f"💥 传输文件 {filename} 时出错: {str(e)}")
-                self.root.after(0, lambda f=filename: self._update_status(f"传输出错: {f}"))
+        同时进行的传输数受设备工作shell数限制，失败的文件按退避间隔重试并续传。
         
-        return success_count
-    
-    async def _transfer_single_file_async(self, local_file: str, remote_path: str, filename: str):
-        """异步传输单个文件 - 增强版本，确保目录存在"""
+        Args:
+            transfer_tasks (List[tuple]): (本地路径, 远程目录, 文件名) 列表
+        
+        Returns:
+            int: 成功传输的文件数
+        """
+        device = f"{self.connection_config.get('host')}:{self.connection_config.get('port')}"
+        jobs = [TransferJob(local_file, self._normalize_unix_path(remote_path), filename, device)
+                for local_file, remote_path, filename in transfer_tasks]
+        queue = TransferQueue(
+            concurrency=self.transfer_concurrency,
+            per_device=self.transfer_concurrency,
+            retries=self.transfer_retries,
+            on_state=lambda job: self._on_transfer_state(job, jobs),
+            logger=self.logger
+        )
+        await queue.run(jobs, self._run_transfer_job)
+        summary = TransferQueue.summarize(jobs)
+        self.logger.info(f"传输队列结束: 成功 {summary['done']}/{summary['total']}，重试 {summary['retries']} 次")
+        return summary['done']
+    
+    async def _run_transfer_job(self, job: TransferJob) -> bool:
+        """在工作shell上执行一次传输尝试，重试时续传"""
+        async with self.shell_dispatcher.worker() as shell:
+            if os.path.isdir(job.local_path):
+                if self.sync_directories:
+                    return await self._sync_directory_async(job.local_path, job.remote_dir, job.name, shell=shell)
+                return await self._transfer_directory_async(job.local_path, job.remote_dir, job.name, shell=shell)
+            return await self._transfer_single_file_async(job.local_path, job.remote_dir, job.name,
+                                                          shell=shell, job=job)
+    
+    def _on_transfer_state(self, job: TransferJob, jobs: List[TransferJob]):
+        """传输任务状态变化：记录日志并在状态栏显示进度"""
+        finished = sum(1 for j in jobs if j.is_finished)
+        progress = f"({finished}/{len(jobs)})"
+        if job.state == STATE_DONE:
+            self.logger.info(f"✅ 文件传输成功: {job.name} {progress}，耗时 {job.elapsed:.1f}秒")
+            message = f"已完成: {job.name} {progress}"
+        elif job.state == STATE_FAILED:
+            self.logger.error(f"❌ 文件传输失败: {job.name} {progress} - {job.error}")
+            message = f"传输失败: {job.name} {progress}"
+        elif job.state == STATE_RETRYING:
+            message = f"重试中: {job.name} (第{job.attempts}次失败) {progress}"
+        else:
+            running = sum(1 for j in jobs if j.state == STATE_RUNNING)
+            message = f"正在传输 {running} 个文件 {progress}"
+        self.root.after(0, lambda m=message: self._update_status(m))
+    
+    async def _transfer_single_file_async(self, local_file: str, remote_path: str, filename: str,
+                                          shell: Optional[CustomTelnetClient] = None,
+                                          job: Optional[TransferJob] = None):
+        """
+        异步传输单个文件
+        
+        建目录、下载、chmod在设备上合并为一条命令链，与大小和校验和比对一起一次往返完成；
+        校验失败时由传输队列重试（截断的文件续传，内容不一致的完整重传）。
+        
+        Args:
+            local_file (str): 本地文件路径
+            remote_path (str): 远程目录
+            filename (str): 远程文件名
+            shell (CustomTelnetClient, optional): 执行命令的客户端，默认交互shell
+            job (TransferJob, optional): 所属传输任务，记录失败原因和下次是否续传
+        
+        Returns:
+            bool: 是否传输成功
+        """
+        shell = shell or self.telnet_client
+        actual_filename = None
         try:
             if not self.http_server:
                 self.logger.error("HTTP服务器未启动")
@@ -1196,7 +1107,7 @@ class ModernFileTransferGUI:
                 self.logger.error("无法添加文件到HTTP服务器")
                 return False
             
-            # 获取实际的文件名
+            # 暂存名只用于下载URL（同名文件仍在被下载时可能带 _1 后缀），设备上始终保存为filename
             actual_filename = os.path.basename(server_file_path)
             
             # 获取下载URL
@@ -1207,128 +1118,169 @@ class ModernFileTransferGUI:
                 self.logger.error("无法获取下载URL")
                 return False
             
-            # 确保远程目录存在
+            retrying = job is not None and job.attempts > 1
+            resume = job is not None and job.resume
             normalized_remote_path = self._normalize_unix_path(remote_path)
-            self.logger.info(f"确保远程目录存在: {normalized_remote_path}")
-            
-            # 简化逻辑：直接创建目录并尝试访问
-            mkdir_cmd = f'mkdir -p "{normalized_remote_path}" 2>/dev/null; echo "MKDIR_DONE"'
-            mkdir_result = await self.telnet_client.execute_command(mkdir_cmd)
-            self.logger.debug(f"创建目录结果: {repr(mkdir_result)}")
-            
-            # 验证目录是否可访问（通过ls命令）
-            ls_check = await self.telnet_client.execute_command(f'ls -la "{normalized_remote_path}" 2>/dev/null | head -1')
-            self.logger.debug(f"目录访问检查: {repr(ls_check)}")
-            
-            # 如果ls命令没有输出，说明目录不存在或不可访问
-            if not ls_check or len(ls_check.strip()) < 5:
-                self.logger.error(f"无法创建或访问远程目录: {normalized_remote_path}")
-                # 尝试获取更详细的错误信息
-                error_info = await self.telnet_client.execute_command(f'ls -la "{normalized_remote_path}" 2>&1')
-                self.logger.error(f"详细错误信息: {error_info}")
+            # 可执行权限由下载命令链用绝对路径添加（扩展名或暂存时检测到的ELF/脚本头）
+            executable = (self._is_executable_binary_file(filename)
+                          or self.http_server.is_executable(actual_filename))
+            # 暂存时已算好SHA-256，设备端下载后在同一批命令中比对
+            checksum = self.http_server.get_checksum(actual_filename)
+            
+            # 可压缩且划算时先尝试gzip变体；重试时直接传原始文件
+            compressed_url = None
+            if not retrying and self.precompress_transfers:
+                # 采样估算和整文件gzip在线程池中执行，不阻塞其他工作shell共用的事件循环
+                gzip_name = await asyncio.get_running_loop().run_in_executor(
+                    None, self._prepare_gzip_variant, local_file, actual_filename)
+                if gzip_name:
+                    compressed_url = self.http_server.get_download_url(gzip_name)
+                    self.logger.info(f"使用预压缩传输: {compressed_url}")
+            
+            start_time = time.time()
+            result = None
+            compressed = False
+            if compressed_url:
+                result = await run_download(shell, normalized_remote_path, filename, compressed_url,
+                                            local_file, compressed=True, executable=executable, sha256=checksum)
+                compressed = result.ok
+                if not result:
+                    self.logger.warning(f"预压缩传输失败，改用原始文件: {filename} - {result.detail}")
+            if not result:
+                if resume:
+                    self.logger.info(f"从设备上已有的部分续传: {filename}")
+                # 只统计原始文件本身的传输耗时，不含失败的压缩尝试
+                start_time = time.time()
+                result = await run_download(shell, normalized_remote_path, filename, download_url,
+                                            local_file, resume=resume, executable=executable, sha256=checksum)
+            # mkdir -p可能新建了目录，目标目录本身和其所在目录的列表都已变化
+            self._invalidate_remote_path(normalized_remote_path)
+            
+            if not result:
+                self.logger.error(f"设备端下载或校验失败: {filename} - {result.detail}")
+                if job is not None:
+                    # 文件被截断时续传，内容不一致时完整重传
+                    job.error = result.detail
+                    job.resume = result.resumable
                 return False
-            else:
-                self.logger.info(f"成功确认目录可访问: {normalized_remote_path}")
-            
-            # 切换到远程目录
-            self.logger.info(f"切换到远程目录: {normalized_remote_path}")
-            cd_result = await self.telnet_client.execute_command(f'cd "{normalized_remote_path}"')
-            
-            # 执行下载
-            download_success = await self._download_via_telnet(download_url, normalized_remote_path, actual_filename)
-            
-            if download_success:
-                # 检查并设置可执行权限（如果是二进制文件）
-                await self._check_and_set_executable_permission(actual_filename, normalized_remote_path)
-                
-                # 验证文件是否真的存在
-                verify_cmd = f'ls -la "{normalized_remote_path}/{actual_filename}"'
-                verify_result = await self.telnet_client.execute_command(verify_cmd)
-                self.logger.info(f"传输后文件验证: {verify_result.strip()}")
-                
-                # 同时检查目录内容
-                dir_check_cmd = f'ls -la "{normalized_remote_path}"'
-                dir_check_result = await self.telnet_client.execute_command(dir_check_cmd)
-                self.logger.info(f"传输后目录内容: {repr(dir_check_result)}")
-            
-            # 延迟清理HTTP服务器文件
-            def delayed_cleanup():
-                try:
-                    if self.http_server:
-                        self.http_server.remove_file(actual_filename)
-                except Exception as cleanup_error:
-                    self.logger.error(f"清理HTTP文件失败: {cleanup_error}")
-            
-            # 3秒后清理
-            threading.Timer(3.0, delayed_cleanup).start()
             
-            return download_success
+            file_size = os.path.getsize(local_file)
+            self.precompress_policy.record_transfer(file_size, time.time() - start_time, compressed=compressed)
+            return True
             
         except Exception as e:
             self.logger.error(f"传输文件失败: {str(e)}")
             import traceback
             self.logger.error(f"详细错误信息: {traceback.format_exc()}")
-            return False
+            if job is not None:
+                # 下载中途超时或断线，设备上可能已有部分内容，续传后仍由校验和把关
+                job.resume = True
+            raise
+        finally:
+            # 只释放租约，宽限期后由暂存存储的清理线程回收；重试会重新取得租约
+            if actual_filename and self.http_server:
+                try:
+                    self.http_server.remove_file(actual_filename)
+                except Exception as cleanup_error:
+                    self.logger.error(f"清理HTTP文件失败: {cleanup_error}")
     
-    async def _download_via_telnet(self, download_url: str, remote_path: str, filename: str):
-        """通过telnet下载"""
+    def _prepare_gzip_variant(self, local_file: str, staged_name: str) -> Optional[str]:
+        """
+        预压缩划算时生成gzip变体（在线程池中调用）
+        
+        Args:
+            local_file (str): 本地文件路径
+            staged_name (str): HTTP服务器上的暂存名
+        
+        Returns:
+            str: gzip变体的暂存名，不划算或生成失败时返回None
+        """
+        if not self.precompress_policy.should_compress(local_file):
+            return None
+        return self.http_server.get_gzip_variant(staged_name)
+    
+    async def _transfer_directory_async(self, local_dir: str, remote_path: str, dirname: str,
+                                        shell: Optional[CustomTelnetClient] = None):
+        """
+        以tar流方式传输整个目录
+        
+        HTTP服务器边打包边发送，设备端执行 wget -O - URL | tar -xf -，
+        无论目录包含多少文件都只需要一次下载和一次telnet命令。
+        
+        Args:
+            local_dir (str): 本地目录路径
+            remote_path (str): 远程目标目录
+            dirname (str): 解包后的目录名
+            shell (CustomTelnetClient, optional): 执行命令的客户端，默认交互shell
+        
+        Returns:
+            bool: 是否传输成功
+        """
+        shell = shell or self.telnet_client
+        archive_name = None
         try:
-            self.logger.info(f"切换到远程目录: {remote_path}")
-            cd_result = await self.telnet_client.execute_command(f'cd "{remote_path}"')
-            
-            wget_cmd = f'wget -O "{filename}" "{download_url}"'
-            self.logger.info(f"执行wget命令: {wget_cmd}")
-            result = await self.telnet_client.execute_command(wget_cmd, timeout=30)
-            
-            # 检查下载结果
-            success_keywords = ['100%', 'saved', 'complete', 'downloaded']
-            download_success = False
+            if not self.http_server:
+                self.logger.error("HTTP服务器未启动")
+                return False
             
-            if any(keyword in result.lower() for keyword in success_keywords):
-                download_success = True
-            else:
-                # 检查文件是否确实存在
-                check_cmd = f'ls -la "{filename}"'
-                check_result = await self.telnet_client.execute_command(check_cmd)
-                download_success = filename in check_result and "-rw" in check_result
+            archive_name = self.http_server.add_directory(local_dir, dirname)
+            if not archive_name:
+                self.logger.error("无法发布目录到HTTP服务器")
+                return False
+            download_url = self.http_server.get_download_url(archive_name)
             
-            # 如果下载成功，检查是否需要添加可执行权限
-            if download_success:
-                await self._check_and_set_executable_permission(filename, remote_path)
+            normalized_remote_path = self._normalize_unix_path(remote_path)
+            # 解包后的目录检查并入命令链，按退出码判断结果
+            tar_cmd = (f'mkdir -p "{normalized_remote_path}" && cd "{normalized_remote_path}" && '
+                       f'wget -q -O - "{download_url}" | tar -xf - && test -d "{dirname}"')
+            self.logger.info(f"执行目录下载命令: {tar_cmd}")
+            # 超时按目录大小推算，大目录在慢速Wi-Fi上不会每次都超时
+            size = await asyncio.get_running_loop().run_in_executor(None, directory_size, local_dir)
+            (result, code), = await shell.execute_many([tar_cmd], timeout=transfer_timeout(size))
+            self._invalidate_remote_path(normalized_remote_path)
+            
+            if code != 0:
+                self.logger.error(f"目录解包失败: {dirname} - {result.strip()}")
+                return False
+            return True
             
-            return download_success
-                
         except Exception as e:
-            self.logger.error(f"telnet下载失败: {str(e)}")
-            return False
+            self.logger.error(f"传输目录失败: {str(e)}")
+            # 交给队列重试，超时或断线的工作shell由调度器丢弃而不是放回池中
+            raise
+        finally:
+            if archive_name and self.http_server:
+                self.http_server.remove_directory(archive_name)
     
-    async def _check_and_set_executable_permission(self, filename: str, remote_path: str):
-        """检查并设置二进制文件的可执行权限"""
+    async def _sync_directory_async(self, local_dir: str, remote_path: str, dirname: str,
+                                    shell: Optional[CustomTelnetClient] = None):
+        """
+        增量同步目录：只发送新增和修改的文件，按选项删除设备上多余的文件
+        
+        Args:
+            local_dir (str): 本地目录路径
+            remote_path (str): 远程目标目录
+            dirname (str): 设备上的目录名
+            shell (CustomTelnetClient, optional): 执行命令的客户端，默认交互shell
+        
+        Returns:
+            bool: 是否同步成功
+        """
+        shell = shell or self.telnet_client
+        if not self.http_server:
+            self.logger.error("HTTP服务器未启动")
+            return False
+        
+        remote_dir = self._join_unix_path(self._normalize_unix_path(remote_path), dirname)
         try:
-            # 检测是否为需要可执行权限的二进制文件
-            if self._is_executable_binary_file(filename):
-                # 构建完整的远程文件路径
-                remote_file_path = f"{remote_path.rstrip('/')}/{filename}"
-                
-                # 添加可执行权限
-                chmod_cmd = f'chmod +x "{remote_file_path}"'
-                self.logger.info(f"为二进制文件添加可执行权限: {chmod_cmd}")
-                
-                await self.telnet_client.execute_command(chmod_cmd, timeout=10)
-                
-                # 验证权限是否添加成功
-                verify_cmd = f'ls -l "{remote_file_path}"'
-                verify_result = await self.telnet_client.execute_command(verify_cmd, timeout=5)
-                
-                self.logger.info(f"权限验证结果: {verify_result.strip()}")
-                
-                if 'x' in verify_result:
-                    self.logger.info(f"✅ 成功为二进制文件添加可执行权限: {filename}")
-                else:
-                    self.logger.warning(f"⚠️ 可执行权限可能未成功添加: {filename}")
-                    
-        except Exception as e:
-            self.logger.error(f"❌ 添加可执行权限失败: {filename} - {e}")
+            plan = await self.delta_sync.sync(shell, self.http_server, local_dir, remote_dir,
+                                              delete_extras=self.sync_delete_extras)
+        finally:
+            self._invalidate_remote_path(remote_dir)
+        self.root.after(0, lambda: self._update_status(
+            f"已同步 {dirname}: 发送 {len(plan.upload)} 个，删除 {len(plan.delete) if self.sync_delete_extras else 0} 个，"
+            f"未变化 {plan.unchanged} 个"))
+        return True
     
     def _is_executable_binary_file(self, filename: str) -> bool:
         """检测文件是否为需要可执行权限的二进制文件"""
@@ -1503,9 +1455,8 @@ class ModernFileTransferGUI:
             
             if self.http_server:
                 self.http_server.stop()
-            if self.telnet_client:
-                if self.loop and not self.loop.is_closed():
-                    asyncio.run_coroutine_threadsafe(self.telnet_client.disconnect(), self.loop)
+            if self.loop and not self.loop.is_closed():
+                asyncio.run_coroutine_threadsafe(get_session_pool(self.loop).close_all(), self.loop)
             if self.loop and not self.loop.is_closed():
                 self.loop.call_soon_threadsafe(self.loop.stop)
         except Exception as e:
@@ -1550,7 +1501,7 @@ class ModernFileTransferGUI:
             async with self.telnet_lock:
                 # 检查文件是否存在
                 check_cmd = 'test -f /customer/screenId.ini && echo "EXISTS" || echo "NOT_EXISTS"'
-                check_result = await self.telnet_client.execute_command(check_cmd, timeout=5)
+                check_result = await self.telnet_client.execute_command(check_cmd)
                 
                 if "NOT_EXISTS" in check_result:
                     self.logger.debug("设备ID文件不存在: /customer/screenId.ini")
@@ -1558,7 +1509,7 @@ class ModernFileTransferGUI:
                 
                 # 读取文件内容
                 read_cmd = 'cat /customer/screenId.ini'
-                content = await self.telnet_client.execute_command(read_cmd, timeout=5)
+                content = await self.telnet_client.execute_command(read_cmd)
                 
                 if not content:
                     self.logger.debug("设备ID文件为空")
@@ -92,6 +92,21 @@ class TransferPanel:
                                           activebackground='#4b5563', activeforeground='#ffffff',
                                           cursor='hand2')
         self.clear_queue_button.pack(fill=tk.X, padx=10, pady=5)
+        
+        # 同步模式：目录只发送有变化的文件，可选删除设备上多余的文件
+        self.sync_mode_var = tk.BooleanVar(value=False)
+        self.delete_extras_var = tk.BooleanVar(value=False)
+        # 预压缩传输：可压缩且划算的文件先以gzip发送，由设备解压
+        self.precompress_var = tk.BooleanVar(value=False)
+        options_frame = tk.Frame(button_frame, bg=self.theme.colors['bg_primary'])
+        options_frame.pack(fill=tk.X, padx=10)
+        for text, variable in (("🔁 增量同步目录", self.sync_mode_var), ("🧹 删除多余文件", self.delete_extras_var),
+                               ("🗜️ 预压缩传输", self.precompress_var)):
+            tk.Checkbutton(options_frame, text=text, variable=variable,
+                           bg=self.theme.colors['bg_primary'], fg=self.theme.colors['text_primary'],
+                           selectcolor=self.theme.colors['bg_card'],
+                           activebackground=self.theme.colors['bg_primary'],
+                           font=('Microsoft YaHei UI', 9)).pack(side=tk.LEFT)
     
     def _create_drop_zone(self):
         """创建现代化文件拖拽区域 - 占主内容30%高度"""
@@ -248,15 +263,9 @@ class TransferPanel:
                                 files.append(path)
                                 self.logger.debug(f"添加文件: {path}")
                             elif os.path.isdir(path):
-                                self.logger.info(f"检测到目录: {path}，查找其中的文件")
-                                try:
-                                    for item in os.listdir(path):
-                                        item_path = os.path.join(path, item)
-                                        if os.path.isfile(item_path):
-                                            files.append(item_path)
-                                            self.logger.debug(f"从目录添加文件: {item_path}")
-                                except Exception as dir_error:
-                                    self.logger.error(f"读取目录失败: {dir_error}")
+                                # 目录整体作为一项，传输时以tar流一次性下发
+                                files.append(path)
+                                self.logger.info(f"检测到目录: {path}，将整体传输")
                         else:
                             self.logger.warning(f"路径不存在: {path}")
                 else:
@@ -272,15 +281,9 @@ class TransferPanel:
                                 files.append(path)
                                 self.logger.debug(f"添加文件: {path}")
                             elif os.path.isdir(path):
-                                self.logger.info(f"检测到目录: {path}，查找其中的文件")
-                                try:
-                                    for item in os.listdir(path):
-                                        item_path = os.path.join(path, item)
-                                        if os.path.isfile(item_path):
-                                            files.append(item_path)
-                                            self.logger.debug(f"从目录添加文件: {item_path}")
-                                except Exception as dir_error:
-                                    self.logger.error(f"读取目录失败: {dir_error}")
+                                # 目录整体作为一项，传输时以tar流一次性下发
+                                files.append(path)
+                                self.logger.info(f"检测到目录: {path}，将整体传输")
                         else:
                             self.logger.warning(f"路径不存在: {path}")
                 
@@ -293,6 +296,9 @@ class TransferPanel:
     def _get_file_type_indicator(self, file_path):
         """获取文件类型标识"""
         try:
+            if os.path.isdir(file_path):
+                return "[目录]"
+            
             # 1. 通过扩展名检测常见的二进制文件
             binary_extensions = {
                 '.exe', '.bin', '.so', '.dll', '.dylib', '.a', '.o', '.obj',
@@ -348,8 +354,8 @@ class TransferPanel:
         added_count = 0
         for file_path in files:
             self.logger.debug(f"检查文件: {file_path}")
-            if os.path.isfile(file_path):
-                filename = os.path.basename(file_path)
+            if os.path.isfile(file_path) or os.path.isdir(file_path):
+                filename = os.path.basename(os.path.normpath(file_path))
                 # 检测文件类型
                 file_type_indicator = self._get_file_type_indicator(file_path)
                 # 显示文件名和类型标识
@@ -359,7 +365,7 @@ class TransferPanel:
                 added_count += 1
                 self.logger.info(f"已添加文件: {filename} {file_type_indicator}")
             else:
-                self.logger.warning(f"文件不存在或不是文件: {file_path}")
+                self.logger.warning(f"文件或目录不存在: {file_path}")
         
         if added_count > 0:
             self.logger.info(f"成功添加 {added_count} 个文件到队列")
@@ -444,6 +450,8 @@ class TransferPanel:
                     filename = filename_with_type.replace(" [文本]", "")
                 elif "[二进制]" in filename_with_type:
                     filename = filename_with_type.replace(" [二进制]", "")
+                elif "[目录]" in filename_with_type:
+                    filename = filename_with_type.replace(" [目录]", "")
                 else:
                     filename = filename_with_type
                 
@@ -453,6 +461,14 @@ class TransferPanel:
         
         return transfer_tasks
     
+    def get_sync_options(self) -> tuple:
+        """获取同步选项 (是否增量同步目录, 是否删除多余文件)"""
+        return self.sync_mode_var.get(), self.sync_mode_var.get() and self.delete_extras_var.get()
+    
+    def get_precompress_option(self) -> bool:
+        """获取是否启用预压缩传输"""
+        return self.precompress_var.get()
+    
     def update_transfer_button_state(self, enabled: bool, text: str = None):
         """更新传输按钮状态"""
         state = 'normal' if enabled else 'disabled'
@@ -11,17 +11,26 @@ Date: 2024
 Version: 1.0
 """
 
+import email.utils
 import os
 import shutil
+import socket
+import ssl
+import tarfile
 import tempfile
 import threading
 import time
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from typing import Optional, Dict, List
+from http.server import HTTPServer, ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Dict, List, Tuple
 import logging
 import urllib.parse
 from datetime import datetime
 from fileTransfer.logger_utils import get_logger
+from fileTransfer.staging_store import StagingStore, STORE_DIR_NAME
+from fileTransfer.bandwidth_scheduler import BandwidthScheduler, ThrottledWriter, CHUNK_SIZE
+from fileTransfer.transfer_metrics import TransferMetrics
+from fileTransfer.upload_receiver import UploadReceiver, UploadError, PendingUpload, UPLOAD_PREFIX
+from fileTransfer.file_metadata import FileMetadata, detect_executable, read_head
 
 
 class FileHTTPRequestHandler(BaseHTTPRequestHandler):
@@ -32,14 +41,36 @@ class FileHTTPRequestHandler(BaseHTTPRequestHandler):
     - 静态文件服务
     - 文件下载
     - 目录浏览（可选）
+    - 目录以tar流方式打包下载
+    - 接收设备通过PUT/POST推送的文件
+    - /metrics 指标接口
     - 错误处理
     """
     
     def __init__(self, *args, server_instance=None, **kwargs):
         """初始化请求处理器"""
         self.server_instance = server_instance
+        self._request_start = None
         super().__init__(*args, **kwargs)
     
+    def parse_request(self):
+        """解析请求行和请求头，同时记录请求开始时间用于统计首字节时间"""
+        self._request_start = time.perf_counter()
+        return super().parse_request()
+    
+    def end_headers(self):
+        """响应头发送完毕时记录首字节时间（每个请求只记录一次）"""
+        super().end_headers()
+        if self._request_start is not None:
+            self.server_instance.metrics.observe_ttfb(time.perf_counter() - self._request_start)
+            self._request_start = None
+    
+    def log_request(self, code='-', size='-'):
+        """统计请求数（按方法和状态码）"""
+        if self.server_instance and isinstance(code, int):
+            self.server_instance.metrics.record_request(self.command or '-', int(code))
+        super().log_request(code, size)
+    
     def do_GET(self):
         """处理GET请求"""
         try:
@@ -60,23 +91,42 @@ class FileHTTPRequestHandler(BaseHTTPRequestHandler):
                     file_path = encoded_file_path
                     self.server_instance.logger.warning(f"  - 解码失败，使用原始路径: {file_path}")
             
-            # 记录访问日志  
-            self.server_instance.logger.info(f"收到下载请求: {self.client_address[0]} -> 原始路径: {self.path}")
-            self.server_instance.logger.info(f"  - 编码路径: {encoded_file_path}")
-            self.server_instance.logger.info(f"  - 解码路径: {file_path}")
+            # 记录访问日志（逐请求的细节只在DEBUG级别输出，避免高负载时日志开销）
+            self.server_instance.logger.debug(f"收到下载请求: {self.client_address[0]} -> 原始路径: {self.path}")
+            self.server_instance.logger.debug(f"  - 编码路径: {encoded_file_path}")
+            self.server_instance.logger.debug(f"  - 解码路径: {file_path}")
             
             if not file_path or file_path == '/':
                 # 根路径请求，返回文件列表
                 self._send_file_list()
                 return
             
+            # 暂存了同名文件时优先下载文件，/metrics 不遮挡它
+            if file_path == 'metrics' and not os.path.exists(os.path.join(self.server_instance.temp_dir, file_path)):
+                self._send_metrics()
+                return
+            
+            # 目录流：边打包边发送tar，不生成临时归档
+            directory_stream = self.server_instance.get_directory_stream(file_path)
+            if directory_stream:
+                self._send_directory_tar(file_path, *directory_stream)
+                return
+            
+            # 暂存文件：文件名由服务器生成，元数据已缓存，无需再访问磁盘
+            # 持有引用期间清理线程不会回收该文件
+            with self.server_instance.staging_store.hold(file_path) as entry:
+                if entry:
+                    self.server_instance.metrics.increment('staging_hits')
+                    self._send_file(entry.path, file_path, entry.metadata)
+                    return
+            self.server_instance.metrics.increment('staging_misses')
+            
             # 构造完整文件路径
             full_path = os.path.join(self.server_instance.temp_dir, file_path)
-            self.server_instance.logger.info(f"  - 完整路径: {full_path}")
-            self.server_instance.logger.info(f"  - 文件存在: {os.path.exists(full_path)}")
+            self.server_instance.logger.debug(f"  - 完整路径: {full_path}")
             
-            # 如果文件不存在，列出临时目录内容进行调试
-            if not os.path.exists(full_path):
+            # 调试模式下，文件不存在时列出临时目录内容
+            if self.server_instance.debug_listing and not os.path.exists(full_path):
                 try:
                     temp_files = os.listdir(self.server_instance.temp_dir)
                     self.server_instance.logger.error(f"  - 临时目录内容: {temp_files}")
@@ -91,7 +141,7 @@ class FileHTTPRequestHandler(BaseHTTPRequestHandler):
             
             # 检查文件是否存在
             if not os.path.exists(full_path):
-                self.server_instance.logger.error(f"  - 文件不存在: {full_path}")
+                self.server_instance.logger.warning(f"文件不存在: {self.client_address[0]} -> {file_path}")
                 self._send_error_response(404, "File Not Found")
                 return
             
@@ -102,7 +152,7 @@ class FileHTTPRequestHandler(BaseHTTPRequestHandler):
                 return
             
             # 发送文件
-            self.server_instance.logger.info(f"  - 开始发送文件: {full_path}")
+            self.server_instance.logger.debug(f"  - 开始发送文件: {full_path}")
             self._send_file(full_path, file_path)
             
         except Exception as e:
@@ -115,12 +165,26 @@ class FileHTTPRequestHandler(BaseHTTPRequestHandler):
         """处理HEAD请求"""
         try:
             parsed_path = urllib.parse.urlparse(self.path)
-            file_path = parsed_path.path.lstrip('/')
+            file_path = urllib.parse.unquote(parsed_path.path.lstrip('/'), encoding='utf-8')
             
             if not file_path:
                 self._send_headers(200, "text/html", 0)
                 return
             
+            directory_stream = self.server_instance.get_directory_stream(file_path)
+            if directory_stream:
+                # 流式归档长度未知，只返回类型
+                self.send_response(200)
+                self.send_header('Content-Type', self._tar_content_type(directory_stream[1]))
+                self.end_headers()
+                return
+            
+            entry = self.server_instance.staging_store.lookup(file_path)
+            if entry:
+                status, byte_range = self._resolve_range(entry.metadata)
+                self._send_file_headers(status, entry.metadata, byte_range)
+                return
+            
             full_path = os.path.join(self.server_instance.temp_dir, file_path)
             
             if not self._is_safe_path(full_path) or not os.path.exists(full_path):
@@ -128,9 +192,9 @@ class FileHTTPRequestHandler(BaseHTTPRequestHandler):
                 return
             
             if os.path.isfile(full_path):
-                file_size = os.path.getsize(full_path)
-                content_type = self._get_content_type(file_path)
-                self._send_headers(200, content_type, file_size)
+                metadata = FileMetadata.from_file(full_path, file_path)
+                status, byte_range = self._resolve_range(metadata)
+                self._send_file_headers(status, metadata, byte_range)
             else:
                 self._send_headers(400, "text/plain", 0)
                 
@@ -138,74 +202,314 @@ class FileHTTPRequestHandler(BaseHTTPRequestHandler):
             self.server_instance.logger.error(f"处理HEAD请求失败: {str(e)}")
             self._send_headers(500, "text/plain", 0)
     
+    def do_PUT(self):
+        """处理PUT请求（设备推送文件，如 curl -T）"""
+        self._receive_upload()
+    
+    def do_POST(self):
+        """处理POST请求（设备推送文件，如 wget --post-file）"""
+        self._receive_upload()
+    
+    def _receive_upload(self):
+        """将 /upload/<名称> 的请求体流式写入磁盘"""
+        try:
+            parsed_path = urllib.parse.urlparse(self.path)
+            file_path = urllib.parse.unquote(parsed_path.path.lstrip('/'), encoding='utf-8')
+            if not file_path.startswith(UPLOAD_PREFIX):
+                self._send_error_response(404, "Not Found")
+                return
+            
+            chunked = 'chunked' in self.headers.get('Transfer-Encoding', '').lower()
+            length_header = self.headers.get('Content-Length')
+            content_length = None if chunked or length_header is None else int(length_header)
+            if self.headers.get('Expect', '').lower() == '100-continue':
+                self.send_response_only(100)
+                self.end_headers()
+            
+            pending = self.server_instance.upload_receiver.receive(
+                file_path[len(UPLOAD_PREFIX):], self.rfile, content_length, chunked)
+            body = f"OK {pending.size}\n".encode('utf-8')
+            self._send_headers(201, "text/plain", len(body))
+            self.wfile.write(body)
+            
+        except UploadError as e:
+            self.server_instance.logger.warning(f"上传失败: {self.client_address[0]} {self.path} - {e}")
+            self.close_connection = True
+            self._send_error_response(e.status_code, str(e))
+        except ValueError:
+            self._send_error_response(400, "Bad Content-Length")
+        except Exception as e:
+            self.server_instance.logger.error(f"处理上传请求失败: {str(e)}")
+            self._send_error_response(500, "Internal Server Error")
+    
     def _is_safe_path(self, file_path):
-        """检查文件路径是否安全（防止路径遍历攻击）"""
+        """检查文件路径是否安全（防止路径遍历攻击，且不暴露暂存blob目录）"""
         try:
             # 获取规范化的绝对路径
             real_path = os.path.realpath(file_path)
             real_temp_dir = os.path.realpath(self.server_instance.temp_dir)
             
             # 检查文件路径是否在临时目录内
-            return real_path.startswith(real_temp_dir)
+            if not real_path.startswith(real_temp_dir):
+                return False
+            
+            # blob目录只供内部使用，不允许直接下载
+            relative = os.path.relpath(real_path, real_temp_dir)
+            return relative.split(os.sep)[0] != STORE_DIR_NAME
             
         except Exception:
             return False
     
-    def _send_file(self, file_path, requested_path):
-        """发送文件内容"""
+    def _send_file(self, file_path, requested_path, metadata: Optional[FileMetadata] = None):
+        """
+        发送文件内容，支持单区间Range请求（断点续传）
+        
+        Args:
+            file_path (str): 文件路径
+            requested_path (str): 请求的文件名
+            metadata (FileMetadata, optional): 已缓存的元数据，未提供时读取文件生成
+        """
         try:
-            file_size = os.path.getsize(file_path)
-            content_type = self._get_content_type(requested_path)
-            
-            # 检测是否为二进制文件
-            is_binary = self._is_binary_file(file_path)
-            file_type_indicator = "[二进制]" if is_binary else "[文本]"
-            
-            # 发送响应头
-            self._send_headers(200, content_type, file_size)
+            if metadata is None:
+                metadata = FileMetadata.from_file(file_path, requested_path)
+            file_size = metadata.size
+            file_type_indicator = "[二进制]" if metadata.is_binary else "[文本]"
+            
+            # 解析Range/If-Range并发送响应头
+            status, byte_range = self._resolve_range(metadata)
+            self._send_file_headers(status, metadata, byte_range)
+            if status == 416:
+                self.server_instance.logger.warning(f"请求区间无法满足: {requested_path} Range={self.headers.get('Range')}")
+                return
             
-            # 发送文件内容
-            with open(file_path, 'rb') as f:
-                shutil.copyfileobj(f, self.wfile)
+            start, end = byte_range if byte_range else (0, file_size - 1)
             
-            self.server_instance.logger.info(f"文件下载完成: {requested_path} ({file_size} bytes) {file_type_indicator}")
+            # 发送文件内容（由带宽调度器按优先级分配速率）
+            scheduler = self.server_instance.bandwidth_scheduler
+            priority = scheduler.classify(requested_path, file_size, metadata.is_binary)
+            with scheduler.open_transfer(self.client_address[0], requested_path, priority) as transfer:
+                with open(file_path, 'rb') as f:
+                    self._send_file_body(f, start, end - start + 1, transfer)
+            self.server_instance.metrics.record_transfer(self.client_address[0], transfer.bytes_sent, transfer.elapsed)
+            rate_text = f"{transfer.achieved_rate / 1024:.1f} KB/s"
             
-            # 如果是需要可执行权限的二进制文件，记录需要添加可执行权限
-            if self._is_executable_binary_file(file_path):
-                self._schedule_chmod_executable(requested_path)
-
-            # 延迟删除临时文件，避免Windows文件占用问题
-            import threading
-            def delayed_remove():
-                import time
-                time.sleep(2)  # 增加等待时间到2秒
-                try:
-                    # 使用强力删除方法
-                    if os.path.exists(file_path):
-                        filename = os.path.basename(file_path)
-                        success = self.server_instance._force_delete_file(file_path, filename)
-                        
-                        if success:
-                            self.server_instance.logger.info(f"延迟删除文件成功: {filename}")
-                        else:
-                            self.server_instance.logger.warning(f"延迟删除文件失败但已处理: {filename}")
-                        
-                        # 从映射中移除
-                        for source_path, temp_path in list(self.server_instance.file_mapping.items()):
-                            if temp_path == file_path:
-                                del self.server_instance.file_mapping[source_path]
-                                break
-                    else:
-                        self.server_instance.logger.warning(f"延迟删除时文件已不存在: {file_path}")
-                except Exception as e:
-                    self.server_instance.logger.error(f"延迟删除文件失败: {os.path.basename(file_path)} - {e}")
-            
-            threading.Thread(target=delayed_remove, daemon=True).start()
+            if status == 206:
+                self.server_instance.logger.info(f"文件区间发送完成: {requested_path} bytes {start}-{end}/{file_size} {file_type_indicator} {rate_text}")
+            else:
+                self.server_instance.logger.info(f"文件下载完成: {requested_path} ({file_size} bytes) {file_type_indicator} {rate_text}")
             
         except Exception as e:
             self.server_instance.logger.error(f"发送文件失败: {str(e)}")
             raise
     
+    def _send_metrics(self):
+        """输出Prometheus文本格式的服务器指标"""
+        body = self.server_instance.metrics.render().encode('utf-8')
+        self._send_headers(200, "text/plain; version=0.0.4; charset=utf-8", len(body))
+        self.wfile.write(body)
+    
+    @staticmethod
+    def _tar_content_type(compress: bool) -> str:
+        """tar流的Content-Type"""
+        return 'application/gzip' if compress else 'application/x-tar'
+    
+    def _send_directory_tar(self, requested_path: str, local_dir: str, compress: bool,
+                            members: Optional[List[str]] = None):
+        """
+        将本地目录打包为tar（可选gzip）直接写入响应
+        
+        归档大小事先未知，响应不带Content-Length，以关闭连接标识结束，
+        设备端可直接执行 wget -O - URL | tar -xf -。
+        
+        Args:
+            requested_path (str): 请求的归档名
+            local_dir (str): 本地目录
+            compress (bool): 是否gzip压缩
+            members (List[str], optional): 只打包这些文件（相对路径，归档内不带根目录），默认整个目录
+        """
+        arc_root = self.server_instance.directory_arcname(requested_path)
+        
+        def normalize_member(member: tarfile.TarInfo) -> tarfile.TarInfo:
+            # 设备端以root解包，不保留本机的用户信息
+            member.uid = member.gid = 0
+            member.uname = member.gname = 'root'
+            if member.isfile() and not member.mode & 0o111:
+                # Windows上没有可执行位，按文件内容补上
+                relative = member.name if members is not None else os.path.relpath(member.name, arc_root)
+                local_path = os.path.join(local_dir, relative)
+                try:
+                    if detect_executable(member.name, read_head(local_path)):
+                        member.mode |= 0o755
+                except OSError:
+                    pass
+            return member
+        
+        self.send_response(200)
+        self.send_header('Content-Type', self._tar_content_type(compress))
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        
+        mode = 'w|gz' if compress else 'w|'
+        scheduler = self.server_instance.bandwidth_scheduler
+        with scheduler.open_transfer(self.client_address[0], requested_path, 'normal') as transfer:
+            writer = ThrottledWriter(self.wfile, scheduler, transfer)
+            with tarfile.open(fileobj=writer, mode=mode, format=tarfile.GNU_FORMAT,
+                              bufsize=self.server_instance.copy_buffer_size) as tar:
+                if members is None:
+                    tar.add(local_dir, arcname=arc_root, filter=normalize_member)
+                else:
+                    # 修改时间随归档保留，设备上的文件与本地保持一致，供下次增量比对
+                    for relative in members:
+                        tar.add(os.path.join(local_dir, *relative.split('/')), arcname=relative,
+                                recursive=False, filter=normalize_member)
+        self.server_instance.metrics.record_transfer(self.client_address[0], transfer.bytes_sent, transfer.elapsed)
+        
+        self.server_instance.logger.info(
+            f"目录流发送完成: {requested_path} <- {local_dir} ({transfer.bytes_sent} bytes, "
+            f"{transfer.elapsed:.2f}s, {transfer.achieved_rate / 1024:.1f} KB/s)")
+    
+    def _resolve_range(self, metadata: FileMetadata):
+        """
+        根据Range和If-Range请求头确定响应区间
+        
+        只支持单个区间（bytes=a-b、bytes=a-、bytes=-n），多区间请求按完整文件返回。
+        
+        Args:
+            metadata (FileMetadata): 文件元数据
+        
+        Returns:
+            tuple: (状态码, (起始, 结束)或None)，状态码为200、206或416
+        """
+        range_header = self.headers.get('Range')
+        file_size = metadata.size
+        if not range_header:
+            return 200, None
+        
+        # If-Range不匹配时说明文件已变化，必须返回完整文件
+        if_range = self.headers.get('If-Range')
+        if if_range and not self._if_range_matches(if_range.strip(), metadata):
+            self.server_instance.logger.info(f"If-Range不匹配，返回完整文件: {if_range}")
+            return 200, None
+        
+        unit, _, spec = range_header.strip().partition('=')
+        if unit.strip().lower() != 'bytes' or ',' in spec:
+            return 200, None
+        
+        first, sep, last = spec.strip().partition('-')
+        if not sep:
+            return 200, None
+        try:
+            if first:
+                start = int(first)
+                if start >= file_size:
+                    return 416, None
+                end = int(last) if last else file_size - 1
+                if start > end:
+                    return 200, None
+            else:
+                suffix_length = int(last)
+                if suffix_length <= 0:
+                    return 416, None
+                start = max(file_size - suffix_length, 0)
+                end = file_size - 1
+        except ValueError:
+            return 200, None
+        
+        return 206, (start, min(end, file_size - 1))
+    
+    def _if_range_matches(self, if_range: str, metadata: FileMetadata) -> bool:
+        """判断If-Range条件（ETag或HTTP日期）是否与当前文件一致"""
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            # If-Range只允许强校验
+            return if_range == metadata.etag
+        try:
+            since = email.utils.parsedate_to_datetime(if_range)
+        except (TypeError, ValueError):
+            return False
+        return int(metadata.mtime) <= int(since.timestamp())
+    
+    def _send_file_headers(self, status, metadata: FileMetadata, byte_range):
+        """发送文件响应头（含断点续传相关头）"""
+        file_size = metadata.size
+        content_type = metadata.content_type
+        extra_headers = {
+            'ETag': metadata.etag,
+            'Last-Modified': email.utils.formatdate(metadata.mtime, usegmt=True),
+        }
+        if status == 416:
+            extra_headers['Content-Range'] = f'bytes */{file_size}'
+            self._send_headers(416, "text/plain", 0, extra_headers)
+        elif status == 206:
+            start, end = byte_range
+            extra_headers['Content-Range'] = f'bytes {start}-{end}/{file_size}'
+            self._send_headers(206, content_type, end - start + 1, extra_headers)
+        else:
+            self._send_headers(200, content_type, file_size, extra_headers)
+    
+    def _send_file_body(self, f, offset: int, count: int, transfer=None) -> int:
+        """
+        将文件的指定区间发送给客户端
+        
+        普通TCP套接字且系统支持时使用内核 os.sendfile 零拷贝发送，
+        否则（Windows、SSL套接字等）退化为大缓冲区读写循环。
+        设置了带宽上限时按块向调度器申请额度后再发送。
+        
+        Args:
+            f: 以二进制模式打开的文件对象
+            offset (int): 起始偏移
+            count (int): 发送字节数
+            transfer (Transfer, optional): 带宽调度器登记的传输
+        
+        Returns:
+            int: 实际发送的字节数
+        """
+        if count <= 0:
+            return 0
+        
+        scheduler = self.server_instance.bandwidth_scheduler
+        throttled = transfer is not None and scheduler.limited
+        sock = self.connection
+        if (self.server_instance.use_sendfile and hasattr(os, 'sendfile')
+                and isinstance(sock, socket.socket) and not isinstance(sock, ssl.SSLSocket)):
+            # wfile无缓冲，响应头已在end_headers时写出，可以直接操作底层套接字
+            if not throttled:
+                sent = sock.sendfile(f, offset, count)
+                if transfer is not None:
+                    scheduler.record(transfer, sent)
+                return sent
+            sent = 0
+            while sent < count:
+                chunk = min(CHUNK_SIZE, count - sent)
+                scheduler.acquire(transfer, chunk)
+                n = sock.sendfile(f, offset + sent, chunk)
+                if not n:
+                    break
+                sent += n
+            return sent
+        
+        return self._copy_file_buffered(f, offset, count, transfer)
+    
+    def _copy_file_buffered(self, f, offset: int, count: int, transfer=None) -> int:
+        """使用可复用的大缓冲区发送文件区间（sendfile不可用时的回退路径）"""
+        scheduler = self.server_instance.bandwidth_scheduler
+        throttled = transfer is not None and scheduler.limited
+        buffer_size = CHUNK_SIZE if throttled else self.server_instance.copy_buffer_size
+        buffer = bytearray(min(buffer_size, count))
+        view = memoryview(buffer)
+        f.seek(offset)
+        sent = 0
+        while sent < count:
+            n = f.readinto(view[:min(len(buffer), count - sent)])
+            if not n:
+                break
+            if transfer is not None:
+                scheduler.acquire(transfer, n)
+            self.wfile.write(view[:n])
+            sent += n
+        return sent
+    
     def _send_file_list(self):
         """发送文件列表页面"""
         try:
@@ -297,13 +601,15 @@ class FileHTTPRequestHandler(BaseHTTPRequestHandler):
             size /= 1024.0
         return f"{size:.1f} TB"
     
-    def _send_headers(self, status_code, content_type, content_length):
+    def _send_headers(self, status_code, content_type, content_length, extra_headers=None):
         """发送HTTP响应头"""
         self.send_response(status_code)
         self.send_header('Content-Type', content_type)
         self.send_header('Content-Length', str(content_length))
         self.send_header('Accept-Ranges', 'bytes')
         self.send_header('Cache-Control', 'no-cache')
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
     
     def _send_error_response(self, status_code, message):
@@ -332,160 +638,77 @@ class FileHTTPRequestHandler(BaseHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(error_bytes)
     
-    def _get_content_type(self, file_path):
-        """根据文件扩展名获取Content-Type"""
-        import mimetypes
-        
-        content_type, _ = mimetypes.guess_type(file_path)
-        if content_type is None:
-            content_type = 'application/octet-stream'
-        
-        return content_type
-    
-    def _is_binary_file(self, file_path):
-        """检测文件是否为二进制文件"""
-        try:
-            # 1. 通过扩展名检测常见的二进制文件
-            binary_extensions = {
-                '.exe', '.bin', '.so', '.dll', '.dylib', '.a', '.o', '.obj',
-                '.zip', '.rar', '.7z', '.tar', '.gz', '.bz2', '.xz',
-                '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.ico', '.tiff',
-                '.mp3', '.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv',
-                '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
-                '.deb', '.rpm', '.apk', '.ipa', '.dmg', '.iso'
-            }
-            
-            file_ext = os.path.splitext(file_path)[1].lower()
-            if file_ext in binary_extensions:
-                return True
-            
-            # 2. 通过文件内容检测
-            with open(file_path, 'rb') as f:
-                # 读取前1024字节进行检测
-                chunk = f.read(1024)
-                if not chunk:
-                    return False
-                
-                # 检测空字节（二进制文件的典型特征）
-                if b'\x00' in chunk:
-                    return True
-                
-                # 检测非ASCII字符的比例
-                non_ascii_count = sum(1 for byte in chunk if byte > 127)
-                non_ascii_ratio = non_ascii_count / len(chunk)
-                
-                # 如果非ASCII字符超过30%，认为是二进制文件
-                if non_ascii_ratio > 0.3:
-                    return True
-                
-                # 检测控制字符（除了常见的换行、制表符等）
-                control_chars = sum(1 for byte in chunk if byte < 32 and byte not in (9, 10, 13))
-                control_ratio = control_chars / len(chunk)
-                
-                # 如果控制字符超过5%，认为是二进制文件
-                if control_ratio > 0.05:
-                    return True
-            
-            return False
-            
-        except Exception as e:
-            self.server_instance.logger.warning(f"检测文件类型失败: {e}")
-            # 出错时默认为文本文件
-            return False
-    
-    def _is_executable_binary_file(self, file_path):
-        """检测文件是否为需要可执行权限的二进制文件"""
-        try:
-            # 只有这些扩展名的文件才需要可执行权限
-            executable_extensions = {
-                '.exe', '.bin', '.so', '.dll', '.dylib', '.a', '.o', '.obj',
-                '.deb', '.rpm', '.apk', '.ipa'
-            }
-            
-            file_ext = os.path.splitext(file_path)[1].lower()
-            if file_ext in executable_extensions:
-                return True
-            
-            # 对于没有扩展名的文件，通过内容检测
-            if not file_ext:
-                # 检测是否为ELF文件（Linux可执行文件）
-                try:
-                    with open(file_path, 'rb') as f:
-                        header = f.read(4)
-                        if header == b'\x7fELF':  # ELF魔数
-                            return True
-                except Exception:
-                    pass
-            
-            return False
-            
-        except Exception as e:
-            self.server_instance.logger.warning(f"检测可执行文件类型失败: {e}")
-            return False
-    
-    def _schedule_chmod_executable(self, requested_path):
-        """安排为二进制文件添加可执行权限"""
-        try:
-            import threading
-            import time
-            import asyncio
-            
-            def delayed_chmod():
-                time.sleep(1)  # 短暂延迟确保文件传输完成
-                try:
-                    # 通过telnet连接执行chmod命令
-                    if hasattr(self.server_instance, 'telnet_client') and self.server_instance.telnet_client:
-                        chmod_cmd = f'chmod +x "{requested_path}"'
-                        self.server_instance.logger.info(f"为二进制文件添加可执行权限: {chmod_cmd}")
-                        
-                        # 在独立线程中创建新的事件循环执行异步命令
-                        def run_chmod_in_thread():
-                            # 创建新的事件循环
-                            loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(loop)
-                            
-                            try:
-                                # 执行chmod命令
-                                result = loop.run_until_complete(
-                                    self.server_instance.telnet_client.execute_command(chmod_cmd, timeout=10)
-                                )
-                                
-                                # 验证权限是否添加成功
-                                verify_cmd = f'ls -l "{requested_path}"'
-                                verify_result = loop.run_until_complete(
-                                    self.server_instance.telnet_client.execute_command(verify_cmd, timeout=5)
-                                )
-                                
-                                if 'x' in verify_result:
-                                    self.server_instance.logger.info(f"✅ 成功为二进制文件添加可执行权限: {requested_path}")
-                                else:
-                                    self.server_instance.logger.warning(f"⚠️ 可执行权限可能未成功添加: {requested_path}")
-                                    self.server_instance.logger.debug(f"权限验证结果: {verify_result.strip()}")
-                                    
-                            except Exception as e:
-                                self.server_instance.logger.error(f"❌ 添加可执行权限失败: {requested_path} - {e}")
-                            finally:
-                                loop.close()
-                        
-                        # 在独立线程中执行
-                        threading.Thread(target=run_chmod_in_thread, daemon=True).start()
-                    else:
-                        self.server_instance.logger.warning(f"⚠️ 无法获取telnet连接，跳过权限设置: {requested_path}")
-                        
-                except Exception as e:
-                    self.server_instance.logger.error(f"❌ 延迟chmod处理失败: {requested_path} - {e}")
-            
-            threading.Thread(target=delayed_chmod, daemon=True).start()
-            
-        except Exception as e:
-            self.server_instance.logger.error(f"安排chmod任务失败: {e}")
-    
     def log_message(self, format, *args):
         """重写日志输出方法，使用自定义logger"""
         if self.server_instance and self.server_instance.logger:
             self.server_instance.logger.debug(f"HTTP: {format % args}")
 
 
+class ConcurrentHTTPServer(ThreadingHTTPServer):
+    """
+    支持并发连接的HTTP服务器
+
+    每个连接由独立线程处理，避免一台设备的慢速wget阻塞其他设备。
+    通过信号量限制同时处理的连接数，超出限制的连接会排队等待，
+    等待超时后返回503。
+    """
+
+    daemon_threads = True
+
+    def __init__(self, server_address, handler_class, max_connections: int = 16,
+                 queue_timeout: float = 30.0, logger: Optional[logging.Logger] = None,
+                 metrics: Optional[TransferMetrics] = None):
+        """
+        初始化并发HTTP服务器
+
+        Args:
+            server_address (tuple): 监听地址
+            handler_class: 请求处理器工厂
+            max_connections (int): 同时处理的最大连接数，默认16
+            queue_timeout (float): 连接排队等待的最长时间（秒），默认30
+            logger (logging.Logger, optional): 日志记录器
+            metrics (TransferMetrics, optional): 指标注册表，用于统计被拒绝的连接
+        """
+        if max_connections < 1:
+            raise ValueError("max_connections 必须大于0")
+        super().__init__(server_address, handler_class)
+        self.max_connections = max_connections
+        self.queue_timeout = queue_timeout
+        self.logger = logger
+        self.metrics = metrics
+        self._connection_slots = threading.BoundedSemaphore(max_connections)
+        self._active_lock = threading.Lock()
+        self.active_connections = 0
+
+    def process_request_thread(self, request, client_address):
+        """在工作线程中获取连接槽位后处理请求"""
+        if not self._connection_slots.acquire(timeout=self.queue_timeout):
+            if self.logger:
+                self.logger.warning(f"连接数已达上限({self.max_connections})，拒绝: {client_address[0]}")
+            self._reject_busy(request)
+            if self.metrics:
+                self.metrics.increment('rejected_connections')
+            self.shutdown_request(request)
+            return
+        with self._active_lock:
+            self.active_connections += 1
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            with self._active_lock:
+                self.active_connections -= 1
+            self._connection_slots.release()
+
+    @staticmethod
+    def _reject_busy(request):
+        """向排队超时的连接返回503"""
+        try:
+            request.sendall(b"HTTP/1.0 503 Service Unavailable\r\n"
+                            b"Content-Length: 0\r\nRetry-After: 5\r\n\r\n")
+        except OSError:
+            pass
+
+
 class FileHTTPServer:
     """
     文件HTTP服务器
@@ -495,9 +718,13 @@ class FileHTTPServer:
     - 管理临时文件目录
     - 支持文件上传和下载
     - 自动清理临时文件
+    - 并发服务多台设备（可限制最大连接数）
     """
     
-    def __init__(self, port: int = 88, temp_dir: Optional[str] = None, parent_logger=None, telnet_client=None):
+    def __init__(self, port: int = 88, temp_dir: Optional[str] = None, parent_logger=None,
+                 concurrent: bool = True, max_connections: int = 16, staging_ttl: float = 600.0,
+                 bandwidth_limit: Optional[float] = None, per_client_limit: Optional[float] = None,
+                 upload_dir: Optional[str] = None):
         """
         初始化HTTP文件服务器
         
@@ -505,15 +732,25 @@ class FileHTTPServer:
             port (int): 服务端口，默认88
             temp_dir (str, optional): 临时文件目录，默认自动创建
             parent_logger (logging.Logger, optional): 父logger
-            telnet_client (optional): telnet客户端，用于执行chmod命令
+            concurrent (bool): 是否启用并发服务模式（每连接一个线程），默认True
+            max_connections (int): 并发模式下同时处理的最大连接数，默认16
+            staging_ttl (float): 暂存文件无人下载时的最长保留时间（秒），默认600
+            bandwidth_limit (float, optional): 全局带宽上限（字节/秒），默认不限
+            per_client_limit (float, optional): 单设备带宽上限（字节/秒），默认不限
+            upload_dir (str, optional): 未登记的设备推送文件保存目录，默认系统临时目录下的file_transfer_uploads
         """
         self.port = port
+        self.concurrent = concurrent
+        self.max_connections = max_connections
+        self.use_sendfile = True  # 支持时使用os.sendfile零拷贝发送
+        self.copy_buffer_size = 1024 * 1024  # 回退路径的读写缓冲区大小
         self.temp_dir = temp_dir or self._create_temp_dir()
         self.server: Optional[HTTPServer] = None
         self.server_thread: Optional[threading.Thread] = None
         self.is_running = False
         self.file_mapping: Dict[str, str] = {}  # 原始文件路径到临时文件路径的映射
-        self.telnet_client = telnet_client  # 添加telnet客户端引用
+        self.directory_streams: Dict[str, Tuple[str, bool, Optional[List[str]]]] = {}  # 归档名到(本地目录, 是否压缩, 文件子集)的映射
+        self._mapping_lock = threading.Lock()  # 并发模式下保护file_mapping
         
         # 配置日志
         self.logger = (parent_logger or get_logger(self.__class__)
@@ -527,7 +764,32 @@ class FileHTTPServer:
             handler.setFormatter(formatter)
             self.logger.addHandler(handler)
         
-        self.logger.info(f"HTTP文件服务器初始化完成，端口: {port}, 临时目录: {self.temp_dir}")
+        # 内容寻址暂存存储：相同内容只复制一次，由单个清理线程统一回收
+        self.staging_store = StagingStore(self.temp_dir, self.logger, ttl=staging_ttl,
+                                          delete_func=self._force_delete_file)
+        
+        # 带宽调度：全局/单设备限速与优先级分配，并统计每次传输的实际速率
+        self.bandwidth_scheduler = BandwidthScheduler(bandwidth_limit, per_client_limit,
+                                                      logger=self.logger.getChild('bandwidth'))
+        
+        # 上传接收：设备通过PUT/POST把文件推送回本机
+        self.upload_dir = upload_dir or os.path.join(tempfile.gettempdir(), 'file_transfer_uploads')
+        self.upload_receiver = UploadReceiver(self.upload_dir, self.logger.getChild('upload'),
+                                              buffer_size=self.copy_buffer_size)
+        
+        # 指标注册表（/metrics），debug_listing为True时404会列出临时目录内容便于排查
+        self.metrics = TransferMetrics()
+        self.metrics.register_gauge('active_connections', self._active_connection_count)
+        self.metrics.register_gauge('active_transfers', lambda: len(self.bandwidth_scheduler.active_transfers()))
+        self.metrics.register_gauge('staged_files', lambda: len(self.staging_store.list_entries()))
+        self.debug_listing = False
+        
+        mode = f"并发(最多{max_connections}连接)" if concurrent else "串行"
+        self.logger.info(f"HTTP文件服务器初始化完成，端口: {port}, 模式: {mode}, 临时目录: {self.temp_dir}")
+    
+    def _active_connection_count(self) -> int:
+        """当前正在处理的连接数（串行模式下为0或1无法精确统计，返回0）"""
+        return getattr(self.server, 'active_connections', 0)
     
     def _create_temp_dir(self) -> str:
         """创建临时文件目录"""
@@ -546,11 +808,17 @@ class FileHTTPServer:
                 return FileHTTPRequestHandler(*args, server_instance=self, **kwargs)
             
             # 创建HTTP服务器
-            self.server = HTTPServer(('', self.port), handler_factory)
+            if self.concurrent:
+                self.server = ConcurrentHTTPServer(('', self.port), handler_factory,
+                                                   max_connections=self.max_connections,
+                                                   logger=self.logger, metrics=self.metrics)
+            else:
+                self.server = HTTPServer(('', self.port), handler_factory)
             
             # 在新线程中启动服务器
             self.server_thread = threading.Thread(target=self._run_server, daemon=True)
             self.server_thread.start()
+            self.staging_store.start_reaper()
             
             # 等待服务器启动
             time.sleep(0.1)
@@ -588,9 +856,11 @@ class FileHTTPServer:
                 self.server_thread = None
             
             self.is_running = False
+            self.staging_store.stop_reaper()
             
             # 清理临时文件
             self._cleanup_temp_files()
+            self.staging_store.clear()
             
             self.logger.info("HTTP文件服务器已停止")
             
@@ -623,24 +893,14 @@ class FileHTTPServer:
             else:
                 filename = os.path.basename(source_file_path)
             
-            # 生成临时文件路径
-            temp_file_path = os.path.join(self.temp_dir, filename)
-            
-            # 如果文件已存在，生成唯一文件名
-            if os.path.exists(temp_file_path):
-                base_name, ext = os.path.splitext(filename)
-                counter = 1
-                while os.path.exists(temp_file_path):
-                    new_filename = f"{base_name}_{counter}{ext}"
-                    temp_file_path = os.path.join(self.temp_dir, new_filename)
-                    counter += 1
-                filename = os.path.basename(temp_file_path)
-            
-            # 复制文件到临时目录
-            shutil.copy2(source_file_path, temp_file_path)
+            # 暂存文件：相同内容复用blob，同名同内容直接复用已发布文件
+            entry = self.staging_store.stage(source_file_path, filename)
+            temp_file_path = entry.path
+            filename = entry.name
             
             # 记录文件映射
-            self.file_mapping[source_file_path] = temp_file_path
+            with self._mapping_lock:
+                self.file_mapping[source_file_path] = temp_file_path
             
             self.logger.info(f"文件已添加到HTTP服务器: {filename}")
             return temp_file_path
@@ -661,15 +921,19 @@ class FileHTTPServer:
         """
         try:
             file_path = os.path.join(self.temp_dir, filename)
+            
+            # 暂存存储管理的文件只释放租约，宽限期后由清理线程删除
+            if self.staging_store.release(filename):
+                self._forget_mapping(file_path)
+                self.logger.info(f"文件已从HTTP服务器释放: {filename}")
+                return True
+            
             if os.path.exists(file_path):
                 # 增强的Windows文件删除逻辑
                 success = self._force_delete_file(file_path, filename)
                 
                 # 从映射中移除
-                for source_path, temp_path in list(self.file_mapping.items()):
-                    if temp_path == file_path:
-                        del self.file_mapping[source_path]
-                        break
+                self._forget_mapping(file_path)
                 
                 if success:
                     self.logger.info(f"文件已从HTTP服务器移除: {filename}")
@@ -684,6 +948,120 @@ class FileHTTPServer:
             self.logger.error(f"移除文件失败: {str(e)}")
             return False
     
+    def get_gzip_variant(self, filename: str) -> Optional[str]:
+        """
+        获取已添加文件的gzip预压缩变体（首次调用时生成并缓存）
+        
+        Args:
+            filename (str): add_file返回的文件名
+        
+        Returns:
+            str: gzip变体的文件名（filename.gz），失败时返回None
+        """
+        try:
+            entry = self.staging_store.ensure_gzip(filename)
+            if not entry:
+                self.logger.warning(f"文件未暂存，无法生成预压缩变体: {filename}")
+                return None
+            self.logger.info(f"预压缩变体已就绪: {entry.name} ({entry.metadata.size} bytes)")
+            return entry.name
+        except Exception as e:
+            self.logger.error(f"生成预压缩变体失败: {filename} - {e}")
+            return None
+    
+    def get_checksum(self, filename: str) -> Optional[str]:
+        """
+        获取已添加文件的SHA-256（暂存时已计算，不重新读取文件）
+        
+        Args:
+            filename (str): add_file返回的文件名
+        
+        Returns:
+            str: 十六进制SHA-256，文件未暂存时返回None
+        """
+        entry = self.staging_store.lookup(filename)
+        return entry.digest if entry else None
+    
+    def is_executable(self, filename: str) -> bool:
+        """
+        判断已添加的文件是否为需要可执行权限的二进制文件（暂存时已检测）
+        
+        Args:
+            filename (str): add_file返回的文件名
+        
+        Returns:
+            bool: 是否需要在设备上添加可执行权限，文件未暂存时返回False
+        """
+        entry = self.staging_store.lookup(filename)
+        return bool(entry and entry.metadata.is_executable)
+    
+    def add_directory(self, local_dir: str, name: Optional[str] = None, compress: bool = False,
+                      members: Optional[List[str]] = None) -> Optional[str]:
+        """
+        以tar流方式发布本地目录
+        
+        不复制文件、不生成临时归档，请求到达时再遍历目录边打包边发送。
+        
+        Args:
+            local_dir (str): 本地目录路径
+            name (str, optional): 解包后的目录名，默认使用本地目录名
+            compress (bool): 是否以gzip压缩，默认False
+            members (List[str], optional): 只发布这些文件（相对local_dir的/分隔路径），
+                归档内不带根目录，设备端应在目标目录内解包；默认发布整个目录
+        
+        Returns:
+            str: 归档文件名（name.tar 或 name.tar.gz），失败时返回None
+        """
+        if not os.path.isdir(local_dir):
+            self.logger.error(f"源路径不是目录: {local_dir}")
+            return None
+        
+        name = name or os.path.basename(os.path.normpath(local_dir))
+        archive_name = f"{name}.tar.gz" if compress else f"{name}.tar"
+        with self._mapping_lock:
+            self.directory_streams[archive_name] = (os.path.abspath(local_dir), compress,
+                                                    list(members) if members is not None else None)
+        
+        self.logger.info(f"目录已发布为tar流: {archive_name} -> {local_dir}")
+        return archive_name
+    
+    def remove_directory(self, archive_name: str) -> bool:
+        """
+        取消目录的tar流发布
+        
+        Args:
+            archive_name (str): add_directory返回的归档文件名
+        
+        Returns:
+            bool: 是否成功移除
+        """
+        with self._mapping_lock:
+            removed = self.directory_streams.pop(archive_name, None) is not None
+        if removed:
+            self.logger.info(f"目录tar流已移除: {archive_name}")
+        return removed
+    
+    def get_directory_stream(self, archive_name: str) -> Optional[Tuple[str, bool, Optional[List[str]]]]:
+        """获取归档名对应的 (本地目录, 是否压缩, 文件子集)"""
+        with self._mapping_lock:
+            return self.directory_streams.get(archive_name)
+    
+    @staticmethod
+    def directory_arcname(archive_name: str) -> str:
+        """归档内的根目录名（去掉 .tar/.tar.gz 后缀）"""
+        for suffix in ('.tar.gz', '.tar'):
+            if archive_name.endswith(suffix):
+                return archive_name[:-len(suffix)]
+        return archive_name
+    
+    def _forget_mapping(self, temp_file_path: str):
+        """从文件映射中移除指定临时文件（线程安全）"""
+        with self._mapping_lock:
+            for source_path, temp_path in list(self.file_mapping.items()):
+                if temp_path == temp_file_path:
+                    del self.file_mapping[source_path]
+                    break
+    
     def _force_delete_file(self, file_path: str, filename: str) -> bool:
         """
         强制删除文件 - 使用多种方法尝试删除Windows文件
@@ -770,8 +1148,8 @@ class FileHTTPServer:
             # 重命名文件
             os.rename(file_path, temp_path)
             
-            # 启动延迟删除任务
-            self._schedule_delayed_deletion(temp_path, temp_name)
+            # 交给暂存存储的清理线程重试删除
+            self.staging_store.schedule_delete(temp_path)
             
             self.logger.debug(f"✅ 文件已重命名并标记为延迟删除: {filename} -> {temp_name}")
             return True
@@ -783,43 +1161,6 @@ class FileHTTPServer:
         self.logger.warning(f"❌ 所有删除方法都失败，文件可能被占用: {filename} - {file_path}")
         return False
     
-    def _schedule_delayed_deletion(self, file_path: str, filename: str):
-        """
-        安排延迟删除任务
-        
-        Args:
-            file_path (str): 文件路径
-            filename (str): 文件名
-        """
-        import threading
-        import time
-        
-        def delayed_delete():
-            # 等待一段时间，让文件句柄释放
-            time.sleep(5)
-            
-            for attempt in range(10):  # 尝试10次
-                try:
-                    if os.path.exists(file_path):
-                        # 使用强力删除方法而不是简单的os.remove
-                        success = self._force_delete_file(file_path, filename)
-                        if success:
-                            self.logger.debug(f"✅ 延迟删除成功: {filename}")
-                        else:
-                            self.logger.debug(f"延迟删除失败但已处理: {filename}")
-                        return
-                    else:
-                        self.logger.debug(f"延迟删除时文件已不存在: {filename}")
-                        return
-                except Exception as e:
-                    if attempt < 9:
-                        time.sleep(2 + attempt * 0.5)  # 递增等待时间
-                    else:
-                        self.logger.debug(f"延迟删除最终失败: {filename} - {e}")
-        
-        # 在后台线程中执行延迟删除
-        threading.Thread(target=delayed_delete, daemon=True).start()
-    
     def list_files(self) -> List[Dict]:
         """
         获取服务器上的文件列表
@@ -860,6 +1201,34 @@ class FileHTTPServer:
         encoded_filename = urllib.parse.quote(filename, safe='')
         return f"http://{host_ip}:{self.port}/{encoded_filename}"
     
+    def expect_upload(self, target_path: str) -> PendingUpload:
+        """
+        登记一个等待设备推送的文件
+        
+        Args:
+            target_path (str): 本地保存路径
+        
+        Returns:
+            PendingUpload: 上传记录，可调用wait()等待完成，name用于get_upload_url
+        """
+        return self.upload_receiver.expect(target_path)
+    
+    def get_upload_url(self, name: str, host_ip: str = None) -> str:
+        """
+        获取设备推送文件使用的URL
+        
+        Args:
+            name (str): 上传名称（PendingUpload.name 或任意文件名）
+            host_ip (str, optional): 主机IP地址
+        
+        Returns:
+            str: 上传URL
+        """
+        if host_ip is None:
+            host_ip = self._get_local_ip()
+        encoded_name = urllib.parse.quote(name, safe='')
+        return f"http://{host_ip}:{self.port}/{UPLOAD_PREFIX}{encoded_name}"
+    
     def _get_local_ip(self) -> str:
         """获取本机IP地址"""
         import socket
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预压缩传输模块
+
+文本配置、日志、脚本和未strip的二进制通常能压缩3~10倍，而设备Wi-Fi较慢。
+本模块负责：
+- 估算文件的gzip压缩率（只压缩少量采样数据）
+- 生成确定性的gzip文件（供暂存存储缓存）
+- 根据链路速率和设备解压速率判断预压缩是否划算
+"""
+
+import gzip
+import os
+import shutil
+import zlib
+from typing import Optional
+
+
+# 已压缩格式，再次gzip几乎没有收益
+COMPRESSED_EXTENSIONS = {
+    '.gz', '.tgz', '.bz2', '.xz', '.zst', '.lz4', '.zip', '.rar', '.7z',
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.mp3', '.mp4', '.avi', '.mkv',
+    '.mov', '.apk', '.ipa', '.deb', '.rpm', '.squashfs', '.pdf'
+}
+
+GZIP_SUFFIX = '.gz'
+SAMPLE_SIZE = 64 * 1024  # 每个采样点读取的字节数
+SAMPLE_POINTS = 4  # 采样点数量（均匀分布在文件中）
+MIN_SIZE = 16 * 1024  # 小于此大小的文件不值得额外一次解压
+
+
+def estimate_gzip_ratio(file_path: str, level: int = 6) -> float:
+    """
+    通过均匀采样估算文件的gzip压缩率
+
+    Args:
+        file_path (str): 文件路径
+        level (int): 压缩等级，默认6
+
+    Returns:
+        float: 压缩后大小 / 原始大小，1.0表示不可压缩
+    """
+    if os.path.splitext(file_path)[1].lower() in COMPRESSED_EXTENSIONS:
+        return 1.0
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return 1.0
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    raw_bytes = 0
+    compressed_bytes = 0
+    with open(file_path, 'rb') as f:
+        step = max(size // SAMPLE_POINTS, SAMPLE_SIZE)
+        for offset in range(0, size, step):
+            f.seek(offset)
+            sample = f.read(SAMPLE_SIZE)
+            raw_bytes += len(sample)
+            compressed_bytes += len(compressor.compress(sample))
+    compressed_bytes += len(compressor.flush())
+    return min(1.0, compressed_bytes / raw_bytes)
+
+
+def gzip_file(source_path: str, target_path: str, level: int = 6):
+    """
+    生成gzip文件，头部不写入文件名和时间戳，相同内容得到相同结果
+
+    Args:
+        source_path (str): 源文件路径
+        target_path (str): 目标gzip文件路径
+        level (int): 压缩等级，默认6
+    """
+    with open(source_path, 'rb') as src, open(target_path, 'wb') as raw:
+        with gzip.GzipFile(filename='', mode='wb', fileobj=raw, compresslevel=level, mtime=0) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+class PrecompressPolicy:
+    """
+    预压缩决策
+
+    只有当节省的传输时间大于设备解压耗时时才使用预压缩：
+        (原始大小 - 压缩后大小) / 链路速率 > 原始大小 / 设备解压速率
+
+    Attributes:
+        link_rate (float): 到设备的下载速率估计（字节/秒），由实际传输结果持续修正
+        gunzip_rate (float): 设备端gunzip输出速率估计（字节/秒）
+    """
+
+    def __init__(self, link_rate: float = 1024 * 1024, gunzip_rate: float = 8 * 1024 * 1024,
+                 smoothing: float = 0.3):
+        """
+        初始化预压缩决策
+
+        Args:
+            link_rate (float): 初始链路速率（字节/秒），默认1MB/s
+            gunzip_rate (float): 初始设备解压速率（字节/秒），默认8MB/s
+            smoothing (float): 速率更新的指数平滑系数，默认0.3
+        """
+        self.link_rate = link_rate
+        self.gunzip_rate = gunzip_rate
+        self.smoothing = smoothing
+
+    def estimated_saving(self, size: int, ratio: float) -> float:
+        """
+        估算预压缩节省的时间（秒），负数表示得不偿失
+
+        Args:
+            size (int): 原始大小
+            ratio (float): 压缩率（压缩后/原始）
+
+        Returns:
+            float: 节省的秒数
+        """
+        saved_transfer = size * (1.0 - ratio) / self.link_rate
+        decompress_cost = size / self.gunzip_rate
+        return saved_transfer - decompress_cost
+
+    def should_compress(self, file_path: str, ratio: Optional[float] = None) -> bool:
+        """
+        判断文件是否应以预压缩方式传输
+
+        Args:
+            file_path (str): 本地文件路径
+            ratio (float, optional): 已知压缩率，未提供时采样估算
+
+        Returns:
+            bool: 是否使用预压缩
+        """
+        size = os.path.getsize(file_path)
+        if size < MIN_SIZE:
+            return False
+        if ratio is None:
+            ratio = estimate_gzip_ratio(file_path)
+        return self.estimated_saving(size, ratio) > 0
+
+    def record_transfer(self, size: int, seconds: float, compressed: bool = False):
+        """
+        根据一次实际传输修正速率估计
+
+        Args:
+            size (int): 原始（解压后）字节数
+            seconds (float): 下载耗时
+            compressed (bool): 是否为预压缩传输，此时耗时包含解压，不用于修正链路速率
+        """
+        if size < MIN_SIZE or seconds <= 0 or compressed:
+            return
+        rate = size / seconds
+        self.link_rate = (1 - self.smoothing) * self.link_rate + self.smoothing * rate
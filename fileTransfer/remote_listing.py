@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+远程目录列表模块
+
+设备固件不同，可用的列表命令也不同（GNU find、busybox stat、只有ls）。
+每台设备只在第一次列目录时用一次往返探测所有候选命令，记住可用的那个；
+之后每个目录只需一条命令，输出为逐行的机器可解析记录（类型、权限、大小、
+修改时间、名称），不再依赖ls多列输出的启发式判断，也不再猜测元数据。
+
+列表结果按设备缓存（带TTL），本程序修改设备上的目录（上传、删除、chmod、mkdir）
+后使对应缓存失效；相邻目录可在一次往返中批量预取，浏览目录树时直接命中缓存。
+"""
+
+import logging
+import posixpath
+import re
+import shlex
+import stat
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fileTransfer.logger_utils import get_logger
+
+
+class RemoteEntry:
+    """
+    远程目录中的一项
+
+    Attributes:
+        name (str): 名称
+        mode (int): st_mode（含文件类型位）
+        size (int): 大小（字节）
+        mtime (float): 修改时间（Unix时间戳），列表命令不提供时为None
+    """
+
+    def __init__(self, name: str, mode: int, size: int, mtime: Optional[float] = None):
+        self.name = name
+        self.mode = mode
+        self.size = size
+        self.mtime = mtime
+
+    @property
+    def is_directory(self) -> bool:
+        return stat.S_ISDIR(self.mode)
+
+    @property
+    def is_link(self) -> bool:
+        return stat.S_ISLNK(self.mode)
+
+    @property
+    def is_executable(self) -> bool:
+        return stat.S_ISREG(self.mode) and bool(self.mode & 0o111)
+
+    @property
+    def permissions(self) -> str:
+        """ls风格的权限字符串，如 -rwxr-xr-x"""
+        return stat.filemode(self.mode)
+
+    def __repr__(self) -> str:
+        return f"RemoteEntry({self.name!r}, {self.permissions}, {self.size})"
+
+
+class ListingStrategy:
+    """
+    一种列表命令及其输出解析
+
+    Attributes:
+        name (str): 策略名称
+    """
+
+    name = ""
+
+    def command(self, path: str) -> str:
+        """生成列出path的命令，目录不存在时退出码非0"""
+        raise NotImplementedError
+
+    def parse_line(self, line: str) -> Optional[RemoteEntry]:
+        """解析一行输出，不是记录的行返回None"""
+        raise NotImplementedError
+
+    def parse(self, output: str) -> List[RemoteEntry]:
+        """
+        解析命令输出
+
+        Args:
+            output (str): 命令输出
+
+        Returns:
+            List[RemoteEntry]: 按名称排序的条目（不含 . 和 ..）
+        """
+        entries = []
+        for line in output.splitlines():
+            entry = self.parse_line(line.rstrip("\r"))
+            if entry is not None and entry.name not in (".", ".."):
+                entries.append(entry)
+        entries.sort(key=lambda e: e.name)
+        return entries
+
+
+class FindPrintfListing(ListingStrategy):
+    """GNU find -printf：类型/八进制权限/大小/小数时间戳/名称"""
+
+    name = "find-printf"
+    _RECORD = re.compile(r"^([a-zA-Z])/([0-7]+)/(\d+)/([\d.]+)/(.+)$")
+    _TYPES = {
+        'd': stat.S_IFDIR, 'f': stat.S_IFREG, 'l': stat.S_IFLNK, 'c': stat.S_IFCHR,
+        'b': stat.S_IFBLK, 'p': stat.S_IFIFO, 's': stat.S_IFSOCK,
+    }
+
+    def command(self, path: str) -> str:
+        return f"find {shlex.quote(path.rstrip('/') + '/')} -mindepth 1 -maxdepth 1 -printf '%y/%m/%s/%T@/%f\\n'"
+
+    def parse_line(self, line: str) -> Optional[RemoteEntry]:
+        match = self._RECORD.match(line)
+        if not match:
+            return None
+        kind, mode, size, mtime, name = match.groups()
+        return RemoteEntry(name, self._TYPES.get(kind, stat.S_IFREG) | int(mode, 8), int(size), float(mtime))
+
+
+class StatListing(ListingStrategy):
+    """busybox/coreutils stat -c：十六进制st_mode/大小/时间戳/路径"""
+
+    name = "stat"
+    _RECORD = re.compile(r"^([0-9a-fA-F]+)/(\d+)/(\d+)/(.+)$")
+
+    def command(self, path: str) -> str:
+        base = shlex.quote(path.rstrip("/")) if path.rstrip("/") else ""
+        globs = " ".join(f"{base}/{pattern}" for pattern in ("*", ".[!.]*", "..?*"))
+        test = f"test -d {shlex.quote(path)}"
+        # 未匹配的通配符原样传给stat，其错误信息丢弃；最后的test决定退出码
+        return f"{test} && stat -c '%f/%s/%Y/%n' {globs} 2>/dev/null; {test}"
+
+    def parse_line(self, line: str) -> Optional[RemoteEntry]:
+        match = self._RECORD.match(line)
+        if not match:
+            return None
+        mode, size, mtime, path = match.groups()
+        return RemoteEntry(posixpath.basename(path), int(mode, 16), int(size), float(mtime))
+
+
+class LsListing(ListingStrategy):
+    """ls -la长格式，没有find和stat时的兜底方案（不含修改时间）"""
+
+    name = "ls"
+    _RECORD = re.compile(r"^([-dlcbps])([-rwxsStT]{9})\S*\s+\d+\s+\S+\s+\S+\s+(\d+)(?:,\s*\d+)?\s+\S+\s+\S+\s+\S+\s+(.+)$")
+    _TYPES = {
+        'd': stat.S_IFDIR, '-': stat.S_IFREG, 'l': stat.S_IFLNK, 'c': stat.S_IFCHR,
+        'b': stat.S_IFBLK, 'p': stat.S_IFIFO, 's': stat.S_IFSOCK,
+    }
+
+    def command(self, path: str) -> str:
+        return f"ls -la {shlex.quote(path)}"
+
+    def parse_line(self, line: str) -> Optional[RemoteEntry]:
+        match = self._RECORD.match(line)
+        if not match:
+            return None
+        kind, perms, size, name = match.groups()
+        if kind == 'l':
+            name = name.split(" -> ", 1)[0]
+        mode = self._TYPES[kind]
+        for i, char in enumerate(perms):
+            if char not in "-ST":
+                mode |= 1 << (8 - i)
+        return RemoteEntry(name, mode, int(size))
+
+
+# 按优先级排列的候选策略
+STRATEGIES: Tuple[ListingStrategy, ...] = (FindPrintfListing(), StatListing(), LsListing())
+
+
+class DirectoryCache:
+    """
+    按设备的目录列表缓存
+
+    每台设备维护一个代数（generation），任何失效操作都会使其加一。列表命令发出前
+    记下代数，结果返回时代数已变化则不写入缓存，避免失效前发出的列表（例如后台预取）
+    把旧内容写回缓存。
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 1024):
+        """
+        初始化缓存
+
+        Args:
+            ttl (float): 缓存有效期（秒），默认30秒
+            max_entries (int): 最多缓存的目录数，超出时淘汰最早写入的，默认1024
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, int, str], Tuple[float, List[RemoteEntry]]] = {}
+        self._generations: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(path: str) -> str:
+        return posixpath.normpath("/" + path.strip("/"))
+
+    def generation(self, host: str, port: int) -> int:
+        """获取设备当前的缓存代数"""
+        with self._lock:
+            return self._generations.get((host, port), 0)
+
+    def get(self, host: str, port: int, path: str) -> Optional[List[RemoteEntry]]:
+        """
+        获取未过期的目录列表
+
+        Returns:
+            List[RemoteEntry]: 缓存的条目，不存在或已过期时返回None
+        """
+        key = (host, port, self._normalize(path))
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                return None
+            if time.monotonic() - cached[0] > self.ttl:
+                del self._entries[key]
+                return None
+            return cached[1]
+
+    def put(self, host: str, port: int, path: str, entries: List[RemoteEntry],
+            generation: Optional[int] = None) -> bool:
+        """
+        写入目录列表
+
+        Args:
+            host (str): 设备地址
+            port (int): 端口号
+            path (str): 目录路径
+            entries (List[RemoteEntry]): 目录条目
+            generation (int, optional): 发出列表命令前的缓存代数，已变化时不写入
+
+        Returns:
+            bool: 是否写入
+        """
+        with self._lock:
+            if generation is not None and generation != self._generations.get((host, port), 0):
+                return False
+            self._entries[(host, port, self._normalize(path))] = (time.monotonic(), entries)
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+            return True
+
+    def invalidate(self, host: str, port: int, path: str) -> None:
+        """
+        设备上的path被创建、删除或修改后调用
+
+        使path所在目录的列表，以及path自身及其下所有目录的列表失效。
+
+        Args:
+            host (str): 设备地址
+            port (int): 端口号
+            path (str): 被修改的文件或目录路径
+        """
+        path = self._normalize(path)
+        parent = posixpath.dirname(path)
+        prefix = path.rstrip("/") + "/"
+        with self._lock:
+            self._generations[(host, port)] = self._generations.get((host, port), 0) + 1
+            for key in [k for k in self._entries if k[0] == host and k[1] == port]:
+                if key[2] in (path, parent) or key[2].startswith(prefix):
+                    del self._entries[key]
+
+    def clear(self, host: Optional[str] = None, port: int = 23) -> None:
+        """
+        清空缓存
+
+        Args:
+            host (str, optional): 设备地址，默认清空全部设备
+            port (int): 端口号
+        """
+        with self._lock:
+            if host is None:
+                self._entries.clear()
+                self._generations = {key: value + 1 for key, value in self._generations.items()}
+            else:
+                self._generations[(host, port)] = self._generations.get((host, port), 0) + 1
+                for key in [k for k in self._entries if k[0] == host and k[1] == port]:
+                    del self._entries[key]
+
+
+class RemoteLister:
+    """
+    按设备缓存列表策略的远程目录列表器
+
+    Example:
+        >>> lister = RemoteLister()
+        >>> entries = await lister.list_directory(client, "/customer")
+        >>> [(e.name, e.size, e.is_directory) for e in entries]
+    """
+
+    def __init__(self, cache: Optional[DirectoryCache] = None, logger: Optional[logging.Logger] = None):
+        """
+        初始化
+
+        Args:
+            cache (DirectoryCache, optional): 目录列表缓存，默认新建（TTL 30秒）
+            logger (logging.Logger, optional): 日志记录器
+        """
+        self.cache = cache or DirectoryCache()
+        self.logger = logger or get_logger(self.__class__)
+        self._strategies: Dict[Tuple[str, int], ListingStrategy] = {}
+        self._lock = threading.Lock()
+
+    async def strategy_for(self, client) -> ListingStrategy:
+        """
+        获取设备的列表策略，第一次调用时探测
+
+        所有候选命令在一次往返中对根目录执行，选择第一个成功且能解析出记录的策略。
+
+        Args:
+            client (CustomTelnetClient): 已登录的客户端（调用方负责串行化）
+
+        Returns:
+            ListingStrategy: 列表策略
+        """
+        key = (client.host, client.port)
+        with self._lock:
+            cached = self._strategies.get(key)
+        if cached is not None:
+            return cached
+
+        results = await client.execute_many([strategy.command("/") for strategy in STRATEGIES])
+        chosen = STRATEGIES[-1]
+        for strategy, (output, code) in zip(STRATEGIES, results):
+            if code == 0 and strategy.parse(output):
+                chosen = strategy
+                break
+        self.logger.info(f"✅ 设备 {client.host} 使用列表命令: {chosen.name}")
+        with self._lock:
+            self._strategies[key] = chosen
+        return chosen
+
+    def forget(self, host: Optional[str] = None, port: int = 23) -> None:
+        """
+        清除缓存的列表策略（设备升级固件后重新探测）
+
+        Args:
+            host (str, optional): 设备地址，默认清除全部设备
+            port (int): 端口号
+        """
+        with self._lock:
+            if host is None:
+                self._strategies.clear()
+            else:
+                self._strategies.pop((host, port), None)
+
+    def invalidate(self, host: str, port: int, path: str) -> None:
+        """
+        设备上的path被本程序修改后调用（上传、删除、chmod、mkdir），使相关缓存失效
+
+        Args:
+            host (str): 设备地址
+            port (int): 端口号
+            path (str): 被修改的文件或目录路径
+        """
+        self.cache.invalidate(host, port, path)
+
+    async def list_directory(
+        self,
+        client,
+        path: str,
+        create: bool = False,
+        use_cache: bool = True
+    ) -> List[RemoteEntry]:
+        """
+        列出远程目录（缓存命中时不访问设备，否则一次往返）
+
+        Args:
+            client (CustomTelnetClient): 已登录的客户端（调用方负责串行化）
+            path (str): 目录绝对路径
+            create (bool): 目录不存在时是否先创建，默认False
+            use_cache (bool): 是否使用缓存，False时强制重新列出，默认True
+
+        Returns:
+            List[RemoteEntry]: 目录中的条目
+
+        Raises:
+            FileNotFoundError: 目录不存在（或无法创建）时抛出
+        """
+        if use_cache:
+            cached = self.cache.get(client.host, client.port, path)
+            if cached is not None:
+                return cached
+        generation = self.cache.generation(client.host, client.port)
+        strategy = await self.strategy_for(client)
+        command = strategy.command(path)
+        if create:
+            command = f"mkdir -p {shlex.quote(path)} 2>/dev/null; {command}"
+        [(output, code)] = await client.execute_many([command])
+        if code == 127:
+            # 命令不存在：缓存的策略已失效，重新探测一次
+            self.logger.warning(f"⚠️ 列表命令 {strategy.name} 在 {client.host} 上不可用，重新探测")
+            self.forget(client.host, client.port)
+            strategy = await self.strategy_for(client)
+            [(output, code)] = await client.execute_many([strategy.command(path)])
+        if code != 0:
+            raise FileNotFoundError(f"远程目录不存在: {path}")
+        entries = strategy.parse(output)
+        self.cache.put(client.host, client.port, path, entries, generation=generation)
+        return entries
+
+    async def prefetch(self, client, paths: Iterable[str], limit: int = 16) -> int:
+        """
+        在一次往返中批量列出尚未缓存的目录并写入缓存
+
+        Args:
+            client (CustomTelnetClient): 已登录的客户端（调用方负责串行化）
+            paths (Iterable[str]): 要预取的目录
+            limit (int): 单次最多预取的目录数，默认16
+
+        Returns:
+            int: 写入缓存的目录数
+        """
+        pending = []
+        for path in paths:
+            if path not in pending and self.cache.get(client.host, client.port, path) is None:
+                pending.append(path)
+            if len(pending) >= limit:
+                break
+        if not pending:
+            return 0
+        generation = self.cache.generation(client.host, client.port)
+        strategy = await self.strategy_for(client)
+        results = await client.execute_many([strategy.command(path) for path in pending])
+        stored = 0
+        for path, (output, code) in zip(pending, results):
+            if code == 0 and self.cache.put(client.host, client.port, path, strategy.parse(output), generation):
+                stored += 1
+        self.logger.debug(f"预取 {stored}/{len(pending)} 个目录")
+        return stored
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容寻址的暂存存储模块
+
+为FileHTTPServer管理待下载文件：
+- 按文件内容的SHA-256存放数据块（blob），相同内容只暂存一次
+- 对外发布的文件名通过硬链接（或reflink/复制回退）指向blob
+- 每次下载持有引用，add_file/remove_file 维护租约计数
+- 由单个后台清理线程按TTL回收无人使用的文件，替代逐文件的延迟删除线程
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+from fileTransfer.file_metadata import FileMetadata
+from fileTransfer.precompress import GZIP_SUFFIX, gzip_file
+
+
+STORE_DIR_NAME = ".staging_blobs"  # 位于临时目录内部的blob目录
+_FICLONE = 0x40049409  # Linux ioctl: 以reflink方式克隆整个文件
+
+
+class StagedFile:
+    """暂存文件记录"""
+
+    def __init__(self, name: str, digest: str, path: str, metadata: FileMetadata):
+        """
+        初始化暂存文件记录
+
+        Args:
+            name (str): 对外发布的文件名
+            digest (str): 内容SHA-256
+            path (str): 发布路径（位于临时目录下）
+            metadata (FileMetadata): 暂存时计算的文件元数据，供请求处理直接使用
+        """
+        self.name = name
+        self.digest = digest
+        self.path = path
+        self.metadata = metadata
+        self.gzip_name: Optional[str] = None  # 预压缩变体的发布名
+        self.leases = 1  # add_file 次数减去 remove_file 次数
+        self.active_downloads = 0  # 正在进行的下载数
+        self.last_access = time.time()
+
+    def is_idle(self) -> bool:
+        """是否没有任何下载正在进行"""
+        return self.active_downloads == 0
+
+
+class StagingStore:
+    """
+    内容寻址、引用计数的暂存存储
+
+    Attributes:
+        root_dir (str): 对外发布文件所在目录（HTTP服务器的临时目录）
+        blob_dir (str): blob存放目录
+        ttl (float): 文件最长保留时间（无下载时），超时后即使仍有租约也会回收
+        grace (float): 租约全部释放后的保留时间，便于其他设备继续下载或续传
+        reap_interval (float): 清理线程的扫描间隔
+    """
+
+    def __init__(self, root_dir: str, logger: logging.Logger, ttl: float = 600.0, grace: float = 30.0,
+                 reap_interval: float = 5.0, delete_func: Optional[Callable[[str, str], bool]] = None):
+        """
+        初始化暂存存储
+
+        Args:
+            root_dir (str): 对外发布文件所在目录
+            logger (logging.Logger): 日志记录器
+            ttl (float): 文件最长保留时间（秒），默认600
+            grace (float): 租约释放后的保留时间（秒），默认30
+            reap_interval (float): 清理线程扫描间隔（秒），默认5
+            delete_func (callable, optional): 删除函数 (path, filename) -> bool，默认os.remove
+        """
+        self.root_dir = root_dir
+        self.blob_dir = os.path.join(root_dir, STORE_DIR_NAME)
+        self.logger = logger
+        self.ttl = ttl
+        self.grace = grace
+        self.reap_interval = reap_interval
+        self._delete_func = delete_func
+
+        self._lock = threading.Lock()  # 保护条目和引用计数
+        self._stage_lock = threading.Lock()  # 串行化blob写入，避免长时间占用 _lock
+        self._entries: Dict[str, StagedFile] = {}
+        self._digest_cache: Dict[Tuple[str, int, int], str] = {}
+        self._pending_deletes: List[Tuple[str, int]] = []  # (路径, 已重试次数)
+
+        self._reaper_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    # ------------------------------------------------------------------
+    # 暂存与释放
+    # ------------------------------------------------------------------
+    def stage(self, source_path: str, filename: str) -> StagedFile:
+        """
+        暂存文件并发布为指定文件名
+
+        相同文件名且内容相同时复用已有发布；同名不同内容时，旧文件的租约已全部释放且
+        没有下载正在进行则原地替换（同名文件修改后重新推送），否则生成唯一文件名；
+        不同文件名但内容相同时共享同一个blob。
+
+        Args:
+            source_path (str): 源文件路径
+            filename (str): 期望发布的文件名
+
+        Returns:
+            StagedFile: 暂存记录
+        """
+        digest = self.file_digest(source_path)
+        with self._stage_lock:
+            with self._lock:
+                entry = self._entries.get(filename)
+                if entry and entry.digest == digest and os.path.exists(entry.path):
+                    self._adjust_leases(entry, 1)
+                    self.logger.debug(f"复用已暂存文件: {filename} (租约 {entry.leases})")
+                    return entry
+                retired = self._retire_unused(entry) if entry else []
+            self._discard(retired)
+            with self._lock:
+                name = self._unique_name(filename)
+
+            blob_path = self._ensure_blob(source_path, digest)
+            publish_path = os.path.join(self.root_dir, name)
+            self._link_or_copy(blob_path, publish_path)
+
+            metadata = FileMetadata.from_file(publish_path, name, sha256=digest)
+            entry = StagedFile(name, digest, publish_path, metadata)
+            with self._lock:
+                self._entries[name] = entry
+            self.logger.debug(f"文件已暂存: {name} -> blob {digest[:12]}")
+            return entry
+
+    def release(self, name: str) -> bool:
+        """
+        释放一次租约（对应一次add_file），文件由清理线程在宽限期后回收
+
+        Args:
+            name (str): 发布的文件名
+
+        Returns:
+            bool: 该文件名是否由暂存存储管理
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if not entry:
+                return False
+            self._adjust_leases(entry, -1)
+            return True
+
+    def _adjust_leases(self, entry: StagedFile, delta: int):
+        """调整租约计数，预压缩变体与原文件同步（需持有 _lock）"""
+        now = time.time()
+        for item in (entry, self._entries.get(entry.gzip_name) if entry.gzip_name else None):
+            if item:
+                item.leases = max(0, item.leases + delta)
+                item.last_access = now
+
+    def ensure_gzip(self, name: str, level: int = 6) -> Optional[StagedFile]:
+        """
+        为已暂存文件生成gzip变体并发布为 name.gz
+
+        压缩结果按内容哈希缓存在blob目录中，相同内容只压缩一次。
+
+        Args:
+            name (str): 已暂存的发布文件名
+            level (int): 压缩等级，默认6
+
+        Returns:
+            StagedFile: gzip变体的暂存记录，原文件不存在时返回None
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if not entry:
+                return None
+            existing = self._entries.get(entry.gzip_name) if entry.gzip_name else None
+            if existing:
+                return existing
+
+        with self._stage_lock:
+            gz_digest = f"{entry.digest}{GZIP_SUFFIX}"
+            blob_path = os.path.join(self.blob_dir, gz_digest)
+            if not os.path.exists(blob_path):
+                tmp_path = f"{blob_path}.partial"
+                gzip_file(os.path.join(self.blob_dir, entry.digest), tmp_path, level)
+                os.replace(tmp_path, blob_path)
+
+            with self._lock:
+                gz_name = self._unique_name(f"{entry.name}{GZIP_SUFFIX}")
+            publish_path = os.path.join(self.root_dir, gz_name)
+            self._link_or_copy(blob_path, publish_path)
+
+            gz_entry = StagedFile(gz_name, gz_digest, publish_path, FileMetadata.from_file(publish_path, gz_name))
+            with self._lock:
+                gz_entry.leases = entry.leases
+                self._entries[gz_name] = gz_entry
+                entry.gzip_name = gz_name
+            self.logger.debug(f"已生成预压缩变体: {gz_name} ({entry.metadata.size} -> {gz_entry.metadata.size} bytes)")
+            return gz_entry
+
+    def list_entries(self) -> List[StagedFile]:
+        """获取当前所有暂存记录"""
+        with self._lock:
+            return list(self._entries.values())
+
+    def lookup(self, name: str) -> Optional[StagedFile]:
+        """获取发布文件名对应的暂存记录"""
+        with self._lock:
+            return self._entries.get(name)
+
+    @contextmanager
+    def hold(self, name: str):
+        """
+        下载期间持有文件引用，防止被清理线程回收
+
+        Args:
+            name (str): 发布的文件名（不由存储管理时不做任何事）
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry:
+                entry.active_downloads += 1
+        try:
+            yield entry
+        finally:
+            if entry:
+                with self._lock:
+                    entry.active_downloads -= 1
+                    entry.last_access = time.time()
+
+    def schedule_delete(self, path: str):
+        """登记一个暂时无法删除的文件（如Windows下被占用），由清理线程重试"""
+        with self._lock:
+            self._pending_deletes.append((path, 0))
+
+    # ------------------------------------------------------------------
+    # 清理线程
+    # ------------------------------------------------------------------
+    def start_reaper(self):
+        """启动后台清理线程"""
+        if self._reaper_thread and self._reaper_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._reaper_thread = threading.Thread(target=self._reaper_loop, name="StagingStoreReaper", daemon=True)
+        self._reaper_thread.start()
+
+    def stop_reaper(self):
+        """停止后台清理线程"""
+        self._stop_event.set()
+        if self._reaper_thread:
+            self._reaper_thread.join(timeout=5)
+            self._reaper_thread = None
+
+    def clear(self):
+        """清空所有记录（临时目录被整体删除后调用）"""
+        with self._lock:
+            self._entries.clear()
+            self._pending_deletes.clear()
+        self._digest_cache.clear()
+
+    def _reaper_loop(self):
+        """清理线程主循环"""
+        while not self._stop_event.wait(self.reap_interval):
+            try:
+                self.reap_once()
+            except Exception as e:
+                self.logger.error(f"暂存清理失败: {e}")
+
+    def reap_once(self, now: Optional[float] = None) -> int:
+        """
+        执行一次清理
+
+        Args:
+            now (float, optional): 当前时间，默认time.time()
+
+        Returns:
+            int: 本次回收的发布文件数
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = []
+            for name, entry in list(self._entries.items()):
+                if not entry.is_idle():
+                    continue
+                idle_for = now - entry.last_access
+                if (entry.leases == 0 and idle_for >= self.grace) or idle_for >= self.ttl:
+                    expired.append(entry)
+                    del self._entries[name]
+            live_digests = {entry.digest for entry in self._entries.values()}
+            pending, self._pending_deletes = self._pending_deletes, []
+
+        for entry in expired:
+            self._delete(entry.path)
+            self.logger.info(f"暂存文件已回收: {entry.name}")
+
+        orphan_digests = {entry.digest for entry in expired} - live_digests
+        if orphan_digests:
+            # 持有暂存锁，避免与正在链接同一blob的stage()竞争
+            with self._stage_lock:
+                self._delete_orphan_blobs(orphan_digests)
+
+        for path, attempts in pending:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError as e:
+                if attempts < 10:
+                    with self._lock:
+                        self._pending_deletes.append((path, attempts + 1))
+                else:
+                    self.logger.debug(f"延迟删除最终失败: {os.path.basename(path)} - {e}")
+        return len(expired)
+
+    # ------------------------------------------------------------------
+    # 内部工具
+    # ------------------------------------------------------------------
+    def file_digest(self, path: str) -> str:
+        """计算文件内容的SHA-256（按路径、大小和修改时间缓存）"""
+        stat_result = os.stat(path)
+        key = (os.path.realpath(path), stat_result.st_size, stat_result.st_mtime_ns)
+        cached = self._digest_cache.get(key)
+        if cached:
+            return cached
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                hasher.update(block)
+        digest = hasher.hexdigest()
+        self._digest_cache[key] = digest
+        return digest
+
+    def _retire_unused(self, entry: StagedFile) -> List[StagedFile]:
+        """租约已全部释放且没有下载时移除记录（连同预压缩变体）并返回，否则返回空列表（需持有 _lock）"""
+        variant = self._entries.get(entry.gzip_name) if entry.gzip_name else None
+        items = [item for item in (entry, variant) if item]
+        if entry.leases > 0 or not all(item.is_idle() for item in items):
+            return []
+        for item in items:
+            self._entries.pop(item.name, None)
+        return items
+
+    def _discard(self, entries: List[StagedFile]):
+        """删除已移除记录的发布文件和不再被引用的blob（需持有 _stage_lock）"""
+        for entry in entries:
+            self._delete(entry.path)
+            self.logger.debug(f"同名文件内容已变化，替换旧的暂存文件: {entry.name}")
+        self._delete_orphan_blobs({entry.digest for entry in entries})
+
+    def _delete_orphan_blobs(self, digests):
+        """删除不再被任何记录引用的blob（需持有 _stage_lock）"""
+        with self._lock:
+            live_digests = {entry.digest for entry in self._entries.values()}
+        for digest in set(digests) - live_digests:
+            self._delete(os.path.join(self.blob_dir, digest))
+
+    def _unique_name(self, filename: str) -> str:
+        """生成在临时目录中未被占用的文件名（需持有 _lock）"""
+        candidate = filename
+        base_name, ext = os.path.splitext(filename)
+        counter = 1
+        while candidate in self._entries or os.path.exists(os.path.join(self.root_dir, candidate)):
+            candidate = f"{base_name}_{counter}{ext}"
+            counter += 1
+        return candidate
+
+    def _ensure_blob(self, source_path: str, digest: str) -> str:
+        """确保内容对应的blob存在，优先reflink，失败时复制"""
+        os.makedirs(self.blob_dir, exist_ok=True)
+        blob_path = os.path.join(self.blob_dir, digest)
+        if os.path.exists(blob_path):
+            return blob_path
+        tmp_path = f"{blob_path}.partial"
+        if not self._try_reflink(source_path, tmp_path):
+            shutil.copy2(source_path, tmp_path)
+        else:
+            shutil.copystat(source_path, tmp_path)
+        os.replace(tmp_path, blob_path)
+        return blob_path
+
+    @staticmethod
+    def _try_reflink(source_path: str, target_path: str) -> bool:
+        """尝试以写时复制方式克隆文件（Btrfs/XFS等），不支持时返回False"""
+        if not sys.platform.startswith('linux'):
+            return False
+        try:
+            import fcntl
+            with open(source_path, 'rb') as src, open(target_path, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+            return True
+        except (OSError, ImportError):
+            try:
+                os.remove(target_path)
+            except OSError:
+                pass
+            return False
+
+    @staticmethod
+    def _link_or_copy(blob_path: str, publish_path: str):
+        """将blob以硬链接方式发布，不支持硬链接时退化为复制"""
+        try:
+            os.link(blob_path, publish_path)
+        except OSError:
+            shutil.copy2(blob_path, publish_path)
+
+    def _delete(self, path: str):
+        """删除文件，优先使用外部提供的强力删除函数"""
+        if not os.path.exists(path):
+            return
+        if self._delete_func:
+            self._delete_func(path, os.path.basename(path))
+            return
+        try:
+            os.remove(path)
+        except OSError:
+            self.schedule_delete(path)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+带宽调度器单元测试
+
+这个文件包含了BandwidthScheduler的限速、优先级分配和速率统计的测试用例。
+"""
+
+import threading
+import time
+
+import pytest
+
+from fileTransfer.bandwidth_scheduler import BandwidthScheduler, CHUNK_SIZE
+
+
+def _run_transfer(scheduler, client, name, priority, total, results):
+    """按块申请额度直到发送total字节，记录完成时间"""
+    with scheduler.open_transfer(client, name, priority) as transfer:
+        sent = 0
+        while sent < total:
+            scheduler.acquire(transfer, CHUNK_SIZE)
+            sent += CHUNK_SIZE
+    results[name] = (time.monotonic(), transfer.achieved_rate)
+
+
+class TestBandwidthScheduler:
+    """
+    BandwidthScheduler的测试用例
+    """
+
+    def test_unlimited_only_records(self):
+        """
+        测试未设置上限时不限速，只统计字节数
+        """
+        scheduler = BandwidthScheduler()
+        assert scheduler.limited is False
+        start = time.monotonic()
+        with scheduler.open_transfer("10.0.0.1", "a.bin") as transfer:
+            for _ in range(100):
+                scheduler.acquire(transfer, CHUNK_SIZE)
+        assert time.monotonic() - start < 0.5
+        history = scheduler.recent_transfers()
+        assert history[-1]["bytes"] == 100 * CHUNK_SIZE
+        assert history[-1]["rate"] > 0
+
+    def test_global_limit(self):
+        """
+        测试全局上限限制发送速率
+        """
+        rate = 1024 * 1024
+        scheduler = BandwidthScheduler(global_rate=rate)
+        results = {}
+        start = time.monotonic()
+        _run_transfer(scheduler, "10.0.0.1", "a.bin", "normal", rate, results)
+        elapsed = time.monotonic() - start
+        # 桶容量为0.25秒流量，1秒的数据至少需要约0.75秒
+        assert elapsed >= 0.6
+        assert results["a.bin"][1] <= rate * 1.5
+
+    def test_per_client_limit_is_independent(self):
+        """
+        测试单客户端上限不影响其他客户端
+        """
+        scheduler = BandwidthScheduler(per_client_rate=512 * 1024)
+        results = {}
+        threads = [
+            threading.Thread(target=_run_transfer, args=(scheduler, ip, ip, "normal", 512 * 1024, results))
+            for ip in ("10.0.0.1", "10.0.0.2")
+        ]
+        start = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # 两个客户端各自限速，并行完成，总耗时约等于单个客户端
+        assert time.monotonic() - start < 1.5
+
+    def test_config_priority_beats_bulk(self):
+        """
+        测试竞争全局带宽时配置文件获得更多带宽、先于大文件完成
+        """
+        scheduler = BandwidthScheduler(global_rate=2 * 1024 * 1024)
+        results = {}
+        bulk = threading.Thread(target=_run_transfer,
+                                args=(scheduler, "10.0.0.1", "ota.img", "bulk", 2 * 1024 * 1024, results))
+        config = threading.Thread(target=_run_transfer,
+                                  args=(scheduler, "10.0.0.2", "app.conf", "config", 512 * 1024, results))
+        bulk.start()
+        time.sleep(0.05)
+        config.start()
+        bulk.join()
+        config.join()
+        assert results["app.conf"][0] < results["ota.img"][0]
+        # 按8:1权重分配，配置文件获得的速率明显高于平分的一半
+        assert results["app.conf"][1] > 1024 * 1024
+
+    @pytest.mark.parametrize("filename, size, is_binary, expected", [
+        ("app.conf", 100, None, "config"),
+        ("firmware.img", 100, True, "bulk"),
+        ("tool", 64 * 1024 * 1024, True, "bulk"),
+        ("busybox", 1024 * 1024, True, "normal"),
+        ("notes", 2048, False, "config"),
+    ])
+    def test_classify(self, filename, size, is_binary, expected):
+        """
+        测试优先级分类
+        """
+        assert BandwidthScheduler.classify(filename, size, is_binary) == expected
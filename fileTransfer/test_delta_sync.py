@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目录增量同步单元测试
+
+这个文件包含了清单解析与比对、本地md5缓存，以及经FileHTTPServer和设备模拟器
+只发送变化文件、删除多余文件的测试用例。
+"""
+
+import hashlib
+import os
+import socket
+import time
+
+import pytest
+
+from fileTransfer.delta_sync import (
+    DeltaSync, FindExecManifest, FindLoopManifest, LocalManifest, ManifestEntry, diff_manifests, manifest_commands,
+    parse_manifest
+)
+from fileTransfer.http_server import FileHTTPServer
+from telnetTool.device_simulator import DeviceSimulator
+from telnetTool.telnetConnect import CustomTelnetClient
+
+
+def _free_port() -> int:
+    """获取一个可用的本地端口"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _write(path, content: bytes, mtime: float = 1700000000):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    os.utime(path, (mtime, mtime))
+
+
+class TestManifest:
+    """
+    清单解析、比对和本地缓存的测试用例
+    """
+
+    def test_parse_and_missing_directory(self):
+        """
+        测试解析stat和md5sum输出，目录不存在时为空清单
+        """
+        output = ("12/1700000000/./a.txt\r\n3/1700000001/./sub/my file.bin\r\n"
+                  "0cc175b9c0f1b6a831c399e269772661  ./a.txt\r\n")
+        manifest = parse_manifest([("", 0), (output, 0)])
+        assert sorted(manifest) == ["a.txt", "sub/my file.bin"]
+        assert (manifest["a.txt"].size, manifest["a.txt"].md5) == (12, "0cc175b9c0f1b6a831c399e269772661")
+        assert manifest["sub/my file.bin"].mtime == 1700000001
+        assert parse_manifest([("", 1), ("sh: cd: can't cd", 2)]) == {}
+        with pytest.raises(RuntimeError):
+            parse_manifest([("", 0), ("sh: find: not found", 127)])
+        assert manifest_commands("/data/my dir", checksums=True)[1].endswith("-exec md5sum {} +")
+
+    def test_find_loop_fallback(self):
+        """
+        测试find | while read兜底命令：不依赖 -exec {} + 和stat，wc -c输出的前导空格可解析
+        """
+        listing = manifest_commands("/data", checksums=True, strategy=FindLoopManifest())[1]
+        assert "-exec" not in listing and "stat" not in listing
+        assert 'while IFS= read -r f; do md5sum "$f"; done' in listing
+        output = "      12/1700000000/./a.txt\r\n3/1700000001/./my file.bin\r\n"
+        manifest = parse_manifest([("", 0), (output, 0)])
+        assert (manifest["a.txt"].size, manifest["my file.bin"].mtime) == (12, 1700000001)
+
+    def test_diff(self):
+        """
+        测试按大小、修改时间（允许误差）或md5判断变化，并找出多余文件
+        """
+        local = {
+            "same.txt": ManifestEntry(5, 1700000000.7),
+            "fat.txt": ManifestEntry(5, 1700000002.0),
+            "touched.txt": ManifestEntry(5, 1700000100.0),
+            "resized.txt": ManifestEntry(6, 1700000000.0),
+            "new.txt": ManifestEntry(9, 1700000000.0),
+            "hashed.txt": ManifestEntry(5, 1700000100.0, "aa"),
+        }
+        remote = {
+            "same.txt": ManifestEntry(5, 1700000000),
+            "fat.txt": ManifestEntry(5, 1700000000),
+            "touched.txt": ManifestEntry(5, 1700000000),
+            "resized.txt": ManifestEntry(5, 1700000000),
+            "hashed.txt": ManifestEntry(5, 1700000000, "aa"),
+            "extra.txt": ManifestEntry(1, 1700000000),
+        }
+        plan = diff_manifests(local, remote)
+        assert plan.upload == ["new.txt", "resized.txt", "touched.txt"]
+        assert plan.delete == ["extra.txt"]
+        assert (plan.unchanged, plan.upload_bytes) == (3, 20)
+
+    def test_md5_cache(self, tmp_path):
+        """
+        测试md5按大小和修改时间复用，缓存持久化后新实例可直接使用
+        """
+        _write(tmp_path / "src" / "a.txt", b"a")
+        cache_file = str(tmp_path / "manifest.json")
+        manifest = LocalManifest(cache_file)
+        assert manifest.scan(str(tmp_path / "src"), checksums=True)["a.txt"].md5 == "0cc175b9c0f1b6a831c399e269772661"
+        manifest.save()
+
+        reloaded = LocalManifest(cache_file)
+        key = os.path.abspath(str(tmp_path / "src" / "a.txt"))
+        reloaded._cache[key] = (1, reloaded._cache[key][1], "cached")
+        assert reloaded.scan(str(tmp_path / "src"), checksums=True)["a.txt"].md5 == "cached"
+        _write(tmp_path / "src" / "a.txt", b"b", mtime=1700000005)
+        assert reloaded.scan(str(tmp_path / "src"), checksums=True)["a.txt"].md5 == "92eb5ffee6ae2fec3ad71c777531578f"
+
+
+class TestDeltaSync:
+    """
+    DeltaSync与HTTP服务器、设备模拟器交互的测试用例
+    """
+
+    def setup_method(self):
+        """
+        每个测试方法执行前启动HTTP服务器
+        """
+        self.server = FileHTTPServer(port=_free_port())
+        self.server._get_local_ip = lambda: "127.0.0.1"
+        assert self.server.start() is True
+
+    def teardown_method(self):
+        """
+        每个测试方法执行后停止HTTP服务器
+        """
+        self.server.stop()
+
+    async def _connect(self, device: DeviceSimulator) -> CustomTelnetClient:
+        client = CustomTelnetClient(device.host, device.port, timeout=10.0, log_level="WARNING")
+        await client.connect("root", "root")
+        return client
+
+    @pytest.mark.asyncio
+    async def test_manifest_command_detected_per_device(self):
+        """
+        测试每台设备只探测一次清单命令，find不支持 -exec {} + 时改用find | while read
+        """
+        legacy_responses = {FindExecManifest().probe(): ("find: unrecognized: +\n", 1)}
+        syncer = DeltaSync()
+        async with DeviceSimulator() as modern, DeviceSimulator(responses=legacy_responses) as legacy:
+            modern_client, legacy_client = await self._connect(modern), await self._connect(legacy)
+            try:
+                assert (await syncer.strategy_for(modern_client)).name == "find-exec"
+                before = modern.commands_executed
+                assert (await syncer.strategy_for(modern_client)).name == "find-exec"
+                assert modern.commands_executed == before
+                assert (await syncer.strategy_for(legacy_client)).name == "find-loop"
+            finally:
+                await modern_client.disconnect()
+                await legacy_client.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_sync_without_changes_saves_manifest(self, tmp_path):
+        """
+        测试设备已是最新、无需发送时，比对时算出的md5也会保存到缓存文件
+        """
+        src = tmp_path / "assets"
+        _write(src / "a.txt", b"alpha")
+        _write(src / "img" / "b.txt", b"beta")
+        cache_file = tmp_path / "state" / "manifest.json"
+        syncer = DeltaSync(LocalManifest(str(cache_file)), checksums=True)
+
+        files = {"/customer/assets/a.txt": "alpha", "/customer/assets/img/b.txt": "beta"}
+        async with DeviceSimulator(files=files) as device:
+            client = await self._connect(device)
+            try:
+                plan = await syncer.sync(client, self.server, str(src), "/customer/assets")
+            finally:
+                await client.disconnect()
+
+        assert (plan.upload, plan.unchanged) == ([], 2)
+        reloaded = LocalManifest(str(cache_file))
+        assert reloaded.scan(str(src), checksums=True)["img/b.txt"].md5 == hashlib.md5(b"beta").hexdigest()
+        assert reloaded._dirty is False
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("checksums", [False, True])
+    async def test_sync_only_changes(self, tmp_path, checksums):
+        """
+        测试首次同步发送全部文件，之后只发送修改和新增的文件，并可删除多余文件
+        """
+        src = tmp_path / "assets"
+        for i in range(5):
+            _write(src / ("img" if i % 2 else "") / f"f{i}.txt", f"content {i}".encode())
+        syncer = DeltaSync(LocalManifest(str(tmp_path / "manifest.json")), checksums=checksums)
+
+        async with DeviceSimulator(files={"/customer/assets/old.txt": "stale"}) as device:
+            client = await self._connect(device)
+            try:
+                first = await syncer.sync(client, self.server, str(src), "/customer/assets")
+                assert (len(first.upload), first.delete) == (5, ["old.txt"])
+                assert device.fs.files["/customer/assets/img/f1.txt"] == b"content 1"
+                assert device.fs.mtimes["/customer/assets/img/f1.txt"] == 1700000000
+
+                again = await syncer.sync(client, self.server, str(src), "/customer/assets")
+                assert (again.upload, again.unchanged) == ([], 5)
+
+                _write(src / "f0.txt", b"changed!!", mtime=time.time())
+                _write(src / "img" / "new.txt", b"new")
+                (src / "f2.txt").unlink()
+                plan = await syncer.sync(client, self.server, str(src), "/customer/assets", delete_extras=True)
+            finally:
+                await client.disconnect()
+
+        assert plan.upload == ["f0.txt", "img/new.txt"]
+        assert plan.delete == ["f2.txt", "old.txt"]
+        assert device.fs.files["/customer/assets/f0.txt"] == b"changed!!"
+        assert "/customer/assets/f2.txt" not in device.fs.files
+        assert "/customer/assets/old.txt" not in device.fs.files
+        assert self.server.directory_streams == {}
@@ -0,0 +1,615 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP文件服务器单元测试
+
+这个文件包含了FileHTTPServer及其请求处理器的测试用例，
+测试在本机回环地址上启动真实服务器并通过urllib/socket访问。
+"""
+
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import socket
+import tarfile
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from fileTransfer.file_metadata import detect_binary, detect_executable
+from fileTransfer.http_server import FileHTTPServer
+from fileTransfer.precompress import MIN_SIZE, PrecompressPolicy, estimate_gzip_ratio, gzip_file
+
+
+def _free_port() -> int:
+    """获取一个可用的本地端口"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _fetch(url: str, headers=None, timeout: float = 5.0):
+    """发送GET请求，返回 (状态码, 响应头, 响应体)"""
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as resp:
+            return resp.status, resp.headers, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+class TestFileHTTPServer:
+    """
+    FileHTTPServer的测试用例
+    """
+
+    def setup_method(self):
+        """
+        每个测试方法执行前启动服务器并准备源文件
+        """
+        self.port = _free_port()
+        self.server = FileHTTPServer(port=self.port)
+        assert self.server.start() is True
+        self.source_dir = tempfile.mkdtemp(prefix="http_server_test_")
+        self.source_file = os.path.join(self.source_dir, "payload.bin")
+        self.payload = os.urandom(256 * 1024)
+        with open(self.source_file, "wb") as f:
+            f.write(self.payload)
+
+    def teardown_method(self):
+        """
+        每个测试方法执行后停止服务器
+        """
+        self.server.stop()
+        for name in os.listdir(self.source_dir):
+            os.remove(os.path.join(self.source_dir, name))
+        os.rmdir(self.source_dir)
+
+    def _url(self, name: str) -> str:
+        return self.server.get_download_url(name, "127.0.0.1")
+
+    def test_download_file(self):
+        """
+        测试完整下载文件
+        """
+        path = self.server.add_file(self.source_file)
+        status, headers, body = _fetch(self._url(os.path.basename(path)))
+        assert status == 200
+        assert body == self.payload
+        assert int(headers["Content-Length"]) == len(self.payload)
+
+    def test_missing_file_returns_404(self):
+        """
+        测试请求不存在的文件
+        """
+        status, _, _ = _fetch(self._url("not_exists.txt"))
+        assert status == 404
+
+    def test_path_traversal_forbidden(self):
+        """
+        测试路径遍历请求被拒绝
+        """
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as sock:
+            sock.sendall(b"GET /../../etc/passwd HTTP/1.0\r\n\r\n")
+            response = sock.recv(1024)
+        assert response.split(b"\r\n", 1)[0].split()[1] in (b"403", b"404")
+
+    def test_slow_client_does_not_block_others(self):
+        """
+        测试一个未发完请求的慢速客户端不会阻塞其他客户端
+        """
+        path = self.server.add_file(self.source_file)
+        slow = socket.create_connection(("127.0.0.1", self.port), timeout=5)
+        try:
+            slow.sendall(b"GET /")  # 故意不发送完整请求
+            start = time.time()
+            status, _, body = _fetch(self._url(os.path.basename(path)), timeout=3)
+            assert status == 200
+            assert body == self.payload
+            assert time.time() - start < 3
+        finally:
+            slow.close()
+
+    def test_connection_limit_rejects_with_503(self):
+        """
+        测试超过最大连接数且排队超时后返回503
+        """
+        self.server.stop()
+        self.port = _free_port()
+        self.server = FileHTTPServer(port=self.port, max_connections=1)
+        self.server.start()
+        self.server.server.queue_timeout = 0.2
+        slow = socket.create_connection(("127.0.0.1", self.port), timeout=5)
+        try:
+            slow.sendall(b"GET /")
+            time.sleep(0.1)
+            status, _, _ = _fetch(self._url("any.txt"))
+            assert status == 503
+        finally:
+            slow.close()
+
+    def test_range_request_returns_partial_content(self):
+        """
+        测试单区间Range请求返回206和对应字节
+        """
+        path = self.server.add_file(self.source_file)
+        url = self._url(os.path.basename(path))
+        status, headers, body = _fetch(url, {"Range": "bytes=100-199"})
+        assert status == 206
+        assert body == self.payload[100:200]
+        assert headers["Content-Range"] == f"bytes 100-199/{len(self.payload)}"
+
+    def test_range_resume_and_suffix(self):
+        """
+        测试 bytes=N- 续传与 bytes=-N 后缀区间
+        """
+        path = self.server.add_file(self.source_file)
+        url = self._url(os.path.basename(path))
+        status, _, body = _fetch(url, {"Range": "bytes=-10"})
+        assert status == 206
+        assert body == self.payload[-10:]
+        status, _, body = _fetch(url, {"Range": "bytes=1000-"})
+        assert status == 206
+        assert body == self.payload[1000:]
+
+    def test_range_not_satisfiable(self):
+        """
+        测试超出文件大小的区间返回416
+        """
+        path = self.server.add_file(self.source_file)
+        url = self._url(os.path.basename(path))
+        status, headers, _ = _fetch(url, {"Range": f"bytes={len(self.payload)}-"})
+        assert status == 416
+        assert headers["Content-Range"] == f"bytes */{len(self.payload)}"
+
+    def test_if_range_mismatch_returns_full_file(self):
+        """
+        测试If-Range与ETag不一致时返回完整文件
+        """
+        path = self.server.add_file(self.source_file)
+        url = self._url(os.path.basename(path))
+        status, headers, _ = _fetch(url, {"Range": "bytes=0-9"})
+        etag = headers["ETag"]
+        status, _, body = _fetch(url, {"Range": "bytes=0-9", "If-Range": etag})
+        assert status == 206
+        assert body == self.payload[:10]
+        status, _, body = _fetch(url, {"Range": "bytes=0-9", "If-Range": '"stale"'})
+        assert status == 200
+        assert body == self.payload
+
+    def test_staging_deduplicates_same_content(self):
+        """
+        测试相同内容只暂存一个blob，同名同内容复用已发布文件
+        """
+        first = self.server.add_file(self.source_file)
+        second = self.server.add_file(self.source_file)
+        renamed = self.server.add_file(self.source_file, "copy.bin")
+        assert first == second
+        assert os.path.basename(renamed) == "copy.bin"
+        assert self.server.staging_store.lookup("payload.bin").leases == 2
+        if os.stat(first).st_nlink > 1:
+            assert os.path.samefile(first, renamed)
+
+    def test_released_file_is_reaped_after_grace(self):
+        """
+        测试租约全部释放并超过宽限期后文件被回收
+        """
+        store = self.server.staging_store
+        path = self.server.add_file(self.source_file)
+        name = os.path.basename(path)
+        assert self.server.remove_file(name) is True
+        assert os.path.exists(path)
+        assert store.reap_once(time.time() + store.grace + 1) == 1
+        assert not os.path.exists(path)
+        assert os.listdir(store.blob_dir) == []
+
+    def test_active_download_prevents_reaping(self):
+        """
+        测试下载进行中的文件不会被回收
+        """
+        store = self.server.staging_store
+        path = self.server.add_file(self.source_file)
+        name = os.path.basename(path)
+        self.server.remove_file(name)
+        with store.hold(name):
+            assert store.reap_once(time.time() + store.ttl + 1) == 0
+            assert os.path.exists(path)
+        assert store.reap_once(time.time() + store.ttl + 1) == 1
+
+    def test_readd_after_edit_keeps_name(self):
+        """
+        测试同名文件修改后重新推送：旧文件已释放时原地替换，仍有租约时才另起文件名
+        """
+        store = self.server.staging_store
+        old_path = self.server.add_file(self.source_file, "app.conf")
+        old_digest = store.lookup("app.conf").digest
+        self.server.remove_file("app.conf")
+        with open(self.source_file, "wb") as f:
+            f.write(b"edited = 1\n")
+
+        path = self.server.add_file(self.source_file, "app.conf")
+        assert path == old_path
+        assert store.lookup("app.conf").leases == 1
+        assert _fetch(self._url("app.conf"))[2] == b"edited = 1\n"
+        assert not os.path.exists(os.path.join(store.blob_dir, old_digest))
+
+        with open(self.source_file, "wb") as f:
+            f.write(b"edited = 2\n")
+        assert os.path.basename(self.server.add_file(self.source_file, "app.conf")) == "app_1.conf"
+
+    def test_blob_directory_not_served(self):
+        """
+        测试内部blob目录不能被直接下载
+        """
+        path = self.server.add_file(self.source_file)
+        digest = self.server.staging_store.lookup(os.path.basename(path)).digest
+        status, _, _ = _fetch(self._url(f".staging_blobs/{digest}"))
+        assert status == 403
+
+    def test_staged_file_has_metadata(self):
+        """
+        测试暂存时生成元数据，ETag基于内容哈希
+        """
+        elf_file = os.path.join(self.source_dir, "tool")
+        with open(elf_file, "wb") as f:
+            f.write(b"\x7fELF" + b"\x00" * 60)
+        entry = self.server.staging_store.lookup(os.path.basename(self.server.add_file(elf_file)))
+        assert entry.metadata.size == 64
+        assert entry.metadata.is_binary and entry.metadata.is_executable
+        assert entry.metadata.sha256 == entry.digest
+        assert self.server.get_checksum("tool") == hashlib.sha256(b"\x7fELF" + b"\x00" * 60).hexdigest()
+        assert self.server.get_checksum("missing") is None
+        assert self.server.is_executable("tool") and not self.server.is_executable("missing")
+
+        status, headers, _ = _fetch(self._url("tool"))
+        assert status == 200
+        assert headers["ETag"] == entry.metadata.etag
+        assert headers["Content-Type"] == "application/octet-stream"
+
+
+    def _make_tree(self) -> str:
+        """在源目录下创建包含子目录的测试目录树"""
+        root = os.path.join(self.source_dir, "config")
+        os.makedirs(os.path.join(root, "sub"))
+        for i in range(50):
+            with open(os.path.join(root, "sub" if i % 2 else "", f"f{i}.txt"), "w") as f:
+                f.write(f"line {i}\n" * i)
+        with open(os.path.join(root, "runner"), "wb") as f:
+            f.write(b"\x7fELF" + b"\x00" * 16)
+        return root
+
+    @pytest.mark.parametrize("compress", [False, True])
+    def test_directory_tar_stream(self, compress):
+        """
+        测试目录以tar流方式下载，内容和结构完整
+        """
+        root = self._make_tree()
+        try:
+            archive = self.server.add_directory(root, compress=compress)
+            assert archive == ("config.tar.gz" if compress else "config.tar")
+            status, headers, body = _fetch(self._url(archive))
+            assert status == 200
+            assert "Content-Length" not in headers
+            with tarfile.open(fileobj=io.BytesIO(body), mode="r:*") as tar:
+                names = set(tar.getnames())
+                assert "config/sub/f1.txt" in names and "config/f0.txt" in names
+                assert tar.extractfile("config/f2.txt").read() == b"line 2\n" * 2
+                runner = tar.getmember("config/runner")
+                assert runner.mode & 0o111 and runner.uid == 0
+            assert self.server.remove_directory(archive) is True
+            assert _fetch(self._url(archive))[0] == 404
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+    def test_directory_member_subset(self):
+        """
+        测试只打包指定文件：归档内不带根目录，保留修改时间
+        """
+        root = self._make_tree()
+        try:
+            os.utime(os.path.join(root, "sub", "f3.txt"), (1700000000, 1700000000))
+            archive = self.server.add_directory(root, "config-delta", members=["sub/f3.txt", "runner"])
+            status, _, body = _fetch(self._url(archive))
+            assert status == 200
+            with tarfile.open(fileobj=io.BytesIO(body), mode="r:") as tar:
+                assert tar.getnames() == ["sub/f3.txt", "runner"]
+                assert tar.getmember("sub/f3.txt").mtime == 1700000000
+                assert tar.getmember("runner").mode & 0o111
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    def test_gzip_variant(self):
+        """
+        测试预压缩变体可下载、可解压，并随原文件一起释放
+        """
+        text_file = os.path.join(self.source_dir, "app.conf")
+        content = b"key=value\n" * 10000
+        with open(text_file, "wb") as f:
+            f.write(content)
+        name = os.path.basename(self.server.add_file(text_file))
+        gzip_name = self.server.get_gzip_variant(name)
+        assert gzip_name == "app.conf.gz"
+        assert self.server.get_gzip_variant(name) == gzip_name
+
+        status, _, body = _fetch(self._url(gzip_name))
+        assert status == 200
+        assert len(body) < len(content) // 10
+        assert gzip.decompress(body) == content
+
+        store = self.server.staging_store
+        self.server.remove_file(name)
+        # 服务端线程可能还未退出下载引用，稍作轮询
+        reaped, deadline = 0, time.time() + 2
+        while reaped < 2 and time.time() < deadline:
+            reaped += store.reap_once(time.time() + store.grace + 1)
+            time.sleep(0.05)
+        assert reaped == 2
+        assert os.listdir(store.blob_dir) == []
+
+
+    def test_bandwidth_limit_and_rate_report(self):
+        """
+        测试全局带宽上限生效并记录传输的实际速率
+        """
+        self.server.bandwidth_scheduler.set_limits(global_rate=512 * 1024)
+        path = self.server.add_file(self.source_file)
+        start = time.time()
+        status, _, body = _fetch(self._url(os.path.basename(path)))
+        assert status == 200 and body == self.payload
+        assert time.time() - start >= 0.2
+        deadline = time.time() + 2
+        while not self.server.bandwidth_scheduler.recent_transfers() and time.time() < deadline:
+            time.sleep(0.05)
+        report = self.server.bandwidth_scheduler.recent_transfers()[-1]
+        assert report["bytes"] == len(self.payload)
+        assert report["rate"] < 1024 * 1024
+
+
+    def test_upload_to_expected_target(self):
+        """
+        测试设备通过PUT推送文件到登记的本地路径
+        """
+        target = os.path.join(self.source_dir, "pulled", "device.log")
+        pending = self.server.expect_upload(target)
+        url = self.server.get_upload_url(pending.name, "127.0.0.1")
+        request = urllib.request.Request(url, data=self.payload, method="PUT")
+        with urllib.request.urlopen(request, timeout=5) as resp:
+            assert resp.status == 201
+        assert pending.wait(2) is True
+        with open(target, "rb") as f:
+            assert f.read() == self.payload
+        shutil.rmtree(os.path.dirname(target))
+
+    def test_upload_retry_after_failed_attempt(self):
+        """
+        测试第一次上传中途失败后登记仍保留，回退的上传写入登记路径；成功后登记才移除
+        """
+        generic_dir = tempfile.mkdtemp(prefix="upload_generic_")
+        self.server.upload_receiver.upload_dir = os.path.join(generic_dir, "uploads")
+        target = os.path.join(self.source_dir, "device.log")
+        pending = self.server.expect_upload(target)
+        path = f"/upload/{pending.name}".encode("utf-8")
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as sock:
+            sock.sendall(b"POST " + path + b" HTTP/1.0\r\nContent-Length: 10\r\n\r\nabc")
+            sock.shutdown(socket.SHUT_WR)
+            assert b" 400 " in sock.recv(1024)
+        assert pending.wait(0.2) is False
+        assert not os.path.exists(target)
+
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as sock:
+            sock.sendall(b"PUT " + path + b" HTTP/1.0\r\nContent-Length: 10\r\n\r\n0123456789")
+            assert b" 201 " in sock.recv(1024)
+        assert pending.wait(2) is True
+        with open(target, "rb") as f:
+            assert f.read() == b"0123456789"
+        assert not os.path.exists(self.server.upload_receiver.upload_dir)
+
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as sock:
+            sock.sendall(b"PUT " + path + b" HTTP/1.0\r\nContent-Length: 3\r\n\r\nxyz")
+            assert b" 201 " in sock.recv(1024)
+        assert os.path.exists(os.path.join(self.server.upload_receiver.upload_dir, pending.name))
+        shutil.rmtree(generic_dir)
+
+    def test_upload_chunked_post(self):
+        """
+        测试chunked编码的POST上传保存到上传目录
+        """
+        self.server.upload_receiver.upload_dir = self.source_dir
+        chunks = [b"hello ", b"device ", b"logs"]
+        body = b"".join(b"%x\r\n%s\r\n" % (len(c), c) for c in chunks) + b"0\r\n\r\n"
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as sock:
+            sock.sendall(b"POST /upload/messages.txt HTTP/1.1\r\nHost: x\r\n"
+                         b"Transfer-Encoding: chunked\r\n\r\n" + body)
+            response = sock.recv(1024)
+        assert b" 201 " in response.split(b"\r\n", 1)[0]
+        with open(os.path.join(self.source_dir, "messages.txt"), "rb") as f:
+            assert f.read() == b"hello device logs"
+
+    def test_upload_rejects_bad_requests(self):
+        """
+        测试非法名称、数据不完整和超出大小限制的上传被拒绝
+        """
+        self.server.upload_receiver.upload_dir = self.source_dir
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as sock:
+            sock.sendall(b"PUT /upload/..%2Fx HTTP/1.0\r\nContent-Length: 1\r\n\r\nx")
+            assert b" 403 " in sock.recv(1024)
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as sock:
+            sock.sendall(b"PUT /upload/short.bin HTTP/1.0\r\nContent-Length: 10\r\n\r\nabc")
+            sock.shutdown(socket.SHUT_WR)
+            assert b" 400 " in sock.recv(1024)
+        assert not os.path.exists(os.path.join(self.source_dir, "short.bin"))
+        assert not os.path.exists(os.path.join(self.source_dir, "short.bin.part"))
+        self.server.upload_receiver.max_size = 4
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as sock:
+            sock.sendall(b"PUT /upload/big.bin HTTP/1.0\r\nContent-Length: 10\r\n\r\n0123456789")
+            assert b" 413 " in sock.recv(1024)
+
+    def test_unregistered_upload_size_limit(self):
+        """
+        测试未登记的上传默认有大小上限，登记的上传不受此限制
+        """
+        receiver = self.server.upload_receiver
+        assert receiver.max_size is None and receiver.unregistered_max_size == 64 * 1024 * 1024
+        receiver.upload_dir = self.source_dir
+        receiver.unregistered_max_size = 4
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as sock:
+            sock.sendall(b"PUT /upload/big.bin HTTP/1.0\r\nContent-Length: 10\r\n\r\n0123456789")
+            assert b" 413 " in sock.recv(1024)
+        chunk = b"a\r\n0123456789\r\n0\r\n\r\n"
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as sock:
+            sock.sendall(b"POST /upload/big.bin HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\n" + chunk)
+            assert b" 413 " in sock.recv(1024)
+        assert not os.path.exists(os.path.join(self.source_dir, "big.bin"))
+
+        target = os.path.join(self.source_dir, "device.log")
+        pending = self.server.expect_upload(target)
+        request = urllib.request.Request(self.server.get_upload_url(pending.name, "127.0.0.1"),
+                                         data=b"0123456789", method="PUT")
+        with urllib.request.urlopen(request, timeout=5) as resp:
+            assert resp.status == 201
+        assert pending.wait(2) is True
+
+
+    def test_metrics_endpoint(self):
+        """
+        测试/metrics输出请求数、发送字节、命中统计和TTFB直方图
+        """
+        path = self.server.add_file(self.source_file)
+        _fetch(self._url(os.path.basename(path)))
+        _fetch(self._url("missing.bin"))
+        deadline = time.time() + 2
+        while not self.server.metrics.snapshot()["clients"] and time.time() < deadline:
+            time.sleep(0.05)
+
+        status, headers, body = _fetch(self._url("metrics"))
+        assert status == 200
+        text = body.decode("utf-8")
+        assert 'file_transfer_requests_total{method="GET",status="200"} 1' in text
+        assert 'file_transfer_requests_total{method="GET",status="404"} 1' in text
+        assert "file_transfer_staging_hits_total 1" in text
+        assert f"file_transfer_bytes_sent_total {len(self.payload)}" in text
+        assert 'file_transfer_client_bytes_total{client="127.0.0.1"}' in text
+        assert "file_transfer_ttfb_seconds_count 2" in text
+        assert "file_transfer_staged_files 1" in text
+
+    def test_staged_file_named_metrics(self):
+        """
+        测试暂存了名为metrics的文件时下载的是文件而不是指标
+        """
+        assert self.server.add_file(self.source_file, "metrics")
+        status, _, body = _fetch(self._url("metrics"))
+        assert status == 200
+        assert body == self.payload
+        self.server.remove_file("metrics")
+
+
+class TestFileMetadata:
+    """
+    文件类型检测的测试用例
+    """
+
+    def test_detect_binary(self):
+        """
+        测试文本与二进制内容的判断
+        """
+        assert detect_binary("a.txt", b"hello world\n" * 50) is False
+        assert detect_binary("a.txt", "中文内容".encode("utf-8") * 20) is True
+        assert detect_binary("a.txt", b"abc\x00def") is True
+        assert detect_binary("a.txt", b"\x01\x02" + b"a" * 20) is True
+        assert detect_binary("a.zip", b"") is True
+        assert detect_binary("a.txt", b"") is False
+
+    def test_detect_executable(self):
+        """
+        测试可执行文件判断
+        """
+        assert detect_executable("busybox", b"\x7fELF\x01") is True
+        assert detect_executable("script", b"#!/bin/sh") is False
+        assert detect_executable("lib.so", b"") is True
+        assert detect_executable("readme.txt", b"\x7fELF") is False
+
+
+class TestPrecompressPolicy:
+    """
+    预压缩决策的测试用例
+    """
+
+    def setup_method(self):
+        """
+        每个测试方法执行前准备可压缩和不可压缩的文件
+        """
+        self.work_dir = tempfile.mkdtemp(prefix="precompress_test_")
+        self.text_file = os.path.join(self.work_dir, "log.txt")
+        with open(self.text_file, "wb") as f:
+            f.write(b"2024-01-01 INFO service started ok\n" * 20000)
+        self.random_file = os.path.join(self.work_dir, "random.bin")
+        with open(self.random_file, "wb") as f:
+            f.write(os.urandom(512 * 1024))
+
+    def teardown_method(self):
+        """
+        每个测试方法执行后删除临时文件
+        """
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_estimate_ratio(self):
+        """
+        测试采样估算压缩率
+        """
+        assert estimate_gzip_ratio(self.text_file) < 0.1
+        assert estimate_gzip_ratio(self.random_file) > 0.95
+        packed = os.path.join(self.work_dir, "log.tar.gz")
+        shutil.copy(self.text_file, packed)
+        assert estimate_gzip_ratio(packed) == 1.0
+
+    def test_gzip_file_is_deterministic(self):
+        """
+        测试gzip结果不含文件名和时间戳：相同内容在不同时间、不同路径下压缩结果相同，且可解压还原
+        """
+        first = os.path.join(self.work_dir, "a.gz")
+        gzip_file(self.text_file, first)
+        copy = os.path.join(self.work_dir, "other.txt")
+        shutil.copy(self.text_file, copy)
+        os.utime(copy, (1, 1))
+        second = os.path.join(self.work_dir, "b.gz")
+        gzip_file(copy, second)
+        with open(first, "rb") as f1, open(second, "rb") as f2:
+            assert f1.read() == f2.read()
+        with gzip.open(first, "rb") as f, open(self.text_file, "rb") as original:
+            assert f.read() == original.read()
+
+    def test_should_compress_depends_on_link_and_device(self):
+        """
+        测试慢链路时压缩文本划算，快链路或慢解压时不划算
+        """
+        slow_link = PrecompressPolicy(link_rate=512 * 1024, gunzip_rate=8 * 1024 * 1024)
+        assert slow_link.should_compress(self.text_file) is True
+        assert slow_link.should_compress(self.random_file) is False
+
+        fast_link = PrecompressPolicy(link_rate=100 * 1024 * 1024, gunzip_rate=8 * 1024 * 1024)
+        assert fast_link.should_compress(self.text_file) is False
+
+        small_file = os.path.join(self.work_dir, "small.txt")
+        with open(small_file, "wb") as f:
+            f.write(b"a" * (MIN_SIZE - 1))
+        assert slow_link.should_compress(small_file, ratio=0.01) is False
+        assert slow_link.should_compress(self.random_file, ratio=0.1) is True
+
+    def test_record_transfer_updates_link_rate(self):
+        """
+        测试实际传输结果修正链路速率
+        """
+        policy = PrecompressPolicy(link_rate=1024 * 1024, smoothing=0.5)
+        policy.record_transfer(4 * 1024 * 1024, 1.0)
+        assert policy.link_rate == pytest.approx(2.5 * 1024 * 1024)
+        policy.record_transfer(4 * 1024 * 1024, 1.0, compressed=True)
+        assert policy.link_rate == pytest.approx(2.5 * 1024 * 1024)
+        policy.record_transfer(MIN_SIZE - 1, 0.001)
+        policy.record_transfer(4 * 1024 * 1024, 0.0)
+        assert policy.link_rate == pytest.approx(2.5 * 1024 * 1024)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+远程目录列表单元测试
+
+这个文件包含了各列表策略的输出解析、按设备探测并缓存策略、目录缓存的过期与失效，
+以及对设备模拟器一次往返列出目录和批量预取的测试用例。
+"""
+
+import stat
+import time
+
+import pytest
+
+from fileTransfer.remote_listing import (
+    DirectoryCache, FindPrintfListing, LsListing, RemoteEntry, RemoteLister, StatListing
+)
+from telnetTool.device_simulator import DeviceSimulator
+from telnetTool.telnetConnect import CustomTelnetClient
+
+
+class TestListingParsers:
+    """
+    列表策略输出解析的测试用例
+    """
+
+    def test_find_printf(self):
+        """
+        测试解析find -printf记录
+        """
+        entries = FindPrintfListing().parse(
+            "f/755/1024/1700000000.5/app.bin\r\nd/755/4096/1700000001.0/conf\r\nl/777/7/1700000002.0/my file\r\n"
+        )
+        assert [(e.name, e.permissions, e.size) for e in entries] == [
+            ("app.bin", "-rwxr-xr-x", 1024),
+            ("conf", "drwxr-xr-x", 4096),
+            ("my file", "lrwxrwxrwx", 7),
+        ]
+        assert entries[0].is_executable and entries[0].mtime == 1700000000.5
+        assert entries[1].is_directory and entries[2].is_link
+
+    def test_stat(self):
+        """
+        测试解析stat -c记录，忽略非记录行
+        """
+        entries = StatListing().parse("81a4/12/1700000000//customer/a.txt\r\nstat: can't stat\r\n41ed/0/1700000000//customer/d\r\n")
+        assert [(e.name, e.mode) for e in entries] == [
+            ("a.txt", stat.S_IFREG | 0o644),
+            ("d", stat.S_IFDIR | 0o755),
+        ]
+
+    def test_ls_long_format(self):
+        """
+        测试解析ls -la长格式（跳过total、.和..，符号链接去掉目标）
+        """
+        output = (
+            "total 8\n"
+            "drwxr-xr-x    2 root     root           160 Jan  1  1970 .\n"
+            "drwxr-xr-x   17 root     root           0 Jan  1 00:00 ..\n"
+            "-rwxr-xr-x    1 root     root        1234 Mar  5 12:01 run.sh\n"
+            "lrwxrwxrwx    1 root     root          11 Mar  5 12:01 log -> /var/log\n"
+            "crw-rw-rw-    1 root     root        1,   3 Jan  1 00:00 null\n"
+        )
+        entries = LsListing().parse(output)
+        assert [(e.name, e.permissions, e.size) for e in entries] == [
+            ("log", "lrwxrwxrwx", 11),
+            ("null", "crw-rw-rw-", 1),
+            ("run.sh", "-rwxr-xr-x", 1234),
+        ]
+        assert entries[2].is_executable and entries[2].mtime is None
+
+
+class TestDirectoryCache:
+    """
+    DirectoryCache类的测试用例
+    """
+
+    def setup_method(self):
+        """
+        每个测试方法执行前的设置
+        """
+        self.cache = DirectoryCache(ttl=30.0)
+        self.entries = [RemoteEntry("a.txt", stat.S_IFREG | 0o644, 1)]
+
+    def test_ttl(self):
+        """
+        测试过期后不再命中，路径按规范化后的形式匹配
+        """
+        self.cache.put("h", 23, "/customer/", self.entries)
+        assert self.cache.get("h", 23, "/customer") is self.entries
+        assert self.cache.get("h", 2323, "/customer") is None
+        self.cache.ttl = 0.0
+        time.sleep(0.01)
+        assert self.cache.get("h", 23, "/customer") is None
+
+    def test_invalidate_parent_and_subtree(self):
+        """
+        测试修改一个路径使其所在目录、自身及子目录失效，其他目录保留
+        """
+        for path in ("/", "/customer", "/customer/conf", "/customer/conf/x", "/customerdata", "/tmp"):
+            self.cache.put("h", 23, path, self.entries)
+        self.cache.invalidate("h", 23, "/customer/conf")
+        remaining = [p for p in ("/", "/customer", "/customer/conf", "/customer/conf/x", "/customerdata", "/tmp")
+                     if self.cache.get("h", 23, p) is not None]
+        assert remaining == ["/", "/customerdata", "/tmp"]
+
+    def test_stale_put_rejected(self):
+        """
+        测试失效前发出的列表结果不会写回缓存
+        """
+        generation = self.cache.generation("h", 23)
+        self.cache.invalidate("h", 23, "/customer/a.txt")
+        assert self.cache.put("h", 23, "/customer", self.entries, generation=generation) is False
+        assert self.cache.get("h", 23, "/customer") is None
+        assert self.cache.put("h", 23, "/customer", self.entries, generation=self.cache.generation("h", 23))
+
+
+class TestRemoteLister:
+    """
+    RemoteLister与设备模拟器交互的测试用例
+    """
+
+    async def _connect(self, device: DeviceSimulator) -> CustomTelnetClient:
+        client = CustomTelnetClient(device.host, device.port, timeout=10.0, log_level="WARNING")
+        await client.connect("root", "root")
+        return client
+
+    @pytest.mark.asyncio
+    async def test_detect_once_and_list(self):
+        """
+        测试探测一次后缓存策略，每个目录一次往返得到完整元数据
+        """
+        files = {"/customer/app.bin": b"\x7fELF" * 4, "/customer/.hidden": "x", "/customer/conf/a.json": "{}"}
+        async with DeviceSimulator(files=files) as device:
+            client = await self._connect(device)
+            try:
+                lister = RemoteLister()
+                entries = await lister.list_directory(client, "/customer")
+                strategy = await lister.strategy_for(client)
+                before = device.commands_executed
+                again = await lister.list_directory(client, "/customer/conf")
+                # 一条分帧命令: echo开始标记 + test + stat + test + echo结束标记
+                assert device.commands_executed - before == 5
+            finally:
+                await client.disconnect()
+
+        assert strategy.name == "stat"
+        assert [(e.name, e.is_directory, e.size) for e in entries] == [
+            (".hidden", False, 1),
+            ("app.bin", False, 16),
+            ("conf", True, 0),
+        ]
+        assert entries[1].permissions == "-rw-r--r--"
+        assert entries[1].mtime > 0
+        assert [e.name for e in again] == ["a.json"]
+
+    @pytest.mark.asyncio
+    async def test_missing_and_create(self):
+        """
+        测试目录不存在时抛出FileNotFoundError，create=True时先创建
+        """
+        async with DeviceSimulator() as device:
+            client = await self._connect(device)
+            try:
+                lister = RemoteLister()
+                with pytest.raises(FileNotFoundError):
+                    await lister.list_directory(client, "/data/new dir")
+                assert await lister.list_directory(client, "/data/new dir", create=True) == []
+                assert "/data/new dir" in device.fs.dirs
+            finally:
+                await client.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_redetect_when_command_missing(self):
+        """
+        测试缓存的列表命令不存在（退出码127）时重新探测
+        """
+        # 模拟固件升级后find被移除
+        missing = {FindPrintfListing().command("/root"): ("sh: find: not found\n", 127)}
+        async with DeviceSimulator(files={"/root/a.txt": "a"}, responses=missing) as device:
+            client = await self._connect(device)
+            try:
+                lister = RemoteLister()
+                lister._strategies[(client.host, client.port)] = FindPrintfListing()
+                entries = await lister.list_directory(client, "/root")
+                assert [e.name for e in entries] == ["a.txt"]
+                assert (await lister.strategy_for(client)).name == "stat"
+            finally:
+                await client.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_cache_prefetch_and_invalidate(self):
+        """
+        测试缓存命中不访问设备、预取一次往返填充多个目录、失效后重新列出
+        """
+        files = {"/customer/a/1.txt": "1", "/customer/b/2.txt": "22", "/customer/c.txt": "c"}
+        async with DeviceSimulator(files=files) as device:
+            client = await self._connect(device)
+            try:
+                lister = RemoteLister()
+                await lister.list_directory(client, "/customer")
+                before = device.commands_executed
+                await lister.list_directory(client, "/customer")
+                assert device.commands_executed == before
+
+                assert await lister.prefetch(client, ["/customer", "/customer/a", "/customer/b", "/nope"]) == 2
+                before = device.commands_executed
+                assert [e.name for e in await lister.list_directory(client, "/customer/b")] == ["2.txt"]
+                assert device.commands_executed == before
+
+                device.fs.write("/customer/b/3.txt", "333")
+                lister.invalidate(client.host, client.port, "/customer/b/3.txt")
+                assert [e.name for e in await lister.list_directory(client, "/customer/b")] == ["2.txt", "3.txt"]
+                # 同级目录不受影响
+                assert lister.cache.get(client.host, client.port, "/customer/a") is not None
+                # 强制刷新绕过缓存
+                device.fs.remove("/customer/c.txt")
+                assert "c.txt" in [e.name for e in await lister.list_directory(client, "/customer")]
+                assert "c.txt" not in [e.name for e in await lister.list_directory(client, "/customer", use_cache=False)]
+            finally:
+                await client.disconnect()
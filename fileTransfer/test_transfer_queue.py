@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发传输队列单元测试
+
+这个文件包含了TransferQueue的并发上限、重试与状态变化，以及设备端下载命令链
+在设备模拟器上一次往返完成下载、chmod和校验和比对，以及校验失败后自动重传的测试用例。
+"""
+
+import asyncio
+import functools
+import hashlib
+import http.server
+import os
+import threading
+
+import pytest
+
+from fileTransfer.transfer_queue import (
+    BASE_TIMEOUT, STATE_DONE, STATE_FAILED, STATE_RETRYING, STATE_RUNNING, TransferJob, TransferQueue, directory_size,
+    download_chain, run_download, transfer_timeout, verify_command
+)
+from telnetTool.device_simulator import DeviceSimulator
+from telnetTool.telnetConnect import CustomTelnetClient
+
+
+class TestTransferQueue:
+    """
+    TransferQueue类的测试用例
+    """
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limits(self):
+        """
+        测试全局和每台设备的并发上限
+        """
+        jobs = [TransferJob(f"{i}.bin", "/data", f"{i}.bin", f"dev{i % 3}") for i in range(12)]
+        active = {}
+        peak = {"total": 0}
+        peak_per_device = {}
+
+        async def handler(job):
+            active[job.device] = active.get(job.device, 0) + 1
+            peak_per_device[job.device] = max(peak_per_device.get(job.device, 0), active[job.device])
+            peak["total"] = max(peak["total"], sum(active.values()))
+            await asyncio.sleep(0.01)
+            active[job.device] -= 1
+            return True
+
+        await TransferQueue(concurrency=4, per_device=2).run(jobs, handler)
+        assert peak["total"] == 4
+        assert max(peak_per_device.values()) == 2
+        assert all(job.state == STATE_DONE and job.attempts == 1 for job in jobs)
+
+    @pytest.mark.asyncio
+    async def test_retry_then_fail(self):
+        """
+        测试失败后重试（异常和返回False都算失败），用尽重试后标记失败并保留原因
+        """
+        flaky = TransferJob("a.bin", "/data", "a.bin")
+        broken = TransferJob("b.bin", "/data", "b.bin")
+        states = []
+
+        async def handler(job):
+            if job is flaky and job.attempts == 1:
+                raise TimeoutError("wget超时")
+            if job is broken:
+                job.error = "磁盘已满"
+                return False
+            return True
+
+        queue = TransferQueue(retries=2, backoff=0.0, on_state=lambda job: states.append((job.name, job.state)))
+        await queue.run([flaky, broken], handler)
+
+        assert (flaky.state, flaky.attempts, flaky.error) == (STATE_DONE, 2, None)
+        assert (broken.state, broken.attempts, broken.error) == (STATE_FAILED, 3, "磁盘已满")
+        assert [state for name, state in states if name == "a.bin"] == [STATE_RUNNING, STATE_RETRYING,
+                                                                         STATE_RUNNING, STATE_DONE]
+        summary = TransferQueue.summarize([flaky, broken])
+        assert (summary["done"], summary["failed"], summary["retries"]) == (1, 1, 3)
+        assert summary["failed_files"] == ["b.bin"]
+
+
+class TestDownloadChain:
+    """
+    设备端下载命令链的测试用例
+    """
+
+    def setup_method(self):
+        """
+        每个测试方法执行前的设置
+        """
+        self.httpd = None
+
+    def teardown_method(self):
+        """
+        每个测试方法执行后的清理
+        """
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+    def _serve(self, tmp_path, files):
+        served = tmp_path / "served"
+        served.mkdir()
+        for name, content in files.items():
+            (served / name).write_bytes(content)
+        handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(served))
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    @staticmethod
+    def _local(tmp_path, name, content) -> str:
+        path = tmp_path / name
+        path.write_bytes(content)
+        return str(path)
+
+    async def _connect(self, device: DeviceSimulator) -> CustomTelnetClient:
+        client = CustomTelnetClient(device.host, device.port, timeout=10.0, log_level="WARNING")
+        await client.connect("root", "root")
+        return client
+
+    def test_chain(self):
+        """
+        测试命令链的组成：续传、可执行权限和带空格的路径
+        """
+        assert download_chain("/data/my dir", "a.bin", "http://h/a.bin", resume=True, executable=True) == (
+            "mkdir -p '/data/my dir' && cd '/data/my dir' && wget -c -O a.bin http://h/a.bin && chmod +x a.bin"
+        )
+        assert "| gunzip -c > a.txt.part && mv -f a.txt.part a.txt" in download_chain(
+            "/data", "a.txt", "http://h/a.txt.gz", compressed=True
+        )
+        assert verify_command("/data/a b") == "ls -l '/data/a b'; sha256sum '/data/a b' 2>/dev/null || md5sum '/data/a b'"
+
+    def test_timeout_scales_with_size(self, tmp_path):
+        """
+        测试批次超时按传输大小推算：小文件保持基础超时，大镜像在慢速Wi-Fi上也有足够时间
+        """
+        assert transfer_timeout(0) == BASE_TIMEOUT
+        assert transfer_timeout(500 * 1024 * 1024) > 3600
+        assert transfer_timeout(2 * 1024 * 1024) > transfer_timeout(1024 * 1024)
+        self._local(tmp_path, "a.bin", b"x" * 10)
+        (tmp_path / "sub").mkdir()
+        self._local(tmp_path / "sub", "b.bin", b"y" * 5)
+        assert directory_size(str(tmp_path)) == 15
+
+    @pytest.mark.asyncio
+    async def test_download_in_one_round_trip(self, tmp_path):
+        """
+        测试一次往返完成建目录、下载、chmod和sha256校验
+        """
+        content = b"\x7fELF" * 100
+        base = self._serve(tmp_path, {"app.bin": content})
+        local = self._local(tmp_path, "app.bin", content)
+        async with DeviceSimulator() as device:
+            client = await self._connect(device)
+            try:
+                before = device.commands_executed
+                result = await run_download(client, "/customer/new dir", "app.bin", f"{base}/app.bin", local,
+                                            executable=True, sha256=hashlib.sha256(content).hexdigest())
+                # 一批分帧命令: 分帧标记3条 + 命令链5条 + ls和sha256sum（成功时跳过md5sum）
+                assert device.commands_executed - before == 3 + 5 + 2
+            finally:
+                await client.disconnect()
+            assert result.ok and result.remote_size == 400
+            assert device.fs.files["/customer/new dir/app.bin"] == content
+            assert device.fs.modes["/customer/new dir/app.bin"] & 0o111
+
+    @pytest.mark.asyncio
+    async def test_failures_reported(self, tmp_path):
+        """
+        测试下载失败、截断和内容损坏都判定为失败，只有截断的文件可续传
+        """
+        base = self._serve(tmp_path, {"a.txt": b"abc", "b.txt": b"xyz"})
+        async with DeviceSimulator() as device:
+            client = await self._connect(device)
+            try:
+                result = await run_download(client, "/data", "missing.txt", f"{base}/missing.txt",
+                                            self._local(tmp_path, "missing.txt", b"abc"))
+                assert not result and "404" in result.detail
+                result = await run_download(client, "/data", "a.txt", f"{base}/a.txt",
+                                            self._local(tmp_path, "a.txt", b"abcde"))
+                assert not result and "大小不一致" in result.detail and result.resumable
+                result = await run_download(client, "/data", "b.txt", f"{base}/b.txt",
+                                            self._local(tmp_path, "b.txt", b"xyZ"))
+                assert not result and "sha256校验不一致" in result.detail and not result.resumable
+            finally:
+                await client.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_md5_fallback(self, tmp_path):
+        """
+        测试设备没有sha256sum时改用md5sum校验
+        """
+        base = self._serve(tmp_path, {"a.txt": b"abc"})
+        responses = {f"sha256sum /data/{name} 2>/dev/null": ("", 127) for name in ("a.txt", "b.txt")}
+        async with DeviceSimulator(responses=responses) as device:
+            client = await self._connect(device)
+            try:
+                ok = await run_download(client, "/data", "a.txt", f"{base}/a.txt", self._local(tmp_path, "a.txt", b"abc"))
+                mismatch = await run_download(client, "/data", "b.txt", f"{base}/a.txt",
+                                              self._local(tmp_path, "b.txt", b"abd"))
+            finally:
+                await client.disconnect()
+        assert ok.ok
+        assert not mismatch and "md5校验不一致" in mismatch.detail
+
+    @pytest.mark.asyncio
+    async def test_queue_resends_after_mismatch(self, tmp_path):
+        """
+        测试队列经多个shell并发传输，校验失败的文件自动重传
+        """
+        files = {f"f{i}.txt": os.urandom(64) for i in range(6)}
+        base = self._serve(tmp_path, files)
+        local = {name: self._local(tmp_path, name, content) for name, content in files.items()}
+        served = tmp_path / "served" / "f0.txt"
+        served.write_bytes(b"!" * 64)  # 第一次下载到损坏的内容
+        async with DeviceSimulator(latency=0.02) as device:
+            shells = [await self._connect(device) for _ in range(3)]
+            idle = asyncio.Queue()
+            for shell in shells:
+                idle.put_nowait(shell)
+
+            async def handler(job):
+                shell = await idle.get()
+                try:
+                    result = await run_download(shell, job.remote_dir, job.name, f"{base}/{job.name}",
+                                                local[job.name], resume=job.resume)
+                    job.error, job.resume = result.detail, result.resumable
+                    if not result:
+                        served.write_bytes(files["f0.txt"])
+                    return result.ok
+                finally:
+                    idle.put_nowait(shell)
+
+            try:
+                jobs = [TransferJob(local[name], "/data", name, "sim") for name in files]
+                await TransferQueue(concurrency=3, per_device=3, backoff=0.0).run(jobs, handler)
+            finally:
+                for shell in shells:
+                    await shell.disconnect()
+            assert all(job.state == STATE_DONE for job in jobs)
+            assert [job.attempts for job in jobs] == [2, 1, 1, 1, 1, 1]
+            assert all(device.fs.files[f"/data/{name}"] == content for name, content in files.items())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+传输服务器指标模块
+
+进程内的轻量指标注册表，供FileHTTPServer的 /metrics 接口输出：
+- 请求数（按方法和状态码）、发送字节数、被拒绝的连接数
+- 活动连接数等即时值（由服务器提供回调）
+- 首字节时间（TTFB）直方图
+- 按客户端统计的传输字节数与吞吐量
+- 暂存存储命中/未命中
+输出格式兼容Prometheus文本格式，也可通过snapshot()获取字典。
+"""
+
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+
+# TTFB直方图的桶上界（秒）
+TTFB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    """累积直方图（非线程安全，由TransferMetrics的锁保护）"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.total += value
+
+    def to_dict(self) -> Dict:
+        return {
+            'buckets': dict(zip(self.buckets, self.counts)),
+            'count': self.count,
+            'sum': self.total,
+        }
+
+
+class TransferMetrics:
+    """
+    传输指标注册表
+
+    所有记录方法都是线程安全的，开销仅为一次加锁和几次整数运算，
+    可以放在请求处理的热路径上。
+    """
+
+    def __init__(self, prefix: str = 'file_transfer'):
+        """
+        初始化指标注册表
+
+        Args:
+            prefix (str): 输出指标名的前缀
+        """
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._ttfb = Histogram(TTFB_BUCKETS)
+        self._client_bytes: Dict[str, int] = defaultdict(int)
+        self._client_seconds: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, Callable[[], float]] = {}
+
+    def record_request(self, method: str, status: int):
+        """记录一个已响应的请求"""
+        with self._lock:
+            self._requests[(method, str(status))] += 1
+
+    def increment(self, name: str, value: int = 1):
+        """累加计数器（如 staging_hits、rejected_connections）"""
+        with self._lock:
+            self._counters[name] += value
+
+    def observe_ttfb(self, seconds: float):
+        """记录一次首字节时间"""
+        with self._lock:
+            self._ttfb.observe(seconds)
+
+    def record_transfer(self, client: str, nbytes: int, seconds: float):
+        """
+        记录一次完成的传输
+
+        Args:
+            client (str): 客户端地址
+            nbytes (int): 发送字节数
+            seconds (float): 传输耗时
+        """
+        with self._lock:
+            self._counters['bytes_sent'] += nbytes
+            self._client_bytes[client] += nbytes
+            self._client_seconds[client] += seconds
+
+    def register_gauge(self, name: str, func: Callable[[], float]):
+        """
+        注册即时值，输出时调用func获取
+
+        Args:
+            name (str): 指标名
+            func (callable): 返回当前值的函数
+        """
+        with self._lock:
+            self._gauges[name] = func
+
+    def snapshot(self) -> Dict:
+        """获取当前全部指标"""
+        with self._lock:
+            requests = {f"{method} {status}": count for (method, status), count in self._requests.items()}
+            counters = dict(self._counters)
+            ttfb = self._ttfb.to_dict()
+            clients = {
+                client: {
+                    'bytes': nbytes,
+                    'seconds': self._client_seconds[client],
+                    'rate': nbytes / self._client_seconds[client] if self._client_seconds[client] > 0 else 0.0,
+                }
+                for client, nbytes in self._client_bytes.items()
+            }
+            gauges = dict(self._gauges)
+        return {
+            'requests': requests,
+            'counters': counters,
+            'gauges': {name: self._safe_call(func) for name, func in gauges.items()},
+            'ttfb_seconds': ttfb,
+            'clients': clients,
+        }
+
+    def render(self) -> str:
+        """以Prometheus文本格式输出全部指标"""
+        data = self.snapshot()
+        p = self.prefix
+        lines: List[str] = [f"# TYPE {p}_requests_total counter"]
+        for key, count in sorted(data['requests'].items()):
+            method, status = key.split(' ', 1)
+            lines.append(f'{p}_requests_total{{method="{method}",status="{status}"}} {count}')
+        for name, value in sorted(data['counters'].items()):
+            lines.append(f"# TYPE {p}_{name}_total counter")
+            lines.append(f"{p}_{name}_total {value}")
+        for name, value in sorted(data['gauges'].items()):
+            lines.append(f"# TYPE {p}_{name} gauge")
+            lines.append(f"{p}_{name} {value}")
+
+        ttfb = data['ttfb_seconds']
+        lines.append(f"# TYPE {p}_ttfb_seconds histogram")
+        for bound, count in ttfb['buckets'].items():
+            lines.append(f'{p}_ttfb_seconds_bucket{{le="{bound}"}} {count}')
+        lines.append(f'{p}_ttfb_seconds_bucket{{le="+Inf"}} {ttfb["count"]}')
+        lines.append(f"{p}_ttfb_seconds_sum {ttfb['sum']:.6f}")
+        lines.append(f"{p}_ttfb_seconds_count {ttfb['count']}")
+
+        lines.append(f"# TYPE {p}_client_bytes_total counter")
+        for client, stats in sorted(data['clients'].items()):
+            lines.append(f'{p}_client_bytes_total{{client="{client}"}} {stats["bytes"]}')
+        lines.append(f"# TYPE {p}_client_throughput_bytes_per_second gauge")
+        for client, stats in sorted(data['clients'].items()):
+            lines.append(f'{p}_client_throughput_bytes_per_second{{client="{client}"}} {stats["rate"]:.1f}')
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _safe_call(func: Callable[[], float]) -> float:
+        try:
+            return func()
+        except Exception:
+            return 0.0
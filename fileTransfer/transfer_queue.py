@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发传输队列模块
+
+把待传输的文件排成队列，由有限数量的并发槽位执行：
+- 全局并发上限，以及每台设备的并发上限（不超过该设备可用的工作shell数）
+- 每个文件独立的状态（等待、传输中、重试中、完成、失败）、尝试次数、错误和耗时
+- 失败后按指数退避重试；设备上留下了不完整的文件时，重试用 wget -c 续传
+- 设备端的建目录、下载、chmod和校验合并为一条命令链，单个文件只需一次往返
+- 校验比对设备端sha256sum（或md5sum）与本地摘要，能发现截断和损坏的文件
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import posixpath
+import re
+import shlex
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fileTransfer.logger_utils import get_logger
+from fileTransfer.remote_listing import LsListing, RemoteEntry
+
+
+# 传输状态
+STATE_PENDING = "pending"
+STATE_RUNNING = "running"
+STATE_RETRYING = "retrying"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+# sha256sum/md5sum的输出行：摘要 + 两个空格 + 文件名
+_DIGEST_LINE = re.compile(r"^([0-9a-fA-F]{64}|[0-9a-fA-F]{32})\s+\S")
+
+# 按大小推算设备端批次超时时使用的保守速率（字节/秒）
+MIN_DOWNLOAD_RATE = 128 * 1024  # 设备Wi-Fi信号差时wget的下载速率
+MIN_DIGEST_RATE = 2 * 1024 * 1024  # 低端设备上sha256sum/md5sum、gunzip或tar解包的处理速率
+BASE_TIMEOUT = 60.0  # 与大小无关的部分：建目录、往返和命令启动
+
+
+class TransferJob:
+    """
+    一个待传输的文件（或目录）
+
+    Attributes:
+        local_path (str): 本地路径
+        remote_dir (str): 远程目标目录
+        name (str): 远程文件名
+        device (str): 目标设备标识（如 "192.168.1.5:23"），同一设备的任务共享设备并发槽位
+        state (str): 当前状态
+        attempts (int): 已开始的尝试次数
+        error (str): 最近一次失败原因
+        resume (bool): 下次尝试是否续传（由处理函数根据上次失败的情况设置）
+    """
+
+    def __init__(self, local_path: str, remote_dir: str, name: str, device: str = ""):
+        self.local_path = local_path
+        self.remote_dir = remote_dir
+        self.name = name
+        self.device = device
+        self.state = STATE_PENDING
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.resume = False
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    @property
+    def remote_path(self) -> str:
+        """远程完整路径"""
+        return posixpath.join(self.remote_dir, self.name)
+
+    @property
+    def elapsed(self) -> float:
+        """从第一次开始到结束（或当前）的耗时（秒）"""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def is_finished(self) -> bool:
+        return self.state in (STATE_DONE, STATE_FAILED)
+
+    def to_dict(self) -> Dict:
+        """转换为状态字典"""
+        return {
+            'name': self.name,
+            'device': self.device,
+            'remote_path': self.remote_path,
+            'state': self.state,
+            'attempts': self.attempts,
+            'error': self.error,
+            'seconds': round(self.elapsed, 3),
+        }
+
+
+class TransferQueue:
+    """
+    带并发上限和重试的传输队列
+
+    处理函数接收TransferJob，成功返回True；返回False或抛出异常视为本次尝试失败。
+    重试时job.attempts大于1，处理函数可通过job.resume记录下次是否续传。
+
+    Example:
+        >>> queue = TransferQueue(concurrency=4, per_device=2, retries=2)
+        >>> jobs = [TransferJob("a.bin", "/customer", "a.bin", "192.168.1.5:23")]
+        >>> await queue.run(jobs, handler)
+        >>> [job.state for job in jobs]
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        per_device: int = 2,
+        retries: int = 2,
+        backoff: float = 1.0,
+        on_state: Optional[Callable[[TransferJob], None]] = None,
+        logger: Optional[logging.Logger] = None
+    ):
+        """
+        初始化队列
+
+        Args:
+            concurrency (int): 同时进行的传输总数上限，默认4
+            per_device (int): 每台设备同时进行的传输数上限，默认2
+            retries (int): 每个文件失败后的重试次数，默认2
+            backoff (float): 第一次重试前的等待秒数，之后每次翻倍，默认1秒
+            on_state (Callable, optional): 任务状态变化时的回调，参数为TransferJob
+            logger (logging.Logger, optional): 日志记录器
+        """
+        self.concurrency = max(1, concurrency)
+        self.per_device = max(1, per_device)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.on_state = on_state
+        self.logger = logger or get_logger(self.__class__)
+
+    async def run(self, jobs: Iterable[TransferJob],
+                  handler: Callable[[TransferJob], Awaitable[bool]]) -> List[TransferJob]:
+        """
+        执行全部任务，直到每个任务完成或用尽重试
+
+        Args:
+            jobs (Iterable[TransferJob]): 任务列表
+            handler (Callable): 执行一次尝试的协程函数
+
+        Returns:
+            List[TransferJob]: 与输入顺序相同的任务列表（状态已更新）
+        """
+        jobs = list(jobs)
+        slots = asyncio.Semaphore(self.concurrency)
+        device_slots: Dict[str, asyncio.Semaphore] = {}
+        for job in jobs:
+            device_slots.setdefault(job.device, asyncio.Semaphore(self.per_device))
+        await asyncio.gather(*(self._run_job(job, handler, slots, device_slots[job.device]) for job in jobs))
+        return jobs
+
+    @staticmethod
+    def summarize(jobs: Iterable[TransferJob]) -> Dict:
+        """
+        汇总任务结果
+
+        Args:
+            jobs (Iterable[TransferJob]): 任务列表
+
+        Returns:
+            Dict: 完成数、失败数、重试总次数和失败文件
+        """
+        jobs = list(jobs)
+        return {
+            'total': len(jobs),
+            'done': sum(1 for job in jobs if job.state == STATE_DONE),
+            'failed': sum(1 for job in jobs if job.state == STATE_FAILED),
+            'retries': sum(max(0, job.attempts - 1) for job in jobs),
+            'failed_files': [job.name for job in jobs if job.state == STATE_FAILED],
+        }
+
+    def _set_state(self, job: TransferJob, state: str) -> None:
+        job.state = state
+        if self.on_state:
+            try:
+                self.on_state(job)
+            except Exception as e:
+                self.logger.error(f"传输状态回调失败: {e}")
+
+    async def _run_job(self, job: TransferJob, handler, slots: asyncio.Semaphore,
+                       device_slot: asyncio.Semaphore) -> None:
+        while True:
+            # 先占设备槽位再占全局槽位，避免等待忙碌设备的任务占着全局名额
+            async with device_slot, slots:
+                job.attempts += 1
+                if job.started is None:
+                    job.started = time.monotonic()
+                self._set_state(job, STATE_RUNNING)
+                try:
+                    success = await handler(job)
+                    job.error = None if success else (job.error or "传输未成功")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    success = False
+                    job.error = str(e) or e.__class__.__name__
+
+            if success:
+                job.finished = time.monotonic()
+                self._set_state(job, STATE_DONE)
+                return
+            if job.attempts > self.retries:
+                job.finished = time.monotonic()
+                self.logger.error(f"❌ 传输失败（共尝试{job.attempts}次）: {job.name} - {job.error}")
+                self._set_state(job, STATE_FAILED)
+                return
+
+            delay = self.backoff * (2 ** (job.attempts - 1))
+            self.logger.warning(f"⚠️ 传输失败，{delay:.1f}秒后重试: {job.name} - {job.error}")
+            self._set_state(job, STATE_RETRYING)
+            await asyncio.sleep(delay)
+
+
+def transfer_timeout(size: int) -> float:
+    """
+    按传输字节数推算设备端下载批次的超时时间
+
+    批次包含下载和随后的校验（或解压、解包），两部分都按保守速率计算，
+    大文件在慢速Wi-Fi上也不会因固定超时而每次重试都失败。
+
+    Args:
+        size (int): 传输的字节数
+
+    Returns:
+        float: 超时时间（秒）
+    """
+    return BASE_TIMEOUT + size / MIN_DOWNLOAD_RATE + size / MIN_DIGEST_RATE
+
+
+def directory_size(local_dir: str) -> int:
+    """
+    统计目录下全部普通文件的字节数（不跟随符号链接）
+
+    Args:
+        local_dir (str): 本地目录
+
+    Returns:
+        int: 总字节数
+    """
+    total = 0
+    for root, _, names in os.walk(local_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            if not os.path.islink(path) and os.path.isfile(path):
+                total += os.path.getsize(path)
+    return total
+
+
+def download_chain(remote_dir: str, name: str, url: str, resume: bool = False,
+                   compressed: bool = False, executable: bool = False) -> str:
+    """
+    生成设备端的下载命令链
+
+    建目录、切换目录、下载、chmod以 && 连接，任一步失败整条命令链即以非零退出码结束。
+    compressed为True时url为gzip变体，先经gunzip解压到临时文件，成功后再改名。
+
+    Args:
+        remote_dir (str): 远程目录
+        name (str): 保存的文件名
+        url (str): 下载URL
+        resume (bool): 是否使用 wget -c 续传
+        compressed (bool): url是否为gzip变体
+        executable (bool): 是否添加可执行权限
+
+    Returns:
+        str: 命令链
+    """
+    quoted_name = shlex.quote(name)
+    steps = [f"mkdir -p {shlex.quote(remote_dir)}", f"cd {shlex.quote(remote_dir)}"]
+    if compressed:
+        partial = shlex.quote(f"{name}.part")
+        steps.append(f"wget -q -O - {shlex.quote(url)} | gunzip -c > {partial}")
+        steps.append(f"mv -f {partial} {quoted_name}")
+    else:
+        steps.append(f"wget {'-c ' if resume else ''}-O {quoted_name} {shlex.quote(url)}")
+    if executable:
+        steps.append(f"chmod +x {quoted_name}")
+    return " && ".join(steps)
+
+
+class DownloadResult:
+    """
+    一次设备端下载的结果
+
+    Attributes:
+        ok (bool): 是否成功（命令链成功且校验通过）
+        detail (str): 失败原因，成功时为命令链输出
+        remote_size (int): 设备上文件的大小，文件不存在时为None
+        resumable (bool): 设备上留下了比本地短的文件，下次可用 wget -c 续传；
+            大小相同但校验和不一致说明内容损坏，需要完整重传
+    """
+
+    def __init__(self, ok: bool, detail: str, remote_size: Optional[int] = None, resumable: bool = False):
+        self.ok = ok
+        self.detail = detail
+        self.remote_size = remote_size
+        self.resumable = resumable
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+
+def verify_command(path: str) -> str:
+    """
+    生成设备端的校验命令：ls -l 取大小，优先sha256sum，busybox未编入时退回md5sum
+
+    Args:
+        path (str): 远程文件路径
+
+    Returns:
+        str: 校验命令
+    """
+    quoted = shlex.quote(path)
+    return f"ls -l {quoted}; sha256sum {quoted} 2>/dev/null || md5sum {quoted}"
+
+
+def file_digest(path: str, algorithm: str = "sha256") -> str:
+    """
+    计算本地文件的十六进制摘要
+
+    Args:
+        path (str): 本地文件路径
+        algorithm (str): hashlib算法名，默认sha256
+
+    Returns:
+        str: 十六进制摘要
+    """
+    hasher = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def _parse_verify_output(output: str) -> Tuple[Optional[RemoteEntry], Optional[str]]:
+    """从校验命令输出中解析出ls记录和摘要（按长度区分sha256与md5）"""
+    entry, digest = None, None
+    for line in output.splitlines():
+        line = line.strip()
+        match = _DIGEST_LINE.match(line)
+        if match:
+            digest = match.group(1).lower()
+        elif entry is None:
+            entry = LsListing().parse_line(line)
+    return entry, digest
+
+
+async def run_download(shell, remote_dir: str, name: str, url: str, local_path: str,
+                       resume: bool = False, compressed: bool = False, executable: bool = False,
+                       sha256: Optional[str] = None, timeout: Optional[float] = None) -> DownloadResult:
+    """
+    在设备上执行下载命令链并校验结果，整个过程一次往返
+
+    命令链与校验命令在同一批命令中发送：命令链退出码为0，且设备上文件的大小和
+    校验和都与本地文件一致才视为成功。设备只有md5sum时在线程池中按需计算本地文件的MD5；
+    两者都没有时只校验大小。
+
+    Args:
+        shell (CustomTelnetClient): 已登录的客户端（调用方负责串行化）
+        remote_dir (str): 远程目录
+        name (str): 保存的文件名
+        url (str): 下载URL
+        local_path (str): 本地文件路径，用于比对大小和校验和
+        resume (bool): 是否续传
+        compressed (bool): url是否为gzip变体
+        executable (bool): 是否添加可执行权限
+        sha256 (str, optional): 本地文件的SHA-256（例如暂存时已算好），默认现算
+        timeout (float, optional): 超时时间，默认按本地文件大小推算（见 transfer_timeout）
+
+    Returns:
+        DownloadResult: 下载结果
+    """
+    size = os.path.getsize(local_path)
+    if timeout is None:
+        timeout = transfer_timeout(size)
+    chain = download_chain(remote_dir, name, url, resume=resume, compressed=compressed, executable=executable)
+    commands = [chain, verify_command(posixpath.join(remote_dir, name))]
+    if compressed:
+        # 失败时不留下不完整的临时文件
+        commands.append(f"rm -f {shlex.quote(posixpath.join(remote_dir, name + '.part'))}")
+    (output, code), (verify_output, _) = (await shell.execute_many(commands, timeout=timeout))[:2]
+
+    entry, remote_digest = _parse_verify_output(verify_output)
+    remote_size = entry.size if entry else None
+    resumable = remote_size is not None and 0 < remote_size < size and not compressed
+    if code != 0:
+        return DownloadResult(False, f"命令链退出码 {code}: {output.strip()[-200:]}", remote_size, resumable)
+    if entry is None:
+        return DownloadResult(False, f"下载后文件不存在: {verify_output.strip()[-200:]}")
+    if remote_size != size:
+        return DownloadResult(False, f"文件大小不一致: 设备 {remote_size} 字节，本地 {size} 字节",
+                              remote_size, resumable)
+    if remote_digest is None:
+        return DownloadResult(True, output, remote_size)
+
+    algorithm = "sha256" if len(remote_digest) == 64 else "md5"
+    if algorithm == "sha256" and sha256:
+        local_digest = sha256
+    else:
+        # 大文件的哈希在线程池中计算，不阻塞其他工作shell共用的事件循环
+        local_digest = await asyncio.get_running_loop().run_in_executor(None, file_digest, local_path, algorithm)
+    if remote_digest != local_digest:
+        return DownloadResult(False, f"{algorithm}校验不一致: 设备 {remote_digest}，本地 {local_digest}",
+                              remote_size)
+    return DownloadResult(True, output, remote_size)
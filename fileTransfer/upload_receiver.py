@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+上传接收模块
+
+让设备通过 PUT/POST 把文件推送回本机（wget --post-file、curl -T 或 nc），
+请求体直接流式写入磁盘，不需要在设备上启动httpd服务。
+"""
+
+import os
+import threading
+import uuid
+from typing import BinaryIO, Dict, Optional, Set
+import logging
+
+
+UPLOAD_PREFIX = "upload/"  # 上传URL路径前缀
+UNREGISTERED_MAX_SIZE = 64 * 1024 * 1024  # 未登记上传的默认大小上限，防止局域网主机任意写满磁盘
+
+
+class UploadError(Exception):
+    """上传请求无效或写入失败"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class PendingUpload:
+    """
+    等待设备推送的上传
+
+    Attributes:
+        name (str): 上传URL中的名称
+        target_path (str): 本地保存路径
+        size (int): 已接收字节数
+        error (str): 最近一次接收失败的原因，成功时为None
+    """
+
+    def __init__(self, name: str, target_path: str):
+        self.name = name
+        self.target_path = target_path
+        self.size = 0
+        self.error: Optional[str] = None
+        self._done = threading.Event()
+
+    @property
+    def succeeded(self) -> bool:
+        """是否已成功接收"""
+        return self._done.is_set() and self.error is None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待上传完成
+
+        Args:
+            timeout (float, optional): 超时时间（秒）
+
+        Returns:
+            bool: 是否在超时前成功完成
+        """
+        return self._done.wait(timeout) and self.error is None
+
+    def finish(self, error: Optional[str] = None):
+        """标记上传结束"""
+        self.error = error
+        self._done.set()
+
+
+class UploadReceiver:
+    """
+    上传接收器
+
+    预先登记的上传（expect）写入指定的本地路径，登记保留到接收成功或被取消为止；
+    未登记的上传按文件名保存到上传目录，并受unregistered_max_size限制。
+    数据先写入 .part 临时文件，完整接收后再改名，避免留下半截文件。
+    """
+
+    def __init__(self, upload_dir: str, logger: logging.Logger, max_size: Optional[int] = None,
+                 buffer_size: int = 1024 * 1024, unregistered_max_size: Optional[int] = UNREGISTERED_MAX_SIZE):
+        """
+        初始化上传接收器
+
+        Args:
+            upload_dir (str): 未登记上传的保存目录
+            logger (logging.Logger): 日志记录器
+            max_size (int, optional): 单个上传的最大字节数，默认不限
+            buffer_size (int): 读写缓冲区大小，默认1MB
+            unregistered_max_size (int, optional): 未登记上传的最大字节数，默认64MB，None表示不限
+        """
+        self.upload_dir = upload_dir
+        self.logger = logger
+        self.max_size = max_size
+        self.unregistered_max_size = unregistered_max_size
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._pending: Dict[str, PendingUpload] = {}
+        self._receiving: Set[str] = set()
+
+    def expect(self, target_path: str, name: Optional[str] = None) -> PendingUpload:
+        """
+        登记一个等待设备推送的上传
+
+        Args:
+            target_path (str): 本地保存路径
+            name (str, optional): 上传URL中的名称，默认随机生成
+
+        Returns:
+            PendingUpload: 可等待的上传记录
+        """
+        name = name or f"{uuid.uuid4().hex[:12]}_{os.path.basename(target_path)}"
+        pending = PendingUpload(name, target_path)
+        with self._lock:
+            self._pending[name] = pending
+        return pending
+
+    def cancel(self, name: str):
+        """取消登记的上传"""
+        with self._lock:
+            pending = self._pending.pop(name, None)
+        if pending and not pending.succeeded:
+            pending.finish("已取消")
+
+    def receive(self, name: str, stream: BinaryIO, content_length: Optional[int],
+                chunked: bool = False) -> PendingUpload:
+        """
+        接收请求体并写入磁盘
+
+        Args:
+            name (str): 上传URL中的名称（不含前缀）
+            stream (BinaryIO): 请求体输入流
+            content_length (int, optional): Content-Length，None表示读到连接关闭
+            chunked (bool): 是否为chunked编码
+
+        Returns:
+            PendingUpload: 完成的上传记录
+
+        Raises:
+            UploadError: 名称无效、同名上传正在接收、超出大小限制或数据不完整
+        """
+        if not name or '/' in name or '\\' in name or name in ('.', '..'):
+            raise UploadError(403, "Invalid upload name")
+
+        # 登记在接收成功前一直保留：wget中途失败后，nc等回退方式仍能写入登记的目标路径
+        with self._lock:
+            pending = self._pending.get(name)
+            if pending:
+                if name in self._receiving:
+                    raise UploadError(409, "Upload already in progress")
+                self._receiving.add(name)
+        registered = pending is not None
+        try:
+            limits = [self.max_size] if registered else [self.max_size, self.unregistered_max_size]
+            limit = min((value for value in limits if value), default=None)
+            if content_length is not None and limit and content_length > limit:
+                raise UploadError(413, "Upload too large")
+            if not registered:
+                os.makedirs(self.upload_dir, exist_ok=True)
+                pending = PendingUpload(name, self._unique_path(os.path.join(self.upload_dir, name)))
+            self._write(pending, stream, content_length, chunked, limit)
+        except Exception as e:
+            if registered:
+                # 只记录失败原因，不结束等待，留给回退方式重试
+                pending.error = str(e)
+                self.logger.warning(f"上传接收失败，保留登记等待重试: {name} - {e}")
+            if isinstance(e, UploadError):
+                raise
+            raise UploadError(500, str(e))
+        finally:
+            if registered:
+                with self._lock:
+                    self._receiving.discard(name)
+
+        if registered:
+            with self._lock:
+                if self._pending.get(name) is pending:
+                    del self._pending[name]
+        pending.finish()
+        self.logger.info(f"上传接收完成: {name} ({pending.size} bytes) -> {pending.target_path}")
+        return pending
+
+    def _write(self, pending: PendingUpload, stream: BinaryIO, content_length: Optional[int],
+               chunked: bool, limit: Optional[int]):
+        """先写入 .part 临时文件，完整接收后再改名为目标路径"""
+        partial_path = f"{pending.target_path}.part"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(pending.target_path)), exist_ok=True)
+            with open(partial_path, 'wb') as f:
+                if chunked:
+                    pending.size = self._copy_chunked(stream, f, limit)
+                else:
+                    pending.size = self._copy(stream, f, content_length, limit)
+            if content_length is not None and pending.size != content_length:
+                raise UploadError(400, f"Incomplete upload: {pending.size}/{content_length} bytes")
+            os.replace(partial_path, pending.target_path)
+        except Exception:
+            try:
+                os.remove(partial_path)
+            except OSError:
+                pass
+            raise
+
+    def _copy(self, stream: BinaryIO, f: BinaryIO, length: Optional[int], limit: Optional[int]) -> int:
+        """复制定长（或直到EOF）的请求体"""
+        buffer = bytearray(self.buffer_size)
+        view = memoryview(buffer)
+        received = 0
+        while length is None or received < length:
+            want = len(buffer) if length is None else min(len(buffer), length - received)
+            n = stream.readinto(view[:want])
+            if not n:
+                break
+            f.write(view[:n])
+            received += n
+            self._check_size(received, limit)
+        return received
+
+    def _copy_chunked(self, stream: BinaryIO, f: BinaryIO, limit: Optional[int]) -> int:
+        """复制chunked编码的请求体"""
+        received = 0
+        while True:
+            line = stream.readline(1024)
+            if not line:
+                raise UploadError(400, "Truncated chunked body")
+            try:
+                chunk_size = int(line.split(b';', 1)[0].strip(), 16)
+            except ValueError:
+                raise UploadError(400, "Invalid chunk size")
+            if chunk_size == 0:
+                # 跳过trailer直到空行
+                while stream.readline(1024) not in (b'\r\n', b'\n', b''):
+                    pass
+                return received
+            copied = self._copy(stream, f, chunk_size, limit - received if limit else None)
+            if copied != chunk_size:
+                raise UploadError(400, "Truncated chunk")
+            received += copied
+            self._check_size(received, limit)
+            stream.readline(1024)  # 块结尾的CRLF
+
+    @staticmethod
+    def _check_size(received: int, limit: Optional[int]):
+        if limit and received > limit:
+            raise UploadError(413, "Upload too large")
+
+    @staticmethod
+    def _unique_path(path: str) -> str:
+        """目标文件已存在时生成新文件名"""
+        if not os.path.exists(path):
+            return path
+        base_name, ext = os.path.splitext(path)
+        counter = 1
+        while os.path.exists(f"{base_name}_{counter}{ext}"):
+            counter += 1
+        return f"{base_name}_{counter}{ext}"
@@ -168,26 +168,15 @@ class OTA_test:
                 while True:
                     if current_time >= retry_time:
                         break
-                    response: str = await self.tn.send_command(cmd, read_timeout=2)
+                    # 分帧执行：结束标记到达即返回，输出不含命令回显和提示符
+                    response, _ = await self.tn.send_command_framed(cmd)
                     current_time += 1
-                    if len(response) <= 0:
-                        continue
-                    elif config["password"] in response:
-                        continue
-                    else:
-                        response_tmp = response.split('\n')
-                        response2 = [x for x in response_tmp if
-                                     'busybox telnetd' not in x and '/ #' not in x and '# ' not in x]
-                        current_cmd_response = response2[-1]
-                        cmd_response_matches = current_cmd_response
-                        # print(f"++++++{response2}++++++")
-                        if expect_response == 'any':
-                            break
-                        else:
-                            if expect_response in cmd_response_matches:
-                                break
-                            else:
-                                continue
+                    response_lines = [x for x in response.split('\n') if x.strip()]
+                    cmd_response_matches = response_lines[-1] if response_lines else ''
+                    if expect_response == 'any':
+                        break
+                    elif expect_response in cmd_response_matches:
+                        break
             except ConnectionError as e:
                 if _ < retry_time - 1:
                     logging.warning(f"{self.host}：连接失败: {e}，等待30秒后重试...")
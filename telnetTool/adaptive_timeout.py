@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应超时模块
+
+按设备维护TCP式（RFC 6298）的平滑往返时间SRTT和偏差RTTVAR：
+
+    RTTVAR = (1 - β)·RTTVAR + β·|SRTT - R|
+    SRTT   = (1 - α)·SRTT + α·R
+    RTO    = SRTT + K·RTTVAR
+
+样本取自发送命令到收到第一个数据块（命令回显）的时间，只反映链路往返，
+不包含命令本身的执行时间。命令超时、提示符后的等待时间都由这些数值推出，
+局域网设备不必空等固定的秒数，慢速Wi-Fi设备也不会因固定超时而失败。
+
+命令按类别（交互/长任务/登录）使用不同的倍数和上下限，可通过set_policy覆盖。
+"""
+
+import shlex
+import threading
+from typing import Dict, Optional
+
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LOGIN = "login"
+
+# 耗时可能较长的命令（传输、打包、校验等）
+BULK_COMMANDS = frozenset({
+    "wget", "curl", "tar", "gzip", "gunzip", "zip", "unzip", "dd", "cp", "mv",
+    "md5sum", "sha256sum", "find", "du", "logread", "sync",
+})
+
+
+def classify_command(command: str) -> str:
+    """
+    判断命令类别
+
+    管道或命令链中任一段是耗时命令即视为长任务。
+
+    Args:
+        command (str): 要执行的命令
+
+    Returns:
+        str: INTERACTIVE 或 BULK
+    """
+    for separator in ("&&", "||", "|", ";"):
+        command = command.replace(separator, "\n")
+    for segment in command.splitlines():
+        try:
+            words = shlex.split(segment)
+        except ValueError:
+            words = segment.split()
+        if words and words[0].rsplit("/", 1)[-1] in BULK_COMMANDS:
+            return BULK
+    return INTERACTIVE
+
+
+class RttEstimator:
+    """
+    单台设备的往返时间估计
+
+    Attributes:
+        srtt (float): 平滑往返时间（秒），尚无样本时为None
+        rttvar (float): 往返时间偏差（秒）
+        samples (int): 已记录的样本数
+    """
+
+    def __init__(self, initial_rto: float = 1.0, alpha: float = 0.125, beta: float = 0.25, k: float = 4.0):
+        """
+        初始化估计器
+
+        Args:
+            initial_rto (float): 尚无样本时使用的RTO（秒），默认1秒
+            alpha (float): SRTT的平滑系数，默认1/8
+            beta (float): RTTVAR的平滑系数，默认1/4
+            k (float): RTO中RTTVAR的倍数，默认4
+        """
+        self.initial_rto = initial_rto
+        self.alpha = alpha
+        self.beta = beta
+        self.k = k
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+        self.samples = 0
+        self._lock = threading.Lock()
+
+    def observe(self, rtt: float) -> None:
+        """
+        记录一个往返时间样本
+
+        Args:
+            rtt (float): 往返时间（秒）
+        """
+        if rtt < 0:
+            return
+        with self._lock:
+            if self.srtt is None:
+                self.srtt = rtt
+                self.rttvar = rtt / 2
+            else:
+                self.rttvar = (1 - self.beta) * self.rttvar + self.beta * abs(self.srtt - rtt)
+                self.srtt = (1 - self.alpha) * self.srtt + self.alpha * rtt
+            self.samples += 1
+
+    @property
+    def rto(self) -> float:
+        """重传超时RTO（秒）"""
+        if self.srtt is None:
+            return self.initial_rto
+        return self.srtt + self.k * self.rttvar
+
+
+class TimeoutPolicy:
+    """
+    一类命令的超时策略：timeout = clamp(multiplier × RTO, minimum, maximum)
+
+    Attributes:
+        multiplier (float): RTO的倍数
+        minimum (float): 下限（秒）
+        maximum (float): 上限（秒），None表示使用调用方提供的上限
+    """
+
+    def __init__(self, multiplier: float, minimum: float, maximum: Optional[float] = None):
+        self.multiplier = multiplier
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def __repr__(self) -> str:
+        return f"TimeoutPolicy(multiplier={self.multiplier}, minimum={self.minimum}, maximum={self.maximum})"
+
+
+class AdaptiveTimeouts:
+    """
+    按设备的自适应超时
+
+    Example:
+        >>> timeouts = get_adaptive_timeouts()
+        >>> timeouts.observe("192.168.1.100", 0.012)
+        >>> timeouts.timeout_for("192.168.1.100", "ls /")
+        5.0
+        >>> timeouts.set_policy(BULK, minimum=120)   # 慢速链路上的大文件传输
+    """
+
+    def __init__(self, policies: Optional[Dict[str, TimeoutPolicy]] = None):
+        """
+        初始化
+
+        Args:
+            policies (Dict[str, TimeoutPolicy], optional): 各命令类别的策略，默认使用内置策略
+        """
+        self.policies: Dict[str, TimeoutPolicy] = {
+            INTERACTIVE: TimeoutPolicy(multiplier=20.0, minimum=5.0),
+            BULK: TimeoutPolicy(multiplier=100.0, minimum=60.0, maximum=900.0),
+            LOGIN: TimeoutPolicy(multiplier=10.0, minimum=10.0, maximum=30.0),
+        }
+        if policies:
+            self.policies.update(policies)
+        self._estimators: Dict[str, RttEstimator] = {}
+        self._lock = threading.Lock()
+
+    def estimator(self, host: str) -> RttEstimator:
+        """获取设备的往返时间估计器（不存在时创建）"""
+        with self._lock:
+            estimator = self._estimators.get(host)
+            if estimator is None:
+                estimator = self._estimators[host] = RttEstimator()
+            return estimator
+
+    def observe(self, host: str, rtt: float) -> None:
+        """
+        记录设备的往返时间样本
+
+        Args:
+            host (str): 设备地址
+            rtt (float): 往返时间（秒）
+        """
+        self.estimator(host).observe(rtt)
+
+    def set_policy(
+        self,
+        kind: str,
+        multiplier: Optional[float] = None,
+        minimum: Optional[float] = None,
+        maximum: Optional[float] = None
+    ) -> None:
+        """
+        覆盖某类命令的超时策略（未提供的参数保持不变）
+
+        Args:
+            kind (str): INTERACTIVE、BULK 或 LOGIN
+            multiplier (float, optional): RTO的倍数
+            minimum (float, optional): 下限（秒）
+            maximum (float, optional): 上限（秒）
+        """
+        policy = self.policies.setdefault(kind, TimeoutPolicy(multiplier=20.0, minimum=5.0))
+        if multiplier is not None:
+            policy.multiplier = multiplier
+        if minimum is not None:
+            policy.minimum = minimum
+        if maximum is not None:
+            policy.maximum = maximum
+
+    def timeout_for(
+        self,
+        host: str,
+        command: Optional[str] = None,
+        kind: Optional[str] = None,
+        ceiling: Optional[float] = None
+    ) -> float:
+        """
+        计算命令超时时间
+
+        Args:
+            host (str): 设备地址
+            command (str, optional): 命令，未提供kind时用于判断类别
+            kind (str, optional): 命令类别，默认由classify_command判断
+            ceiling (float, optional): 策略未设置上限时使用的上限
+
+        Returns:
+            float: 超时时间（秒）
+        """
+        kind = kind or (classify_command(command) if command else INTERACTIVE)
+        policy = self.policies.get(kind) or self.policies[INTERACTIVE]
+        timeout = max(policy.minimum, policy.multiplier * self.estimator(host).rto)
+        maximum = policy.maximum if policy.maximum is not None else ceiling
+        if maximum is not None:
+            timeout = min(timeout, max(maximum, policy.minimum))
+        return timeout
+
+    def settle_time(self, host: str, minimum: float = 0.05, maximum: float = 0.5) -> float:
+        """
+        输出到达后等待后续数据（如提示符）的时间
+
+        Args:
+            host (str): 设备地址
+            minimum (float): 下限（秒），默认0.05
+            maximum (float): 上限（秒），尚无样本时使用，默认0.5
+
+        Returns:
+            float: 等待时间（秒）
+        """
+        estimator = self.estimator(host)
+        if estimator.srtt is None:
+            return maximum
+        return min(maximum, max(minimum, 2 * estimator.srtt + estimator.k * estimator.rttvar))
+
+    def reset(self, host: Optional[str] = None) -> None:
+        """
+        清除往返时间统计
+
+        Args:
+            host (str, optional): 设备地址，默认清除全部设备
+        """
+        with self._lock:
+            if host is None:
+                self._estimators.clear()
+            else:
+                self._estimators.pop(host, None)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        获取各设备的往返时间统计
+
+        Returns:
+            Dict[str, Dict[str, float]]: {host: {"srtt", "rttvar", "rto", "samples"}}
+        """
+        with self._lock:
+            estimators = dict(self._estimators)
+        return {
+            host: {
+                'srtt': estimator.srtt,
+                'rttvar': estimator.rttvar,
+                'rto': estimator.rto,
+                'samples': estimator.samples,
+            }
+            for host, estimator in estimators.items()
+        }
+
+
+_adaptive_timeouts = AdaptiveTimeouts()
+
+
+def get_adaptive_timeouts() -> AdaptiveTimeouts:
+    """
+    获取进程级的自适应超时（同一设备的所有连接共享往返时间统计）
+
+    Returns:
+        AdaptiveTimeouts: 自适应超时
+    """
+    return _adaptive_timeouts
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telnet客户端端到端基准测试
+
+在本机启动DeviceSimulator，按不同的链路配置（延迟、抖动、带宽）测量现有客户端的
+每秒命令数和单条命令延迟分位数：
+- custom.execute_command: CustomTelnetClient逐条执行
+- custom.execute_many: CustomTelnetClient分帧批量执行（每批 --batch 条）
+- connector.send_command: Telnet_connector按静默时间判定命令结束
+- connector.send_command_framed: Telnet_connector分帧执行
+
+用法:
+    python telnetTool/benchmark_device.py --profiles lan wifi --commands 50
+    python telnetTool/benchmark_device.py --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+
+# 添加当前目录和仓库根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from adaptive_timeout import get_adaptive_timeouts
+from device_simulator import DeviceSimulator
+from fleet_runner import percentile
+from telnetConnect import CustomTelnetClient
+from telnet_connecter import Telnet_connector
+
+
+# 链路配置: (单向延迟秒, 抖动秒, 带宽字节/秒)
+PROFILES: Dict[str, Dict[str, float]] = {
+    "lan": {"latency": 0.001, "jitter": 0.0005, "bandwidth": None},
+    "wifi": {"latency": 0.03, "jitter": 0.01, "bandwidth": 250_000},
+    "slow": {"latency": 0.15, "jitter": 0.05, "bandwidth": 50_000},
+}
+
+LOG_TEXT = "".join(f"[{i:05d}] kernel: 设备日志 line {i}\n" for i in range(100))
+WORKLOAD = ["pwd", "ls -l /root", "cat /root/log.txt", "ls /tmp"]
+USERNAME, PASSWORD = "root", "bench"
+
+
+def summarize(name: str, profile: str, latencies: List[float], commands: int, elapsed: float) -> Dict:
+    """汇总一组测量结果"""
+    return {
+        "client": name,
+        "profile": profile,
+        "commands": commands,
+        "commands_per_sec": commands / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def measure(count: int, run_one: Callable[[int], Awaitable[int]]) -> tuple:
+    """
+    重复执行run_one直到完成count条命令
+
+    Returns:
+        tuple: (每次调用的单条命令延迟列表, 实际命令数, 总耗时)
+    """
+    latencies: List[float] = []
+    done = 0
+    start = time.perf_counter()
+    while done < count:
+        begin = time.perf_counter()
+        executed = await run_one(done)
+        per_command = (time.perf_counter() - begin) / executed
+        latencies.extend([per_command] * executed)
+        done += executed
+    return latencies, done, time.perf_counter() - start
+
+
+async def bench_custom(device: DeviceSimulator, profile: str, count: int, batch: int) -> List[Dict]:
+    """CustomTelnetClient的逐条和批量执行"""
+    client = CustomTelnetClient(device.host, device.port, timeout=60.0, log_level="WARNING")
+    await client.connect(USERNAME, PASSWORD)
+    results = []
+    try:
+        async def single(i: int) -> int:
+            await client.execute_command(WORKLOAD[i % len(WORKLOAD)])
+            return 1
+
+        async def many(i: int) -> int:
+            commands = [WORKLOAD[(i + j) % len(WORKLOAD)] for j in range(batch)]
+            await client.execute_many(commands)
+            return len(commands)
+
+        results.append(summarize("custom.execute_command", profile, *await measure(count, single)))
+        results.append(summarize(f"custom.execute_many(x{batch})", profile, *await measure(count, many)))
+    finally:
+        await client.disconnect()
+    return results
+
+
+async def bench_connector(device: DeviceSimulator, profile: str, count: int) -> List[Dict]:
+    """Telnet_connector的静默判定和分帧执行"""
+    connector = Telnet_connector(device.host, device.port, username=USERNAME, password=PASSWORD)
+    await connector.connect()
+    results = []
+    try:
+        async def quiet(i: int) -> int:
+            await connector.send_command(WORKLOAD[i % len(WORKLOAD)])
+            return 1
+
+        async def framed(i: int) -> int:
+            await connector.send_command_framed(WORKLOAD[i % len(WORKLOAD)])
+            return 1
+
+        results.append(summarize("connector.send_command", profile, *await measure(count, quiet)))
+        results.append(summarize("connector.send_command_framed", profile, *await measure(count, framed)))
+    finally:
+        await connector.disconnect()
+    return results
+
+
+async def run_profile(profile: str, count: int, batch: int, skip_connector: bool) -> List[Dict]:
+    """在一个链路配置下运行全部客户端"""
+    settings = PROFILES[profile]
+    device = DeviceSimulator(password=PASSWORD, files={"/root/log.txt": LOG_TEXT}, seed=1, **settings)
+    async with device:
+        # 各配置独立统计往返时间，避免上一个配置的数据影响超时计算
+        get_adaptive_timeouts().reset(device.host)
+        results = await bench_custom(device, profile, count, batch)
+        if not skip_connector:
+            results += await bench_connector(device, profile, count)
+    return results
+
+
+def print_table(results: List[Dict]) -> None:
+    """打印结果表格"""
+    header = f"{'client':<34}{'profile':<8}{'cmds':>6}{'cmds/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['client']:<34}{r['profile']:<8}{r['commands']:>6}{r['commands_per_sec']:>10.1f}"
+              f"{r['p50_ms']:>10.1f}{r['p90_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+
+
+async def main_async(args: argparse.Namespace) -> List[Dict]:
+    results = []
+    for profile in args.profiles:
+        results += await run_profile(profile, args.commands, args.batch, args.skip_connector)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Telnet客户端端到端基准测试（本地设备模拟器）")
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=["lan", "wifi"])
+    parser.add_argument("--commands", type=int, default=40, help="每个客户端执行的命令数")
+    parser.add_argument("--batch", type=int, default=8, help="execute_many每批命令数")
+    parser.add_argument("--skip-connector", action="store_true", help="跳过Telnet_connector（登录需要数秒）")
+    parser.add_argument("--json", help="把结果写入JSON文件")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(main_async(args))
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
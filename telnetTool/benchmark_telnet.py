@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telnet提示符匹配性能基准测试
+
+用合成的多MB命令输出（中英文混合，多字节字符会落在chunk边界上）比较：
+- legacy: 逐chunk解码后拼接字符串，并在整个响应中查找提示符（原实现）
+- matcher: StreamMatcher增量匹配（bytearray + 增量解码 + 只扫描新数据）
+- wait_for_prompt: 通过模拟reader调用CustomTelnetClient._wait_for_prompt的端到端耗时
+
+用法:
+    python telnetTool/benchmark_telnet.py --sizes-mb 1 4 8 --chunk-size 1024
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stream_matcher import StreamMatcher
+from telnetConnect import CustomTelnetClient
+
+
+PROMPT = "root@device:~# "
+
+
+def make_output(size_mb: float) -> bytes:
+    """生成指定大小、以提示符结尾的合成命令输出"""
+    line = "-rw-r--r-- 1 root root 4096 Jan 01 00:00 日志文件_log.txt\r\n".encode("utf-8")
+    target = int(size_mb * 1024 * 1024)
+    body = line * (target // len(line) + 1)
+    return body[:target] + PROMPT.encode("utf-8")
+
+
+def split_chunks(data: bytes, chunk_size: int) -> List[bytes]:
+    """按固定大小切分（故意不对齐字符边界）"""
+    return [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+
+
+def legacy_match(chunks: List[bytes], prompt: str) -> str:
+    """原实现：字符串拼接 + 全量查找；跨chunk的多字节字符解码失败会被丢弃"""
+    response = ""
+    for chunk in chunks:
+        try:
+            response += chunk.decode("utf-8")
+        except UnicodeDecodeError:
+            continue
+        if prompt in response:
+            return response
+    return response
+
+
+def matcher_match(chunks: List[bytes], prompt: str) -> str:
+    """增量匹配实现"""
+    matcher = StreamMatcher([prompt])
+    for chunk in chunks:
+        if matcher.feed(chunk):
+            break
+    return matcher.text
+
+
+class _ChunkReader:
+    """按预先切好的chunk返回数据的模拟reader"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    async def read(self, n: int) -> bytes:
+        chunk = self.data[self.pos:self.pos + n]
+        self.pos += len(chunk)
+        return chunk
+
+
+def wait_for_prompt_once(data: bytes) -> str:
+    """通过模拟reader运行一次_wait_for_prompt"""
+    client = CustomTelnetClient(host="127.0.0.1", log_level="WARNING")
+    client.reader = _ChunkReader(data)
+    return asyncio.run(client._wait_for_prompt(PROMPT, timeout=600.0))
+
+
+def _timed(func, *args) -> Dict:
+    start = time.perf_counter()
+    result = func(*args)
+    return {"seconds": time.perf_counter() - start, "chars": len(result)}
+
+
+def run_benchmark(sizes_mb: List[float], chunk_size: int) -> List[Dict]:
+    """
+    运行基准测试
+
+    Args:
+        sizes_mb (List[float]): 输出大小列表（MB）
+        chunk_size (int): 模拟的单次读取大小
+
+    Returns:
+        List[Dict]: 每种实现在每种大小下的结果
+    """
+    rows = []
+    for size_mb in sizes_mb:
+        data = make_output(size_mb)
+        chunks = split_chunks(data, chunk_size)
+        expected = len(data.decode("utf-8"))
+        for variant, func, args in (
+            ("legacy", legacy_match, (chunks, PROMPT)),
+            ("matcher", matcher_match, (chunks, PROMPT)),
+            ("wait_for_prompt", wait_for_prompt_once, (data,)),
+        ):
+            result = _timed(func, *args)
+            rows.append({
+                "size_mb": size_mb,
+                "variant": variant,
+                "seconds": result["seconds"],
+                "mb_per_s": size_mb / result["seconds"] if result["seconds"] > 0 else 0.0,
+                "lost_chars": expected - result["chars"],
+            })
+    return rows
+
+
+def _print_table(rows: List[Dict], columns: List[str]):
+    """打印结果表格"""
+    print(" | ".join(f"{c:>16}" for c in columns))
+    for row in rows:
+        cells = []
+        for c in columns:
+            value = row[c]
+            cells.append(f"{value:>16.3f}" if isinstance(value, float) else f"{str(value):>16}")
+        print(" | ".join(cells))
+
+
+def main():
+    """基准测试入口"""
+    parser = argparse.ArgumentParser(description="Telnet提示符匹配性能基准测试")
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 4, 8], help="合成输出大小(MB)")
+    parser.add_argument("--chunk-size", type=int, default=1024, help="单次读取的字节数")
+    args = parser.parse_args()
+
+    rows = run_benchmark(args.sizes_mb, args.chunk_size)
+    _print_table(rows, ["size_mb", "variant", "seconds", "mb_per_s", "lost_chars"])
+
+
+if __name__ == "__main__":
+    main()
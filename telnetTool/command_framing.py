@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令分帧模块
+
+在命令前后各输出一个带随机nonce的标记，结束标记中附带命令的退出码 ($?)：
+
+    echo __TFB""_<nonce>; <command>; echo __TFE""_<nonce>_$?
+
+shell回显的命令行里标记被引号拆开，不会被误认为标记；只有shell真正执行echo后
+才会出现完整的 __TFB_<nonce> / __TFE_<nonce>_<退出码>。结束标记一到达即可判定
+命令完成，不需要再等待一段静默时间。
+"""
+
+import re
+import uuid
+from typing import Optional, Tuple
+
+
+BEGIN_TAG = "__TFB"
+END_TAG = "__TFE"
+
+
+class CommandFrame:
+    """
+    单条命令的分帧信息
+
+    Attributes:
+        command (str): 原始命令
+        nonce (str): 本次命令的随机标识
+        begin_marker (str): 开始标记
+        end_marker (str): 结束标记前缀（后面跟退出码）
+    """
+
+    def __init__(self, command: str, nonce: Optional[str] = None):
+        """
+        初始化命令分帧
+
+        Args:
+            command (str): 要执行的命令
+            nonce (str, optional): 随机标识，默认自动生成
+        """
+        self.command = command
+        self.nonce = nonce or uuid.uuid4().hex[:12]
+        self.begin_marker = f"{BEGIN_TAG}_{self.nonce}"
+        self.end_marker = f"{END_TAG}_{self.nonce}_"
+        self._end_pattern = re.compile(re.escape(self.end_marker) + r"(\d+)\r?\n")
+
+    def wrap(self) -> str:
+        """
+        生成发送给shell的命令行（不含换行符）
+
+        Returns:
+            str: 带开始/结束标记的命令行
+        """
+        command = self.command.strip()
+        # 以 & 结尾的后台命令不能再接分号，以分号结尾的去掉多余分号
+        if command.endswith("&") and not command.endswith("&&"):
+            separator = " "
+        else:
+            command = command.rstrip(";").rstrip()
+            separator = "; "
+        begin = f'echo {BEGIN_TAG}""_{self.nonce}'
+        end = f'echo {END_TAG}""_{self.nonce}_$?'
+        if not command:
+            return f"{begin}; {end}"
+        return f"{begin}; {command}{separator}{end}"
+
+    def parse(self, text: str) -> Optional[Tuple[str, int]]:
+        """
+        从收到的文本中解析命令输出和退出码
+
+        Args:
+            text (str): 发送命令后收到的全部文本
+
+        Returns:
+            Tuple[str, int]: (命令输出, 退出码)，结束标记尚未完整到达时返回None
+        """
+        end_match = self._end_pattern.search(text)
+        if not end_match:
+            return None
+        body = text[:end_match.start()]
+        begin_index = body.find(self.begin_marker)
+        if begin_index != -1:
+            body = body[begin_index + len(self.begin_marker):]
+            # 去掉开始标记所在行的换行符
+            if body.startswith("\r\n"):
+                body = body[2:]
+            elif body.startswith("\n"):
+                body = body[1:]
+        if body.endswith("\r\n"):
+            body = body[:-2]
+        elif body.endswith("\n"):
+            body = body[:-1]
+        return body, int(end_match.group(1))
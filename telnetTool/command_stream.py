@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令输出流模块
+
+execute_command要等提示符出现才返回，而且整段响应都留在内存里，不适合
+tail -f、日志抓取、耗时的tar等长时间运行的命令。CommandStream以异步迭代器
+的形式逐行产出命令输出：
+- 拉取式读取：只有消费者取走已解析的行后才会继续从连接读取，消费者处理慢时
+  telnetlib3的读缓冲区写满、连接暂停接收，形成背压
+- 内存有界：待产出的行最多来自一个读取块，未结束的行超过max_line_length即被切分产出
+- 提前退出（break、异常、任务取消）时发送Ctrl-C终止命令，并用一条分帧空命令
+  把shell重新同步到提示符
+"""
+
+import asyncio
+import codecs
+import time
+from collections import deque
+from typing import Deque, Optional
+
+try:
+    from telnetTool.command_framing import CommandFrame
+    from telnetTool.telnetConnect import CustomTelnetClient, LoginRequiredError
+except ImportError:
+    from command_framing import CommandFrame
+    from telnetConnect import CustomTelnetClient, LoginRequiredError
+
+
+CTRL_C = b"\x03"
+
+
+class CommandStream:
+    """
+    单条命令的逐行输出流
+
+    Attributes:
+        command (str): 执行的命令
+        exit_code (int): 命令退出码，命令尚未结束或被中断时为None
+        lines_read (int): 已产出的行数
+
+    Example:
+        >>> async with client.stream_command("tail -f /var/log/messages") as stream:
+        ...     async for line in stream:
+        ...         print(line)
+        ...         if "panic" in line:
+        ...             break      # 退出时自动发送Ctrl-C
+    """
+
+    def __init__(
+        self,
+        client: CustomTelnetClient,
+        command: str,
+        end_prompt: str = "#",
+        idle_timeout: Optional[float] = None,
+        max_line_length: int = 4096,
+        read_size: int = 4096
+    ):
+        """
+        初始化输出流（首次迭代或进入上下文时才发送命令）
+
+        Args:
+            client (CustomTelnetClient): 已连接的客户端
+            command (str): 要执行的命令
+            end_prompt (str): Shell提示符，默认"#"
+            idle_timeout (float, optional): 超过此时间（秒）没有任何输出则抛出TimeoutError，默认一直等待
+            max_line_length (int): 单行最大字符数，超出部分切分为多行产出，默认4096
+            read_size (int): 每次从连接读取的字节数，默认4096
+        """
+        self.client = client
+        self.command = command
+        self.end_prompt = end_prompt
+        self.idle_timeout = idle_timeout
+        self.max_line_length = max_line_length
+        self.read_size = read_size
+        self.exit_code: Optional[int] = None
+        self.lines_read = 0
+        self._frame = CommandFrame(command)
+        self._decoder = codecs.getincrementaldecoder(client.encoding)(errors="replace")
+        self._pending: Deque[str] = deque()
+        self._partial = ""
+        self._started = False
+        self._begun = False
+        self._finished = False
+
+    async def start(self) -> "CommandStream":
+        """发送命令（重复调用无效果）"""
+        if not self._started:
+            if not self.client.is_connected:
+                raise ConnectionError("未连接到服务器")
+            self._started = True
+            await self.client._send_line(self._frame.wrap())
+        return self
+
+    def __aiter__(self) -> "CommandStream":
+        return self
+
+    async def __anext__(self) -> str:
+        await self.start()
+        while not self._pending:
+            if self._finished:
+                raise StopAsyncIteration
+            await self._read_chunk()
+        self.lines_read += 1
+        return self._pending.popleft()
+
+    async def __aenter__(self) -> "CommandStream":
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    @property
+    def finished(self) -> bool:
+        """命令是否已执行结束（或已被中断）"""
+        return self._finished
+
+    async def aclose(self) -> None:
+        """
+        结束输出流；命令仍在运行时发送Ctrl-C终止，并等待shell回到提示符
+        """
+        if not self._started or self._finished:
+            return
+        self._finished = True
+        self._pending.clear()
+        self.client.logger.debug(f"中断流式命令: {self.command}")
+        try:
+            await self.client.send_raw_data(CTRL_C)
+            # 旧命令的残余输出（包括可能出现的结束标记）都带着旧nonce，被这条空命令的分帧丢弃
+            await self.client.execute_many([":"], end_prompt=self.end_prompt, timeout=10.0)
+        except Exception as e:
+            self.client.logger.warning(f"中断命令后重新同步shell失败: {e}")
+
+    async def _read_chunk(self) -> None:
+        """读取一个数据块并拆分成行"""
+        reader = self.client.reader
+        if reader is None:
+            raise ConnectionError("未连接到服务器")
+        deadline = None if self.idle_timeout is None else time.time() + self.idle_timeout
+        while True:
+            wait = 0.5 if deadline is None else min(0.5, deadline - time.time())
+            if wait <= 0:
+                raise TimeoutError(f"命令 '{self.command}' 超过 {self.idle_timeout} 秒没有输出")
+            try:
+                chunk = await asyncio.wait_for(reader.read(self.read_size), timeout=wait)
+            except asyncio.TimeoutError:
+                continue
+            if chunk:
+                break
+            if reader.at_eof():
+                self._finished = True
+                raise ConnectionError("连接已被远端关闭")
+        self.client._last_activity = time.time()
+        if isinstance(chunk, str):
+            chunk = chunk.encode(self.client.encoding)
+        self._partial += self._decoder.decode(chunk)
+
+        *lines, self._partial = self._partial.split("\n")
+        for i, line in enumerate(lines):
+            self._take_line(line.rstrip("\r"))
+            if self._finished:
+                await self._consume_prompt("\n".join(lines[i + 1:] + [self._partial]))
+                self._partial = ""
+                return
+        self._check_login_prompt()
+        while len(self._partial) > self.max_line_length:
+            self._take_line(self._partial[:self.max_line_length])
+            self._partial = self._partial[self.max_line_length:]
+
+    def _take_line(self, line: str) -> None:
+        """处理一行完整输出：识别开始/结束标记，其余的行排队等待产出"""
+        if not self._begun:
+            if line == self._frame.begin_marker:
+                self._begun = True
+            return
+        index = line.find(self._frame.end_marker)
+        if index != -1:
+            code = line[index + len(self._frame.end_marker):]
+            if code.isdigit():
+                # 没有换行结尾的最后一行输出与结束标记在同一行
+                if index:
+                    self._pending.append(line[:index])
+                self.exit_code = int(code)
+                self._finished = True
+                return
+        self._pending.append(line)
+
+    async def _consume_prompt(self, rest: str) -> None:
+        """
+        把结束标记后的提示符读走，避免残留到下一条命令的响应中
+
+        Args:
+            rest (str): 结束标记所在行之后已收到的文本
+        """
+        deadline = time.time() + self.client.adaptive.settle_time(self.client.host)
+        while self.end_prompt not in rest and time.time() < deadline:
+            try:
+                chunk = await asyncio.wait_for(self.client.reader.read(self.read_size),
+                                               timeout=deadline - time.time())
+            except asyncio.TimeoutError:
+                break
+            if not chunk:
+                break
+            if isinstance(chunk, str):
+                chunk = chunk.encode(self.client.encoding)
+            rest += self._decoder.decode(chunk)
+
+    def _check_login_prompt(self) -> None:
+        """输出停在登录/密码提示符时标记会话未登录并抛出LoginRequiredError"""
+        prompt = self.client._match_login_prompt(self._partial[-64:])
+        if prompt:
+            self.client.logged_in = False
+            self._finished = True
+            raise LoginRequiredError(prompt)
@@ -0,0 +1,976 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+设备模拟器模块
+
+在本机启动一个模拟busybox设备的asyncio telnet服务器，不需要真实屏幕即可验证
+telnet客户端（CustomTelnetClient、Telnet_connector）的正确性和性能：
+- login/Password登录流程，登录后为 "<cwd> # " 提示符，exit回到登录提示符
+- 服务器回显输入（与设备的pty一致），密码不回显
+- 可配置单向延迟、抖动、带宽和输出分块大小
+- 内存文件系统，脚本化实现 ls、cat、wget、chmod 以及 cd、pwd、echo、mkdir、rm、
+  stat、test、find、tar -x、sleep、tail -f 等分帧命令和日常操作需要的命令
+- 支持 ; && || 命令列表、| 管道、> >> 2>/dev/null 重定向、通配符和 $?，
+  Ctrl-C 中断正在执行的命令
+
+用法:
+    python telnetTool/device_simulator.py --port 2323 --latency 0.02 --jitter 0.005 --bandwidth 200000
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import hashlib
+import io
+import logging
+import posixpath
+import random
+import re
+import shlex
+import tarfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+# telnet协议字节
+IAC, DONT, DO, WONT, WILL, SB, SE = 255, 254, 253, 252, 251, 250, 240
+OPT_ECHO, OPT_SGA = 1, 3
+
+CommandResult = Tuple[bytes, int]
+Response = Union[str, Tuple[str, int]]
+
+
+class VirtualFileSystem:
+    """
+    内存文件系统
+
+    Attributes:
+        files (Dict[str, bytes]): 文件内容
+        dirs (set): 目录集合
+        modes (Dict[str, int]): 权限位
+    """
+
+    def __init__(self, files: Optional[Dict[str, Union[str, bytes]]] = None):
+        """
+        初始化文件系统
+
+        Args:
+            files (Dict[str, Union[str, bytes]], optional): 初始文件，键为绝对路径
+        """
+        self.files: Dict[str, bytes] = {}
+        self.dirs = {"/", "/root", "/tmp", "/etc", "/bin", "/dev", "/var", "/var/log"}
+        self.modes: Dict[str, int] = {}
+        self.mtimes: Dict[str, float] = dict.fromkeys(self.dirs, time.time())
+        self.write("/dev/null", b"")
+        for path, content in (files or {}).items():
+            self.write(path, content)
+
+    def write(self, path: str, content: Union[str, bytes], append: bool = False) -> None:
+        """写入文件（自动创建上级目录）"""
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        self.mkdir(posixpath.dirname(path))
+        if append and path in self.files:
+            content = self.files[path] + content
+        self.files[path] = content
+        self.modes.setdefault(path, 0o644)
+        self.mtimes[path] = time.time()
+
+    def mkdir(self, path: str) -> None:
+        """创建目录及其上级目录"""
+        while path and path not in self.dirs:
+            self.dirs.add(path)
+            self.mtimes.setdefault(path, time.time())
+            path = posixpath.dirname(path)
+
+    def remove(self, path: str) -> bool:
+        """删除文件或目录树，返回是否存在"""
+        if path in self.files:
+            del self.files[path]
+            self.modes.pop(path, None)
+            return True
+        if path in self.dirs and path != "/":
+            prefix = path.rstrip("/") + "/"
+            for name in [f for f in self.files if f.startswith(prefix)]:
+                del self.files[name]
+            self.dirs = {d for d in self.dirs if d != path and not d.startswith(prefix)}
+            return True
+        return False
+
+    def listdir(self, path: str) -> List[str]:
+        """列出目录下的名称"""
+        prefix = path.rstrip("/") + "/"
+        names = {p[len(prefix):].split("/", 1)[0] for p in list(self.files) + list(self.dirs)
+                 if p.startswith(prefix) and p != prefix}
+        return sorted(n for n in names if n)
+
+
+class DeviceSimulator:
+    """
+    模拟设备的telnet服务器
+
+    Example:
+        >>> async with DeviceSimulator(latency=0.01) as device:
+        ...     client = CustomTelnetClient(device.host, device.port)
+        ...     await client.connect("root", "root")
+        ...     await client.execute_command("ls /")
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        username: str = "root",
+        password: str = "root",
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        bandwidth: Optional[float] = None,
+        chunk_size: int = 512,
+        files: Optional[Dict[str, Union[str, bytes]]] = None,
+        responses: Optional[Dict[str, Response]] = None,
+        seed: Optional[int] = None,
+        logger: Optional[logging.Logger] = None
+    ):
+        """
+        初始化模拟器
+
+        Args:
+            host (str): 监听地址，默认127.0.0.1
+            port (int): 监听端口，0表示自动分配
+            username (str): 登录用户名
+            password (str): 登录密码
+            latency (float): 每次输出前的单向延迟（秒）
+            jitter (float): 延迟的随机抖动幅度（秒）
+            bandwidth (float, optional): 输出带宽（字节/秒），默认不限速
+            chunk_size (int): 输出分块大小（字节）
+            files (Dict[str, Union[str, bytes]], optional): 初始文件
+            responses (Dict[str, Response], optional): 脚本化响应，命令完全匹配时返回
+                输出文本或 (输出文本, 退出码)
+            seed (int, optional): 抖动随机数种子
+            logger (logging.Logger, optional): 日志记录器
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.chunk_size = max(1, chunk_size)
+        self.fs = VirtualFileSystem(files)
+        self.responses: Dict[str, Response] = dict(responses or {})
+        self.commands_executed = 0
+        self.logins = 0
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self._random = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._sessions: List["_DeviceSession"] = []
+        self._tasks: set = set()
+
+    async def start(self) -> Tuple[str, int]:
+        """
+        启动服务器
+
+        Returns:
+            Tuple[str, int]: 实际监听的 (地址, 端口)
+        """
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.host, self.port = self._server.sockets[0].getsockname()[:2]
+        self.logger.info(f"设备模拟器已启动: {self.host}:{self.port}")
+        return self.host, self.port
+
+    async def stop(self) -> None:
+        """停止服务器并断开所有会话"""
+        if self._server:
+            self._server.close()
+            for session in list(self._sessions):
+                session.close()
+            for task in list(self._tasks):
+                task.cancel()
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    @property
+    def session_count(self) -> int:
+        """当前连接的会话数"""
+        return len(self._sessions)
+
+    def drop_sessions_to_login(self) -> None:
+        """让所有会话掉回登录提示符（模拟shell超时退出）"""
+        for session in self._sessions:
+            session.drop_to_login()
+
+    async def __aenter__(self) -> "DeviceSimulator":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    def delay(self) -> float:
+        """一次输出的延迟（包含抖动）"""
+        if not self.latency and not self.jitter:
+            return 0.0
+        return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = _DeviceSession(self, reader, writer)
+        self._sessions.append(session)
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            await session.run()
+        except (asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            self._sessions.remove(session)
+            self._tasks.discard(task)
+
+
+class _DeviceSession:
+    """单个telnet连接的状态：登录状态、当前目录、上一条命令的退出码"""
+
+    def __init__(self, device: DeviceSimulator, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.device = device
+        self.fs = device.fs
+        self.reader = reader
+        self.writer = writer
+        self.state = "login"
+        self.pending_user = ""
+        self.cwd = "/root"
+        self.last_status = 0
+        self._stderr: List[bytes] = []
+        self._lines: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        self._current: Optional[asyncio.Task] = None
+        self._outbox: "asyncio.Queue[Tuple[float, bytes]]" = asyncio.Queue()
+        self._inbox: "asyncio.Queue[Tuple[float, Callable, tuple]]" = asyncio.Queue()
+        self._last_out = 0.0
+        self._last_in = 0.0
+        self._closed = False
+
+    async def run(self) -> None:
+        # 与busybox telnetd一样由服务器负责回显
+        self.writer.write(bytes([IAC, WILL, OPT_ECHO, IAC, WILL, OPT_SGA]))
+        self.send("\r\nSimulated device\r\nlogin: ")
+        worker = asyncio.create_task(self._process_lines())
+        output = asyncio.create_task(self._write_output())
+        delivery = asyncio.create_task(self._deliver_input())
+        try:
+            await self._read_input()
+        finally:
+            self._lines.put_nowait(None)
+            for task in (worker, output, delivery):
+                task.cancel()
+            self.close()
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self.writer.close()
+
+    def drop_to_login(self) -> None:
+        self.state = "login"
+        self.send("\r\nlogin: ")
+
+    @property
+    def prompt(self) -> str:
+        return f"{self.cwd} # "
+
+    def send(self, text: Union[str, bytes]) -> None:
+        """
+        把输出排入发送队列，按延迟、带宽和分块大小送达（\\n转换为\\r\\n）
+
+        Args:
+            text (Union[str, bytes]): 输出内容
+        """
+        if self._closed:
+            return
+        data = text.encode("utf-8") if isinstance(text, str) else text
+        data = data.replace(b"\r\n", b"\n").replace(b"\n", b"\r\n")
+        self._last_out = self._deliver_at(self._last_out)
+        self._outbox.put_nowait((self._last_out, data))
+
+    def _deliver_at(self, previous: float) -> float:
+        """延迟后的送达时间；与TCP一样保持顺序，抖动不会让后发的数据先到"""
+        return max(previous, asyncio.get_running_loop().time() + self.device.delay())
+
+    def _receive(self, callback: Callable, *args) -> None:
+        """输入经过单向延迟后再交给shell处理"""
+        if not self.device.latency and not self.device.jitter:
+            callback(*args)
+            return
+        self._last_in = self._deliver_at(self._last_in)
+        self._inbox.put_nowait((self._last_in, callback, args))
+
+    async def _deliver_input(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            deliver_at, callback, args = await self._inbox.get()
+            wait = deliver_at - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            callback(*args)
+
+    async def _write_output(self) -> None:
+        loop = asyncio.get_running_loop()
+        device = self.device
+        while True:
+            deliver_at, data = await self._outbox.get()
+            wait = deliver_at - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            for i in range(0, len(data), device.chunk_size):
+                chunk = data[i:i + device.chunk_size]
+                self.writer.write(chunk)
+                if device.bandwidth:
+                    await asyncio.sleep(len(chunk) / device.bandwidth)
+                await self.writer.drain()
+
+    async def _read_input(self) -> None:
+        """读取输入，处理telnet协商，按行放入队列；Ctrl-C立即中断当前命令"""
+        line = bytearray()
+        pending_cr = False
+        while True:
+            data = await self.reader.read(4096)
+            if not data:
+                return
+            i = 0
+            while i < len(data):
+                byte = data[i]
+                if byte == IAC and i + 1 < len(data):
+                    i = self._handle_iac(data, i)
+                    continue
+                i += 1
+                if pending_cr and byte in (0, 10):
+                    pending_cr = False
+                    continue
+                pending_cr = False
+                if byte == 3:
+                    self._receive(self._interrupt)
+                elif byte in (10, 13):
+                    pending_cr = byte == 13
+                    self._receive(self._lines.put_nowait, line.decode("utf-8", errors="replace"))
+                    line = bytearray()
+                else:
+                    line.append(byte)
+
+    def _handle_iac(self, data: bytes, i: int) -> int:
+        command = data[i + 1]
+        if command in (DO, DONT, WILL, WONT) and i + 2 < len(data):
+            option = data[i + 2]
+            if command == DO and option not in (OPT_ECHO, OPT_SGA):
+                self.writer.write(bytes([IAC, WONT, option]))
+            elif command == WILL and option != OPT_SGA:
+                self.writer.write(bytes([IAC, DONT, option]))
+            return i + 3
+        if command == SB:
+            end = data.find(bytes([IAC, SE]), i)
+            return len(data) if end == -1 else end + 2
+        return i + 2
+
+    def _interrupt(self) -> None:
+        if self._current and not self._current.done():
+            self._current.cancel()
+        else:
+            self.send(f"^C\r\n{self.prompt}")
+
+    async def _process_lines(self) -> None:
+        while True:
+            line = await self._lines.get()
+            if line is None:
+                return
+            if self.state == "login":
+                self.pending_user = line.strip()
+                self.state = "password"
+                self.send(f"{line}\r\nPassword: ")
+            elif self.state == "password":
+                if self.pending_user == self.device.username and line == self.device.password:
+                    self.state = "shell"
+                    self.cwd = "/root"
+                    self.device.logins += 1
+                    self.send(f"\r\n{self.prompt}")
+                else:
+                    self.state = "login"
+                    self.send("\r\nLogin incorrect\r\nlogin: ")
+            else:
+                self.send(f"{line}\r\n")
+                self._current = asyncio.ensure_future(self._run_line(line))
+                try:
+                    await self._current
+                except asyncio.CancelledError:
+                    if self._closed:
+                        return
+                    self.last_status = 130
+                    self.send(f"^C\r\n{self.prompt}")
+                    continue
+                finally:
+                    self._current = None
+                if self.state == "shell":
+                    self.send(self.prompt)
+
+    async def _run_line(self, line: str) -> None:
+        """执行一行命令列表（; && || 连接）"""
+        for connector, pipeline in _split_command_list(line):
+            if connector == "&&" and self.last_status != 0:
+                continue
+            if connector == "||" and self.last_status == 0:
+                continue
+            stdin = b""
+            for command in pipeline:
+                stdin, self.last_status = await self._run_simple(command, stdin)
+            if stdin:
+                self.send(stdin)
+            if self.state != "shell":
+                return
+
+    async def _run_simple(self, command: str, stdin: bytes) -> CommandResult:
+        """执行简单命令（含重定向），返回 (标准输出, 退出码)"""
+        self.device.commands_executed += 1
+        command = command.replace("$?", str(self.last_status)).strip()
+        scripted = self.device.responses.get(command)
+        if scripted is not None:
+            output, status = scripted if isinstance(scripted, tuple) else (scripted, 0)
+            return output.encode("utf-8"), status
+        try:
+            words = [expanded for word, pattern in _shell_words(command) for expanded in self._glob(word, pattern)]
+        except ValueError:
+            return b"sh: syntax error: unterminated quoted string\n", 2
+
+        redirect, append, args, discard_stderr = None, False, [], False
+        iterator = iter(words)
+        for word in iterator:
+            if word in ("2>/dev/null", "2>&1", ">/dev/null"):
+                redirect = "/dev/null" if word == ">/dev/null" else redirect
+                discard_stderr = discard_stderr or word == "2>/dev/null"
+            elif word in (">", ">>"):
+                redirect, append = next(iterator, ""), word == ">>"
+            elif word.startswith(">>") or (word.startswith(">") and len(word) > 1):
+                append = word.startswith(">>")
+                redirect = word.lstrip(">")
+            elif word == "&":
+                continue
+            else:
+                args.append(word)
+        if not args:
+            return b"", self.last_status
+
+        name = args[0].rsplit("/", 1)[-1]
+        handler: Optional[Callable] = getattr(self, f"_cmd_{name.replace('-', '_')}", None)
+        if name == ":":
+            handler = self._cmd_true
+        elif name == "[":
+            handler = self._cmd_test
+        if handler is None:
+            return f"sh: {args[0]}: not found\n".encode("utf-8"), 127
+        output, status = await handler(args[1:], stdin)
+        errors, self._stderr = b"".join(self._stderr), []
+        if errors and not discard_stderr:
+            self.send(errors)
+        if redirect:
+            if redirect != "/dev/null":
+                self.fs.write(self._path(redirect), output, append=append)
+            output = b""
+        return output, status
+
+    def _glob(self, word: str, pattern: Optional[str]) -> List[str]:
+        """展开最后一级路径中的通配符，没有匹配时保留原词（与sh一致）"""
+        if pattern is None or "/" in pattern.rstrip("/") and any(c in pattern.rsplit("/", 1)[0] for c in "*?["):
+            return [word]
+        directory, _, name_pattern = word.rpartition("/")
+        _, _, name_pattern = pattern.rpartition("/")
+        full = self._path(directory or ("/" if word.startswith("/") else "."))
+        if full not in self.fs.dirs:
+            return [word]
+        names = [".", ".."] + self.fs.listdir(full) if name_pattern.startswith(".") else self.fs.listdir(full)
+        prefix = directory + "/" if word.startswith("/") or directory else ""
+        matches = [
+            prefix + name for name in names
+            if fnmatch.fnmatchcase(name, name_pattern) and (name_pattern.startswith(".") or not name.startswith("."))
+        ]
+        return matches or [word]
+
+    def _error(self, message: str) -> None:
+        """写入标准错误（2>/dev/null时丢弃）"""
+        self._stderr.append(message.encode("utf-8"))
+
+    def _stat(self, path: str) -> Optional[Tuple[int, int, float]]:
+        """返回 (st_mode, 大小, 修改时间)，不存在时返回None"""
+        if path in self.fs.dirs:
+            return 0o040755, 0, self.fs.mtimes.get(path, 0)
+        if path in self.fs.files:
+            return 0o100000 | self.fs.modes.get(path, 0o644), len(self.fs.files[path]), self.fs.mtimes.get(path, 0)
+        return None
+
+    def _path(self, path: str) -> str:
+        return posixpath.normpath(posixpath.join(self.cwd, path)) if path else self.cwd
+
+    @staticmethod
+    def _flags(args: List[str]) -> Tuple[str, List[str]]:
+        flags = "".join(a[1:] for a in args if a.startswith("-") and a != "-")
+        return flags, [a for a in args if not a.startswith("-") or a == "-"]
+
+    # ---- 命令实现 ----
+
+    async def _cmd_true(self, args, stdin) -> CommandResult:
+        return b"", 0
+
+    async def _cmd_false(self, args, stdin) -> CommandResult:
+        return b"", 1
+
+    async def _cmd_echo(self, args, stdin) -> CommandResult:
+        newline = True
+        if args and args[0] == "-n":
+            newline, args = False, args[1:]
+        return (" ".join(args) + ("\n" if newline else "")).encode("utf-8"), 0
+
+    async def _cmd_pwd(self, args, stdin) -> CommandResult:
+        return f"{self.cwd}\n".encode("utf-8"), 0
+
+    async def _cmd_cd(self, args, stdin) -> CommandResult:
+        path = self._path(args[0] if args else "/root")
+        if path not in self.fs.dirs:
+            return f"sh: cd: can't cd to {args[0]}: No such file or directory\n".encode("utf-8"), 2
+        self.cwd = path
+        return b"", 0
+
+    async def _cmd_mkdir(self, args, stdin) -> CommandResult:
+        flags, paths = self._flags(args)
+        for path in paths:
+            path = self._path(path)
+            if path in self.fs.files or (path in self.fs.dirs and "p" not in flags):
+                return f"mkdir: can't create directory '{path}': File exists\n".encode("utf-8"), 1
+            if posixpath.dirname(path) not in self.fs.dirs and "p" not in flags:
+                return f"mkdir: can't create directory '{path}': No such file or directory\n".encode("utf-8"), 1
+            self.fs.mkdir(path)
+        return b"", 0
+
+    async def _cmd_rm(self, args, stdin) -> CommandResult:
+        flags, paths = self._flags(args)
+        for path in paths:
+            if not self.fs.remove(self._path(path)) and "f" not in flags:
+                return f"rm: can't remove '{path}': No such file or directory\n".encode("utf-8"), 1
+        return b"", 0
+
+    async def _cmd_mv(self, args, stdin) -> CommandResult:
+        _, paths = self._flags(args)
+        if len(paths) != 2 or self._path(paths[0]) not in self.fs.files:
+            return b"mv: can't rename\n", 1
+        source, target = self._path(paths[0]), self._path(paths[1])
+        if target in self.fs.dirs:
+            target = posixpath.join(target, posixpath.basename(source))
+        self.fs.write(target, self.fs.files[source])
+        self.fs.modes[target] = self.fs.modes.get(source, 0o644)
+        self.fs.remove(source)
+        return b"", 0
+
+    async def _cmd_cat(self, args, stdin) -> CommandResult:
+        _, paths = self._flags(args)
+        if not paths or paths == ["-"]:
+            return stdin, 0
+        output = b""
+        for path in paths:
+            full = self._path(path)
+            if full in self.fs.dirs:
+                return output + f"cat: read error: Is a directory\n".encode("utf-8"), 1
+            if full not in self.fs.files:
+                return output + f"cat: can't open '{path}': No such file or directory\n".encode("utf-8"), 1
+            output += self.fs.files[full]
+        return output, 0
+
+    async def _cmd_ls(self, args, stdin) -> CommandResult:
+        flags, paths = self._flags(args)
+        lines, status = [], 0
+        for path in paths or ["."]:
+            full = self._path(path)
+            if full in self.fs.files:
+                entries = [(path, full)]
+            elif full in self.fs.dirs:
+                names = self.fs.listdir(full)
+                if "a" in flags:
+                    names = [".", ".."] + names
+                entries = [(name, posixpath.normpath(posixpath.join(full, name))) for name in names]
+            else:
+                lines.append(f"ls: {path}: No such file or directory")
+                status = 1
+                continue
+            for name, entry in entries:
+                lines.append(self._ls_entry(name, entry) if "l" in flags else name)
+        return ("\n".join(lines) + "\n").encode("utf-8") if lines else b"", status
+
+    def _ls_entry(self, name: str, path: str) -> str:
+        is_dir = path in self.fs.dirs
+        mode = 0o755 if is_dir else self.fs.modes.get(path, 0o644)
+        perms = "".join(
+            char if mode & (1 << (8 - i)) else "-" for i, char in enumerate("rwxrwxrwx")
+        )
+        size = 0 if is_dir else len(self.fs.files.get(path, b""))
+        when = time.strftime("%b %d %H:%M", time.localtime(self.fs.mtimes.get(path, 0)))
+        return f"{'d' if is_dir else '-'}{perms}    1 root     root     {size:>9} {when} {name}"
+
+    async def _cmd_chmod(self, args, stdin) -> CommandResult:
+        if len(args) < 2:
+            return b"chmod: missing operand\n", 1
+        mode_arg, paths = args[0], args[1:]
+        for path in paths:
+            full = self._path(path)
+            if full not in self.fs.files and full not in self.fs.dirs:
+                return f"chmod: {path}: No such file or directory\n".encode("utf-8"), 1
+            mode = self.fs.modes.get(full, 0o644)
+            if mode_arg.isdigit():
+                mode = int(mode_arg, 8)
+            elif mode_arg.lstrip("ugoa").startswith("+"):
+                mode |= 0o111 if "x" in mode_arg else 0
+                mode |= 0o222 if "w" in mode_arg else 0
+            elif mode_arg.lstrip("ugoa").startswith("-"):
+                mode &= ~0o111 if "x" in mode_arg else ~0
+            self.fs.modes[full] = mode
+        return b"", 0
+
+    async def _cmd_stat(self, args, stdin) -> CommandResult:
+        fmt, paths, index = None, [], 0
+        while index < len(args):
+            arg = args[index]
+            if arg == "-c":
+                index += 1
+                fmt = args[index] if index < len(args) else ""
+            elif arg.startswith("--format="):
+                fmt = arg.split("=", 1)[1]
+            elif arg.startswith("-") and arg != "-":
+                pass
+            else:
+                paths.append(arg)
+            index += 1
+        if not paths:
+            return b"stat: missing operand\n", 1
+        lines, status = [], 0
+        for path in paths:
+            info = self._stat(self._path(path))
+            if info is None:
+                self._error(f"stat: can't stat '{path}': No such file or directory\n")
+                status = 1
+                continue
+            mode, size, mtime = info
+            values = {
+                "f": f"{mode:x}", "s": str(size), "Y": str(int(mtime)), "n": path, "a": f"{mode & 0o7777:o}",
+                "F": "directory" if mode & 0o040000 else "regular file", "%": "%",
+            }
+            if fmt is None:
+                lines.append(f"  File: {path}\n  Size: {size}\n  Access: ({mode & 0o7777:04o})")
+            else:
+                lines.append(re.sub(r"%(.)", lambda m: values.get(m.group(1), m.group(0)), fmt))
+        return ("\n".join(lines) + "\n").encode("utf-8") if lines else b"", status
+
+    async def _cmd_test(self, args, stdin) -> CommandResult:
+        if args and args[-1] == "]":
+            args = args[:-1]
+        negate = bool(args) and args[0] == "!"
+        if negate:
+            args = args[1:]
+        if len(args) == 2 and args[0] in ("-d", "-e", "-f", "-s", "-x"):
+            path = self._path(args[1])
+            info = self._stat(path)
+            result = info is not None and {
+                "-d": lambda: path in self.fs.dirs,
+                "-e": lambda: True,
+                "-f": lambda: path in self.fs.files,
+                "-s": lambda: info[1] > 0,
+                "-x": lambda: bool(info[0] & 0o111),
+            }[args[0]]()
+        else:
+            result = bool(args and args[0])
+        return b"", 0 if result != negate else 1
+
+    async def _cmd_find(self, args, stdin) -> CommandResult:
+        # 支持: find [路径...] [-type f|d] [-exec 命令 {} +]
+        paths, index = [], 0
+        while index < len(args) and not args[index].startswith("-"):
+            paths.append(args[index])
+            index += 1
+        kind, exec_args = None, None
+        while index < len(args):
+            if args[index] == "-type" and index + 1 < len(args):
+                kind, index = args[index + 1], index + 2
+            elif args[index] == "-exec" and "+" in args[index:]:
+                end = args.index("+", index)
+                exec_args, index = args[index + 1:end], end + 1
+            else:
+                return f"find: unrecognized: {args[index]}\n".encode("utf-8"), 1
+
+        found, status = [], 0
+        for path in paths or ["."]:
+            root = self._path(path)
+            if root not in self.fs.dirs and root not in self.fs.files:
+                self._error(f"find: {path}: No such file or directory\n")
+                status = 1
+                continue
+            prefix = "" if root == "/" else root
+            for full in [root] + sorted(p for p in set(self.fs.files) | self.fs.dirs if p.startswith(prefix + "/")):
+                if kind == "f" and full not in self.fs.files or kind == "d" and full not in self.fs.dirs:
+                    continue
+                found.append(path.rstrip("/") + full[len(root):] if full != root else path)
+        if exec_args is None:
+            return ("".join(f"{name}\n" for name in found)).encode("utf-8"), status
+        if not found:
+            return b"", status
+        words = [name for arg in exec_args for name in (found if arg == "{}" else [arg])]
+        output, exec_status = await self._run_simple(" ".join(shlex.quote(word) for word in words), b"")
+        return output, status or exec_status
+
+    async def _cmd_tar(self, args, stdin) -> CommandResult:
+        # 只支持解包: tar -x[z]f 归档|- [-C 目录]，保留权限和修改时间
+        flags, archive, directory, index = "", None, None, 0
+        while index < len(args):
+            arg = args[index]
+            if arg == "-C" and index + 1 < len(args):
+                directory, index = args[index + 1], index + 1
+            elif arg.startswith("-") or index == 0:
+                flags += arg.lstrip("-")
+                if "f" in arg and index + 1 < len(args):
+                    archive, index = args[index + 1], index + 1
+            index += 1
+        if "x" not in flags:
+            return b"tar: only extraction is supported\n", 1
+        data = stdin if archive in (None, "-") else self.fs.files.get(self._path(archive))
+        if data is None:
+            return f"tar: can't open '{archive}': No such file or directory\n".encode("utf-8"), 1
+        base = self._path(directory) if directory else self.cwd
+        try:
+            with tarfile.open(fileobj=io.BytesIO(data), mode="r:*") as tar:
+                for member in tar.getmembers():
+                    target = posixpath.normpath(posixpath.join(base, member.name))
+                    if member.isdir():
+                        self.fs.mkdir(target)
+                    elif member.isfile():
+                        self.fs.write(target, tar.extractfile(member).read())
+                        self.fs.modes[target] = member.mode & 0o7777
+                        self.fs.mtimes[target] = member.mtime
+        except tarfile.TarError:
+            return b"tar: invalid tar magic\n", 1
+        return b"", 0
+
+    async def _cmd_md5sum(self, args, stdin) -> CommandResult:
+        return self._digest(args, stdin, hashlib.md5)
+
+    async def _cmd_sha256sum(self, args, stdin) -> CommandResult:
+        return self._digest(args, stdin, hashlib.sha256)
+
+    def _digest(self, args, stdin, algorithm) -> CommandResult:
+        _, paths = self._flags(args)
+        if not paths:
+            return f"{algorithm(stdin).hexdigest()}  -\n".encode("utf-8"), 0
+        lines, status = [], 0
+        for path in paths:
+            content = self.fs.files.get(self._path(path))
+            if content is None:
+                lines.append(f"{args[0] if args else 'md5sum'}: {path}: No such file or directory")
+                status = 1
+            else:
+                lines.append(f"{algorithm(content).hexdigest()}  {path}")
+        return ("\n".join(lines) + "\n").encode("utf-8"), status
+
+    async def _cmd_sleep(self, args, stdin) -> CommandResult:
+        await asyncio.sleep(float(args[0]) if args else 0)
+        return b"", 0
+
+    async def _cmd_tail(self, args, stdin) -> CommandResult:
+        flags, paths = self._flags(args)
+        content = self.fs.files.get(self._path(paths[0])) if paths else stdin
+        if content is None:
+            return f"tail: can't open '{paths[0]}': No such file or directory\n".encode("utf-8"), 1
+        tail = b"\n".join(content.splitlines()[-10:]) + b"\n" if content else b""
+        if "f" not in flags:
+            return tail, 0
+        self.send(tail)
+        # 跟随模式：直到Ctrl-C为止
+        await asyncio.Event().wait()
+        return b"", 0
+
+    async def _cmd_exit(self, args, stdin) -> CommandResult:
+        self.state = "login"
+        self.send("\r\nlogin: ")
+        return b"", 0
+
+    async def _cmd_wget(self, args, stdin) -> CommandResult:
+        quiet, output_file, url, index = False, None, None, 0
+        while index < len(args):
+            arg = args[index]
+            if arg == "-q":
+                quiet = True
+            elif arg == "-O":
+                index += 1
+                output_file = args[index] if index < len(args) else None
+            elif arg.startswith("-O"):
+                output_file = arg[2:]
+            elif not arg.startswith("-"):
+                url = arg
+            index += 1
+        if not url:
+            return b"BusyBox wget: missing URL\n", 1
+
+        parsed = urllib.parse.urlparse(url)
+        host = parsed.hostname or ""
+        port = parsed.port or 80
+        name = output_file or posixpath.basename(parsed.path) or "index.html"
+        log = "" if quiet else f"Connecting to {host}:{port} ({host}:{port})\n"
+        try:
+            content = await asyncio.get_running_loop().run_in_executor(None, _http_get, url)
+        except urllib.error.HTTPError as e:
+            return (log + f"wget: server returned error: HTTP/1.1 {e.code} {e.reason}\n").encode("utf-8"), 1
+        except Exception:
+            return (log + f"wget: can't connect to remote host ({host}): Connection refused\n").encode("utf-8"), 1
+        if name == "-":
+            return log.encode("utf-8") + content, 0
+        self.fs.write(self._path(name), content)
+        if not quiet:
+            log += (f"saving to '{name}'\n"
+                    f"{name:<20} 100% |********************************| {len(content):>6}  0:00:00 ETA\n"
+                    f"'{name}' saved\n")
+        return log.encode("utf-8"), 0
+
+
+def _http_get(url: str) -> bytes:
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return response.read()
+
+
+def _shell_words(command: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    按sh规则拆分单词（引号、反斜杠转义）
+
+    Args:
+        command (str): 简单命令
+
+    Returns:
+        List[Tuple[str, Optional[str]]]: [(去掉引号后的单词, 通配符模式), ...]，
+        模式中引号内的通配符已转义，单词不含未加引号的通配符时模式为None
+
+    Raises:
+        ValueError: 引号不匹配时抛出
+    """
+    words: List[Tuple[str, Optional[str]]] = []
+    text: List[str] = []
+    pattern: List[str] = []
+    in_word = globbing = False
+    quote = None
+    i = 0
+    while i < len(command):
+        char = command[i]
+        if quote:
+            if char == quote:
+                quote = None
+            elif char == "\\" and quote == '"' and i + 1 < len(command) and command[i + 1] in '"\\$`':
+                i += 1
+                text.append(command[i])
+                pattern.append(command[i])
+            else:
+                text.append(char)
+                pattern.append(f"[{char}]" if char in "*?[" else char)
+        elif char in "'\"":
+            quote, in_word = char, True
+        elif char == "\\" and i + 1 < len(command):
+            i += 1
+            text.append(command[i])
+            pattern.append(f"[{command[i]}]" if command[i] in "*?[" else command[i])
+            in_word = True
+        elif char.isspace():
+            if in_word:
+                words.append(("".join(text), "".join(pattern) if globbing else None))
+            text, pattern, in_word, globbing = [], [], False, False
+        else:
+            text.append(char)
+            pattern.append(char)
+            in_word = True
+            globbing = globbing or char in "*?["
+        i += 1
+    if quote:
+        raise ValueError("unterminated quote")
+    if in_word:
+        words.append(("".join(text), "".join(pattern) if globbing else None))
+    return words
+
+
+def _split_command_list(line: str) -> List[Tuple[str, List[str]]]:
+    """
+    按 ; && || 拆分命令列表，每项再按 | 拆分为管道（引号内的分隔符不拆分）
+
+    Args:
+        line (str): 命令行
+
+    Returns:
+        List[Tuple[str, List[str]]]: [(前面的连接符, [管道中的命令]), ...]
+    """
+    result: List[Tuple[str, List[str]]] = []
+    pipeline: List[str] = []
+    current: List[str] = []
+    connector = ";"
+    quote = None
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if quote:
+            if char == quote:
+                quote = None
+            current.append(char)
+        elif char in "'\"":
+            quote = char
+            current.append(char)
+        elif line.startswith("&&", i) or line.startswith("||", i) or char == ";":
+            pipeline.append("".join(current))
+            result.append((connector, pipeline))
+            connector = ";" if char == ";" else line[i:i + 2]
+            pipeline, current = [], []
+            i += 1 if char == ";" else 2
+            continue
+        elif char == "|":
+            pipeline.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    pipeline.append("".join(current))
+    result.append((connector, pipeline))
+    return [(c, [cmd for cmd in p if cmd.strip()]) for c, p in result if any(cmd.strip() for cmd in p)]
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    device = DeviceSimulator(
+        host=args.host,
+        port=args.port,
+        username=args.username,
+        password=args.password,
+        latency=args.latency,
+        jitter=args.jitter,
+        bandwidth=args.bandwidth,
+        chunk_size=args.chunk_size,
+    )
+    await device.start()
+    print(f"设备模拟器监听 {device.host}:{device.port}（用户名 {args.username} / 密码 {args.password}），Ctrl-C退出")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await device.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本地busybox设备模拟器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2323)
+    parser.add_argument("--username", default="root")
+    parser.add_argument("--password", default="root")
+    parser.add_argument("--latency", type=float, default=0.0, help="单向延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延迟抖动（秒）")
+    parser.add_argument("--bandwidth", type=float, default=None, help="输出带宽（字节/秒）")
+    parser.add_argument("--chunk-size", type=int, default=512, help="输出分块大小（字节）")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telnet批量设备执行模块
+
+对成百上千台设备执行同一条命令或脚本：
+- 固定数量的工作协程从队列取设备，并发数有上限，不会一次打开全部连接
+- 每台设备的连接、登录和执行整体受单独的超时限制，一台卡住不影响其他设备
+- 每台设备完成后立即写出一行JSONL结果，中途中断也不会丢失已完成的结果
+- 结束时汇总成功/失败数量、失败原因和耗时分位数
+
+设备清单可以来自IP历史记录（IPHistoryManager）或清单文件。
+
+用法:
+    python telnetTool/fleet_runner.py --inventory hosts.txt -c "cat /etc/version" -o results.jsonl
+    python telnetTool/fleet_runner.py --history ip_history.json --script update.sh --concurrency 100
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shlex
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, TextIO
+
+try:
+    from telnetTool.telnetConnect import CustomTelnetClient
+except ImportError:
+    from telnetConnect import CustomTelnetClient
+
+
+# 结果状态
+STATUS_OK = "ok"              # 所有命令退出码为0
+STATUS_FAILED = "failed"      # 命令执行完成但有非0退出码
+STATUS_ERROR = "error"        # 连接、登录或执行出错
+STATUS_TIMEOUT = "timeout"    # 超过单台设备的超时时间
+
+
+class FleetTarget:
+    """
+    一台目标设备
+
+    Attributes:
+        host (str): 设备地址
+        port (int): 端口号
+        device_id (str): 设备ID，可能为None
+    """
+
+    def __init__(self, host: str, port: int = 23, device_id: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.device_id = device_id
+
+    def __repr__(self) -> str:
+        return f"FleetTarget({self.host}:{self.port})"
+
+
+def parse_target(entry: str, default_port: int = 23) -> FleetTarget:
+    """
+    解析 "host"、"host:port" 或 "host:port 设备ID" 格式的清单行
+
+    Args:
+        entry (str): 清单行
+        default_port (int): 未指定端口时使用的端口
+
+    Returns:
+        FleetTarget: 目标设备
+    """
+    address, _, device_id = entry.strip().partition(" ")
+    host, _, port = address.partition(":")
+    return FleetTarget(host, int(port) if port else default_port, device_id.strip() or None)
+
+
+def _targets_from_json(data: Any, default_port: int) -> List[FleetTarget]:
+    """解析JSON清单：IP历史记录格式、字符串列表或 {"host", "port", "device_id"} 列表"""
+    if isinstance(data, dict):
+        data = data.get('ip_history', [])
+    targets = []
+    for item in data:
+        if isinstance(item, str):
+            targets.append(parse_target(item, default_port))
+        elif isinstance(item, dict) and (item.get('host') or item.get('ip')):
+            targets.append(FleetTarget(
+                item.get('host') or item['ip'],
+                int(item.get('port') or default_port),
+                item.get('device_id'),
+            ))
+    return targets
+
+
+def load_inventory(path: str, default_port: int = 23) -> List[FleetTarget]:
+    """
+    从清单文件加载设备
+
+    支持两种格式：
+    - 文本文件：每行一台设备（host、host:port 或 host:port 设备ID），#开头为注释
+    - JSON文件：ip_history.json格式、字符串列表或对象列表
+
+    Args:
+        path (str): 清单文件路径
+        default_port (int): 未指定端口时使用的端口
+
+    Returns:
+        List[FleetTarget]: 去重后的设备列表（保持原顺序）
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    if content.lstrip().startswith(('[', '{')):
+        targets = _targets_from_json(json.loads(content), default_port)
+    else:
+        targets = [
+            parse_target(line, default_port)
+            for line in content.splitlines()
+            if line.strip() and not line.strip().startswith('#')
+        ]
+    return unique_targets(targets)
+
+
+def inventory_from_history(history_file: str = "ip_history.json", default_port: int = 23) -> List[FleetTarget]:
+    """
+    从IP历史记录加载设备
+
+    Args:
+        history_file (str): 历史记录文件路径
+        default_port (int): 端口号
+
+    Returns:
+        List[FleetTarget]: 设备列表（最近使用的在前）
+    """
+    from fileTransfer.ip_history_manager import IPHistoryManager
+
+    manager = IPHistoryManager(history_file)
+    return unique_targets(
+        FleetTarget(item['ip'], default_port, item.get('device_id'))
+        for item in manager.get_ip_suggestions()
+    )
+
+
+def unique_targets(targets: Iterable[FleetTarget]) -> List[FleetTarget]:
+    """按 host:port 去重，保持原顺序"""
+    seen = set()
+    result = []
+    for target in targets:
+        key = (target.host, target.port)
+        if target.host and key not in seen:
+            seen.add(key)
+            result.append(target)
+    return result
+
+
+def script_command(text: str) -> str:
+    """
+    把脚本整体包装成一条 sh -c 命令
+
+    逐行发送会把 if/fi、for/done 等多行结构拆散；整体交给 sh 执行时，
+    注释、续行和多行结构都由设备上的shell解析，退出码为脚本的退出码。
+
+    Args:
+        text (str): 脚本内容
+
+    Returns:
+        str: 可作为单条命令执行的字符串
+    """
+    script = text.replace('\r', '').strip()
+    return f"sh -c {shlex.quote(script)}"
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """最近秩法计算分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class FleetRunner:
+    """
+    批量设备命令执行器
+
+    Example:
+        >>> runner = FleetRunner(["cat /etc/version"], username="root", password="***", concurrency=50)
+        >>> with open("results.jsonl", "w") as f:
+        ...     summary = await runner.run(load_inventory("hosts.txt"), output=f)
+        >>> print(summary['ok'], summary['errors'])
+    """
+
+    def __init__(
+        self,
+        commands: Sequence[str],
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        concurrency: int = 50,
+        host_timeout: float = 60.0,
+        connect_timeout: float = 10.0,
+        command_timeout: Optional[float] = None,
+        logger: Optional[logging.Logger] = None
+    ):
+        """
+        初始化执行器
+
+        Args:
+            commands (Sequence[str]): 要执行的命令（脚本的每一行），在同一个shell中一次写入
+            username (str, optional): 用户名
+            password (str, optional): 密码
+            concurrency (int): 同时连接的设备数上限，默认50
+            host_timeout (float): 单台设备的总超时时间（连接+登录+执行），默认60秒
+            connect_timeout (float): TCP连接超时时间，默认10秒
+            command_timeout (float, optional): 命令超时时间，默认按命令类别和设备往返时间自适应
+            logger (logging.Logger, optional): 日志记录器
+        """
+        if not commands:
+            raise ValueError("至少需要一条命令")
+        self.commands = list(commands)
+        self.username = username
+        self.password = password
+        self.concurrency = max(1, concurrency)
+        self.host_timeout = host_timeout
+        self.connect_timeout = connect_timeout
+        self.command_timeout = command_timeout
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+    async def run(
+        self,
+        targets: Iterable[FleetTarget],
+        output: Optional[TextIO] = None,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        对所有设备执行命令
+
+        Args:
+            targets (Iterable[FleetTarget]): 目标设备
+            output (TextIO, optional): JSONL输出流，每台设备完成后写入一行并刷新
+            on_result (Callable, optional): 每台设备完成后的回调，参数为结果字典
+
+        Returns:
+            Dict[str, Any]: 汇总信息，见summarize
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for target in targets:
+            queue.put_nowait(target)
+        total = queue.qsize()
+        results: List[Dict[str, Any]] = []
+        started = time.perf_counter()
+        self.logger.info(f"开始批量执行: {total} 台设备，并发 {self.concurrency}")
+
+        async def worker() -> None:
+            while True:
+                try:
+                    target = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                result = await self._run_target(target)
+                results.append(result)
+                if output is not None:
+                    output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    output.flush()
+                if on_result is not None:
+                    on_result(result)
+                self.logger.debug(f"[{len(results)}/{total}] {target.host}: {result['status']}")
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, total))))
+        summary = self.summarize(results, time.perf_counter() - started)
+        self.logger.info(
+            f"✅ 批量执行完成: 成功 {summary['ok']}，命令失败 {summary['failed']}，"
+            f"出错 {summary['errors']}，超时 {summary['timeouts']}，耗时 {summary['wall_time']:.1f}s"
+        )
+        return summary
+
+    async def _run_target(self, target: FleetTarget) -> Dict[str, Any]:
+        """
+        在一台设备上执行命令，任何异常都转换为结果记录
+
+        Args:
+            target (FleetTarget): 目标设备
+
+        Returns:
+            Dict[str, Any]: 结果字典（一行JSONL）
+        """
+        result: Dict[str, Any] = {
+            'host': target.host,
+            'port': target.port,
+            'device_id': target.device_id,
+            'status': STATUS_ERROR,
+            'elapsed': 0.0,
+            'results': [],
+            'error': None,
+            'error_type': None,
+        }
+        started = time.perf_counter()
+        try:
+            outputs = await asyncio.wait_for(self._execute(target), timeout=self.host_timeout)
+            result['results'] = [
+                {'command': command, 'output': output, 'exit_code': code}
+                for command, (output, code) in zip(self.commands, outputs)
+            ]
+            failed = any(code != 0 for _, code in outputs)
+            result['status'] = STATUS_FAILED if failed else STATUS_OK
+        except asyncio.TimeoutError:
+            result['status'] = STATUS_TIMEOUT
+            result['error'] = f"超过 {self.host_timeout}s 未完成"
+            result['error_type'] = "TimeoutError"
+        except Exception as e:
+            result['error'] = str(e)
+            result['error_type'] = type(e).__name__
+        result['elapsed'] = round(time.perf_counter() - started, 4)
+        if result['status'] not in (STATUS_OK, STATUS_FAILED):
+            self.logger.warning(f"⚠️ {target.host}:{target.port} {result['status']}: {result['error']}")
+        return result
+
+    async def _execute(self, target: FleetTarget) -> List[tuple]:
+        """连接、登录并一次写入全部命令"""
+        client = CustomTelnetClient(
+            target.host,
+            target.port,
+            timeout=self.host_timeout,
+            connect_timeout=self.connect_timeout,
+            # 错误已记录在结果中，避免数百台设备的客户端日志刷屏
+            log_level="CRITICAL"
+        )
+        try:
+            await client.connect(self.username, self.password)
+            return await client.execute_many(
+                self.commands,
+                timeout=self.command_timeout,
+                username=self.username,
+                password=self.password
+            )
+        finally:
+            await client.disconnect()
+
+    @staticmethod
+    def summarize(results: Sequence[Dict[str, Any]], wall_time: float) -> Dict[str, Any]:
+        """
+        汇总批量执行结果
+
+        Args:
+            results (Sequence[Dict[str, Any]]): 各设备的结果字典
+            wall_time (float): 总耗时（秒）
+
+        Returns:
+            Dict[str, Any]: 数量统计、失败原因分布和耗时分位数（秒）
+        """
+        counts = {status: 0 for status in (STATUS_OK, STATUS_FAILED, STATUS_ERROR, STATUS_TIMEOUT)}
+        reasons: Dict[str, int] = {}
+        for result in results:
+            counts[result['status']] += 1
+            if result['error_type']:
+                reasons[result['error_type']] = reasons.get(result['error_type'], 0) + 1
+        elapsed = [result['elapsed'] for result in results if result['status'] in (STATUS_OK, STATUS_FAILED)]
+        return {
+            'hosts': len(results),
+            'ok': counts[STATUS_OK],
+            'failed': counts[STATUS_FAILED],
+            'errors': counts[STATUS_ERROR],
+            'timeouts': counts[STATUS_TIMEOUT],
+            'error_reasons': reasons,
+            'failed_hosts': [r['host'] for r in results if r['status'] != STATUS_OK],
+            'wall_time': round(wall_time, 3),
+            'hosts_per_sec': round(len(results) / wall_time, 2) if wall_time else 0.0,
+            'latency': {
+                'p50': percentile(elapsed, 50),
+                'p90': percentile(elapsed, 90),
+                'p99': percentile(elapsed, 99),
+                'max': max(elapsed) if elapsed else 0.0,
+            },
+        }
+
+
+def print_summary(summary: Dict[str, Any], stream: TextIO = sys.stderr) -> None:
+    """打印汇总信息（默认输出到标准错误，不混入标准输出的JSONL）"""
+    latency = summary['latency']
+    print(f"设备: {summary['hosts']}  成功: {summary['ok']}  命令失败: {summary['failed']}  "
+          f"出错: {summary['errors']}  超时: {summary['timeouts']}", file=stream)
+    print(f"总耗时: {summary['wall_time']:.1f}s  ({summary['hosts_per_sec']:.1f} 台/秒)", file=stream)
+    print(f"单台耗时: p50 {latency['p50']:.2f}s  p90 {latency['p90']:.2f}s  "
+          f"p99 {latency['p99']:.2f}s  max {latency['max']:.2f}s", file=stream)
+    for reason, count in sorted(summary['error_reasons'].items(), key=lambda item: -item[1]):
+        print(f"  {reason}: {count}", file=stream)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="对多台设备批量执行Telnet命令")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--inventory", help="清单文件（文本或JSON）")
+    source.add_argument("--history", nargs="?", const="ip_history.json", help="IP历史记录文件，默认ip_history.json")
+    commands = parser.add_mutually_exclusive_group(required=True)
+    commands.add_argument("-c", "--command", action="append", help="要执行的命令，可重复")
+    commands.add_argument("--script", help="脚本文件，整体作为一条sh -c命令执行")
+    parser.add_argument("--port", type=int, default=23, help="默认端口")
+    parser.add_argument("--username", default="root")
+    parser.add_argument("--password", default=os.environ.get("TELNET_PASSWORD"), help="默认读取环境变量TELNET_PASSWORD")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发设备数")
+    parser.add_argument("--timeout", type=float, default=60.0, help="单台设备总超时（秒）")
+    parser.add_argument("--connect-timeout", type=float, default=10.0, help="连接超时（秒）")
+    parser.add_argument("-o", "--output", help="JSONL结果文件，默认输出到标准输出")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    if args.inventory:
+        targets = load_inventory(args.inventory, args.port)
+    else:
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        targets = inventory_from_history(args.history, args.port)
+    if args.script:
+        with open(args.script, 'r', encoding='utf-8') as f:
+            command_list = [script_command(f.read())]
+    else:
+        command_list = args.command
+
+    runner = FleetRunner(
+        command_list,
+        username=args.username,
+        password=args.password,
+        concurrency=args.concurrency,
+        host_timeout=args.timeout,
+        connect_timeout=args.connect_timeout
+    )
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        summary = asyncio.run(runner.run(targets, output=output))
+    finally:
+        if args.output:
+            output.close()
+    print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
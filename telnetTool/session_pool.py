@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telnet会话池模块
+
+设备登录需要数秒，各工具各自建连登录代价很高。会话池按 (host, port) 缓存
+已认证的CustomTelnetClient：
+- acquire/release（或 session() 上下文管理器）借出和归还会话
+- 每台设备同时存在的会话数有上限，超出时等待归还
+- 空闲超过一定时间的会话在借出前做健康检查（一次分帧空命令），失败则重建
+- 空闲过久的会话被回收
+
+telnetlib3的连接绑定在创建它的事件循环上，因此连接池也是按事件循环划分的：
+get_session_pool() 返回当前事件循环的进程级连接池。其他线程需要使用时，
+应通过 asyncio.run_coroutine_threadsafe 把协程提交到该事件循环。
+"""
+
+import asyncio
+import logging
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from telnetTool.telnetConnect import CustomTelnetClient
+except ImportError:
+    from telnetConnect import CustomTelnetClient
+
+
+class PooledSession:
+    """
+    池中的一个会话
+
+    Attributes:
+        client (CustomTelnetClient): 已认证的客户端
+        in_use (bool): 是否已借出
+        last_used (float): 最近一次归还/借出的时间
+        last_checked (float): 最近一次确认可用的时间
+    """
+
+    def __init__(self, client: CustomTelnetClient):
+        now = time.monotonic()
+        self.client = client
+        self.in_use = False
+        self.created = now
+        self.last_used = now
+        self.last_checked = now
+
+
+class TelnetSessionPool:
+    """
+    按设备复用已登录会话的连接池
+
+    Example:
+        >>> pool = get_session_pool()
+        >>> async with pool.session("192.168.1.100", username="root", password="***") as client:
+        ...     await client.execute_command("uptime")
+    """
+
+    def __init__(
+        self,
+        max_sessions_per_host: int = 2,
+        idle_timeout: float = 300.0,
+        health_check_interval: float = 30.0,
+        logger: Optional[logging.Logger] = None
+    ):
+        """
+        初始化会话池
+
+        Args:
+            max_sessions_per_host (int): 每台设备最多同时存在的会话数，默认2
+            idle_timeout (float): 空闲超过此时间（秒）的会话被关闭，默认300秒
+            health_check_interval (float): 空闲超过此时间（秒）的会话借出前先做健康检查，默认30秒
+            logger (logging.Logger, optional): 日志记录器
+        """
+        self.max_sessions_per_host = max_sessions_per_host
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self._sessions: Dict[Tuple[str, int], List[PooledSession]] = {}
+        self._credentials: Dict[Tuple[str, int], Tuple[Optional[str], Optional[str]]] = {}
+        self._cond = asyncio.Condition()
+
+    async def acquire(
+        self,
+        host: str,
+        port: int = 23,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        timeout: float = 60.0,
+        wait_timeout: Optional[float] = None
+    ) -> CustomTelnetClient:
+        """
+        借出一个已认证的会话，没有空闲会话且未达上限时新建
+
+        Args:
+            host (str): 设备地址
+            port (int): 端口号，默认23
+            username (str, optional): 用户名，省略时使用该设备上次提供的认证信息
+            password (str, optional): 密码
+            timeout (float): 新建客户端的命令超时时间
+            wait_timeout (float, optional): 达到上限时等待归还的最长时间，默认一直等待
+
+        Returns:
+            CustomTelnetClient: 已连接并登录的客户端
+
+        Raises:
+            ConnectionError: 连接或登录失败时抛出
+            TimeoutError: 等待空闲会话超时时抛出
+        """
+        key = (host, port)
+        if username and password:
+            self._credentials[key] = (username, password)
+        username, password = self._credentials.get(key, (username, password))
+
+        await self.evict_idle()
+        deadline = None if wait_timeout is None else time.monotonic() + wait_timeout
+        while True:
+            async with self._cond:
+                while True:
+                    sessions = self._sessions.setdefault(key, [])
+                    idle = [s for s in sessions if not s.in_use]
+                    if idle:
+                        # 优先复用最近使用过的会话，其余的更容易被空闲回收
+                        pooled = max(idle, key=lambda s: s.last_used)
+                        pooled.in_use = True
+                        break
+                    if len(sessions) < self.max_sessions_per_host:
+                        pooled = None
+                        # 先占位，避免等待连接期间被其他协程超额创建
+                        placeholder = PooledSession(CustomTelnetClient(host, port, timeout=timeout))
+                        placeholder.in_use = True
+                        sessions.append(placeholder)
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"等待 {host}:{port} 的空闲会话超时")
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        raise TimeoutError(f"等待 {host}:{port} 的空闲会话超时")
+
+            if pooled is None:
+                try:
+                    await placeholder.client.connect(username, password)
+                except Exception:
+                    await self._remove(key, placeholder)
+                    raise
+                placeholder.last_checked = placeholder.last_used = time.monotonic()
+                self.logger.info(f"新建会话: {host}:{port}（当前 {len(self._sessions[key])} 个）")
+                return placeholder.client
+
+            if await self._is_healthy(pooled):
+                pooled.last_used = time.monotonic()
+                return pooled.client
+            self.logger.info(f"会话健康检查失败，重建: {host}:{port}")
+            await self._remove(key, pooled, close=True)
+
+    async def release(self, client: CustomTelnetClient, discard: bool = False) -> None:
+        """
+        归还会话
+
+        Args:
+            client (CustomTelnetClient): acquire借出的客户端
+            discard (bool): 是否关闭而不放回池中（命令异常、状态未知时使用）
+        """
+        key = (client.host, client.port)
+        pooled = self._find(key, client)
+        if pooled is None:
+            await client.disconnect()
+            return
+        if discard or not client.is_connected:
+            await self._remove(key, pooled, close=True)
+            return
+        async with self._cond:
+            pooled.in_use = False
+            pooled.last_used = time.monotonic()
+            self._cond.notify_all()
+
+    @asynccontextmanager
+    async def session(
+        self,
+        host: str,
+        port: int = 23,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        timeout: float = 60.0
+    ):
+        """
+        借出会话的上下文管理器，退出时自动归还；发生异常时关闭该会话
+
+        Args:
+            host (str): 设备地址
+            port (int): 端口号，默认23
+            username (str, optional): 用户名
+            password (str, optional): 密码
+            timeout (float): 新建客户端的命令超时时间
+
+        Yields:
+            CustomTelnetClient: 已连接并登录的客户端
+        """
+        client = await self.acquire(host, port, username, password, timeout=timeout)
+        try:
+            yield client
+        except BaseException:
+            await self.release(client, discard=True)
+            raise
+        else:
+            await self.release(client)
+
+    async def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        关闭空闲超过idle_timeout的会话
+
+        Args:
+            now (float, optional): 当前时间（time.monotonic），默认取当前值
+
+        Returns:
+            int: 关闭的会话数
+        """
+        now = time.monotonic() if now is None else now
+        expired = []
+        async with self._cond:
+            for key, sessions in self._sessions.items():
+                for pooled in list(sessions):
+                    if not pooled.in_use and now - pooled.last_used > self.idle_timeout:
+                        sessions.remove(pooled)
+                        expired.append(pooled)
+            if expired:
+                self._cond.notify_all()
+        for pooled in expired:
+            self.logger.debug(f"回收空闲会话: {pooled.client.host}:{pooled.client.port}")
+            await self._close(pooled.client)
+        return len(expired)
+
+    async def close_host(self, host: str, port: int = 23) -> None:
+        """关闭某台设备的全部会话（包括已借出的）"""
+        async with self._cond:
+            sessions = self._sessions.pop((host, port), [])
+            self._cond.notify_all()
+        for pooled in sessions:
+            await self._close(pooled.client)
+
+    async def close_all(self) -> None:
+        """关闭池中全部会话"""
+        for host, port in list(self._sessions):
+            await self.close_host(host, port)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        获取各设备的会话数量
+
+        Returns:
+            Dict[str, Dict[str, int]]: {"host:port": {"total": n, "in_use": m}}
+        """
+        return {
+            f"{host}:{port}": {
+                'total': len(sessions),
+                'in_use': sum(1 for s in sessions if s.in_use),
+            }
+            for (host, port), sessions in self._sessions.items()
+        }
+
+    async def _is_healthy(self, pooled: PooledSession) -> bool:
+        """借出前检查会话是否可用，近期确认过的会话跳过检查"""
+        client = pooled.client
+        if not client.is_connected or not client.writer or client.writer.is_closing():
+            return False
+        if time.monotonic() - pooled.last_checked < self.health_check_interval:
+            return True
+        try:
+            # 分帧空命令：一次往返，顺带处理掉线后的重新登录
+            (_, code), = await client.execute_many([":"], timeout=5.0)
+        except Exception as e:
+            self.logger.debug(f"健康检查异常: {e}")
+            return False
+        pooled.last_checked = time.monotonic()
+        return code == 0
+
+    def _find(self, key: Tuple[str, int], client: CustomTelnetClient) -> Optional[PooledSession]:
+        for pooled in self._sessions.get(key, []):
+            if pooled.client is client:
+                return pooled
+        return None
+
+    async def _remove(self, key: Tuple[str, int], pooled: PooledSession, close: bool = False) -> None:
+        async with self._cond:
+            sessions = self._sessions.get(key, [])
+            if pooled in sessions:
+                sessions.remove(pooled)
+            self._cond.notify_all()
+        if close:
+            await self._close(pooled.client)
+
+    async def _close(self, client: CustomTelnetClient) -> None:
+        try:
+            await client.disconnect()
+        except Exception as e:
+            self.logger.debug(f"关闭会话时出错: {e}")
+
+
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, TelnetSessionPool]" = weakref.WeakKeyDictionary()
+
+
+def get_session_pool(loop: Optional[asyncio.AbstractEventLoop] = None) -> TelnetSessionPool:
+    """
+    获取事件循环对应的进程级会话池
+
+    Args:
+        loop (asyncio.AbstractEventLoop, optional): 事件循环，默认为当前正在运行的事件循环
+
+    Returns:
+        TelnetSessionPool: 会话池
+    """
+    loop = loop or asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = TelnetSessionPool()
+    return pool
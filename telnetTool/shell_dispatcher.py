@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telnet多shell调度模块
+
+一台设备只用一个shell时，所有命令都要排队：30秒的wget会让目录浏览、文件编辑
+全部卡住。ShellDispatcher为每台设备维护两类shell：
+- 交互shell：一个常驻会话，由一把锁串行化，专门执行ls、cat等短命令，保证低延迟
+- 工作shell：从会话池借出的少量额外会话，执行传输、tar、日志打包等长任务
+
+设备不允许多个telnet会话时，工作shell会自动退回到交互shell上执行（与原先的
+单shell行为一致）。
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+
+try:
+    from telnetTool.adaptive_timeout import BULK, INTERACTIVE, classify_command
+    from telnetTool.session_pool import TelnetSessionPool, get_session_pool
+    from telnetTool.telnetConnect import CustomTelnetClient
+except ImportError:
+    from adaptive_timeout import BULK, INTERACTIVE, classify_command
+    from session_pool import TelnetSessionPool, get_session_pool
+    from telnetConnect import CustomTelnetClient
+
+
+class ShellDispatcher:
+    """
+    单台设备的shell调度器
+
+    Example:
+        >>> dispatcher = ShellDispatcher("192.168.1.100", username="root", password="***")
+        >>> await dispatcher.start()
+        >>> async with dispatcher.worker() as shell:
+        ...     await shell.execute_command('wget -O a.bin "http://..."', timeout=300)
+        >>> await dispatcher.run("ls /")          # 交互shell，不会被上面的wget阻塞
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 23,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        worker_shells: int = 1,
+        timeout: float = 60.0,
+        pool: Optional[TelnetSessionPool] = None,
+        interactive_lock: Optional[asyncio.Lock] = None,
+        logger: Optional[logging.Logger] = None
+    ):
+        """
+        初始化调度器
+
+        Args:
+            host (str): 设备地址
+            port (int): 端口号，默认23
+            username (str, optional): 用户名
+            password (str, optional): 密码
+            worker_shells (int): 工作shell数量，默认1
+            timeout (float): 新建客户端的命令超时时间
+            pool (TelnetSessionPool, optional): 会话池，默认使用当前事件循环的会话池
+            interactive_lock (asyncio.Lock, optional): 交互shell的锁，已有锁保护同一客户端时传入
+            logger (logging.Logger, optional): 日志记录器
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.worker_shells = max(0, worker_shells)
+        self.timeout = timeout
+        self.pool = pool
+        self.interactive_lock = interactive_lock or asyncio.Lock()
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self.interactive_client: Optional[CustomTelnetClient] = None
+        self._worker_slots = asyncio.Semaphore(self.worker_shells) if self.worker_shells else None
+        self._workers_available = self.worker_shells > 0
+
+    async def start(self) -> CustomTelnetClient:
+        """
+        建立交互shell
+
+        Returns:
+            CustomTelnetClient: 交互shell客户端
+
+        Raises:
+            ConnectionError: 连接或登录失败时抛出
+        """
+        if self.pool is None:
+            self.pool = get_session_pool()
+        # 交互shell常驻占用一个会话，保证工作shell有足够的名额
+        self.pool.max_sessions_per_host = max(self.pool.max_sessions_per_host, 1 + self.worker_shells)
+        if self.interactive_client is None:
+            self.interactive_client = await self.pool.acquire(
+                self.host, self.port, self.username, self.password, timeout=self.timeout
+            )
+        return self.interactive_client
+
+    @asynccontextmanager
+    async def interactive(self):
+        """
+        独占交互shell的上下文管理器
+
+        Yields:
+            CustomTelnetClient: 交互shell客户端
+        """
+        client = await self.start()
+        async with self.interactive_lock:
+            yield client
+
+    @asynccontextmanager
+    async def worker(self):
+        """
+        借出工作shell的上下文管理器
+
+        工作shell无法建立时（例如设备限制了telnet会话数）退回到交互shell。
+
+        Yields:
+            CustomTelnetClient: 工作shell客户端
+        """
+        await self.start()
+        if not self._workers_available:
+            async with self.interactive() as client:
+                yield client
+            return
+
+        async with self._worker_slots:
+            try:
+                client = await self.pool.acquire(
+                    self.host, self.port, self.username, self.password, timeout=self.timeout
+                )
+            except ConnectionError as e:
+                self.logger.warning(f"⚠️ 无法建立工作shell，长任务改用交互shell执行: {e}")
+                self._workers_available = False
+                client = None
+            if client is None:
+                async with self.interactive() as client:
+                    yield client
+                return
+            try:
+                yield client
+            except BaseException:
+                await self.pool.release(client, discard=True)
+                raise
+            else:
+                await self.pool.release(client)
+
+    async def run(self, command: str, timeout: Optional[float] = None, kind: Optional[str] = None) -> str:
+        """
+        按命令类型选择shell执行命令
+
+        Args:
+            command (str): 要执行的命令
+            timeout (float, optional): 超时时间
+            kind (str, optional): INTERACTIVE 或 BULK，默认由classify_command判断
+
+        Returns:
+            str: 命令输出
+        """
+        kind = kind or classify_command(command)
+        shell = self.worker() if kind == BULK else self.interactive()
+        async with shell as client:
+            return await client.execute_command(command, timeout=timeout)
+
+    async def close(self) -> None:
+        """关闭该设备的全部shell"""
+        if self.pool is not None:
+            await self.pool.close_host(self.host, self.port)
+        self.interactive_client = None
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telnet输出流匹配模块
+
+为等待提示符/结束标记提供线性时间的增量匹配：
+- 原始字节追加到bytearray，不再反复拼接字符串
+- 每次只在新到达的数据（加上模式长度-1的重叠区）中查找，总耗时与输出长度成线性关系
+- 使用增量解码器解码，多字节字符（如中文）跨chunk边界时不会丢失
+"""
+
+import codecs
+from typing import Iterable, List, Optional, Tuple
+
+
+class StreamMatcher:
+    """
+    增量流匹配器
+
+    Example:
+        >>> matcher = StreamMatcher(["#", "login:"])
+        >>> matcher.feed(b"ls\\r\\nfile\\r\\n")
+        >>> matcher.feed(b"/ # ")
+        '#'
+        >>> matcher.text
+        'ls\\r\\nfile\\r\\n/ # '
+    """
+
+    def __init__(self, patterns: Iterable[str], encoding: str = "utf-8"):
+        """
+        初始化匹配器
+
+        Args:
+            patterns (Iterable[str]): 要查找的模式（任一出现即匹配）
+            encoding (str): 字符编码，默认utf-8
+        """
+        self.encoding = encoding
+        self.patterns: List[Tuple[str, bytes]] = [(p, p.encode(encoding)) for p in patterns if p]
+        if not self.patterns:
+            raise ValueError("至少需要一个非空模式")
+        self._overlap = max(len(raw) for _, raw in self.patterns) - 1
+        self._buffer = bytearray()
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._parts: List[str] = []
+        self.matched: Optional[str] = None
+        self.match_end = -1  # 匹配结束位置（字节偏移）
+
+    def feed(self, data: bytes) -> Optional[str]:
+        """
+        追加数据并在新数据中查找模式
+
+        Args:
+            data (bytes): 新收到的数据
+
+        Returns:
+            str: 匹配到的模式（最早出现者），未匹配时返回None
+        """
+        if not data:
+            return None
+        if isinstance(data, str):
+            data = data.encode(self.encoding)
+        start = max(0, len(self._buffer) - self._overlap)
+        self._buffer += data
+        self._parts.append(self._decoder.decode(data))
+        if self.matched is not None:
+            return self.matched
+
+        best: Optional[Tuple[int, str, int]] = None
+        for pattern, raw in self.patterns:
+            index = self._buffer.find(raw, start)
+            if index != -1 and (best is None or index < best[0]):
+                best = (index, pattern, index + len(raw))
+        if best:
+            _, self.matched, self.match_end = best
+        return self.matched
+
+    @property
+    def raw(self) -> bytes:
+        """收到的全部原始字节"""
+        return bytes(self._buffer)
+
+    @property
+    def text(self) -> str:
+        """已解码的全部文本（不完整的多字节字符会保留到下次feed）"""
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def tail(self, nbytes: int) -> str:
+        """
+        解码末尾最多nbytes字节（用于判断输出是否停在某个提示符上）
+
+        Args:
+            nbytes (int): 字节数
+
+        Returns:
+            str: 末尾文本，被截断的多字节字符会被忽略
+        """
+        return bytes(self._buffer[-nbytes:]).decode(self.encoding, errors="ignore")
+
+    def __len__(self) -> int:
+        return len(self._buffer)
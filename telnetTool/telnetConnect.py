@@ -14,10 +14,30 @@ import asyncio
 import logging
 import time
 import sys
-from typing import Optional, Union, Tuple, Dict, Any
+from typing import Optional, Union, Tuple, Dict, Any, List, Sequence
 import telnetlib3
 from telnetlib3 import TelnetWriter, TelnetReader
 
+try:
+    from telnetTool.adaptive_timeout import LOGIN, get_adaptive_timeouts
+    from telnetTool.command_framing import CommandFrame
+    from telnetTool.stream_matcher import StreamMatcher
+except ImportError:
+    from adaptive_timeout import LOGIN, get_adaptive_timeouts
+    from command_framing import CommandFrame
+    from stream_matcher import StreamMatcher
+
+
+READ_CHUNK_SIZE = 4096  # 等待提示符时每次读取的字节数
+
+
+class LoginRequiredError(ConnectionError):
+    """等待命令结果时设备输出了登录/密码提示符（会话已掉回登录界面）"""
+
+    def __init__(self, prompt: str):
+        super().__init__(f"检测到登录提示符: {prompt}")
+        self.prompt = prompt
+
 
 class CustomTelnetClient:
     """
@@ -80,6 +100,15 @@ class CustomTelnetClient:
         self._stored_username: Optional[str] = None
         self._stored_password: Optional[str] = None
         self._stored_shell_prompt: str = "#"
+        self._login_prompt: str = "login:"
+        self._password_prompt: str = "Password:"
+        
+        # 会话状态（由输出流维护，不再每条命令前探测）
+        self.logged_in = False
+        self._last_activity = 0.0
+        
+        # 按设备共享的往返时间统计，未显式指定超时的命令由它推出超时时间
+        self.adaptive = get_adaptive_timeouts()
         
         # 设置日志
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -147,6 +176,8 @@ class CustomTelnetClient:
                 self._stored_username = username
                 self._stored_password = password
                 self._stored_shell_prompt = shell_prompt
+            self._login_prompt = login_prompt
+            self._password_prompt = password_prompt
             
             return True
             
@@ -183,102 +214,115 @@ class CustomTelnetClient:
                 raise ValueError("所有提示符参数必须为非空字符串")
         try:
             # 等待登录提示符
-            await self._wait_for_prompt(login_prompt, timeout=10.0)
-            
-            # 发送用户名
-            await self._send_line(username)
-            self.logger.debug(f"已发送用户名: {username}")
-            
-            # 等待密码提示符
-            await self._wait_for_prompt(password_prompt, timeout=10.0)
-            
-            # 发送密码
-            await self._send_line(password)
-            self.logger.debug("已发送密码")
-            
-            # 等待Shell提示符，表示登录成功
-            await self._wait_for_prompt(shell_prompt, timeout=15.0)
-            self.logger.info("认证成功")
+            await self._wait_for_prompt(login_prompt, timeout=self._login_timeout())
+            await self._send_credentials(username, password, password_prompt, shell_prompt)
             
         except Exception as e:
             error_msg = f"认证失败: {str(e)}"
             self.logger.error(error_msg)
             raise ConnectionError(error_msg)
     
-    async def _check_and_handle_login(
+    async def _send_credentials(
+        self,
+        username: str,
+        password: str,
+        password_prompt: str,
+        shell_prompt: str
+    ) -> None:
+        """
+        在登录提示符之后发送用户名和密码，等待Shell提示符
+        
+        Args:
+            username (str): 用户名
+            password (str): 密码
+            password_prompt (str): 密码提示符
+            shell_prompt (str): Shell提示符
+        """
+        self.logged_in = False
+        
+        # 发送用户名
+        await self._send_line(username)
+        self.logger.debug(f"已发送用户名: {username}")
+        
+        # 等待密码提示符
+        await self._wait_for_prompt(password_prompt, timeout=self._login_timeout())
+        
+        # 发送密码
+        await self._send_line(password)
+        self.logger.debug("已发送密码")
+        
+        # 等待Shell提示符，表示登录成功（密码不回显，首个数据块包含登录处理时间，不计入往返时间）
+        await self._wait_for_prompt(shell_prompt, timeout=self._login_timeout() * 1.5, sample_rtt=False)
+        self.logged_in = True
+        self.logger.info("认证成功")
+    
+    async def _relogin(
         self,
+        seen_prompt: str,
         username: Optional[str] = None,
-        password: Optional[str] = None,
-        shell_prompt: str = "#",
-        login_prompt: str = "login:",
-        password_prompt: str = "Password:"
+        password: Optional[str] = None
     ) -> None:
         """
-        检查登录状态并处理重新登录
+        输出流中出现登录提示符后重新登录
+        
+        刚发送的命令可能已被设备当作用户名输入，因此先读完设备后续的输出，
+        根据最后停留的提示符决定从哪一步开始。
         
         Args:
-            username (str, optional): 用户名
-            password (str, optional): 密码
-            shell_prompt (str): Shell提示符，默认"#"
-            login_prompt (str): 登录提示符，默认"login:"
-            password_prompt (str): 密码提示符，默认"Password:"
+            seen_prompt (str): 检测到的提示符（登录或密码提示符）
+            username (str, optional): 用户名，默认使用存储的认证信息
+            password (str, optional): 密码，默认使用存储的认证信息
+        
+        Raises:
+            ConnectionError: 没有可用的认证信息或重新登录失败时抛出
         """
-        try:
-            self.logger.debug("检查登录状态...")
-            
-            # 发送回车检查当前状态
-            await self._send_line("")
-            
-            # 尝试读取响应，看看是否有登录提示
+        self.logged_in = False
+        username = username or self._stored_username
+        password = password or self._stored_password
+        if not username or not password:
+            raise ConnectionError("检测到需要登录，但未提供用户名或密码")
+        self.logger.info("检测到登录提示符，重新登录")
+        
+        tail = seen_prompt
+        while True:
             try:
-                response = await asyncio.wait_for(
-                    self.reader.read(1024),
-                    timeout=2.0  # 短超时，快速检查
-                )
-                
-                if not response:
-                    self.logger.debug("没有收到响应，可能已经在shell中")
-                    return
-                
-                # 解码响应
-                if isinstance(response, bytes):
-                    decoded_response = response.decode(self.encoding)
-                elif isinstance(response, str):
-                    decoded_response = response
-                else:
-                    decoded_response = str(response)
-                
-                self.logger.debug(f"收到响应: {repr(decoded_response)}")
-                
-                # 检查是否包含登录提示符
-                if login_prompt.lower() in decoded_response.lower():
-                    self.logger.info("检测到登录提示符，需要重新登录")
-                    
-                    if not username or not password:
-                        raise ConnectionError("检测到需要登录，但未提供用户名或密码")
-                    
-                    # 执行重新登录
-                    await self._authenticate(username, password, login_prompt, password_prompt, shell_prompt)
-                    
-                elif shell_prompt in decoded_response:
-                    self.logger.debug("已经在shell中，无需登录")
-                    
-                else:
-                    # 可能是其他状态，尝试等待shell提示符
-                    self.logger.debug("状态不明确，尝试等待shell提示符")
-                    try:
-                        await self._wait_for_prompt(shell_prompt, timeout=3.0)
-                        self.logger.debug("成功获得shell提示符")
-                    except asyncio.TimeoutError:
-                        self.logger.warning("无法获得shell提示符，可能需要手动处理")
-                        
+                chunk = await asyncio.wait_for(self.reader.read(READ_CHUNK_SIZE),
+                                               timeout=self.adaptive.settle_time(self.host, maximum=0.3))
             except asyncio.TimeoutError:
-                # 没有立即响应，可能已经在shell中
-                self.logger.debug("没有立即响应，假设已经在shell中")
-                
+                break
+            if not chunk:
+                break
+            if isinstance(chunk, bytes):
+                chunk = chunk.decode(self.encoding, errors="replace")
+            tail = (tail + chunk)[-256:]
+        prompt = self._match_login_prompt(tail) or seen_prompt
+        
+        try:
+            if prompt == self._password_prompt:
+                # 用户名已被占用（多半是刚发送的命令），发送空密码让设备回到登录提示符
+                await self._send_line("")
+                await self._wait_for_prompt(self._login_prompt, timeout=self._login_timeout())
+            await self._send_credentials(username, password, self._password_prompt, self._stored_shell_prompt)
         except Exception as e:
-            self.logger.warning(f"检查登录状态时出现错误: {str(e)}")
-            # 不抛出异常，让命令执行继续进行
+            error_msg = f"重新登录失败: {str(e)}"
+            self.logger.error(error_msg)
+            raise ConnectionError(error_msg)
+    
+    def _match_login_prompt(self, tail: str) -> Optional[str]:
+        """
+        判断输出末尾是否停在登录/密码提示符
+        
+        Args:
+            tail (str): 输出末尾的文本
+        
+        Returns:
+            str: 匹配到的提示符，未匹配时返回None
+        """
+        tail = tail.rstrip().lower()
+        for prompt in (self._login_prompt, self._password_prompt):
+            if tail.endswith(prompt.strip().lower()):
+                return prompt
+        return None
     
     async def execute_command(
         self, 
@@ -295,12 +339,12 @@ class CustomTelnetClient:
         
         Args:
             command (str): 要执行的命令
-            timeout (float, optional): 命令执行超时时间，默认使用实例超时时间
+            timeout (float, optional): 命令执行超时时间，默认按命令类别和设备往返时间自适应
             end_prompt (str): 命令结束提示符，默认"#"
             strip_command (bool): 是否从结果中移除命令本身，默认True
             username (str, optional): 用户名，用于自动重新登录
             password (str, optional): 密码，用于自动重新登录
-            auto_login (bool): 是否自动检查并处理登录，默认True
+            auto_login (bool): 输出中出现登录提示符时是否自动重新登录并重发命令，默认True
         
         Returns:
             str: 命令执行结果
@@ -313,23 +357,21 @@ class CustomTelnetClient:
             raise ConnectionError("未连接到服务器")
         
         if timeout is None:
-            timeout = self.timeout
+            timeout = self.adaptive.timeout_for(self.host, command, ceiling=self.timeout)
         
         try:
             self.logger.debug(f"执行命令: {command}")
             
-            # 执行命令前检查登录状态
-            if auto_login:
-                # 如果没有提供认证信息，使用存储的认证信息
-                auth_username = username or self._stored_username
-                auth_password = password or self._stored_password
-                await self._check_and_handle_login(auth_username, auth_password, end_prompt)
-            
-            # 发送命令
-            await self._send_line(command)
-            
-            # 等待命令执行完成
-            response = await self._wait_for_prompt(end_prompt, timeout=timeout)
+            # 登录状态由输出流维护：只有看到登录提示符时才重新登录，不再逐条命令探测
+            try:
+                await self._send_line(command)
+                response = await self._wait_for_prompt(end_prompt, timeout=timeout)
+            except LoginRequiredError as e:
+                if not auto_login:
+                    raise
+                await self._relogin(e.prompt, username, password)
+                await self._send_line(command)
+                response = await self._wait_for_prompt(end_prompt, timeout=timeout)
             
             # 处理响应
             if strip_command:
@@ -350,6 +392,185 @@ class CustomTelnetClient:
             self.logger.error(error_msg)
             raise RuntimeError(error_msg)
     
+    async def execute_many(
+        self,
+        commands: Sequence[str],
+        timeout: Optional[float] = None,
+        end_prompt: str = "#",
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        auto_login: bool = True
+    ) -> List[Tuple[str, int]]:
+        """
+        一次写入多条命令，按分帧标记拆分出每条命令的输出和退出码
+
+        所有命令在同一个shell中依次执行（cd等状态会延续到后续命令），
+        整批只需一次往返，前一条命令失败不会中止后续命令。
+
+        Args:
+            commands (Sequence[str]): 要执行的命令列表
+            timeout (float, optional): 整批命令的超时时间，默认按命令类别和设备往返时间自适应
+            end_prompt (str): Shell提示符，默认"#"
+            username (str, optional): 用户名，用于自动重新登录
+            password (str, optional): 密码，用于自动重新登录
+            auto_login (bool): 输出中出现登录提示符时是否自动重新登录并重发，默认True
+
+        Returns:
+            List[Tuple[str, int]]: 与commands一一对应的 (输出, 退出码)
+
+        Raises:
+            ConnectionError: 未连接时抛出
+            TimeoutError: 命令执行超时时抛出
+        """
+        if not self.is_connected:
+            raise ConnectionError("未连接到服务器")
+        if not commands:
+            return []
+
+        if timeout is None:
+            # 整批按最慢的一类命令计算
+            timeout = self.adaptive.timeout_for(self.host, "\n".join(commands), ceiling=self.timeout)
+
+        try:
+            self.logger.debug(f"批量执行 {len(commands)} 条命令")
+            try:
+                frames, text = await self._send_frames(commands, end_prompt, timeout)
+            except LoginRequiredError as e:
+                if not auto_login:
+                    raise
+                await self._relogin(e.prompt, username, password)
+                frames, text = await self._send_frames(commands, end_prompt, timeout)
+            results = []
+            for frame in frames:
+                parsed = frame.parse(text)
+                if parsed is None:
+                    raise RuntimeError(f"未找到命令 '{frame.command}' 的结束标记")
+                results.append(parsed)
+            self.logger.debug(f"批量执行完成，退出码: {[code for _, code in results]}")
+            return results
+
+        except asyncio.TimeoutError:
+            error_msg = f"批量命令执行超时: {list(commands)}"
+            self.logger.error(error_msg)
+            raise TimeoutError(error_msg)
+        except Exception as e:
+            error_msg = f"批量命令执行失败: {str(e)}"
+            self.logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+    def stream_command(
+        self,
+        command: str,
+        end_prompt: str = "#",
+        idle_timeout: Optional[float] = None,
+        max_line_length: int = 4096
+    ) -> "CommandStream":
+        """
+        以异步迭代器的形式逐行获取命令输出，适用于tail -f、日志抓取等长时间运行的命令
+
+        读取由消费者驱动（背压），内存占用与输出总量无关；在async with中提前退出时
+        自动发送Ctrl-C终止命令。命令结束后可从返回对象的exit_code获取退出码。
+
+        Args:
+            command (str): 要执行的命令
+            end_prompt (str): Shell提示符，默认"#"
+            idle_timeout (float, optional): 超过此时间（秒）没有输出则抛出TimeoutError，默认一直等待
+            max_line_length (int): 单行最大字符数，超出部分切分为多行，默认4096
+
+        Returns:
+            CommandStream: 输出流
+
+        Example:
+            >>> async with client.stream_command("logread -f") as stream:
+            ...     async for line in stream:
+            ...         print(line)
+        """
+        try:
+            from telnetTool.command_stream import CommandStream
+        except ImportError:
+            from command_stream import CommandStream
+
+        return CommandStream(
+            self,
+            command,
+            end_prompt=end_prompt,
+            idle_timeout=idle_timeout,
+            max_line_length=max_line_length,
+            read_size=READ_CHUNK_SIZE
+        )
+
+    async def _send_frames(
+        self,
+        commands: Sequence[str],
+        end_prompt: str,
+        timeout: float
+    ) -> Tuple[List[CommandFrame], str]:
+        """
+        分帧后一次写入全部命令并等待最后一条完成
+
+        Args:
+            commands (Sequence[str]): 要执行的命令列表
+            end_prompt (str): Shell提示符
+            timeout (float): 超时时间
+
+        Returns:
+            Tuple[List[CommandFrame], str]: 分帧信息和收到的完整响应
+        """
+        frames = [CommandFrame(command) for command in commands]
+        payload = "".join(f"{frame.wrap()}\n" for frame in frames)
+        self.writer.write(payload.encode(self.encoding))
+        await self.writer.drain()
+        return frames, await self._wait_for_frames(frames[-1], end_prompt, timeout)
+
+    async def _wait_for_frames(self, last_frame: CommandFrame, end_prompt: str, timeout: float) -> str:
+        """
+        读取直到最后一条命令的结束标记及其后的提示符到达
+
+        Args:
+            last_frame (CommandFrame): 批次中最后一条命令的分帧信息
+            end_prompt (str): Shell提示符
+            timeout (float): 超时时间
+
+        Returns:
+            str: 收到的完整响应
+        """
+        matcher = StreamMatcher([last_frame.end_marker], self.encoding)
+        start_time = time.time()
+        deadline = start_time + timeout
+        settle_deadline = None
+        while True:
+            now = time.time()
+            if settle_deadline is not None and now >= settle_deadline:
+                # 结束标记已到但迟迟没有提示符（提示符与end_prompt不符），直接返回
+                return matcher.text
+            if now >= deadline:
+                raise asyncio.TimeoutError(f"等待命令结束标记超时: {last_frame.command}")
+            try:
+                chunk = await asyncio.wait_for(
+                    self.reader.read(READ_CHUNK_SIZE),
+                    timeout=min(0.5, deadline - now)
+                )
+            except asyncio.TimeoutError:
+                continue
+            if not chunk:
+                if self.reader.at_eof():
+                    raise ConnectionError("连接已被远端关闭")
+                continue
+            self._last_activity = time.time()
+            if not len(matcher):
+                self.adaptive.observe(self.host, self._last_activity - start_time)
+            if not matcher.feed(chunk):
+                self._raise_if_login_prompt(matcher)
+                continue
+            text = matcher.text
+            if last_frame.parse(text) is None:
+                continue
+            # 把结束标记后的提示符一起读走，避免残留到下一条命令的响应中
+            if end_prompt in text[text.rfind(last_frame.end_marker):]:
+                return text
+            if settle_deadline is None:
+                settle_deadline = time.time() + self.adaptive.settle_time(self.host)
+
     async def send_raw_data(self, data: Union[str, bytes]) -> None:
         """
         发送原始数据
@@ -469,49 +690,63 @@ class CustomTelnetClient:
         self.writer.write(data)
         await self.writer.drain()
     
-    async def _wait_for_prompt(self, prompt: str, timeout: float) -> str:
+    async def _wait_for_prompt(self, prompt: str, timeout: float, sample_rtt: bool = True) -> str:
         """
         等待指定的提示符出现
         
         Args:
             prompt (str): 期望的提示符
             timeout (float): 超时时间
+            sample_rtt (bool): 是否把首个数据块的到达时间记为往返时间样本，默认True
         
         Returns:
             str: 收到的完整响应
         """
         assert isinstance(prompt, str) and prompt, "prompt 必须为非空字符串"
         self.logger.debug(f"等待提示符: '{prompt}', 超时: {timeout}秒")
-        response = ""
+        # 增量匹配：每个chunk只扫描新数据，多字节字符跨chunk时由增量解码器拼接
+        matcher = StreamMatcher([prompt], self.encoding)
         start_time = time.time()
         while time.time() - start_time < timeout:
             try:
                 chunk = await asyncio.wait_for(
-                    self.reader.read(1024),
+                    self.reader.read(READ_CHUNK_SIZE),
                     timeout=0.5
                 )
                 if not chunk:
                     continue
-                # 手动处理编码
-                if isinstance(chunk, bytes):
-                    try:
-                        decoded_chunk = chunk.decode(self.encoding)
-                    except Exception as e:
-                        self.logger.error(f'解码chunk失败: {e}, chunk内容: {chunk}')
-                        continue
-                elif isinstance(chunk, str):
-                    decoded_chunk = chunk
-                else:
+                if not isinstance(chunk, (bytes, bytearray, str)):
                     self.logger.error(f'收到未知类型chunk: {type(chunk)}，内容: {chunk}')
                     continue
-                response += decoded_chunk
-                if prompt in response:
+                self._last_activity = time.time()
+                if sample_rtt and not len(matcher):
+                    # 发送后的首个数据块通常是命令回显，反映的是链路往返时间
+                    self.adaptive.observe(self.host, self._last_activity - start_time)
+                if matcher.feed(chunk):
                     self._last_prompt = prompt
-                    return response
+                    return matcher.text
+                if prompt not in (self._login_prompt, self._password_prompt):
+                    self._raise_if_login_prompt(matcher)
             except asyncio.TimeoutError:
                 continue
         raise asyncio.TimeoutError(f"等待提示符 '{prompt}' 超时")
     
+    def _login_timeout(self) -> float:
+        """登录各步骤的超时时间"""
+        return self.adaptive.timeout_for(self.host, kind=LOGIN)
+    
+    def _raise_if_login_prompt(self, matcher: StreamMatcher) -> None:
+        """
+        输出停在登录/密码提示符时标记会话未登录并抛出LoginRequiredError
+        
+        Args:
+            matcher (StreamMatcher): 当前响应的匹配器
+        """
+        prompt = self._match_login_prompt(matcher.tail(64))
+        if prompt:
+            self.logged_in = False
+            raise LoginRequiredError(prompt)
+    
     def set_auth_info(
         self, 
         username: str, 
@@ -548,6 +783,9 @@ class CustomTelnetClient:
             "timeout": self.timeout,
             "connection_duration": connection_duration,
             "last_prompt": self._last_prompt,
+            "logged_in": self.logged_in,
+            "last_activity": self._last_activity,
+            "srtt": self.adaptive.estimator(self.host).srtt,
             "has_stored_auth": bool(self._stored_username and self._stored_password)
         }
     
@@ -598,6 +836,9 @@ async def quick_telnet_command(
     """
     快速执行单个Telnet命令的便利函数
     
+    每次调用单独建立连接并在返回前断开，可直接用于 asyncio.run()；
+    需要复用已登录连接的调用方请使用 session_pool.get_session_pool()。
+    
     Args:
         host (str): 目标主机
         command (str): 要执行的命令
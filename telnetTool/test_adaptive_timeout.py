@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应超时单元测试
+
+这个文件包含了RttEstimator的平滑计算、AdaptiveTimeouts的分类策略以及
+CustomTelnetClient往返时间采样的测试用例
+"""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from adaptive_timeout import BULK, INTERACTIVE, LOGIN, AdaptiveTimeouts, RttEstimator
+from telnetConnect import CustomTelnetClient
+
+
+class TestRttEstimator:
+    """
+    RttEstimator类的测试用例
+    """
+
+    def test_initial_rto(self):
+        """
+        测试尚无样本时使用初始RTO
+        """
+        estimator = RttEstimator(initial_rto=1.0)
+        assert estimator.srtt is None
+        assert estimator.rto == 1.0
+
+    def test_smoothing(self):
+        """
+        测试按RFC 6298计算SRTT和RTTVAR
+        """
+        estimator = RttEstimator()
+        estimator.observe(0.1)
+        assert estimator.srtt == pytest.approx(0.1)
+        assert estimator.rttvar == pytest.approx(0.05)
+        assert estimator.rto == pytest.approx(0.3)
+
+        estimator.observe(0.3)
+        assert estimator.rttvar == pytest.approx(0.75 * 0.05 + 0.25 * 0.2)
+        assert estimator.srtt == pytest.approx(0.875 * 0.1 + 0.125 * 0.3)
+        assert estimator.samples == 2
+
+    def test_negative_sample_ignored(self):
+        """
+        测试负数样本被忽略
+        """
+        estimator = RttEstimator()
+        estimator.observe(-1.0)
+        assert estimator.samples == 0
+
+
+class TestAdaptiveTimeouts:
+    """
+    AdaptiveTimeouts类的测试用例
+    """
+
+    def setup_method(self):
+        """
+        每个测试方法执行前的设置
+        """
+        self.timeouts = AdaptiveTimeouts()
+
+    def test_fast_and_slow_hosts(self):
+        """
+        测试慢速设备得到更长的超时，快速设备使用下限
+        """
+        for _ in range(20):
+            self.timeouts.observe("lan", 0.005)
+            self.timeouts.observe("wifi", 0.8)
+        assert self.timeouts.timeout_for("lan", "ls /") == 5.0
+        assert self.timeouts.timeout_for("wifi", "ls /") > 16.0
+        assert self.timeouts.timeout_for("wifi", "ls /", ceiling=10.0) == 10.0
+
+    def test_command_classes(self):
+        """
+        测试按命令类别使用不同策略
+        """
+        assert self.timeouts.timeout_for("new", 'wget -O a "http://h/a"') == 100.0
+        assert self.timeouts.timeout_for("new", "cat /etc/version") == 20.0
+        assert self.timeouts.timeout_for("new", kind=LOGIN) == 10.0
+
+    def test_policy_override(self):
+        """
+        测试覆盖某类命令的策略
+        """
+        self.timeouts.set_policy(BULK, minimum=300.0)
+        self.timeouts.set_policy(INTERACTIVE, multiplier=1.0, minimum=1.0, maximum=2.0)
+        assert self.timeouts.timeout_for("h", "tar -xf a.tar") == 300.0
+        assert self.timeouts.timeout_for("h", "ls") == 1.0
+
+    def test_settle_time(self):
+        """
+        测试提示符等待时间随往返时间缩短
+        """
+        assert self.timeouts.settle_time("h") == 0.5
+        for _ in range(20):
+            self.timeouts.observe("h", 0.002)
+        assert self.timeouts.settle_time("h") == pytest.approx(0.05)
+
+
+class TestClientSampling:
+    """
+    CustomTelnetClient往返时间采样的测试用例
+    """
+
+    @pytest.mark.asyncio
+    async def test_wait_for_prompt_samples_first_chunk(self):
+        """
+        测试发送后首个数据块的到达时间被记为样本，且只记一次
+        """
+        client = CustomTelnetClient(host="sample.example.com", timeout=5.0)
+        client.adaptive = AdaptiveTimeouts()
+        chunks = [b"pwd\r\n", b"/root\r\n", b"/ # "]
+
+        async def read(n):
+            await asyncio.sleep(0.02)
+            return chunks.pop(0)
+
+        client.reader = MagicMock()
+        client.reader.read = read
+        await client._wait_for_prompt("#", timeout=2.0)
+
+        estimator = client.adaptive.estimator("sample.example.com")
+        assert estimator.samples == 1
+        assert 0.01 < estimator.srtt < 0.5
+
+    @pytest.mark.asyncio
+    async def test_no_sample_when_disabled(self):
+        """
+        测试sample_rtt=False时不记录样本（例如发送密码后的登录处理时间）
+        """
+        client = CustomTelnetClient(host="nosample.example.com", timeout=5.0)
+        client.adaptive = AdaptiveTimeouts()
+        client.reader = MagicMock()
+
+        async def read(n):
+            return b"\r\n/ # "
+
+        client.reader.read = read
+        await client._wait_for_prompt("#", timeout=2.0, sample_rtt=False)
+        assert client.adaptive.estimator("nosample.example.com").samples == 0
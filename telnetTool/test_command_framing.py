@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令分帧单元测试
+
+这个文件包含了CommandFrame的命令包装和输出解析测试用例
+"""
+
+import pytest
+
+from command_framing import CommandFrame
+
+
+class TestCommandFrame:
+    """
+    CommandFrame类的测试用例
+    """
+
+    def setup_method(self):
+        """
+        每个测试方法执行前的设置
+        """
+        self.frame = CommandFrame("ls /tmp", nonce="abc123")
+
+    def _device_output(self, body: str, status: int) -> str:
+        """模拟shell回显命令行后输出标记和命令结果"""
+        return (f"/ # {self.frame.wrap()}\r\n"
+                f"{self.frame.begin_marker}\r\n{body}"
+                f"{self.frame.end_marker}{status}\r\n/ # ")
+
+    def test_wrap_splits_markers_in_echo(self):
+        """
+        测试命令行中的标记被引号拆开，回显不会被误判为标记
+        """
+        line = self.frame.wrap()
+        assert line == 'echo __TFB""_abc123; ls /tmp; echo __TFE""_abc123_$?'
+        assert self.frame.begin_marker not in line
+        assert self.frame.end_marker not in line
+
+    @pytest.mark.parametrize("command, expected", [
+        ("sleep 5 &", 'echo __TFB""_abc123; sleep 5 & echo __TFE""_abc123_$?'),
+        ("cd /tmp;", 'echo __TFB""_abc123; cd /tmp; echo __TFE""_abc123_$?'),
+        ("", 'echo __TFB""_abc123; echo __TFE""_abc123_$?'),
+    ])
+    def test_wrap_separators(self, command, expected):
+        """
+        测试后台命令、分号结尾和空命令的包装
+        """
+        assert CommandFrame(command, nonce="abc123").wrap() == expected
+
+    def test_parse_output_and_status(self):
+        """
+        测试解析出不含回显和提示符的输出及退出码
+        """
+        text = self._device_output("a.txt\r\nb.txt\r\n", 0)
+        assert self.frame.parse(text) == ("a.txt\r\nb.txt", 0)
+
+    def test_parse_nonzero_status(self):
+        """
+        测试非零退出码
+        """
+        text = self._device_output("ls: /nope: No such file or directory\r\n", 1)
+        assert self.frame.parse(text) == ("ls: /nope: No such file or directory", 1)
+
+    def test_parse_incomplete_returns_none(self):
+        """
+        测试结束标记或退出码尚未完整到达时返回None
+        """
+        text = self._device_output("a.txt\r\n", 127)
+        assert self.frame.parse(text[:text.index("127")]) is None
+        assert self.frame.parse(text[:text.index("127") + 2]) is None
+        assert self.frame.parse(text) == ("a.txt", 127)
+
+    def test_other_nonce_ignored(self):
+        """
+        测试残留的其他命令标记不会被误认
+        """
+        stale = CommandFrame("ls /tmp", nonce="old999")
+        text = f"{stale.end_marker}0\r\n" + self._device_output("x\r\n", 0)
+        assert self.frame.parse(f"{stale.end_marker}0\r\n") is None
+        assert self.frame.parse(text) == ("x", 0)
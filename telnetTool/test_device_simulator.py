@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+设备模拟器单元测试
+
+这个文件包含了DeviceSimulator的命令解析、登录流程、脚本化命令、链路延迟以及
+CustomTelnetClient端到端交互的测试用例
+"""
+
+import functools
+import http.server
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+from device_simulator import DeviceSimulator, _split_command_list
+from telnetConnect import CustomTelnetClient
+
+
+class TestSplitCommandList:
+    """
+    _split_command_list函数的测试用例
+    """
+
+    def test_connectors_and_pipes(self):
+        """
+        测试按 ; && || 拆分命令列表，按 | 拆分管道
+        """
+        assert _split_command_list('echo a; ls | cat && wget -O - "u" || echo "x;y"') == [
+            (";", ["echo a"]),
+            (";", [" ls ", " cat "]),
+            ("&&", [' wget -O - "u" ']),
+            ("||", [' echo "x;y"']),
+        ]
+
+
+class TestDeviceSimulator:
+    """
+    DeviceSimulator与CustomTelnetClient端到端交互的测试用例
+    """
+
+    async def _connect(self, device: DeviceSimulator) -> CustomTelnetClient:
+        client = CustomTelnetClient(device.host, device.port, timeout=10.0, log_level="WARNING")
+        await client.connect("root", "root")
+        return client
+
+    @pytest.mark.asyncio
+    async def test_login_and_commands(self):
+        """
+        测试登录后执行ls、cat、chmod，并返回正确的退出码
+        """
+        async with DeviceSimulator(files={"/root/app.bin": b"\x7fELF", "/root/说明.txt": "你好\n"}) as device:
+            client = await self._connect(device)
+            try:
+                assert client.logged_in is True
+                results = await client.execute_many([
+                    "ls",
+                    "cat 说明.txt",
+                    "chmod +x app.bin",
+                    "ls -l app.bin",
+                    "cat /nope",
+                ])
+                assert results[0] == ("app.bin\r\n说明.txt", 0)
+                assert results[1] == ("你好", 0)
+                assert results[2] == ("", 0)
+                assert results[3][0].startswith("-rwxr-xr-x")
+                assert results[4][1] == 1
+                assert device.fs.modes["/root/app.bin"] & 0o111
+            finally:
+                await client.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_wrong_password(self):
+        """
+        测试密码错误时登录失败
+        """
+        async with DeviceSimulator(password="secret") as device:
+            client = CustomTelnetClient(device.host, device.port, timeout=2.0, log_level="CRITICAL")
+            with pytest.raises(Exception):
+                await client.connect("root", "wrong")
+            await client.disconnect()
+            assert device.logins == 0
+
+    @pytest.mark.asyncio
+    async def test_wget_from_http_server(self):
+        """
+        测试wget从本地HTTP服务器下载文件到模拟文件系统
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, "fw.bin"), "wb") as f:
+                f.write(b"firmware" * 100)
+            handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=tmpdir)
+            handler.log_message = lambda *args: None
+            httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+            threading.Thread(target=httpd.serve_forever, daemon=True).start()
+            try:
+                url = f"http://127.0.0.1:{httpd.server_address[1]}"
+                async with DeviceSimulator() as device:
+                    client = await self._connect(device)
+                    try:
+                        (output, code), (_, missing_code) = await client.execute_many([
+                            f'mkdir -p /tmp/up && cd /tmp/up && wget -O fw.bin "{url}/fw.bin"',
+                            f'wget -q -O x.bin "{url}/missing.bin"',
+                        ])
+                    finally:
+                        await client.disconnect()
+                    assert code == 0
+                    assert "'fw.bin' saved" in output
+                    assert device.fs.files["/tmp/up/fw.bin"] == b"firmware" * 100
+                    assert missing_code == 1
+            finally:
+                httpd.shutdown()
+                httpd.server_close()
+
+    @pytest.mark.asyncio
+    async def test_latency(self):
+        """
+        测试单向延迟作用于输入和输出两个方向
+        """
+        async with DeviceSimulator(latency=0.05) as device:
+            client = await self._connect(device)
+            try:
+                start = time.perf_counter()
+                assert await client.execute_many(["pwd"]) == [("/root", 0)]
+                assert time.perf_counter() - start >= 0.1
+            finally:
+                await client.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_ctrl_c_interrupts_follow(self):
+        """
+        测试Ctrl-C中断tail -f后shell恢复可用
+        """
+        log = "".join(f"line {i}\n" for i in range(20))
+        async with DeviceSimulator(files={"/var/log/messages": log}) as device:
+            client = await self._connect(device)
+            try:
+                async with client.stream_command("tail -f /var/log/messages") as stream:
+                    first = await stream.__anext__()
+                assert first == "line 10"
+                assert await client.execute_many(["echo ok"]) == [("ok", 0)]
+            finally:
+                await client.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_relogin_after_drop(self):
+        """
+        测试会话掉回登录提示符后客户端自动重新登录
+        """
+        async with DeviceSimulator() as device:
+            client = await self._connect(device)
+            try:
+                device.drop_sessions_to_login()
+                assert await client.execute_many(["pwd"]) == [("/root", 0)]
+                assert device.logins == 2
+            finally:
+                await client.disconnect()
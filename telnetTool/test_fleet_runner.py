@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量设备执行单元测试
+
+这个文件包含了清单解析、FleetRunner并发控制、单台超时、JSONL输出以及汇总统计的测试用例
+"""
+
+import asyncio
+import io
+import json
+import shlex
+import socket
+
+import pytest
+
+from device_simulator import DeviceSimulator
+from fleet_runner import FleetRunner, FleetTarget, load_inventory, percentile, script_command
+
+
+def _closed_port() -> int:
+    """获取一个当前没有监听的本地端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestInventory:
+    """
+    清单加载的测试用例
+    """
+
+    def test_text_inventory(self, tmp_path):
+        """
+        测试文本清单：注释、端口、设备ID和去重
+        """
+        path = tmp_path / "hosts.txt"
+        path.write_text("# 产线\n192.168.1.5\n192.168.1.6:2323 M1220401L000189\n\n192.168.1.5\n", encoding="utf-8")
+        targets = load_inventory(str(path))
+        assert [(t.host, t.port, t.device_id) for t in targets] == [
+            ("192.168.1.5", 23, None),
+            ("192.168.1.6", 2323, "M1220401L000189"),
+        ]
+
+    def test_history_json_inventory(self, tmp_path):
+        """
+        测试ip_history.json格式的清单
+        """
+        path = tmp_path / "ip_history.json"
+        path.write_text(json.dumps({
+            "ip_history": [
+                {"ip": "192.168.1.8", "device_id": "PinturaTest173459"},
+                {"ip": "192.168.1.5", "device_id": None},
+            ],
+            "device_history": {},
+        }), encoding="utf-8")
+        targets = load_inventory(str(path))
+        assert [(t.host, t.device_id) for t in targets] == [("192.168.1.8", "PinturaTest173459"), ("192.168.1.5", None)]
+
+    def test_percentile(self):
+        """
+        测试最近秩法分位数
+        """
+        assert percentile([], 50) == 0.0
+        assert percentile([3.0, 1.0, 2.0, 4.0], 50) == 2.0
+        assert percentile([3.0, 1.0, 2.0, 4.0], 99) == 4.0
+
+    def test_script_command(self):
+        """
+        测试脚本整体作为一条sh -c命令发送，多行结构和引号保持原样
+        """
+        script = "#!/bin/sh\r\nif [ -f /etc/version ]; then\r\n  echo 'ok'\r\nfi\r\n"
+        command = script_command(script)
+        assert shlex.split(command) == ["sh", "-c", "#!/bin/sh\nif [ -f /etc/version ]; then\n  echo 'ok'\nfi"]
+
+
+class TestFleetRunner:
+    """
+    FleetRunner类的测试用例
+    """
+
+    @pytest.mark.asyncio
+    async def test_run_against_simulators(self):
+        """
+        测试对多台设备执行脚本：成功、命令失败、连接失败和超时分别记录
+        """
+        devices = [DeviceSimulator(files={"/etc/version": "1.0.0\n"}) for _ in range(3)]
+        devices.append(DeviceSimulator(responses={"cat version": ("", 1)}))
+        # 单向延迟超过单台超时，登录都无法完成
+        slow = DeviceSimulator(latency=3.0)
+        for device in devices + [slow]:
+            await device.start()
+        try:
+            targets = [FleetTarget(d.host, d.port, f"dev{i}") for i, d in enumerate(devices)]
+            targets.append(FleetTarget("127.0.0.1", _closed_port()))
+            targets.append(FleetTarget(slow.host, slow.port))
+            runner = FleetRunner(
+                ["cd /etc", "cat version"],
+                username="root",
+                password="root",
+                concurrency=3,
+                host_timeout=2.0,
+                command_timeout=10.0
+            )
+            output = io.StringIO()
+            summary = await runner.run(targets, output=output)
+        finally:
+            for device in devices + [slow]:
+                await device.stop()
+
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert len(lines) == 6
+        by_port = {line["port"]: line for line in lines}
+        for i, device in enumerate(devices[:3]):
+            record = by_port[device.port]
+            assert record["status"] == "ok"
+            assert record["device_id"] == f"dev{i}"
+            assert record["results"][1] == {"command": "cat version", "output": "1.0.0", "exit_code": 0}
+        assert by_port[devices[3].port]["status"] == "failed"
+        assert by_port[targets[4].port]["status"] == "error"
+        assert by_port[slow.port]["status"] == "timeout"
+
+        assert summary["hosts"] == 6
+        assert (summary["ok"], summary["failed"], summary["errors"], summary["timeouts"]) == (3, 1, 1, 1)
+        assert summary["error_reasons"] == {"ConnectionError": 1, "TimeoutError": 1}
+        assert summary["latency"]["max"] > 0
+
+    @pytest.mark.asyncio
+    async def test_concurrency_bound(self):
+        """
+        测试同时执行的设备数不超过并发上限，且每台设备完成后立即回调
+        """
+        runner = FleetRunner(["true"], concurrency=4)
+        active = 0
+        peak = 0
+
+        async def fake_execute(target):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return [("", 0)]
+
+        runner._execute = fake_execute
+        seen = []
+        summary = await runner.run(
+            [FleetTarget(f"10.0.0.{i}") for i in range(20)],
+            on_result=lambda result: seen.append(result["host"])
+        )
+        assert peak == 4
+        assert len(seen) == 20
+        assert summary["ok"] == 20
+        assert summary["hosts_per_sec"] > 0
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telnet会话池单元测试
+
+这个文件包含了TelnetSessionPool的复用、上限、健康检查和空闲回收测试用例
+"""
+
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from telnetConnect import CustomTelnetClient
+from session_pool import TelnetSessionPool, get_session_pool
+
+
+class TestTelnetSessionPool:
+    """
+    TelnetSessionPool类的测试用例
+    """
+
+    def setup_method(self):
+        """
+        每个测试方法执行前的设置
+        """
+        self.connects = []
+        test = self
+
+        async def fake_connect(client, username=None, password=None, *args, **kwargs):
+            test.connects.append((client.host, username, password))
+            client.is_connected = True
+            client.writer = MagicMock()
+            client.writer.is_closing.return_value = False
+            return True
+
+        self.patcher = patch.object(CustomTelnetClient, 'connect', fake_connect)
+        self.patcher.start()
+        self.pool = TelnetSessionPool(max_sessions_per_host=2, idle_timeout=60.0, health_check_interval=30.0)
+
+    def teardown_method(self):
+        """
+        每个测试方法执行后的清理
+        """
+        self.patcher.stop()
+
+    @pytest.mark.asyncio
+    async def test_session_reused(self):
+        """
+        测试归还后的会话被复用，不重复登录
+        """
+        async with self.pool.session("10.0.0.1", username="root", password="pw") as first:
+            pass
+        async with self.pool.session("10.0.0.1") as second:
+            pass
+        assert first is second
+        assert self.connects == [("10.0.0.1", "root", "pw")]
+        assert self.pool.stats() == {"10.0.0.1:23": {"total": 1, "in_use": 0}}
+
+    @pytest.mark.asyncio
+    async def test_max_sessions_per_host(self):
+        """
+        测试达到单设备上限后等待归还
+        """
+        a = await self.pool.acquire("10.0.0.1", username="root", password="pw")
+        b = await self.pool.acquire("10.0.0.1")
+        assert a is not b
+        with pytest.raises(TimeoutError):
+            await self.pool.acquire("10.0.0.1", wait_timeout=0.1)
+
+        waiter = asyncio.ensure_future(self.pool.acquire("10.0.0.1"))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        await self.pool.release(b)
+        assert await asyncio.wait_for(waiter, 1.0) is b
+        # 其他设备不受影响
+        other = await self.pool.acquire("10.0.0.2", username="root", password="pw")
+        assert other.host == "10.0.0.2"
+
+    @pytest.mark.asyncio
+    async def test_failed_health_check_reconnects(self):
+        """
+        测试空闲会话健康检查失败时重建
+        """
+        client = await self.pool.acquire("10.0.0.1", username="root", password="pw")
+        await self.pool.release(client)
+        self.pool._sessions[("10.0.0.1", 23)][0].last_checked -= 60
+        with patch.object(CustomTelnetClient, 'execute_many', side_effect=RuntimeError("dead")):
+            fresh = await self.pool.acquire("10.0.0.1")
+        assert fresh is not client
+        assert len(self.connects) == 2
+        assert self.pool.stats()["10.0.0.1:23"]["total"] == 1
+
+    @pytest.mark.asyncio
+    async def test_error_discards_session(self):
+        """
+        测试使用中出现异常的会话不放回池中
+        """
+        with pytest.raises(ValueError):
+            async with self.pool.session("10.0.0.1", username="root", password="pw"):
+                raise ValueError("boom")
+        assert self.pool.stats()["10.0.0.1:23"]["total"] == 0
+
+    @pytest.mark.asyncio
+    async def test_evict_idle(self):
+        """
+        测试空闲过久的会话被回收，借出中的不受影响
+        """
+        idle = await self.pool.acquire("10.0.0.1", username="root", password="pw")
+        busy = await self.pool.acquire("10.0.0.1")
+        await self.pool.release(idle)
+        assert await self.pool.evict_idle(now=time.monotonic() + 120) == 1
+        assert idle.is_connected is False
+        assert busy.is_connected is True
+        assert self.pool.stats()["10.0.0.1:23"] == {"total": 1, "in_use": 1}
+
+    @pytest.mark.asyncio
+    async def test_pool_per_event_loop(self):
+        """
+        测试同一事件循环内获取的是同一个会话池
+        """
+        assert get_session_pool() is get_session_pool()
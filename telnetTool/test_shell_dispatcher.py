@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telnet多shell调度单元测试
+
+这个文件包含了ShellDispatcher的命令分类、交互/工作shell隔离和回退测试用例
+"""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from telnetConnect import CustomTelnetClient
+from session_pool import TelnetSessionPool
+from shell_dispatcher import BULK, INTERACTIVE, ShellDispatcher, classify_command
+
+
+class TestClassifyCommand:
+    """
+    classify_command函数的测试用例
+    """
+
+    @pytest.mark.parametrize("command, kind", [
+        ("ls -la /tmp", INTERACTIVE),
+        ("cat /etc/version", INTERACTIVE),
+        ('wget -O a.bin "http://host/a.bin"', BULK),
+        ('cd /tmp && wget -q -O - "http://host/d.tar" | tar -xf -', BULK),
+        ("/usr/bin/md5sum a.bin", BULK),
+        ("echo tar", INTERACTIVE),
+    ])
+    def test_classify(self, command, kind):
+        """
+        测试按命令（包括命令链中的各段）判断shell类型
+        """
+        assert classify_command(command) == kind
+
+
+class TestShellDispatcher:
+    """
+    ShellDispatcher类的测试用例
+    """
+
+    def setup_method(self):
+        """
+        每个测试方法执行前的设置
+        """
+        self.connects = []
+        self.refuse_extra = False
+        test = self
+
+        async def fake_connect(client, username=None, password=None, *args, **kwargs):
+            if test.refuse_extra and test.connects:
+                raise ConnectionError("too many sessions")
+            test.connects.append(client)
+            client.is_connected = True
+            client.writer = MagicMock()
+            client.writer.is_closing.return_value = False
+            return True
+
+        self.patcher = patch.object(CustomTelnetClient, 'connect', fake_connect)
+        self.patcher.start()
+        self.pool = TelnetSessionPool(max_sessions_per_host=1)
+
+    def teardown_method(self):
+        """
+        每个测试方法执行后的清理
+        """
+        self.patcher.stop()
+
+    def _dispatcher(self, **kwargs):
+        return ShellDispatcher("10.0.0.1", username="root", password="pw", pool=self.pool, **kwargs)
+
+    @pytest.mark.asyncio
+    async def test_worker_does_not_block_interactive(self):
+        """
+        测试工作shell执行长任务期间，交互shell仍可立即使用
+        """
+        dispatcher = self._dispatcher(worker_shells=1)
+        interactive = await dispatcher.start()
+        assert self.pool.max_sessions_per_host == 2
+
+        release_worker = asyncio.Event()
+        worker_clients = []
+
+        async def long_job():
+            async with dispatcher.worker() as shell:
+                worker_clients.append(shell)
+                await release_worker.wait()
+
+        job = asyncio.create_task(long_job())
+        await asyncio.sleep(0)
+        async with dispatcher.interactive() as client:
+            assert client is interactive
+        release_worker.set()
+        await job
+
+        assert worker_clients[0] is not interactive
+        assert len(self.connects) == 2
+
+    @pytest.mark.asyncio
+    async def test_worker_shells_bounded(self):
+        """
+        测试同时借出的工作shell数量不超过worker_shells
+        """
+        dispatcher = self._dispatcher(worker_shells=1)
+        await dispatcher.start()
+        active = []
+        peak = []
+
+        async def job():
+            async with dispatcher.worker():
+                active.append(1)
+                peak.append(len(active))
+                await asyncio.sleep(0.01)
+                active.pop()
+
+        await asyncio.gather(job(), job(), job())
+        assert max(peak) == 1
+        assert len(self.connects) == 2
+
+    @pytest.mark.asyncio
+    async def test_worker_falls_back_to_interactive(self):
+        """
+        测试设备拒绝额外会话时，长任务退回交互shell执行
+        """
+        self.refuse_extra = True
+        dispatcher = self._dispatcher(worker_shells=1)
+        interactive = await dispatcher.start()
+
+        async with dispatcher.worker() as shell:
+            assert shell is interactive
+            assert dispatcher.interactive_lock.locked()
+        async with dispatcher.worker() as shell:
+            assert shell is interactive
+        assert len(self.connects) == 1
+
+    @pytest.mark.asyncio
+    async def test_run_dispatches_by_kind(self):
+        """
+        测试run按命令类型选择shell
+        """
+        dispatcher = self._dispatcher(worker_shells=1)
+        interactive = await dispatcher.start()
+        used = []
+
+        async def fake_execute(client, command, timeout=None, *args, **kwargs):
+            used.append((client is interactive, command))
+            return ""
+
+        with patch.object(CustomTelnetClient, 'execute_command', fake_execute):
+            await dispatcher.run("ls /")
+            await dispatcher.run('wget -O a "http://h/a"')
+
+        assert used == [(True, "ls /"), (False, 'wget -O a "http://h/a"')]
@@ -10,10 +10,12 @@
 """
 
 import asyncio
+import re
 import pytest
 import logging
 from unittest.mock import AsyncMock, MagicMock, patch
 from telnetConnect import CustomTelnetClient, quick_telnet_command
+from stream_matcher import StreamMatcher
 
 
 class TestCustomTelnetClient:
@@ -515,6 +517,348 @@ class TestEdgeCases:
                 assert len(result) > 9000
 
 
+class TestStreamMatcher:
+    """
+    StreamMatcher增量匹配的测试用例
+    """
+
+    def test_prompt_split_across_chunks(self):
+        """
+        测试提示符被拆分在两个chunk之间时仍能匹配
+        """
+        matcher = StreamMatcher(["root@device:~#"])
+        assert matcher.feed(b"output\r\nroot@dev") is None
+        assert matcher.feed(b"ice:~# ") == "root@device:~#"
+        assert matcher.text.endswith("root@device:~# ")
+
+    def test_multibyte_split_across_chunks(self):
+        """
+        测试中文字符被拆分在chunk边界时解码不丢失
+        """
+        data = "文件列表\n# ".encode("utf-8")
+        matcher = StreamMatcher(["#"])
+        for i in range(len(data)):
+            matcher.feed(data[i:i + 1])
+        assert matcher.text == "文件列表\n# "
+        assert matcher.matched == "#"
+
+    def test_earliest_pattern_wins(self):
+        """
+        测试多个模式时返回最早出现者
+        """
+        matcher = StreamMatcher(["#", "login:"])
+        assert matcher.feed(b"device login: x #") == "login:"
+
+    @pytest.mark.asyncio
+    async def test_wait_for_prompt_with_chunked_reader(self):
+        """
+        测试_wait_for_prompt在分块读取时返回完整响应
+        """
+        client = CustomTelnetClient(host="test.example.com")
+        payload = ("行" * 5000 + "\n/ # ").encode("utf-8")
+        chunks = [payload[i:i + 1000] for i in range(0, len(payload), 1000)]
+        client.reader = MagicMock()
+        client.reader.read = AsyncMock(side_effect=chunks)
+
+        response = await client._wait_for_prompt("/ #", timeout=5.0)
+        assert response == payload.decode("utf-8")
+        assert client._last_prompt == "/ #"
+
+
+class _FakeShellWriter:
+    """
+    模拟busybox shell：回显每行命令，执行分帧标记并输出预设结果
+    """
+
+    def __init__(self, queue: asyncio.Queue, outputs: dict):
+        self.queue = queue
+        self.outputs = outputs
+        self.writes = 0
+        self.lines = []
+
+    def write(self, data: bytes):
+        self.writes += 1
+        for line in data.decode("utf-8").splitlines() or [""]:
+            self.lines.append(line)
+            self._handle_line(line)
+
+    def _handle_line(self, line: str):
+        chunks = [f"{line}\r\n"]
+        for part in line.split("; "):
+            part = part.strip()
+            echo = re.fullmatch(r'echo (__TF[BE])""(_\w+_?)(\$\?)?', part)
+            if echo:
+                status = str(self.last_status) if echo.group(3) else ""
+                chunks.append(f"{echo.group(1)}{echo.group(2)}{status}\r\n")
+            elif part:
+                output, self.last_status = self.outputs.get(part, ("", 0))
+                chunks.append(output)
+        chunks.append("/ # ")
+        self._emit("".join(chunks))
+
+    def _emit(self, text: str):
+        # 拆成小块逐个送达，模拟网络分片
+        data_out = text.encode("utf-8")
+        for i in range(0, len(data_out), 7):
+            self.queue.put_nowait(data_out[i:i + 7])
+
+    async def drain(self):
+        pass
+
+
+class TestExecuteMany:
+    """
+    execute_many批量执行的测试用例
+    """
+
+    def setup_method(self):
+        """
+        每个测试方法执行前的设置
+        """
+        self.client = CustomTelnetClient(host="test.example.com", timeout=5.0)
+        self.client.is_connected = True
+        self.queue = asyncio.Queue()
+        self.client.reader = MagicMock()
+        self.client.reader.read = self._read
+        self.client.writer = _FakeShellWriter(self.queue, {
+            "pwd": ("/root\r\n", 0),
+            "ls /nope": ("ls: /nope: No such file or directory\r\n", 1),
+            "cat 中文.txt": ("你好\r\n", 0),
+        })
+
+    async def _read(self, n: int) -> bytes:
+        return await self.queue.get()
+
+    @pytest.mark.asyncio
+    async def test_results_and_exit_codes(self):
+        """
+        测试一次写入多条命令并按顺序拆分输出和退出码
+        """
+        results = await self.client.execute_many(
+            ["pwd", "ls /nope", "cat 中文.txt", "mkdir -p /tmp/x"], auto_login=False)
+        assert results == [
+            ("/root", 0),
+            ("ls: /nope: No such file or directory", 1),
+            ("你好", 0),
+            ("", 0),
+        ]
+        # 整批命令只写入一次
+        assert self.client.writer.writes == 1
+
+    @pytest.mark.asyncio
+    async def test_trailing_prompt_consumed(self):
+        """
+        测试批次结束后的提示符被读走，不残留到下一批
+        """
+        await self.client.execute_many(["pwd"], auto_login=False)
+        assert self.queue.empty()
+
+    @pytest.mark.asyncio
+    async def test_empty_batch(self):
+        """
+        测试空命令列表直接返回
+        """
+        assert await self.client.execute_many([]) == []
+
+
+class _FakeLoginDevice(_FakeShellWriter):
+    """
+    带登录流程的模拟设备，可以在会话中途掉回登录提示符
+    """
+
+    def __init__(self, queue: asyncio.Queue, outputs: dict):
+        super().__init__(queue, outputs)
+        self.state = "shell"
+        self.pending_user = None
+
+    def drop_to_login(self):
+        """模拟shell退出、设备重新显示登录提示符"""
+        self.state = "login"
+        self._emit("\r\nlogin: ")
+
+    def _handle_line(self, line: str):
+        if self.state == "shell":
+            super()._handle_line(line)
+        elif self.state == "login":
+            self.pending_user = line
+            self.state = "password"
+            self._emit(f"{line}\r\nPassword: ")
+        elif self.pending_user == "root" and line == "secret":
+            self.state = "shell"
+            self._emit("\r\n/ # ")
+        else:
+            self.state = "login"
+            self._emit("\r\nLogin incorrect\r\nlogin: ")
+
+
+class TestLoginStateTracking:
+    """
+    根据输出流维护登录状态的测试用例
+    """
+
+    def setup_method(self):
+        """
+        每个测试方法执行前的设置
+        """
+        self.client = CustomTelnetClient(host="test.example.com", timeout=5.0)
+        self.client.is_connected = True
+        self.client.logged_in = True
+        self.client.set_auth_info("root", "secret", "#")
+        self.queue = asyncio.Queue()
+        self.client.reader = MagicMock()
+        self.client.reader.read = self._read
+        self.device = _FakeLoginDevice(self.queue, {"pwd": ("/root\r\n", 0)})
+        self.client.writer = self.device
+
+    async def _read(self, n: int) -> bytes:
+        return await self.queue.get()
+
+    @pytest.mark.asyncio
+    async def test_no_probe_before_commands(self):
+        """
+        测试已登录时每条命令只发送命令本身，不再发送空行探测
+        """
+        assert (await self.client.execute_command("pwd")).startswith("/root")
+        assert (await self.client.execute_command("pwd")).startswith("/root")
+        assert self.device.lines == ["pwd", "pwd"]
+        assert self.client.get_connection_info()["last_activity"] > 0
+
+    @pytest.mark.asyncio
+    async def test_relogin_after_drop(self):
+        """
+        测试会话中途掉回登录提示符后自动重新登录并重发命令
+        """
+        assert (await self.client.execute_command("pwd")).startswith("/root")
+        self.device.drop_to_login()
+
+        assert (await self.client.execute_command("pwd")).startswith("/root")
+        # 命令被设备当作用户名 -> 空密码回到登录提示符 -> 登录 -> 重发命令
+        assert self.device.lines == ["pwd", "pwd", "", "root", "secret", "pwd"]
+        assert self.client.logged_in is True
+
+    @pytest.mark.asyncio
+    async def test_relogin_for_batch(self):
+        """
+        测试批量执行时同样检测登录提示符并重发整批命令
+        """
+        self.device.drop_to_login()
+        results = await self.client.execute_many(["pwd", "ls /"])
+        assert results == [("/root", 0), ("", 0)]
+        assert self.client.logged_in is True
+
+    @pytest.mark.asyncio
+    async def test_drop_without_auto_login(self):
+        """
+        测试关闭自动登录时检测到登录提示符直接报错
+        """
+        self.device.drop_to_login()
+        with pytest.raises(RuntimeError):
+            await self.client.execute_command("pwd", auto_login=False)
+        assert self.client.logged_in is False
+
+
+
+class _FakeStreamingShell(_FakeShellWriter):
+    """
+    支持长时间运行命令的模拟shell：tail -f 只输出开始标记和若干行，直到收到Ctrl-C
+    """
+
+    def __init__(self, queue: asyncio.Queue, outputs: dict, follow_lines: int = 5):
+        super().__init__(queue, outputs)
+        self.follow_lines = follow_lines
+        self.running = False
+
+    def _handle_line(self, line: str):
+        if line == "\x03":
+            self.running = False
+            self._emit("^C\r\n/ # ")
+            return
+        if "tail -f" not in line:
+            super()._handle_line(line)
+            return
+        begin = re.search(r'echo (__TFB)""(_\w+)', line)
+        log = "".join(f"log line {i}\r\n" for i in range(self.follow_lines))
+        self.running = True
+        self._emit(f"{line}\r\n{begin.group(1)}{begin.group(2)}\r\n{log}")
+
+
+class TestStreamCommand:
+    """
+    stream_command流式输出的测试用例
+    """
+
+    def setup_method(self):
+        """
+        每个测试方法执行前的设置
+        """
+        self.client = CustomTelnetClient(host="test.example.com", timeout=5.0)
+        self.client.is_connected = True
+        self.queue = asyncio.Queue()
+        self.client.reader = MagicMock()
+        self.client.reader.read = self._read
+        self.client.reader.at_eof = MagicMock(return_value=False)
+        self.device = _FakeStreamingShell(self.queue, {
+            "pwd": ("/root\r\n", 0),
+            "dmesg": ("".join(f"[{i}] 内核消息\r\n" for i in range(200)), 0),
+            "false": ("", 1),
+            "cat big": ("x" * 50 + "\r\n", 0),
+        })
+        self.client.writer = self.device
+
+    async def _read(self, n: int) -> bytes:
+        return await self.queue.get()
+
+    @pytest.mark.asyncio
+    async def test_lines_and_exit_code(self):
+        """
+        测试逐行产出输出，结束后得到退出码且提示符被读走
+        """
+        async with self.client.stream_command("dmesg") as stream:
+            lines = [line async for line in stream]
+        assert lines == [f"[{i}] 内核消息" for i in range(200)]
+        assert stream.exit_code == 0
+        assert self.queue.empty()
+
+        async with self.client.stream_command("false") as stream:
+            assert [line async for line in stream] == []
+        assert stream.exit_code == 1
+
+    @pytest.mark.asyncio
+    async def test_reads_only_on_demand(self):
+        """
+        测试消费者不取数据时不会继续读取连接（背压）
+        """
+        async with self.client.stream_command("dmesg") as stream:
+            assert await stream.__anext__() == "[0] 内核消息"
+            # 只读取了凑出第一行所需的几个分片，其余仍留在连接中
+            assert self.queue.qsize() > 500
+
+    @pytest.mark.asyncio
+    async def test_early_exit_sends_ctrl_c(self):
+        """
+        测试提前退出时发送Ctrl-C并重新同步shell
+        """
+        async with self.client.stream_command("tail -f /var/log/messages") as stream:
+            async for line in stream:
+                if line == "log line 2":
+                    break
+        assert "\x03" in self.device.lines
+        assert self.device.running is False
+        assert stream.exit_code is None
+        # shell已回到提示符，后续命令不受影响
+        assert await self.client.execute_many(["pwd"]) == [("/root", 0)]
+
+    @pytest.mark.asyncio
+    async def test_long_line_split(self):
+        """
+        测试超长行被切分，内存中不会累积整行
+        """
+        async with self.client.stream_command("cat big", max_line_length=20) as stream:
+            lines = [line async for line in stream]
+        assert lines == ["x" * 20, "x" * 20, "x" * 10]
+        assert stream.exit_code == 0
+
+
 if __name__ == "__main__":
     """
     运行测试
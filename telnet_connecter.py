@@ -1,7 +1,13 @@
 import asyncio
 import re
+import time
 import telnetlib3
 import logging
+from typing import Tuple
+
+from telnetTool.adaptive_timeout import get_adaptive_timeouts
+from telnetTool.command_framing import CommandFrame
+from telnetTool.stream_matcher import StreamMatcher
 
 # 嘗試導入 telnetlib3 的特定類型，如果失敗也沒關係，後面有檢查
 try:
@@ -85,6 +91,8 @@ class Telnet_connector:
         self.writer: asyncio.StreamWriter | None = None
         self.is_unicode_mode = False  # 添加標誌
         self.shell = None  # 如果需要的话
+        self.adaptive = get_adaptive_timeouts()  # 按設備共享的往返時間統計
+        self._first_chunk_at: float | None = None
         self.username = username if username else 'root'
         self.password = password if password else 'ya!2dkwy7-934^'
         print(f"username: {self.username}, password: {self.password}")
@@ -218,6 +226,8 @@ class Telnet_connector:
 
         Args:
             read_timeout: 在認為讀取完成之前，等待新數據的最長時間（秒）。
+                          靜默判定不按往返時間縮短：設備輸出停頓可能遠長於往返時間，
+                          需要更快返回的調用方應使用 `send_command_framed`。
 
         Returns:
             從連接讀取到的所有數據，組合成的單個字符串。
@@ -229,6 +239,7 @@ class Telnet_connector:
             raise ConnectionError("Not connected.")
 
         output = ""  # 初始化為空字符串
+        self._first_chunk_at = None
         while True:
             try:
                 # print(f"DEBUG: Waiting for data (timeout={read_timeout}s)...")
@@ -252,6 +263,8 @@ class Telnet_connector:
                     continue
 
                 # 累加字符串
+                if self._first_chunk_at is None:
+                    self._first_chunk_at = time.monotonic()
                 output += chunk_str
 
             except asyncio.TimeoutError:
@@ -387,7 +400,11 @@ class Telnet_connector:
                               f"draining buffer...")
                 await self.writer.drain()  # May raise ConnectionError
                 logging.debug(f"[Attempt {attempt+1}/{max_retries+1}] Command sent, reading response...")
+                sent_at = time.monotonic()
                 response = await self.read_until_timeout(read_timeout)  # May raise ConnectionError
+                if self._first_chunk_at is not None:
+                    # 首個數據塊是命令回顯，記為往返時間樣本
+                    self.adaptive.observe(self.host, self._first_chunk_at - sent_at)
 
                 # --- 检查响应是否为空且连接已断开 ---
                 if not response and (not self.reader or not self.writer or self.writer.is_closing()):
@@ -477,6 +494,98 @@ class Telnet_connector:
         raise ConnectionError(f"Command send failed unexpectedly after {max_retries + 1} attempts. Last known error: "
                               f"{last_exception}")
 
+    async def send_command_framed(self, command: str, timeout: float | None = None) -> Tuple[str, int]:
+        """發送命令並在結束標記到達時立即返回輸出和退出碼。
+
+        命令前後各輸出一個帶隨機 nonce 的標記（見 `CommandFrame`），結束標記附帶 `$?`，
+        因此不需要像 `send_command` 那樣等待 read_timeout 秒的靜默才判定命令完成。
+        若在開始標記之前收到登錄提示（會話已掉回登錄界面），會重新登錄並重發一次。
+
+        Args:
+            command: 要執行的 shell 命令（不含結尾的換行符）。
+            timeout: 等待命令完成的最長時間（秒），默認按命令類別和設備往返時間推算。
+
+        Returns:
+            (命令輸出, 退出碼)，輸出不含命令回顯和提示符。
+
+        Raises:
+            ConnectionError: 如果連接未建立或在讀取過程中被關閉。
+            asyncio.TimeoutError: 如果在 timeout 秒內未收到結束標記。
+        """
+        if not self.writer or not self.reader or self.writer.is_closing():
+            await self.connect()
+        if timeout is None:
+            timeout = self.adaptive.timeout_for(self.host, command)
+
+        for relogin in (True, False):
+            frame = CommandFrame(command)
+            await self._write_line(frame.wrap())
+            result = await self._read_frame(frame, timeout, allow_login=relogin)
+            if result is not None:
+                return result
+            logging.warning(f"{self.host}: 命令執行前檢測到登錄提示，重新登錄後重發")
+            # 登錄提示已被讀走，直接發送用户名，再由 _auto_login 處理密碼提示
+            await self._write_line(self.username)
+            await self._auto_login()
+        raise ConnectionError(f"{self.host}: 重新登錄後仍停留在登錄提示")
+
+    async def _read_frame(self, frame: CommandFrame, timeout: float,
+                          allow_login: bool = True) -> Tuple[str, int] | None:
+        """讀取直到分帧命令的結束標記完整到達。
+
+        Args:
+            frame: 已發送命令的分帧信息。
+            timeout: 最長等待時間（秒）。
+            allow_login: 開始標記前輸出停在登錄提示時是否返回 None 交給調用方重新登錄。
+
+        Returns:
+            (命令輸出, 退出碼)；檢測到登錄提示時返回 None。
+        """
+        matcher = StreamMatcher([frame.end_marker])
+        started = time.monotonic()
+        deadline = started + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"等待命令完成超時: {frame.command!r}")
+            try:
+                chunk = await asyncio.wait_for(self.reader.read(4096), timeout=remaining)
+            except asyncio.TimeoutError:
+                continue
+            if not chunk:
+                self.reader = None
+                self.writer = None
+                raise ConnectionError("Connection closed by remote host while waiting for command frame.")
+            if not len(matcher):
+                self.adaptive.observe(self.host, time.monotonic() - started)
+            if matcher.feed(chunk):
+                result = frame.parse(matcher.text)
+                if result is not None:
+                    return result
+            elif allow_login and self._at_login_prompt(matcher.tail(128)) \
+                    and frame.begin_marker not in matcher.text:
+                return None
+
+    @staticmethod
+    def _at_login_prompt(tail: str) -> bool:
+        """判斷輸出是否停在登錄提示：最後一行以 "login:" 結尾且前面有換行。
+
+        命令回顯中出現的 "login:" 不在輸出末尾，不會被誤判為會話掉回登錄界面。
+        """
+        _, newline, last_line = tail.rpartition('\n')
+        return bool(newline) and last_line.rstrip().lower().endswith("login:")
+
+    async def _write_line(self, line: str):
+        """寫入一行命令，兼容 telnetlib3 的 Unicode 模式和 Bytes 模式。"""
+        if not self.writer:
+            raise ConnectionError("Not connected")
+        data = line + '\r\n'
+        try:
+            self.writer.write(data)  # type: ignore
+        except TypeError:
+            self.writer.write(data.encode('utf-8', errors='ignore'))
+        await self.writer.drain()
+
     async def _send_raw_command(self, command: str) -> str:
         """发送原始命令，不包含重试逻辑，仅用于内部调用
 
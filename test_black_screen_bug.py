@@ -5,7 +5,6 @@ import time
 
 from telnet_connecter import Telnet_connector
 from api_sender import Api_sender
-import re
 
 config = {
     "user": "root",
@@ -71,27 +70,13 @@ class Black_bug_tester:
         await self.tn.send_command(config["user"])
         await self.tn.send_command(config["password"])
         while True:
-            response: str = await self.tn.send_command(cmd, read_timeout=2)
-            if len(response) <= 0:
+            # 分帧执行：结束标记到达即返回，输出不含命令回显和提示符
+            response, _ = await self.tn.send_command_framed(cmd)
+            lines = [line.strip() for line in response.split('\n') if line.strip()]
+            if len(lines) <= 0:
                 continue
-            elif 'ya!2dkwy7-934' in response:
-                continue
-            else:
-                lines = response.split('\n')[1:-2]
-                cmd_response_matches = '\n'.join(lines).strip().replace(' ', '')
-                if len(lines) <= 0:
-                    pattern = fr'\b({expected_result1}|{expected_result2})\b'
-                    match = re.search(pattern, response, re.IGNORECASE)
-                    lines = match
-                    if match:
-                        cmd_response_matches = match.group()
-                        break
-                else:
-                    if len(lines) > 1:
-                        cmd_response_matches = lines[0]  # 有的时候会存在把命令也列出来的情况，导致匹配不上
-                    break
-                # 清空缓冲区
-                await self.tn.reader.read(-1)
+            cmd_response_matches = lines[0].replace(' ', '')
+            break
         return cmd_response_matches, lines, response
 
     async def check_screen_backlight(self):
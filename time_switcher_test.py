@@ -4,7 +4,6 @@ from datetime import datetime, timedelta
 import asyncio
 from telnet_connecter import Telnet_connector
 from api_sender import Api_sender
-import re
 
 host = ['192.168.1.10']
 config = {
@@ -41,19 +40,9 @@ class Time_switcher_tester:
         # Now self.tn should be a valid connector object
         await self.tn.send_command(config["user"])
         await self.tn.send_command(config["password"])
-        while True:
-            response: str = await self.tn.send_command('cat /tmp/screen_on_off', read_timeout=2)
-            if len(response) <= 0:
-                continue
-            else:
-                break
-        lines = response.split('\n')[1:-2]
-        screen_status = '\n'.join(lines).strip().replace(' ', '')
-        if len(lines) <= 0:
-            pattern = r'\b(on|off)\b'
-            match = re.search(pattern, response, re.IGNORECASE)
-            if match:
-                screen_status = match.group()
+        # 分帧执行：结束标记到达即返回，不再等待2秒静默
+        response, _ = await self.tn.send_command_framed('cat /tmp/screen_on_off')
+        screen_status = response.strip().replace(' ', '')
         return screen_status
 
     async def tn_initialize(self):